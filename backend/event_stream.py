@@ -0,0 +1,104 @@
+"""
+Отдача событий прогресса сессий (src/progress_events.py) клиентам: SSE и WebSocket
+
+Клиент сразу получает текущее состояние сессии, затем - каждое изменение. Поток
+закрывается после терминального статуса; в паузах уходит keep-alive.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from src.progress_events import TERMINAL_STATUSES, get_progress_bus
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS = 15
+
+# Начальное состояние, если шина еще ничего не знает о сессии (например после перезапуска бэкенда)
+InitialState = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+
+def _dumps(state: Dict[str, Any]) -> str:
+    return json.dumps(state, ensure_ascii=False, default=str)
+
+
+def _is_terminal(state: Dict[str, Any]) -> bool:
+    return state.get("status") in TERMINAL_STATUSES
+
+
+async def _seed(topic: str, initial_state: Optional[InitialState]):
+    bus = get_progress_bus()
+    if initial_state is not None and bus.get_state(topic) is None:
+        state = await initial_state()
+        if state:
+            bus.publish(topic, state)
+
+
+def sse_response(topic: str, initial_state: Optional[InitialState] = None) -> StreamingResponse:
+    """text/event-stream со снимками состояния сессии topic (событие "progress")"""
+
+    async def events():
+        await _seed(topic, initial_state)
+        async with get_progress_bus().subscribe(topic) as subscription:
+            # Клиент переподключается через 3 секунды после обрыва (EventSource)
+            yield "retry: 3000\n\n"
+            while True:
+                state = await subscription.get(timeout=KEEPALIVE_SECONDS)
+                if state is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {state['seq']}\nevent: progress\ndata: {_dumps(state)}\n\n"
+                if _is_terminal(state):
+                    yield "event: end\ndata: {}\n\n"
+                    return
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx не должен буферизовать поток
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def websocket_stream(websocket: WebSocket, topic: Optional[str], initial_state: Optional[InitialState] = None):
+    """
+    Снимки состояния сессии topic (None - всех сессий) в WebSocket.
+    Отправка ждет клиента; пока он не успевает, промежуточные снимки вытесняются последними.
+    """
+    await websocket.accept()
+    if topic is not None:
+        await _seed(topic, initial_state)
+
+    async def drain_client():
+        # Входящие сообщения не используются, но без чтения не узнать о закрытии соединения
+        while True:
+            await websocket.receive_text()
+
+    reader = asyncio.create_task(drain_client())
+    try:
+        async with get_progress_bus().subscribe(topic) as subscription:
+            while not reader.done():
+                getter = asyncio.create_task(subscription.get(timeout=KEEPALIVE_SECONDS))
+                done, _ = await asyncio.wait({getter, reader}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    break
+                state = getter.result()
+                if state is None:
+                    await websocket.send_json({"type": "keepalive"})
+                    continue
+                await websocket.send_text(_dumps(state))
+                if topic is not None and _is_terminal(state):
+                    await websocket.close()
+                    break
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"Progress WebSocket for {topic or 'all sessions'} closed: {e}")
+    finally:
+        reader.cancel()
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks, WebSocket, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import os
@@ -9,17 +9,15 @@ import shutil
 import aiofiles
 import logging
 import pandas as pd
-from fastapi.responses import PlainTextResponse, FileResponse
+from fastapi.responses import PlainTextResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import asyncio
 import json
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import aiohttp
-from openai import AsyncOpenAI
 from src.external_apis.scrapingbee_client import CustomScrapingBeeClient
-import tempfile # Added for temporary file for zip archive
-import numpy as np
+from src.external_apis.rate_limiter import create_async_openai_client
 
 # Adjust sys.path to allow importing from src
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -30,11 +28,16 @@ from src.pipeline import run_pipeline  # Новая публичная функ
 from src.pipeline.adapter import PipelineAdapter  # Класс с методом run_pipeline_for_file
 from src.pipeline.core import process_companies  # Перенесенная функция
 from src.pipeline.utils.logging import setup_session_logging  # Перенесенная функция
+from src.pipeline.utils.checkpoints import CheckpointIndex, CHECKPOINT_DB_NAME  # Индекс контрольных точек сессий
 from src.config import OUTPUT_DIR, load_env_vars, load_llm_config
-from src.data_io import load_session_metadata, save_session_metadata, SESSIONS_DIR
+from src.data_io import load_session_metadata, get_session_metadata, add_session_metadata, update_session_metadata, SESSIONS_DIR, jsonl_path_for, iter_jsonl_results, iter_json_array
 
 # --- Import background task runner --- 
 from .processing_runner import run_session_pipeline
+from .event_stream import sse_response, websocket_stream
+from .zip_stream import resolve_session_dir, session_archive_response
+from src.progress_events import get_progress_bus
+from src.results_store import get_results_store, parse_columns, parse_filters, parse_sort
 
 # --- Import routers ---
 from .routers import sessions  # Импортируем роутер сессий
@@ -76,9 +79,6 @@ app.include_router(criteria.router, prefix="/api")
 # Монтируем статические файлы
 app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
-# Store active WebSocket connections
-active_connections: list[WebSocket] = []
-
 # --- Начало изменений: Управление фоновыми задачами ---
 # Словарь для хранения активных задач обработки
 # Ключ: session_id (str), Значение: asyncio.Task
@@ -142,7 +142,7 @@ async def execute_pipeline_for_session_async(
         logger.info("[EXECUTE_PIPELINE] aiohttp.ClientSession created.")
         sb_client = CustomScrapingBeeClient(api_key=scrapingbee_api_key) 
         logger.info("[EXECUTE_PIPELINE] ScrapingBeeClient created.")
-        openai_async_client = AsyncOpenAI(api_key=openai_api_key)
+        openai_async_client = create_async_openai_client(openai_api_key)
         logger.info("[EXECUTE_PIPELINE] AsyncOpenAI client created.")
         
         try:
@@ -192,11 +192,11 @@ def _processing_task_done_callback(task: asyncio.Task, session_id: str):
         logger.info(f"Processing task for session {session_id} finished successfully (via callback).")
         # Обновляем метаданные: статус = "completed"
         try:
-            all_metadata = load_session_metadata()
-            session_data = next((s for s in all_metadata if s.get('session_id') == session_id), None)
-            if session_data and session_data.get('status') != 'cancelled':  # Не перезаписываем статус cancelled
-                session_data['status'] = 'completed'
-                save_session_metadata(all_metadata)
+            # Не перезаписываем статус cancelled (проверка и запись - одна транзакция)
+            session_data = update_session_metadata(
+                session_id, lambda s: None if s.get('status') == 'cancelled' else {'status': 'completed'}
+            )
+            if session_data and session_data.get('status') == 'completed':
                 logger.info(f"Updated session {session_id} status to 'completed' in metadata")
         except Exception as e:
             logger.error(f"Failed to update session {session_id} metadata to completed: {e}")
@@ -204,12 +204,7 @@ def _processing_task_done_callback(task: asyncio.Task, session_id: str):
         logger.info(f"Processing task for session {session_id} was cancelled (via callback).")
         # Обновляем метаданные: статус = "cancelled"
         try:
-            all_metadata = load_session_metadata()
-            session_data = next((s for s in all_metadata if s.get('session_id') == session_id), None)
-            if session_data:
-                session_data['status'] = 'cancelled'
-                session_data['error_message'] = 'Processing cancelled by user'
-                save_session_metadata(all_metadata)
+            if update_session_metadata(session_id, status='cancelled', error_message='Processing cancelled by user'):
                 logger.info(f"Updated session {session_id} status to 'cancelled' in metadata")
         except Exception as e:
             logger.error(f"Failed to update session {session_id} metadata to cancelled: {e}")
@@ -217,12 +212,7 @@ def _processing_task_done_callback(task: asyncio.Task, session_id: str):
         logger.error(f"Processing task for session {session_id} failed with error (via callback): {e}", exc_info=True)
         # Обновляем метаданные: статус = "error"
         try:
-            all_metadata = load_session_metadata()
-            session_data = next((s for s in all_metadata if s.get('session_id') == session_id), None)
-            if session_data:
-                session_data['status'] = 'error'
-                session_data['error_message'] = str(e)
-                save_session_metadata(all_metadata)
+            if update_session_metadata(session_id, status='error', error_message=str(e)):
                 logger.info(f"Updated session {session_id} status to 'error' in metadata")
         except Exception as meta_e:
             logger.error(f"Failed to update session {session_id} metadata to error: {meta_e}")
@@ -235,23 +225,22 @@ def _processing_task_done_callback(task: asyncio.Task, session_id: str):
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    active_connections.append(websocket)
-    try:
-        while True:
-            # Keep connection alive
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        active_connections.remove(websocket)
+    """События прогресса всех сессий (src/progress_events.py)"""
+    await websocket_stream(websocket, None)
+
+@app.websocket("/ws/sessions/{session_id}")
+async def session_websocket_endpoint(websocket: WebSocket, session_id: str):
+    """Текущее состояние сессии и его изменения; соединение закрывается после завершения сессии"""
+    await websocket_stream(websocket, session_id, initial_state=lambda: _session_initial_state(session_id))
+
+async def _session_initial_state(session_id: str) -> Optional[dict]:
+    return get_session_metadata(session_id)
 
 async def broadcast_update(data: dict):
-    """Broadcast update to all connected clients"""
-    for connection in active_connections:
-        try:
-            await connection.send_json(data)
-        except:
-            # Remove dead connections
-            active_connections.remove(connection)
+    """Опубликовать обновление сессии подписчикам /ws, /ws/sessions/{id} и /api/sessions/{id}/events"""
+    session_id = data.get("session_id")
+    if session_id:
+        get_progress_bus().publish(session_id, data)
 
 # Маршрут для главной страницы
 @app.get("/")
@@ -292,8 +281,7 @@ async def create_new_session(
     session_id = f"{timestamp}_{base_filename}"
     session_dir = SESSIONS_DIR / session_id
 
-    metadata = load_session_metadata()
-    if any(s.get('session_id') == session_id for s in metadata):
+    if get_session_metadata(session_id) is not None:
         session_id += f"_{int(time.time() * 1000) % 1000}"
         session_dir = SESSIONS_DIR / session_id
         logging.warning(f"Session ID collision detected, generated new ID: {session_id}")
@@ -374,9 +362,8 @@ async def create_new_session(
             "write_to_hubspot": write_to_hubspot
         }
         
-        metadata.append(new_session_data)
         try:
-            save_session_metadata(metadata)
+            add_session_metadata(new_session_data)
             logging.info(f"Added new session metadata for ID: {session_id}")
         except Exception as e:
              logging.error(f"Failed to save session metadata after creating session {session_id}: {e}")
@@ -393,8 +380,7 @@ async def start_session_processing(session_id: str, background_tasks: Background
     Starts the data processing pipeline for the specified session in the background.
     """
     # 1. Find session metadata
-    all_metadata = load_session_metadata()
-    session_data = next((s for s in all_metadata if s.get('session_id') == session_id), None)
+    session_data = get_session_metadata(session_id)
     
     if not session_data:
         raise HTTPException(status_code=404, detail=f"Session with ID '{session_id}' not found.")
@@ -415,9 +401,7 @@ async def start_session_processing(session_id: str, background_tasks: Background
     if not input_file_path_rel or not (PROJECT_ROOT / input_file_path_rel).exists():
         logging.error(f"Input file path missing or file not found for session {session_id}: {input_file_path_rel}")
         # Update status to error maybe?
-        session_data['status'] = 'error'
-        session_data['error_message'] = "Input file missing or path invalid in metadata."
-        save_session_metadata(all_metadata)
+        update_session_metadata(session_id, status='error', error_message="Input file missing or path invalid in metadata.")
         raise HTTPException(status_code=400, detail="Input file path missing or invalid in session metadata.")
 
     # --- Wrap task adding in try/except --- 
@@ -433,9 +417,7 @@ async def start_session_processing(session_id: str, background_tasks: Background
         
         # Update status IN METADATA immediately after successfully adding task?
         # This prevents UI showing old status until task actually starts running.
-        session_data['status'] = 'queued' # Or 'starting'
-        session_data['error_message'] = None # Clear previous errors on restart
-        save_session_metadata(all_metadata)
+        update_session_metadata(session_id, status='queued', error_message=None) # Clear previous errors on restart
         logging.info(f"Updated session {session_id} status to 'queued' in metadata.")
         
     except Exception as e_task:
@@ -447,11 +429,67 @@ async def start_session_processing(session_id: str, background_tasks: Background
     # 5. Return immediate response
     return {"message": f"Processing queued in background for session {session_id}"}
 
+@app.post("/api/sessions/{session_id}/resume", tags=["Sessions"], summary="Resume an interrupted session")
+async def resume_session_processing(session_id: str):
+    """
+    Resumes a cancelled, failed or interrupted (e.g. by a container restart) session.
+    Companies finished by the previous run are restored from the session checkpoint index,
+    unfinished ones restart from their last completed stage.
+    """
+    session_data = get_session_metadata(session_id)
+    if not session_data:
+        raise HTTPException(status_code=404, detail=f"Session with ID '{session_id}' not found.")
+
+    # Статус running/queued без активной задачи означает, что процесс был перезапущен посреди обработки
+    task = active_processing_tasks.get(session_id)
+    if task and not task.done():
+        raise HTTPException(status_code=409, detail=f"Session '{session_id}' is already running.")
+    if session_data.get("status") == "completed":
+        raise HTTPException(status_code=409, detail=f"Session '{session_id}' has already completed.")
+
+    input_file_path_rel = session_data.get("input_file_path")
+    if not input_file_path_rel or not (PROJECT_ROOT / input_file_path_rel).exists():
+        raise HTTPException(status_code=400, detail="Input file path missing or invalid in session metadata.")
+
+    checkpoint_path = SESSIONS_DIR / session_id / CHECKPOINT_DB_NAME
+    checkpoint_summary = None
+    if checkpoint_path.exists():
+        checkpoint_index = CheckpointIndex(checkpoint_path)
+        checkpoint_summary = checkpoint_index.summary()
+        checkpoint_index.close()
+    else:
+        logging.info(f"No checkpoint index for session {session_id}, resume will process all companies.")
+
+    try:
+        task = asyncio.create_task(run_session_pipeline(session_id, broadcast_update, resume=True))
+        active_processing_tasks[session_id] = task
+        task.add_done_callback(lambda t: _processing_task_done_callback(t, session_id))
+
+        update_session_metadata(
+            session_id, lambda s: {'status': 'queued', 'error_message': None, 'resume_count': s.get('resume_count', 0) + 1}
+        )
+        logging.info(f"Queued resume of session {session_id}, checkpoint: {checkpoint_summary}")
+    except Exception as e_task:
+        logging.error(f"Failed to queue resume for session {session_id}: {e_task}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue resume for session {session_id}.")
+
+    return {"message": f"Resume queued in background for session {session_id}", "checkpoint": checkpoint_summary}
+
 @app.get("/api/sessions/{session_id}/results", tags=["Sessions"], summary="Get session results")
-async def get_session_results(session_id: str):
-    """Retrieves the processed results from the session's CSV file."""
-    all_metadata = load_session_metadata()
-    session_data = next((s for s in all_metadata if s.get('session_id') == session_id), None)
+async def get_session_results(
+    session_id: str,
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    columns: Optional[str] = Query(None, description="Comma-separated result columns to return"),
+    filter: Optional[List[str]] = Query(None, description="column:op:value, e.g. Qualified_Products:contains:CRM"),
+    sort: Optional[str] = Query(None, description="Comma-separated columns, '-' prefix for descending")
+):
+    """
+    Retrieves a page of processed results from the session's results index (built from the CSV).
+    Without limit all matching rows are returned; the number of matching rows is in X-Total-Count.
+    """
+    session_data = get_session_metadata(session_id)
     
     if not session_data:
         raise HTTPException(status_code=404, detail=f"Session with ID '{session_id}' not found.")
@@ -462,6 +500,7 @@ async def get_session_results(session_id: str):
         raise HTTPException(status_code=404, detail=f"Results file path not found in metadata for session '{session_id}'.")
         
     output_csv_path = PROJECT_ROOT / output_csv_path_rel
+    response.headers["X-Total-Count"] = "0"
     
     if not output_csv_path.exists():
         # File doesn't exist yet (maybe processing started but hasn't written anything)
@@ -470,53 +509,33 @@ async def get_session_results(session_id: str):
         return [] 
         
     try:
-        # Check if file is empty or only has header
-        if output_csv_path.stat().st_size < 50: # Small threshold
-             logging.info(f"Results file {output_csv_path} is empty or header only for session {session_id}. Returning empty list.")
-             return []
-             
-        # Read CSV using pandas, assuming comma separator from our writer
-        df = pd.read_csv(output_csv_path, sep=',', encoding='utf-8-sig')
-        
-        # Convert NaN/NaT to None (which becomes null in JSON)
-        df = df.where(pd.notnull(df), None)
-        
-        # Обрабатываем специальные числовые значения, которые не могут быть сериализованы в JSON
-        for col in df.select_dtypes(include=['float', 'float64']).columns:
-            df[col] = df[col].apply(lambda x: None if pd.isna(x) or np.isinf(x) else x)
-            
-        # Конвертируем DataFrame в словари
-        results = df.to_dict(orient='records')
-        
-        # Дополнительная очистка для JSON сериализации
-        def clean_for_json(obj):
-            if isinstance(obj, float):
-                if np.isnan(obj) or np.isinf(obj):
-                    return None
-                return obj
-            elif isinstance(obj, (np.integer, np.floating)):
-                return obj.item()
-            elif obj is pd.NaT or obj is None:
-                return None
-            elif isinstance(obj, str):
-                return obj
-            else:
-                return str(obj)
-        
-        # Применяем очистку ко всем значениям
-        cleaned_results = []
-        for result in results:
-            cleaned_result = {key: clean_for_json(value) for key, value in result.items()}
-            cleaned_results.append(cleaned_result)
-            
-        return cleaned_results
-    except pd.errors.EmptyDataError:
-        logging.warning(f"Results file {output_csv_path} is empty for session {session_id}. Returning empty list.")
+        filters = parse_filters(filter)
+        order = parse_sort(sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # Страница читается из индекса результатов (SQLite рядом с CSV), а не из всего CSV
+        total, results = get_results_store(output_csv_path).query(
+            columns=parse_columns(columns), filters=filters, sort=order, offset=offset, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        logging.warning(f"Results file {output_csv_path} disappeared for session {session_id}, returning empty list.")
         return []
     except Exception as e:
-        logging.error(f"Error reading results CSV for session {session_id} from {output_csv_path}: {e}")
+        logging.error(f"Error reading results for session {session_id} from {output_csv_path}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to read or parse results file for session '{session_id}'.")
 
+    response.headers["X-Total-Count"] = str(total)
+    # Формат ответа прежний: bool-значения отдавались строками "True"/"False"
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, bool):
+                result[key] = str(value)
+    return results
+
 @app.get("/api/sessions/{session_id}/logs/{log_type}", tags=["Sessions"], summary="Get session log file content")
 async def get_session_log(session_id: str, log_type: str):
     """
@@ -526,8 +545,7 @@ async def get_session_log(session_id: str, log_type: str):
     if log_type not in ["pipeline", "scoring"]:
         raise HTTPException(status_code=400, detail="Invalid log_type. Must be 'pipeline' or 'scoring'.")
         
-    all_metadata = load_session_metadata()
-    session_data = next((s for s in all_metadata if s.get('session_id') == session_id), None)
+    session_data = get_session_metadata(session_id)
     
     if not session_data:
         raise HTTPException(status_code=404, detail=f"Session with ID '{session_id}' not found.")
@@ -556,72 +574,21 @@ async def get_session_log(session_id: str, log_type: str):
         raise HTTPException(status_code=500, detail=f"Failed to read {log_type} log file for session '{session_id}'.")
 
 @app.get("/api/sessions/{session_id}/download_archive", tags=["Sessions"], summary="Download session archive")
-async def download_session_archive(session_id: str, background_tasks: BackgroundTasks):
+async def download_session_archive(
+    session_id: str,
+    include: Optional[List[str]] = Query(None, description="Only these subfolders (top-level files are always included)"),
+    exclude: Optional[List[str]] = Query(None, description="Subfolders to leave out, e.g. serper_results")
+):
     """
-    Downloads a ZIP archive of the entire specified session directory.
+    Streams a ZIP archive of the specified session directory (generated chunk by chunk, no temp file).
     """
-    all_metadata = load_session_metadata()
-    session_data = next((s for s in all_metadata if s.get('session_id') == session_id), None)
+    session_data = get_session_metadata(session_id)
 
     if not session_data:
         raise HTTPException(status_code=404, detail=f"Session with ID '{session_id}' not found.")
 
-    session_dir_path = SESSIONS_DIR / session_id
-    if not session_dir_path.is_dir():
-        logger.error(f"Session directory not found for session_id: {session_id} at path: {session_dir_path}")
-        raise HTTPException(status_code=404, detail=f"Session directory for ID '{session_id}' not found on server.")
-
-    # Create a temporary file for the archive
-    try:
-        # We need a temporary file path that shutil.make_archive can write to.
-        # tempfile.NamedTemporaryFile creates a file, make_archive needs a base name for the archive.
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmpfile:
-            temp_zip_path_obj = Path(tmpfile.name)
-        
-        # shutil.make_archive will append '.zip' to base_name if format is 'zip'
-        # So, we give it the path without the .zip suffix.
-        archive_base_name = temp_zip_path_obj.with_suffix('') 
-        
-        archive_path_str = shutil.make_archive(
-            base_name=str(archive_base_name), 
-            format='zip', 
-            root_dir=str(SESSIONS_DIR), # Archive contents relative to SESSIONS_DIR
-            base_dir=session_id        # The directory to archive within SESSIONS_DIR
-        )
-        
-        archive_path = Path(archive_path_str) # Convert back to Path object
-
-        if not archive_path.exists():
-            logger.error(f"Failed to create archive for session {session_id} at {archive_path}")
-            raise HTTPException(status_code=500, detail="Failed to create session archive.")
-
-        # Schedule the removal of the temporary archive file after the response is sent
-        background_tasks.add_task(os.remove, archive_path)
-
-        return FileResponse(
-            path=archive_path,
-            filename=f"{session_id}_archive.zip",
-            media_type='application/zip'
-        )
-    except Exception as e:
-        logger.error(f"Error creating or serving session archive for {session_id}: {e}", exc_info=True)
-        # Clean up temp file if it exists and an error occurred before FileResponse
-        if 'archive_path' in locals() and archive_path.exists(): # type: ignore
-            try:
-                os.remove(archive_path) # type: ignore
-            except Exception as e_clean:
-                logger.error(f"Failed to clean up temporary archive {archive_path} after error: {e_clean}") # type: ignore
-        elif 'temp_zip_path_obj' in locals() and temp_zip_path_obj.exists(): # type: ignore
-             try:
-                os.remove(temp_zip_path_obj) # type: ignore
-             except Exception as e_clean:
-                logger.error(f"Failed to clean up temporary file {temp_zip_path_obj} after error: {e_clean}") # type: ignore
-        raise HTTPException(status_code=500, detail=f"Could not create or serve session archive: {str(e)}")
-
-# --- Placeholder for future routes --- 
-# Example:
-# from .routers import sessions # Assuming routes are split into routers
-# app.include_router(sessions.router)
+    session_dir_path = resolve_session_dir(SESSIONS_DIR, session_id)
+    return session_archive_response(session_dir_path, session_id, include=include, exclude=exclude)
 
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
@@ -645,6 +612,14 @@ async def upload_file(file: UploadFile = File(...)):
 async def download_file(session_dir: str, filename: str):
     file_path = OUTPUT_DIR / "sessions" / session_dir / filename
     if not file_path.is_file():
+        # JSON результаты еще идущей сессии существуют только как JSONL журнал - отдаем массив потоково
+        jsonl_path = jsonl_path_for(file_path)
+        if file_path.suffix == ".json" and jsonl_path.is_file():
+            return StreamingResponse(
+                iter_json_array(iter_jsonl_results(jsonl_path)),
+                media_type="application/json",
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+            )
         raise HTTPException(status_code=404, detail="File not found")
     return FileResponse(path=file_path, filename=filename)
 
@@ -659,12 +634,7 @@ async def cancel_processing_session(session_id: str):
     
     # Обновляем статус в метаданных
     try:
-        all_metadata = load_session_metadata()
-        session_data = next((s for s in all_metadata if s.get('session_id') == session_id), None)
-        if session_data:
-            session_data['status'] = 'cancelled'
-            session_data['error_message'] = 'Processing cancelled by user'
-            save_session_metadata(all_metadata)
+        if update_session_metadata(session_id, status='cancelled', error_message='Processing cancelled by user'):
             logger.info(f"Updated session {session_id} status to 'cancelled' in metadata")
     except Exception as e:
         logger.error(f"Failed to update session {session_id} metadata during cancellation: {e}")
@@ -685,17 +655,13 @@ async def cancel_processing_session(session_id: str):
         logger.warning(f"No active task found for session {session_id} to cancel.")
         return {"status": "no_active_task", "session_id": session_id, "message": "No active processing task found for this session."}
 
-# Пример эндпоинта для получения статуса (нужно адаптировать)
 @app.get("/api/sessions/{session_id}/status", tags=["Sessions"], summary="Get session status")
 async def get_session_status(session_id: str):
-    # Здесь должна быть логика чтения метаданных сессии (например, из JSON файла)
-    # sessions_metadata = load_session_metadata()
-    # session_meta = next((s for s in sessions_metadata if s["id"] == session_id), None)
-    # if not session_meta:
-    #     raise HTTPException(status_code=404, detail="Session not found")
-
-    status = "unknown" # session_meta.get("status", "unknown")
-    message = "" # session_meta.get("message", "")
+    # Метаданные одной сессии читаются по индексу session_id - запрос не зависит от числа сессий
+    session_meta = get_session_metadata(session_id)
+
+    status = session_meta.get("status", "unknown") if session_meta else "unknown"
+    message = (session_meta.get("error_message") or "") if session_meta else ""
     
     if session_id in active_processing_tasks and not active_processing_tasks[session_id].done():
         status = "processing"
@@ -706,6 +672,22 @@ async def get_session_status(session_id: str):
 
     return {"session_id": session_id, "status": status, "message": message} #, "progress": progress}
 
+@app.get("/api/sessions/{session_id}/events", tags=["Sessions"], summary="Stream session progress (SSE)")
+async def stream_session_events(session_id: str):
+    """
+    Server-Sent Events: метаданные сессии и прогресс пайплайна (progress_processed/progress_total)
+    при каждом изменении вместо опроса /api/sessions/{id}; поток закрывается после завершения сессии
+    """
+    if not get_session_metadata(session_id):
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return sse_response(session_id, initial_state=lambda: _session_initial_state(session_id))
+
+@app.on_event("startup")
+async def app_startup():
+    # Воркер движка критериев стартует заранее: первый анализ не ждет импорта модулей и разбора критериев
+    if os.getenv("CRITERIA_ENGINE_WARMUP", "true").lower() == "true":
+        app.state.criteria_engine_warmup = asyncio.create_task(criteria.get_criteria_engine().warm_up())
+
 # Важно: При завершении работы сервера FastAPI (graceful shutdown),
 # нужно попытаться отменить все активные задачи.
 @app.on_event("shutdown")
@@ -727,6 +709,7 @@ async def app_shutdown():
         if session_id in active_processing_tasks: # Проверяем снова, т.к. колбэк мог уже удалить
             del active_processing_tasks[session_id]
     logger.info("All active tasks processed for cancellation during shutdown.")
+    criteria.get_criteria_engine().shutdown()
 
 # --- Конец примера изменений ---
 
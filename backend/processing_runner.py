@@ -14,25 +14,32 @@ sys.path.insert(0, str(PROJECT_ROOT))
 # Обновленные импорты для новой структуры
 from src.pipeline import get_pipeline_adapter # Импортируем get_pipeline_adapter
 from src.pipeline.utils.logging import setup_session_logging
-from src.data_io import load_session_metadata, save_session_metadata, SESSIONS_DIR # Import session helpers
+from src.data_io import get_session_metadata, update_session_metadata, SESSIONS_DIR # Import session helpers
 from src.config import load_env_vars, load_llm_config # Import config loaders
-from openai import AsyncOpenAI
 from src.external_apis.scrapingbee_client import CustomScrapingBeeClient
+from src.external_apis.rate_limiter import create_async_openai_client
+from src.language_detection import start_translation_stats
+from src.progress_events import start_session_events, publish_session_progress
+from src.pipeline.utils.checkpoints import CheckpointIndex
+from src.external_apis.url_resolver import start_url_resolution_session, URL_CACHE_FILE_NAME
+from src.external_apis.hubspot_cache import get_hubspot_cache
 
-async def run_session_pipeline(session_id: str, broadcast_update=None):
+async def run_session_pipeline(session_id: str, broadcast_update=None, resume: bool = False):
     """
     Runs the full data processing pipeline for a given session ID in the background.
     Updates the session metadata with status (running, completed, error).
+
+    Per-company progress is recorded in the session checkpoint index. With resume=True
+    companies finished by a previous run are restored from it and unfinished ones
+    continue from their last completed stage; otherwise the index is reset.
     """
     session_logger = logging.getLogger(f"pipeline.session.{session_id}")
     session_logger.info(f"Background task started for session: {session_id}")
     
-    all_metadata = [] # Инициализируем на случай ошибки на раннем этапе
     session_data = {} # Инициализируем на случай ошибки на раннем этапе
     
     try:
-        all_metadata = load_session_metadata()
-        session_data = next((s for s in all_metadata if s.get('session_id') == session_id), None)
+        session_data = get_session_metadata(session_id)
         if not session_data:
             session_logger.error(f"[BG Task {session_id}] Session metadata not found. Aborting.")
             return
@@ -75,9 +82,7 @@ async def run_session_pipeline(session_id: str, broadcast_update=None):
         
     except Exception as e_path:
         session_logger.error(f"[BG Task {session_id}] Error preparing file paths: {e_path}. Aborting.")
-        session_data['status'] = 'error'
-        session_data['error_message'] = f"Error preparing paths: {e_path}"
-        if all_metadata: save_session_metadata(all_metadata)
+        update_session_metadata(session_id, status='error', error_message=f"Error preparing paths: {e_path}")
         return
 
     try:
@@ -91,19 +96,37 @@ async def run_session_pipeline(session_id: str, broadcast_update=None):
         # session_logger.info(f"Scoring Log: {scoring_log_path}") # Удаляем из логов
     except Exception as e_log:
         logging.error(f"[BG Task {session_id}] Error setting up session logging: {e_log}. Aborting.")
-        session_data['status'] = 'error'
-        session_data['error_message'] = f"Error setting up logging: {e_log}"
-        if all_metadata: save_session_metadata(all_metadata)
+        update_session_metadata(session_id, status='error', error_message=f"Error setting up logging: {e_log}",
+                                output_csv_path=session_data['output_csv_path'], pipeline_log_path=session_data['pipeline_log_path'])
         return
 
-    session_data['status'] = 'running'
-    session_data['error_message'] = None 
-    save_session_metadata(all_metadata) 
+    update_session_metadata(session_id, status='running', error_message=None,
+                            output_csv_path=session_data['output_csv_path'], pipeline_log_path=session_data['pipeline_log_path'])
 
     success_count = 0
     failure_count = 0
     pipeline_error = None
+    # Статистика пропущенных переводов этой сессии (задачи пайплайна наследуют ее через contextvars)
+    translation_stats = start_translation_stats()
+    # Прогресс пайплайна публикуется в тему сессии (задачи наследуют session_id через contextvars)
+    start_session_events(session_id)
+    publish_session_progress(progress_processed=None, progress_total=None, last_company=None)
+    checkpoint_index = None
+    url_resolver = None
+    # Кэш поиска HubSpot общий для процесса - статистика запуска считается от этого снимка
+    hubspot_cache = get_hubspot_cache()
+    hubspot_cache_snapshot = hubspot_cache.snapshot()
     try:
+        checkpoint_index = CheckpointIndex.for_session(session_dir)
+        url_cache_path = session_dir / URL_CACHE_FILE_NAME
+        if resume:
+            session_logger.info(f"Resuming session {session_id} from checkpoint index: {checkpoint_index.summary()}")
+        else:
+            checkpoint_index.reset()
+            url_cache_path.unlink(missing_ok=True)
+        # Кэш проверок URL/DNS сессии: каждый домен проверяется один раз за запуск (и не проверяется снова при возобновлении)
+        url_resolver = start_url_resolution_session(url_cache_path)
+        
         session_logger.info("Loading API keys and LLM config...")
         try:
             # Исправленная распаковка - теперь получаем 4 значения, включая hubspot_api_key
@@ -121,7 +144,7 @@ async def run_session_pipeline(session_id: str, broadcast_update=None):
             
         session_logger.info("Initializing API clients...")
         try:
-            openai_client = AsyncOpenAI(api_key=openai_api_key)
+            openai_client = create_async_openai_client(openai_api_key)
             sb_client = CustomScrapingBeeClient(api_key=scrapingbee_api_key) 
         except Exception as e_client:
             pipeline_error = f"API Client initialization failed: {e_client}"
@@ -201,20 +224,24 @@ async def run_session_pipeline(session_id: str, broadcast_update=None):
                 pipeline_adapter.output_csv_path = output_csv_path
                 pipeline_adapter.pipeline_log_path = pipeline_log_path
                 pipeline_adapter.company_col_index = 0 # Предполагаем, что это всегда 0 по умолчанию
+                pipeline_adapter.checkpoint_index = checkpoint_index
 
                 # Запускаем пайплайн
-                success_count, failure_count, all_results = await pipeline_adapter.run(
-                    # Параметры, которые run может все еще ожидать:
-                    # run_standard_pipeline=run_standard_pipeline, # Эти флаги из session_data
-                    # run_llm_deep_search_pipeline=run_llm_deep_search_pipeline
-                    # broadcast_update=broadcast_update # callback
-                    # main_batch_size # из параметров функции run_session_pipeline
-                    # context_text # из session_data
-                    expected_csv_fieldnames = expected_cols, # <--- Передаем наш список полей
-                    write_to_hubspot = write_to_hubspot # <--- Передаем флаг записи в HubSpot
-                    # aiohttp_session, sb_client, openai_client - уже установлены как атрибуты
-                    # llm_config, api_keys - уже установлены как атрибуты
-                )
+                try:
+                    success_count, failure_count, all_results = await pipeline_adapter.run(
+                        # Параметры, которые run может все еще ожидать:
+                        # run_standard_pipeline=run_standard_pipeline, # Эти флаги из session_data
+                        # run_llm_deep_search_pipeline=run_llm_deep_search_pipeline
+                        # broadcast_update=broadcast_update # callback
+                        # main_batch_size # из параметров функции run_session_pipeline
+                        # context_text # из session_data
+                        expected_csv_fieldnames = expected_cols, # <--- Передаем наш список полей
+                        write_to_hubspot = write_to_hubspot # <--- Передаем флаг записи в HubSpot
+                        # aiohttp_session, sb_client, openai_client - уже установлены как атрибуты
+                        # llm_config, api_keys - уже установлены как атрибуты
+                    )
+                finally:
+                    await pipeline_adapter.close()
                 
                 session_logger.info(f"Pipeline completed with {success_count} successes and {failure_count} failures.")
                 
@@ -243,41 +270,48 @@ async def run_session_pipeline(session_id: str, broadcast_update=None):
         session_data['error_message'] = None if failure_count == 0 else f"Completed with {failure_count} errors"
 
     finally:
-        # Перезагружаем метаданные ПЕРЕД финальным сохранением,
-        # чтобы учесть изменения от других модулей (например, normalize_urls)
-        current_all_metadata = load_session_metadata()
-        final_session_data_idx = -1
+        # Обновляем только те поля, за которые отвечает этот runner
+        # (одна транзакция - изменения других модулей, например normalize_urls, сохраняются)
         # Используем локальный session_data для получения статуса, который был определен в try/except/else выше
-        determined_status = session_data.get('status', 'unknown') 
-        determined_error_message = session_data.get('error_message')
+        final_fields = {
+            'status': session_data.get('status', 'unknown'),
+            'processed_count': success_count,
+            'error_count': failure_count,
+            'error_message': session_data.get('error_message'),
+            'completion_time': asyncio.get_running_loop().time(),
+            'translation_stats': dict(translation_stats),
+            'hubspot_cache_stats': hubspot_cache.get_stats(since=hubspot_cache_snapshot),
+        }
+        if checkpoint_index:
+            final_fields['checkpoint_summary'] = checkpoint_index.summary()
+        if url_resolver:
+            final_fields['url_resolution_stats'] = url_resolver.get_stats()
 
-        for idx, meta_item in enumerate(current_all_metadata):
-            if meta_item.get("session_id") == session_id:
-                final_session_data_idx = idx
-                break
-        
-        status_to_log = 'unknown' # Для лога в конце
-        error_msg_to_log = ''    # Для лога в конце
+        try:
+            final_session_data = update_session_metadata(session_id, final_fields)
+        except Exception as e_meta:
+            session_logger.error(f"[BG Task {session_id}] Failed to save final session metadata: {e_meta}")
+            final_session_data = final_fields
 
-        if final_session_data_idx != -1:
-            # Обновляем только те поля, за которые отвечает этот runner
-            current_all_metadata[final_session_data_idx]['status'] = determined_status
-            current_all_metadata[final_session_data_idx]['processed_count'] = success_count
-            current_all_metadata[final_session_data_idx]['error_count'] = failure_count
-            current_all_metadata[final_session_data_idx]['error_message'] = determined_error_message
-            current_all_metadata[final_session_data_idx]['completion_time'] = asyncio.get_running_loop().time()
-            
-            save_session_metadata(current_all_metadata)
-            
-            status_to_log = current_all_metadata[final_session_data_idx].get('status', 'unknown')
-            error_msg_to_log = current_all_metadata[final_session_data_idx].get('error_message', '')
+        if final_session_data is not None:
+            status_to_log = final_session_data.get('status', 'unknown')
+            error_msg_to_log = final_session_data.get('error_message', '')
         else:
-            session_logger.error(f"[BG Task {session_id}] Session metadata not found in list during final save. This is unexpected.")
-            # Если сессии нет в списке, то и сохранять нечего, но нужно залогировать и для broadcast_update
+            session_logger.error(f"[BG Task {session_id}] Session metadata not found during final save. This is unexpected.")
+            # Если сессии нет в хранилище, то и сохранять нечего, но нужно залогировать и для broadcast_update
             status_to_log = 'error' 
-            error_msg_to_log = 'Session data not found in metadata list for final update'
+            error_msg_to_log = 'Session data not found in metadata store for final update'
 
         session_logger.info(f"Background task ended for session: {session_id} - Status: {status_to_log}{' - ' + error_msg_to_log if error_msg_to_log else ''}")
+        if translation_stats["checked"]:
+            session_logger.info(f"Translation stats: {translation_stats['skipped']}/{translation_stats['checked']} translations skipped, "
+                                f"~{translation_stats['estimated_tokens_saved']} tokens saved")
+        if checkpoint_index:
+            checkpoint_index.close()
+        if url_resolver:
+            session_logger.info(f"URL resolution cache stats: {url_resolver.get_stats()}")
+            url_resolver.close()
+        session_logger.info(f"HubSpot lookup cache stats: {final_fields['hubspot_cache_stats']}")
         
         if broadcast_update:
             await broadcast_update({
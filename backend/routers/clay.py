@@ -5,13 +5,13 @@ import logging
 import time
 from datetime import datetime
 import aiohttp
-from openai import AsyncOpenAI
 import os
 import uuid
 import asyncio
 
 from src.config import load_env_vars, load_llm_config
 from src.external_apis.scrapingbee_client import CustomScrapingBeeClient
+from src.external_apis.rate_limiter import create_async_openai_client
 from src.pipeline.core import process_companies
 
 router = APIRouter(prefix="/api/clay", tags=["Clay Integration"])
@@ -90,7 +90,7 @@ async def process_company_for_clay(request: ClayCompanyRequest):
         # Initialize clients (ТОЧНО как в основном коде)
         async with aiohttp.ClientSession() as aiohttp_session:
             sb_client = CustomScrapingBeeClient(api_key=scrapingbee_api_key)
-            openai_client = AsyncOpenAI(api_key=openai_api_key)
+            openai_client = create_async_openai_client(openai_api_key)
             
             # Convert companies to format expected by process_companies (ТОЧНО как в основном коде)
             company_names_for_processing = []
@@ -225,7 +225,7 @@ async def process_and_send_to_clay_webhook(task_id: str, request: ClayAsyncReque
         # Обрабатываем компанию
         async with aiohttp.ClientSession() as aiohttp_session:
             sb_client = CustomScrapingBeeClient(api_key=scrapingbee_api_key)
-            openai_client = AsyncOpenAI(api_key=openai_api_key)
+            openai_client = create_async_openai_client(openai_api_key)
             
             company_names_for_processing = []
             for company in main_request_data["companies"]:
@@ -13,11 +13,15 @@ import pandas as pd
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, File, Form, UploadFile, HTTPException
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException, WebSocket, Query
 from starlette.background import BackgroundTasks
 from fastapi.responses import FileResponse, JSONResponse
-from src.data_io import load_session_metadata, save_session_metadata, SESSIONS_DIR, SESSIONS_METADATA_FILE
+from src.data_io import get_session_metadata, SESSIONS_DIR
 from .sessions import cleanup_old_sessions  # Добавляем импорт функции очистки
+from ..event_stream import sse_response, websocket_stream
+from ..zip_stream import resolve_session_dir, session_archive_response
+from src.progress_events import TERMINAL_STATUSES, get_progress_bus
+from src.results_store import get_results_store, parse_columns, parse_filters, parse_sort
 
 # Добавляем путь к criteria_processor в sys.path СРАЗУ
 CRITERIA_PROCESSOR_PATH = Path(__file__).parent.parent.parent / "services" / "criteria_processor"
@@ -34,153 +38,82 @@ if str(CRITERIA_PROCESSOR_PATH) not in sys.path:
     sys.path.insert(0, str(CRITERIA_PROCESSOR_PATH))
 
 # Импортируем правильные пути из data_io.py
-from src.data_io import SESSIONS_DIR, SESSIONS_METADATA_FILE
+from src.data_io import SESSIONS_DIR
 
-def run_criteria_processor(input_file_path: str, load_all_companies: bool = False, session_id: str = None, use_deep_analysis: bool = False, use_parallel: bool = True, max_concurrent: int = 12, selected_products: List[str] = None, selected_criteria_files: List[str] = None, write_to_hubspot_criteria: bool = False):
-    """Запускаем criteria_processor как отдельный процесс"""
-    import subprocess
-    import shutil
-    import os
-    
-    try:
-        if load_all_companies:
-            cmd = [
-                "python", 
-                str(CRITERIA_PROCESSOR_PATH / "main.py"),
-                "--all-files"
-            ]
-            if session_id:
-                cmd.extend(["--session-id", session_id])
-        else:
-            # Очищаем папку data от старых файлов перед копированием нового
-            data_dir = CRITERIA_PROCESSOR_PATH / "data"
-            data_dir.mkdir(exist_ok=True)
-            
-            # Удаляем все CSV файлы из data папки
-            for old_file in data_dir.glob("*.csv"):
-                old_file.unlink()
-                logger.info(f"Removed old file: {old_file}")
-            
-            # Копируем новый файл в data папку criteria_processor
-            source_path = Path(input_file_path)
-            target_path = data_dir / source_path.name
-            
-            # Логируем пути
-            logger.info(f"Copying file: {source_path} -> {target_path}")
-            
-            # Копируем файл
-            shutil.copy2(source_path, target_path)
-            
-            # Проверяем что файл скопировался
-            if target_path.exists():
-                logger.info(f"File copied successfully: {target_path}")
-            else:
-                logger.error(f"File copy failed: {target_path}")
-                return {"status": "error", "error": "Failed to copy file to data directory"}
-            
-            cmd = [
-                "python", 
-                str(CRITERIA_PROCESSOR_PATH / "main.py"),
-                "--file", f"data/{target_path.name}",  # Путь относительно criteria_processor
-                "--session-id", session_id  # Передаем session_id для создания отдельной папки
-            ]
-        
-        if use_deep_analysis:
-            cmd.append("--deep-analysis")
-        
-        # Добавляем параметры параллельной обработки
-        if use_parallel:
-            cmd.append("--parallel")
-            cmd.extend(["--max-concurrent", str(max_concurrent)])
-        
-        # НОВАЯ ЛОГИКА: Обрабатываем выбранные файлы критериев
-        if selected_criteria_files:
-            # Преобразуем имена файлов в продукты
-            # Читаем файлы критериев и извлекаем продукты только из выбранных файлов
-            criteria_dir = CRITERIA_PROCESSOR_PATH / "criteria"
-            selected_products_from_files = []
-            
-            for filename in selected_criteria_files:
-                file_path = criteria_dir / filename
-                if file_path.exists():
-                    try:
-                        if file_path.suffix.lower() == '.csv':
-                            import pandas as pd
-                            df = pd.read_csv(file_path)
-                            if 'Product' in df.columns:
-                                file_products = df['Product'].unique().tolist()
-                                file_products = [str(p).strip() for p in file_products if pd.notna(p) and str(p).strip()]
-                                selected_products_from_files.extend(file_products)
-                                logger.info(f"From file {filename} extracted products: {file_products}")
-                    except Exception as e:
-                        logger.error(f"Error reading criteria file {filename}: {e}")
-            
-            # Удаляем дубликаты
-            selected_products_from_files = list(set(selected_products_from_files))
-            logger.info(f"Final products from selected files: {selected_products_from_files}")
-            
-            if selected_products_from_files:
-                cmd.append("--selected-products")
-                cmd.append(",".join(selected_products_from_files))
-                logger.info(f"Adding products from selected files to command: {selected_products_from_files}")
-            
-        # Fallback к старой логике с selected_products
-        elif selected_products:
-            cmd.append("--selected-products")
-            cmd.append(",".join(selected_products))
-            logger.info(f"Adding selected products to command: {selected_products}")
-        else:
-            logger.info("No selected products or files specified - will process all products")
-        
-        # Add Circuit Breaker support (enabled by default, can be disabled via env var)
-        import os
-        if os.getenv('DISABLE_CIRCUIT_BREAKER', 'false').lower() == 'true':
-            cmd.append("--disable-circuit-breaker")
-            logger.info("Circuit Breaker отключен через переменную окружения")
-        
-        # Add HubSpot integration flag
-        logger.info(f"🔍 HUBSPOT ПАРАМЕТР ПРОВЕРКА:")
-        logger.info(f"   🔗 write_to_hubspot_criteria = {write_to_hubspot_criteria}")
-        logger.info(f"   📝 Тип параметра: {type(write_to_hubspot_criteria)}")
-        
-        if write_to_hubspot_criteria:
-            cmd.append("--write-to-hubspot-criteria")
-            logger.info("✅ HubSpot интеграция включена - добавлен флаг --write-to-hubspot-criteria")
-        else:
-            logger.info("📝 HubSpot интеграция отключена - флаг НЕ добавлен")
-        
-        # Log the full command for debugging ПОСЛЕ добавления всех флагов
-        logger.info(f"🚀 ИТОГОВАЯ КОМАНДА: {' '.join(cmd)}")
-        
-        # Меняем рабочую директорию на criteria_processor
-        # Устанавливаем UTF-8 кодировку для Windows
-        env = os.environ.copy()
-        env['PYTHONIOENCODING'] = 'utf-8'
-        env['PYTHONLEGACYWINDOWSSTDIO'] = '0'
-        
-        result = subprocess.run(
-            cmd, 
-            cwd=str(CRITERIA_PROCESSOR_PATH),
-            capture_output=True, 
-            text=True, 
-            encoding='utf-8',
-            env=env,
-            timeout=None  # Без ограничений - пусть работает сколько нужно
-        )
-        
-        if result.returncode == 0:
-            logger.info(f"Criteria processor completed successfully")
-            return {"status": "success", "output": result.stdout}
-        else:
-            logger.error(f"Criteria processor failed: {result.stderr}")
-            return {"status": "error", "error": result.stderr}
-            
-    except subprocess.TimeoutExpired:
-        logger.error("Criteria processor timed out")
-        return {"status": "error", "error": "Process timed out"}
-    except Exception as e:
-        logger.error(f"Error running criteria processor: {e}")
-        return {"status": "error", "error": str(e)}
+_progress_journal_module = None
+
+def load_progress_journal():
+    """
+    Читатель журнала прогресса criteria_processor (src/utils/progress_journal.py).
+    У сервиса свой пакет src, поэтому модуль загружается по пути к файлу.
+    """
+    global _progress_journal_module
+    if _progress_journal_module is None:
+        _progress_journal_module = _load_service_module("criteria_progress_journal", "src/utils/progress_journal.py")
+    return _progress_journal_module
+
+_criteria_catalog_module = None
+# Снапшот каталога воркеров движка (CRITERIA_CATALOG_PATH в config.py сервиса)
+CRITERIA_CATALOG_SNAPSHOT = CRITERIA_PROCESSOR_PATH / "cache" / "criteria_catalog.pkl"
+
+def _load_service_module(module_name: str, relative_path: str):
+    """Загрузить модуль criteria_processor, не импортирующий пакет src, по пути к файлу"""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(module_name, CRITERIA_PROCESSOR_PATH / relative_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _read_criteria_file(file_path: str) -> pd.DataFrame:
+    """Файл критериев как есть (список файлов показывает исходное содержимое)"""
+    if file_path.lower().endswith('.xlsx'):
+        return pd.read_excel(file_path)
+    return pd.read_csv(file_path)
+
+def get_criteria_catalog():
+    """
+    Каталог файлов критериев бэкенда (src/data/criteria_catalog.py сервиса):
+    файлы перечитываются только после изменения, список /files не читает все CSV на каждый запрос
+    """
+    global _criteria_catalog_module
+    if _criteria_catalog_module is None:
+        _criteria_catalog_module = _load_service_module("criteria_catalog", "src/data/criteria_catalog.py")
+    return _criteria_catalog_module.get_criteria_catalog(
+        str(CRITERIA_PROCESSOR_PATH / "criteria"),
+        parse_file=_read_criteria_file,
+        parser_id="backend",
+        patterns=("*.csv", "*.xlsx"),
+        # backup файлы не показываются (на случай если они остались от старых версий)
+        exclude=(".backup_", ".deleted_")
+    )
+
+def invalidate_criteria_catalog(filename: str):
+    """После изменения файла через API: сбросить каталог бэкенда и снапшот воркеров движка"""
+    catalog = get_criteria_catalog()
+    catalog.invalidate(filename)
+    _criteria_catalog_module.remove_snapshot(str(CRITERIA_CATALOG_SNAPSHOT))
+
+from criteria_engine import get_criteria_engine  # Пул процессов движка (services/criteria_processor/criteria_engine.py)
+
+async def run_criteria_processor(input_file_path: str, load_all_companies: bool = False, session_id: str = None, use_deep_analysis: bool = False, use_parallel: bool = True, max_concurrent: int = 12, selected_products: List[str] = None, selected_criteria_files: List[str] = None, write_to_hubspot_criteria: bool = False):
+    """Запускаем анализ в воркере движка критериев (вместо отдельного процесса main.py на каждый анализ)"""
+    logger.info(f"🚀 Criteria engine job {session_id}: file={input_file_path}, all_files={load_all_companies}, "
+                f"parallel={use_parallel}, max_concurrent={max_concurrent}, criteria_files={selected_criteria_files}, "
+                f"products={selected_products}, write_to_hubspot_criteria={write_to_hubspot_criteria}")
+    return await get_criteria_engine().run(
+        # Входной файл читается прямо из папки сессии - общая папка data/ нужна только для режима "все файлы"
+        companies_file=None if load_all_companies else input_file_path,
+        load_all_companies=load_all_companies,
+        session_id=session_id,
+        use_deep_analysis=use_deep_analysis,
+        use_parallel=use_parallel,
+        max_concurrent=max_concurrent,
+        selected_products=selected_products,
+        selected_criteria_files=selected_criteria_files,
+        write_to_hubspot_criteria=write_to_hubspot_criteria,
+        # Circuit Breaker включен по умолчанию, можно отключить переменной окружения
+        disable_circuit_breaker=os.getenv('DISABLE_CIRCUIT_BREAKER', 'false').lower() == 'true'
+    )
 
 logger = logging.getLogger(__name__)
 
@@ -221,12 +154,10 @@ async def run_criteria_analysis_task(
         # Обновляем статус
         criteria_sessions[session_id]["status"] = "processing"
         criteria_sessions[session_id]["start_time"] = datetime.now().isoformat()
+        _publish_criteria_status(session_id)
         
-        # Запускаем анализ как отдельный процесс
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            run_criteria_processor,
+        # Запускаем анализ в пуле процессов движка критериев
+        result = await run_criteria_processor(
             str(input_file_path),
             load_all_companies,
             session_id,
@@ -243,7 +174,7 @@ async def run_criteria_analysis_task(
             criteria_sessions[session_id].update({
                 "status": "completed",
                 "end_time": datetime.now().isoformat(),
-                "output": result["output"]
+                "companies_processed": result["companies"]
             })
             logger.info(f"Completed criteria analysis for session {session_id}")
         else:
@@ -267,6 +198,7 @@ async def run_criteria_analysis_task(
         # Удаляем задачу из активных
         if session_id in criteria_tasks:
             del criteria_tasks[session_id]
+        _publish_criteria_status(session_id)
 
 def cleanup_old_sessions(max_sessions: int = 10) -> None:
     """
@@ -495,19 +427,8 @@ async def create_criteria_analysis_from_session(
         # Получаем информацию о существующей сессии
         import json
         
-        # Загружаем метаданные сессий через data_io.py (работает и локально и в Docker)
-        metadata = []
-        if SESSIONS_METADATA_FILE.exists():
-            try:
-                with open(SESSIONS_METADATA_FILE, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                    if not isinstance(metadata, list):
-                        metadata = []
-            except Exception as e:
-                logger.error(f"Error loading session metadata: {e}")
-                metadata = []
-        
-        source_session = next((m for m in metadata if m.get("session_id") == session_id), None)
+        # Метаданные сессии из хранилища data_io.py (работает и локально и в Docker)
+        source_session = get_session_metadata(session_id)
         
         if not source_session:
             raise HTTPException(status_code=404, detail=f"Source session {session_id} not found")
@@ -619,9 +540,43 @@ async def get_criteria_session_status(session_id: str):
         "progress": "In progress..." if session_data["status"] == "processing" else "Complete"
     }
 
+def _select_results_file(session_results_dir: Path) -> Optional[Path]:
+    """Файл результатов сессии: самый свежий из *results*/*analysis* (иначе самый свежий CSV/JSON)"""
+    result_files = [f for pattern in ("*.csv", "*.json") for f in session_results_dir.glob(pattern)]
+    if not result_files:
+        return None
+    # Приоритет файлам с "results" или "analysis" в названии
+    results_files = [f for f in result_files if any(keyword in f.name.lower() for keyword in ['results', 'analysis'])]
+    return max(results_files or result_files, key=lambda f: f.stat().st_mtime)
+
+def _clean_json_value(obj):
+    """Рекурсивно очищает данные от некорректных float значений (NaN/inf в JSON All_Results)"""
+    if isinstance(obj, dict):
+        return {k: _clean_json_value(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_clean_json_value(item) for item in obj]
+    elif isinstance(obj, float) and (obj != obj or obj in (float('inf'), float('-inf'))):
+        return None
+    return obj
+
+def _parse_all_results(value):
+    if not isinstance(value, str):
+        return value
+    try:
+        return _clean_json_value(json.loads(value))
+    except (json.JSONDecodeError, TypeError):
+        return value
+
 @router.get("/sessions/{session_id}/results")
-async def get_criteria_session_results(session_id: str):
-    """Получить результаты анализа критериев"""
+async def get_criteria_session_results(
+    session_id: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    columns: Optional[str] = Query(None, description="Comma-separated result columns to return"),
+    filter: Optional[List[str]] = Query(None, description="column:op:value, e.g. Qualified_Products:contains:CRM"),
+    sort: Optional[str] = Query(None, description="Comma-separated columns, '-' prefix for descending")
+):
+    """Получить страницу результатов анализа критериев (offset/limit, колонки, фильтры, сортировка)"""
     if session_id not in criteria_sessions:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -636,124 +591,73 @@ async def get_criteria_session_results(session_id: str):
     # Ищем файлы результатов в папке сессии
     session_results_dir = CRITERIA_PROCESSOR_PATH / "output" / session_id
     
-    logger.info(f"Looking for results in: {session_results_dir}")
-    
     if not session_results_dir.exists():
         logger.error(f"Session results directory not found: {session_results_dir}")
         return {
             "session_id": session_id, 
             "status": "completed",
             "results_count": 0,
+            "total": 0,
             "results": [],
             "message": f"Session results directory not found: {session_results_dir}"
         }
     
-    result_files = []
-    
-    # Поиск CSV и JSON файлов с результатами в папке сессии
-    for pattern in ["*.csv", "*.json"]:
-        found_files = list(session_results_dir.glob(pattern))
-        result_files.extend(found_files)
-        logger.info(f"Found {len(found_files)} files with pattern {pattern}: {[f.name for f in found_files]}")
-    
-    logger.info(f"Total result files found: {len(result_files)}")
-    
-    # Возвращаем результирующие файлы, отдавая приоритет файлам с результатами
-    if result_files:
-        # Приоритет файлам с "results" или "analysis" в названии
-        results_files = [f for f in result_files if any(keyword in f.name.lower() for keyword in ['results', 'analysis'])]
-        
-        if results_files:
-            # Из файлов результатов берем самый свежий
-            latest_file = max(results_files, key=lambda f: f.stat().st_mtime)
-            logger.info(f"Selected results file: {latest_file.name} from {len(results_files)} result files")
-        else:
-            # Если нет файлов с результатами, берем самый свежий из всех
-            latest_file = max(result_files, key=lambda f: f.stat().st_mtime)
-            logger.info(f"No dedicated results files found, selected: {latest_file.name}")
-        
-        try:
-            if latest_file.suffix == '.csv':
-                # Читаем CSV как DataFrame и конвертируем в JSON
-                df = pd.read_csv(latest_file)
-                # Агрессивная очистка данных для корректной JSON сериализации
-                import numpy as np
-                df = df.replace([float('inf'), float('-inf'), np.inf, -np.inf], None)
-                df = df.where(pd.notnull(df), None)
-                
-                # Парсим JSON в колонке All_Results
-                if 'All_Results' in df.columns:
-                    import json
-                    def parse_json_column(value):
-                        if pd.isna(value) or value is None:
-                            return None
-                        try:
-                            if isinstance(value, str):
-                                return json.loads(value)
-                            return value
-                        except (json.JSONDecodeError, TypeError):
-                            return value
-                    
-                    df['All_Results'] = df['All_Results'].apply(parse_json_column)
-                
-                # Конвертируем в records и дополнительно очищаем
-                records = df.to_dict('records')
-                
-                # Дополнительная очистка каждой записи
-                def clean_data_recursive(obj):
-                    """Рекурсивно очищает данные от некорректных float значений"""
-                    if isinstance(obj, dict):
-                        return {k: clean_data_recursive(v) for k, v in obj.items()}
-                    elif isinstance(obj, list):
-                        return [clean_data_recursive(item) for item in obj]
-                    elif isinstance(obj, float):
-                        if np.isnan(obj) or np.isinf(obj):
-                            return None
-                        return obj
-                    elif pd.isna(obj):
-                        return None
-                    else:
-                        return obj
-                
-                cleaned_records = []
-                for record in records:
-                    cleaned_record = clean_data_recursive(record)
-                    cleaned_records.append(cleaned_record)
-                
-                results = cleaned_records
-            else:
-                # Читаем JSON файл
-                import json
-                with open(latest_file, 'r', encoding='utf-8') as f:
-                    results = json.load(f)
-            
-            logger.info(f"Results loaded successfully: {len(results) if isinstance(results, list) else 1} records from {latest_file.name}")
-            logger.info(f"Sample data (first record): {results[0] if isinstance(results, list) and len(results) > 0 else 'No records'}")
-            
-            return {
-                "session_id": session_id,
-                "status": "completed",
-                "results_count": len(results) if isinstance(results, list) else 1,
-                "results": results,
-                "result_file": str(latest_file)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error reading results file {latest_file}: {e}")
-            logger.error(f"File details: {latest_file.stat()}")
-            raise HTTPException(status_code=500, detail=f"Failed to read results: {str(e)}")
-    
-    else:
+    latest_file = _select_results_file(session_results_dir)
+    if latest_file is None:
         logger.error(f"No result files found in {session_results_dir}")
-        logger.error(f"Directory contents: {list(session_results_dir.iterdir()) if session_results_dir.exists() else 'Directory does not exist'}")
         return {
             "session_id": session_id, 
             "status": "completed",
             "results_count": 0,
+            "total": 0,
             "results": [],
             "message": "No result files found"
         }
 
+    try:
+        filters = parse_filters(filter)
+        order = parse_sort(sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        if latest_file.suffix == '.csv':
+            # Страница читается из индекса результатов (SQLite рядом с CSV); All_Results разбирается только для нее
+            total, results = get_results_store(latest_file).query(
+                columns=parse_columns(columns), filters=filters, sort=order, offset=offset, limit=limit
+            )
+            for record in results:
+                if 'All_Results' in record:
+                    record['All_Results'] = _parse_all_results(record['All_Results'])
+        else:
+            if filters or order or columns:
+                raise HTTPException(status_code=400, detail="Filtering, sorting and column selection are only supported for CSV results")
+            with open(latest_file, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+            if not isinstance(results, list):
+                results = [results]
+            total = len(results)
+            results = results[offset:offset + limit] if limit is not None else results[offset:]
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error reading results file {latest_file}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to read results: {str(e)}")
+
+    logger.info(f"Results loaded: {len(results)} of {total} records from {latest_file.name}")
+    return {
+        "session_id": session_id,
+        "status": "completed",
+        "results_count": len(results),
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "results": results,
+        "result_file": str(latest_file)
+    }
+
 @router.get("/sessions/{session_id}/download")
 async def download_criteria_results(session_id: str):
     """Скачивает CSV файл с результатами анализа для указанной сессии."""
@@ -781,6 +685,22 @@ async def download_criteria_results(session_id: str):
         media_type="text/csv"
     )
 
+@router.get("/sessions/{session_id}/download_archive")
+async def download_criteria_session_archive(
+    session_id: str,
+    include: Optional[List[str]] = Query(None, description="Только эти подпапки (файлы верхнего уровня входят всегда)"),
+    exclude: Optional[List[str]] = Query(None, description="Подпапки, которые не нужно архивировать")
+):
+    """Потоковый ZIP архив папки сессии в output микросервиса (без временного файла)"""
+    if session_id not in criteria_sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    session_dir = resolve_session_dir(CRITERIA_PROCESSOR_PATH / "output", session_id)
+    return session_archive_response(
+        session_dir, session_id, include=include, exclude=exclude,
+        filename=f"criteria_analysis_{session_id}.zip"
+    )
+
 @router.get("/sessions/{session_id}/scrapingbee_logs")
 async def download_scrapingbee_logs(session_id: str):
     """Скачивает единый, читаемый файл .log с результатами ScrapingBee."""
@@ -818,6 +738,7 @@ async def cancel_criteria_analysis(session_id: str):
         "status": "cancelled",
         "end_time": datetime.now().isoformat()
     })
+    _publish_criteria_status(session_id)
     
     return {
         "session_id": session_id,
@@ -833,66 +754,32 @@ async def get_criteria_files():
     if not criteria_dir.exists():
         return {"files": [], "products": []}
     
+    catalog = get_criteria_catalog()
+    # Разбираются только новые и изменившиеся файлы, остальные берутся из каталога
+    catalog.refresh()
+    
     files = []
     all_products = set()
     
-    # Поддерживаем как CSV, так и XLSX файлы
-    for pattern in ["*.csv", "*.xlsx"]:
-        for file_path in criteria_dir.glob(pattern):
-            # Исключаем backup файлы из отображения (на случай если они остались от старых версий)
-            if ".backup_" in file_path.name or ".deleted_" in file_path.name:
-                continue
-            try:
-                # Читаем файл в зависимости от расширения
-                if file_path.suffix.lower() == '.csv':
-                    df = pd.read_csv(file_path)
-                elif file_path.suffix.lower() == '.xlsx':
-                    df = pd.read_excel(file_path)
-                else:
-                    continue  # Пропускаем неподдерживаемые файлы
-                
-                # ФИЛЬТРАЦИЯ ПУСТЫХ СТРОК для правильного подсчета
-                # Основные колонки для критериев
-                main_columns = ['Product', 'Criteria', 'Target Audience']
-                existing_columns = [col for col in main_columns if col in df.columns]
-                
-                if existing_columns:
-                    # Удаляем строки где ВСЕ основные колонки пустые
-                    df_filtered = df.dropna(subset=existing_columns, how='all')
-                    df_filtered = df_filtered[df_filtered[existing_columns].ne('').any(axis=1)]
-                    actual_rows = len(df_filtered)
-                else:
-                    # Если нет основных колонок, считаем все непустые строки
-                    actual_rows = len(df.dropna(how='all'))
-                
-                # Извлекаем продукты из файла
-                file_products = []
-                if 'Product' in df.columns:
-                    file_products = df['Product'].unique().tolist()
-                    # Убираем NaN значения
-                    file_products = [p for p in file_products if pd.notna(p) and str(p).strip()]
-                    all_products.update(file_products)
-                
-                files.append({
-                    "filename": file_path.name,
-                    "full_path": str(file_path),
-                    "size": file_path.stat().st_size,
-                    "modified": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
-                    "rows_preview": min(5, actual_rows),  # Показываем до 5 строк для preview
-                    "total_rows": actual_rows,  # РЕАЛЬНОЕ количество строк с данными
-                    "columns": list(df.columns) if not df.empty else [],
-                    "products": file_products  # Продукты в этом файле
-                })
-            except Exception as e:
-                logger.error(f"Error reading criteria file {file_path}: {e}")
-                files.append({
-                    "filename": file_path.name,
-                    "full_path": str(file_path),
-                    "size": file_path.stat().st_size,
-                    "modified": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
-                    "error": str(e),
-                    "products": []
-                })
+    for info in catalog.files():
+        file_path = criteria_dir / info["filename"]
+        entry = {
+            "filename": info["filename"],
+            "full_path": str(file_path),
+            "size": info["size"],
+            "modified": datetime.fromtimestamp(info["mtime_ns"] / 1e9).isoformat(),
+            "products": info["products"]  # Продукты в этом файле
+        }
+        if "error" in info:
+            entry["error"] = info["error"]
+        else:
+            entry.update({
+                "rows_preview": min(5, info["total_rows"]),  # Показываем до 5 строк для preview
+                "total_rows": info["total_rows"],  # РЕАЛЬНОЕ количество строк с данными
+                "columns": info["columns"]
+            })
+            all_products.update(info["products"])
+        files.append(entry)
     
     return {
         "files": files,
@@ -955,6 +842,7 @@ async def update_criteria_file(filename: str, file_data: dict):
         df.to_csv(file_path, index=False)
         
         logger.info(f"Updated criteria file: {filename}")
+        invalidate_criteria_catalog(filename)
         
         return {
             "message": "File updated successfully",
@@ -1005,6 +893,7 @@ async def create_criteria_file(file_data: dict):
         df.to_csv(file_path, index=False)
         
         logger.info(f"Created new criteria file: {filename}")
+        invalidate_criteria_catalog(filename)
         
         return {
             "message": "File created successfully",
@@ -1041,6 +930,7 @@ async def upload_criteria_file(file: UploadFile = File(...)):
             await f.write(content)
         
         logger.info(f"Uploaded criteria file: {file.filename}")
+        invalidate_criteria_catalog(file.filename)
         
         return {
             "message": "File uploaded successfully",
@@ -1067,6 +957,7 @@ async def delete_criteria_file(filename: str):
         file_path.unlink()
         
         logger.info(f"Deleted criteria file: {filename}")
+        invalidate_criteria_catalog(filename)
         
         return {
             "message": "File deleted successfully",
@@ -1102,6 +993,117 @@ async def criteria_service_health():
             "error": str(e)
         }
 
+def _format_progress(session_id: str, progress_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Ответ /progress по состоянию ProcessingStateManager (он же - событие прогресса для SSE/WebSocket)"""
+    # Рассчитываем процент выполнения
+    total_companies = progress_data.get("total_companies", 0)
+    processed_companies = progress_data.get("processed_companies", 0)
+    total_criteria = progress_data.get("total_criteria", 0)
+    processed_criteria = progress_data.get("processed_criteria", 0)
+    
+    # Приоритет для критериев, если они доступны
+    if total_criteria > 0:
+        percentage = min(100, int((processed_criteria / total_criteria) * 100))
+    elif total_companies > 0:
+        percentage = min(100, int((processed_companies / total_companies) * 100))
+    else:
+        percentage = 0
+    
+    # Создаем описательное сообщение
+    current_stage = progress_data.get("current_stage", "unknown")
+    current_product = progress_data.get("current_product")
+    current_company = progress_data.get("current_company")
+    
+    if current_stage == "general_criteria":
+        message = "Checking general criteria..."
+    elif current_stage == "product_start":
+        message = f"Starting analysis for {current_product}"
+    elif current_stage == "processing":
+        if current_company:
+            message = f"Analyzing {current_company} for {current_product or 'products'}"
+        else:
+            message = "Processing companies..."
+    elif current_stage == "product_completed":
+        message = f"Completed {current_product}"
+    else:
+        message = f"Stage: {current_stage}"
+    
+    # Создаем информацию о критериях
+    criteria_breakdown = progress_data.get("criteria_breakdown", {})
+    criteria_summary = ""
+    if criteria_breakdown:
+        for crit_type, stats in criteria_breakdown.items():
+            if stats.get("total", 0) > 0:
+                criteria_summary += f"{crit_type.title()}: {stats.get('processed', 0)}/{stats.get('total', 0)} "
+    
+    return {
+        "session_id": session_id,
+        "status": progress_data.get("status", "unknown"),
+        "progress": {
+            "criteria": f"{processed_criteria}/{total_criteria}" if total_criteria > 0 else "0/0",
+            "companies": f"{processed_companies}/{total_companies}",
+            "processed": processed_companies,
+            "failed": progress_data.get("failed_companies", 0)
+        },
+        "current": {
+            "product": current_product,
+            "company": current_company,
+            "audience": progress_data.get("current_audience"),
+            "stage": current_stage
+        },
+        "percentage": percentage,
+        "message": message,
+        "criteria_breakdown": criteria_breakdown,
+        "criteria_summary": criteria_summary.strip(),
+        "detailed_progress": True,
+        "last_updated": progress_data.get("updated_at"),
+        "circuit_breaker_events": len(progress_data.get("circuit_breaker_events", [])),
+        "cache": {
+            "serper": progress_data.get("serper_cache"),
+            "scrapingbee": progress_data.get("scrapingbee_cache")
+        }
+    }
+
+def _publish_criteria_progress(session_id: str, progress_data: Dict[str, Any]):
+    """Событие прогресса воркера движка критериев (вызывается из потока чтения очереди прогресса)"""
+    session_data = criteria_sessions.get(session_id)
+    if session_data and session_data.get("status") in TERMINAL_STATUSES:
+        # Очередь прогресса не упорядочена с результатом задачи: поздний "processing"
+        # не должен перекрыть итоговый статус (иначе поток событий новых подписчиков не закончится)
+        return
+    event = _format_progress(session_id, progress_data)
+    if event["status"] in TERMINAL_STATUSES and session_data and session_data.get("status") == "processing":
+        # Итоговый статус публикует задача анализа, когда движок вернул результат
+        event["status"] = "processing"
+    get_progress_bus().publish(session_id, event)
+
+def _publish_criteria_status(session_id: str):
+    """Опубликовать статус сессии из criteria_sessions (старт, завершение, ошибка, отмена)"""
+    session_data = criteria_sessions[session_id]
+    fields = {"status": session_data["status"]}
+    if session_data["status"] == "completed":
+        fields.update({"percentage": 100, "message": "Analysis completed"})
+    if session_data.get("error"):
+        fields["error"] = session_data["error"]
+    get_progress_bus().publish(session_id, fields)
+
+get_criteria_engine().set_progress_callback(_publish_criteria_progress)
+
+@router.get("/sessions/{session_id}/events")
+async def stream_criteria_session_events(session_id: str):
+    """
+    Server-Sent Events с прогрессом анализа (те же поля, что у /progress) при каждом изменении
+    вместо опроса; поток закрывается после завершения анализа
+    """
+    if session_id not in criteria_sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return sse_response(session_id, initial_state=lambda: get_criteria_session_progress(session_id))
+
+@router.websocket("/sessions/{session_id}/ws")
+async def criteria_session_websocket(websocket: WebSocket, session_id: str):
+    """Прогресс анализа через WebSocket (те же события, что у /events)"""
+    await websocket_stream(websocket, session_id, initial_state=lambda: get_criteria_session_progress(session_id))
+
 @router.get("/sessions/{session_id}/progress")
 async def get_criteria_session_progress(session_id: str):
     """Получить детальный прогресс анализа критериев с счетчиками"""
@@ -1109,10 +1111,11 @@ async def get_criteria_session_progress(session_id: str):
         raise HTTPException(status_code=404, detail="Session not found")
     
     try:
-        # Проверяем, есть ли файл прогресса в output папке criteria_processor
+        # Проверяем, есть ли прогресс (снапшот или журнал) в output папке criteria_processor
+        progress_journal = load_progress_journal()
         progress_file = CRITERIA_PROCESSOR_PATH / "output" / session_id / f"{session_id}_progress.json"
         
-        if not progress_file.exists():
+        if not progress_journal.has_progress(progress_file):
             # Если файла нет, проверим есть ли результаты - возможно процесс завершился без progress файла
             session_data = criteria_sessions[session_id]
             
@@ -1206,75 +1209,9 @@ async def get_criteria_session_progress(session_id: str):
                 "detailed_progress": False
             }
         
-        # Читаем детальный прогресс из файла ProcessingStateManager
-        import json
-        with open(progress_file, 'r', encoding='utf-8') as f:
-            progress_data = json.load(f)
-        
-        # Рассчитываем процент выполнения
-        total_companies = progress_data.get("total_companies", 0)
-        processed_companies = progress_data.get("processed_companies", 0)
-        total_criteria = progress_data.get("total_criteria", 0)
-        processed_criteria = progress_data.get("processed_criteria", 0)
-        
-        # Приоритет для критериев, если они доступны
-        if total_criteria > 0:
-            percentage = min(100, int((processed_criteria / total_criteria) * 100))
-        elif total_companies > 0:
-            percentage = min(100, int((processed_companies / total_companies) * 100))
-        else:
-            percentage = 0
-        
-        # Создаем описательное сообщение
-        current_stage = progress_data.get("current_stage", "unknown")
-        current_product = progress_data.get("current_product")
-        current_company = progress_data.get("current_company")
-        
-        if current_stage == "general_criteria":
-            message = "Checking general criteria..."
-        elif current_stage == "product_start":
-            message = f"Starting analysis for {current_product}"
-        elif current_stage == "processing":
-            if current_company:
-                message = f"Analyzing {current_company} for {current_product or 'products'}"
-            else:
-                message = "Processing companies..."
-        elif current_stage == "product_completed":
-            message = f"Completed {current_product}"
-        else:
-            message = f"Stage: {current_stage}"
-        
-        # Создаем информацию о критериях
-        criteria_breakdown = progress_data.get("criteria_breakdown", {})
-        criteria_summary = ""
-        if criteria_breakdown:
-            for crit_type, stats in criteria_breakdown.items():
-                if stats.get("total", 0) > 0:
-                    criteria_summary += f"{crit_type.title()}: {stats.get('processed', 0)}/{stats.get('total', 0)} "
-        
-        return {
-            "session_id": session_id,
-            "status": progress_data.get("status", "unknown"),
-            "progress": {
-                "criteria": f"{processed_criteria}/{total_criteria}" if total_criteria > 0 else "0/0",
-                "companies": f"{processed_companies}/{total_companies}",
-                "processed": processed_companies,
-                "failed": progress_data.get("failed_companies", 0)
-            },
-            "current": {
-                "product": current_product,
-                "company": current_company,
-                "audience": progress_data.get("current_audience"),
-                "stage": current_stage
-            },
-            "percentage": percentage,
-            "message": message,
-            "criteria_breakdown": criteria_breakdown,
-            "criteria_summary": criteria_summary.strip(),
-            "detailed_progress": True,
-            "last_updated": progress_data.get("updated_at"),
-            "circuit_breaker_events": len(progress_data.get("circuit_breaker_events", []))
-        }
+        # Детальный прогресс ProcessingStateManager: снапшот + события журнала
+        progress_data = progress_journal.read_progress(progress_file) or {}
+        return _format_progress(session_id, progress_data)
         
     except Exception as e:
         logger.error(f"Error reading progress for session {session_id}: {e}")
@@ -2,7 +2,7 @@ import time
 import logging
 from fastapi import HTTPException
 from fastapi import APIRouter
-from src.data_io import load_session_metadata, save_session_metadata, SESSIONS_DIR, SESSIONS_METADATA_FILE
+from src.data_io import get_session_metadata, update_session_metadata, list_sessions_by_status, delete_session_metadata, SESSIONS_DIR
 
 logger = logging.getLogger(__name__)
 
@@ -13,17 +13,15 @@ async def get_sessions():
     """Получение списка всех сессий"""
     try:
         logger.info("GET /api/sessions - Вызов функции get_sessions из роутера sessions.py")
-        metadata = load_session_metadata()
-        
-        # Фильтруем только те сессии, папки которых существуют и имеют статус completed
-        import os
+        # Только завершенные сессии (выборка по индексу status), папки которых существуют
+        metadata = list_sessions_by_status("completed")
         filtered_sessions = []
         for session in metadata:
             session_id = session.get("session_id")
             session_dir = SESSIONS_DIR / session_id  # Используем динамический путь
             
-            # Проверяем существование папки сессии и статус completed
-            if session_dir.exists() and session.get("status") == "completed":
+            # Проверяем существование папки сессии
+            if session_dir.exists():
                 # Исправляем поле created_time если используется старое поле timestamp_created
                 if "created_time" not in session and "timestamp_created" in session:
                     session["created_time"] = session["timestamp_created"]
@@ -37,7 +35,7 @@ async def get_sessions():
         # Сортируем по времени создания, новые сверху
         filtered_sessions.sort(key=lambda x: x.get("created_time", ""), reverse=True)
         
-        logger.info(f"Filtered {len(filtered_sessions)} valid sessions out of {len(metadata)} total")
+        logger.info(f"Filtered {len(filtered_sessions)} valid sessions out of {len(metadata)} completed")
         return filtered_sessions
     except Exception as e:
         logger.error(f"Error getting sessions: {e}", exc_info=True)
@@ -48,8 +46,7 @@ async def get_session(session_id: str):
     """Получение информации о сессии по ID"""
     try:
         logger.info(f"GET /api/sessions/{session_id} - Вызов функции get_session из роутера sessions.py")
-        metadata = load_session_metadata()
-        session_data = next((m for m in metadata if m.get("session_id") == session_id), None)
+        session_data = get_session_metadata(session_id)
         
         if not session_data:
             logger.error(f"Session {session_id} not found")
@@ -76,14 +73,7 @@ async def get_session(session_id: str):
                 session_data["processing_messages"] = processing_messages + [new_message]
                 
                 # Сохраняем метаданные, так как добавили новое сообщение
-                current_all_metadata = load_session_metadata() 
-                updated_all_metadata = []
-                for meta_item in current_all_metadata:
-                    if meta_item.get("session_id") == session_id:
-                        updated_all_metadata.append(session_data) 
-                    else:
-                        updated_all_metadata.append(meta_item)
-                save_session_metadata(updated_all_metadata)
+                update_session_metadata(session_id, processing_messages=session_data["processing_messages"])
                 logger.info(f"Session {session_id}: Сохранены метаданные с новым сообщением о дедупликации.")
         
         return session_data
@@ -96,8 +86,7 @@ async def get_session_results_file(session_id: str):
     """Получение пути к результирующему файлу сессии для использования в criteria analysis"""
     try:
         logger.info(f"GET /api/sessions/{session_id}/results_file - Получение пути к результирующему файлу")
-        metadata = load_session_metadata()
-        session_data = next((m for m in metadata if m.get("session_id") == session_id), None)
+        session_data = get_session_metadata(session_id)
         
         if not session_data:
             logger.error(f"Session {session_id} not found")
@@ -129,15 +118,13 @@ def cleanup_old_sessions(max_sessions: int = 10) -> None:
     """
     try:
         logger.info(f"🧹 Начинаем очистку старых сессий (оставляем {max_sessions})")
-        metadata = load_session_metadata()
-        
         # Фильтруем только completed сессии с существующими папками
         valid_sessions = []
-        for session in metadata:
+        for session in list_sessions_by_status("completed"):
             session_id = session.get("session_id")
             session_dir = SESSIONS_DIR / session_id
             
-            if session_dir.exists() and session.get("status") == "completed":
+            if session_dir.exists():
                 # Убеждаемся что есть поле created_time
                 if "created_time" not in session and "timestamp_created" in session:
                     session["created_time"] = session["timestamp_created"]
@@ -160,12 +147,11 @@ def cleanup_old_sessions(max_sessions: int = 10) -> None:
                 if session_dir.exists():
                     shutil.rmtree(session_dir)
                     logger.info(f"🗑️ Удалена папка сессии: {session_id}")
+                
+                # Удаляем метаданные сессии (остальные сессии не перезаписываются)
+                delete_session_metadata(session_id)
             
-            # Обновляем метаданные, оставляя только актуальные сессии
-            updated_metadata = [s for s in metadata if s.get("session_id") not in 
-                              [old_s.get("session_id") for old_s in sessions_to_remove]]
-            save_session_metadata(updated_metadata)
-            logger.info(f"✅ Метаданные обновлены, оставлено {len(updated_metadata)} сессий")
+            logger.info(f"✅ Метаданные обновлены, удалено {len(sessions_to_remove)} сессий")
         else:
             logger.info(f"✅ Очистка не требуется, активных сессий ({len(valid_sessions)}) <= {max_sessions}")
             
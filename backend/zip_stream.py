@@ -0,0 +1,169 @@
+"""
+Потоковая выдача папки сессии ZIP архивом
+
+Архив не собирается во временный файл: zip_chunks() - синхронный генератор, который
+пишет ZIP в буфер и отдает его кусками. StreamingResponse выполняет синхронный
+генератор в пуле потоков, поэтому сжатие не блокирует event loop, а следующий кусок
+готовится только после отправки предыдущего (память - порядка CHUNK_SIZE).
+
+- уже сжатые файлы (архивы, изображения, xlsx...) кладутся без сжатия (ZIP_STORED)
+- include/exclude - подпапки сессии, которые попадают / не попадают в архив
+- временные файлы и индексы результатов (*.index.sqlite) не архивируются
+"""
+
+import logging
+import os
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.results_store import INDEX_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+STORED_SUFFIXES = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".xlsx", ".docx", ".pptx", ".pdf", ".parquet", ".mp4",
+}
+SKIPPED_SUFFIXES = (".tmp", INDEX_SUFFIX, f"{INDEX_SUFFIX}-journal")
+# До 1980 года ZIP даты хранить не умеет
+MIN_ZIP_TIMESTAMP = time.mktime((1980, 1, 1, 0, 0, 0, 0, 0, -1))
+
+
+class _ChunkBuffer:
+    """Файлоподобный приемник для ZipFile (без seek): накопленные байты забирает take()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._size += len(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    @property
+    def size(self) -> int:
+        # Не __len__: ZipFile проверяет приемник как `if not self.fp`
+        return self._size
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self._size = 0
+        return data
+
+
+def _normalize_subfolders(folders: Optional[Sequence[str]]) -> Tuple[str, ...]:
+    return tuple(Path(folder.strip().strip("/\\")).as_posix() for folder in folders or () if folder.strip().strip("/\\"))
+
+
+def _in_folders(relative: str, folders: Tuple[str, ...]) -> bool:
+    return any(relative == folder or relative.startswith(f"{folder}/") for folder in folders)
+
+
+def collect_archive_files(
+    root_dir: Path,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None
+) -> List[Tuple[Path, str]]:
+    """
+    Файлы папки root_dir для архива: (путь, путь относительно root_dir).
+    include - только файлы верхнего уровня и файлы этих подпапок; exclude - без этих подпапок.
+    """
+    include_folders = _normalize_subfolders(include)
+    exclude_folders = _normalize_subfolders(exclude)
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames.sort()
+        relative_dir = Path(dirpath).relative_to(root_dir).as_posix()
+        for filename in sorted(filenames):
+            if filename.endswith(SKIPPED_SUFFIXES):
+                continue
+            relative = filename if relative_dir == "." else f"{relative_dir}/{filename}"
+            if relative_dir != "." and include_folders and not _in_folders(relative_dir, include_folders):
+                continue
+            if exclude_folders and _in_folders(relative_dir, exclude_folders):
+                continue
+            files.append((Path(dirpath) / filename, relative))
+    return files
+
+
+def zip_chunks(files: Sequence[Tuple[Path, str]], archive_root: str = "") -> Iterator[bytes]:
+    """ZIP архив файлов кусками ~CHUNK_SIZE; имена в архиве - archive_root/относительный путь"""
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        for path, relative in files:
+            try:
+                stat = path.stat()
+                source = open(path, "rb")
+            except OSError as e:
+                # Файл удален или недоступен (например, временный файл пайплайна) - архив продолжается без него
+                logger.warning(f"Skipping {path} in archive: {e}")
+                continue
+
+            name = f"{archive_root}/{relative}" if archive_root else relative
+            entry = zipfile.ZipInfo(name, date_time=time.localtime(max(stat.st_mtime, MIN_ZIP_TIMESTAMP))[:6])
+            entry.external_attr = (stat.st_mode & 0xFFFF) << 16
+            entry.compress_type = zipfile.ZIP_STORED if path.suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+            with source, archive.open(entry, mode="w", force_zip64=stat.st_size >= zipfile.ZIP64_LIMIT) as target:
+                for block in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    target.write(block)
+                    if buffer.size >= CHUNK_SIZE:
+                        yield buffer.take()
+            if buffer.size >= CHUNK_SIZE:
+                yield buffer.take()
+    # Центральный каталог архива записывается при закрытии ZipFile
+    if buffer.size:
+        yield buffer.take()
+
+
+def resolve_session_dir(base_dir: Path, session_id: str) -> Path:
+    """Папка сессии внутри base_dir (404, если ее нет или session_id выводит за пределы base_dir)"""
+    base = Path(base_dir).resolve()
+    session_dir = (base / session_id).resolve()
+    if session_dir.parent != base or not session_dir.is_dir():
+        raise HTTPException(status_code=404, detail=f"Session directory for ID '{session_id}' not found on server.")
+    return session_dir
+
+
+def session_archive_response(
+    session_dir: Path,
+    session_id: str,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    filename: Optional[str] = None
+) -> StreamingResponse:
+    """StreamingResponse с ZIP архивом папки сессии (в архиве - папка session_id)"""
+
+    def chunks() -> Iterator[bytes]:
+        try:
+            # Обход папки тоже выполняется в пуле потоков (serper_results может содержать тысячи файлов)
+            files = collect_archive_files(session_dir, include=include, exclude=exclude)
+            logger.info(f"Streaming archive of session {session_id}: {len(files)} files")
+            yield from zip_chunks(files, archive_root=session_id)
+        except Exception as e:
+            # Заголовки уже отправлены - остается только оборвать поток
+            logger.error(f"Error streaming archive of session {session_id}: {e}", exc_info=True)
+            raise
+
+    return StreamingResponse(
+        chunks(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename or f"{session_id}_archive.zip"}"'}
+    )
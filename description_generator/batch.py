@@ -0,0 +1,400 @@
+"""
+Batched description generation across companies.
+
+Two modes:
+
+1. Online packing (ExtractionBatcher): extraction requests of companies processed
+   at the same time are collected for a short window and sent as ONE chat completion
+   with a multi-company schema {"companies": [{"company_key", "data"}]}. The response
+   is reconciled back by company_key; companies missing from the response (or an
+   invalid response) fall back to the regular single-company extraction.
+
+2. Offline OpenAI Batch API: export_extraction_batch / export_summary_batch write
+   Batch API JSONL files (custom_id = company key), submit_batch / wait_for_batch /
+   download_batch_results run the job, read_batch_results maps answers back to keys.
+   A manifest next to the JSONL keeps key -> company name, so results can be
+   reconciled after a restart.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from description_generator.config import DEFAULT_BATCH_CONFIG
+from description_generator.schemas import (
+    build_extraction_params,
+    build_summary_params,
+    extract_data_with_schema,
+    extraction_model_name,
+    parse_extraction_content,
+    parse_summary_content,
+)
+
+logger = logging.getLogger(__name__)
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+COMPANY_KEY_MARKER = "### company_key:"
+MAX_PACKED_OUTPUT_TOKENS = 16000
+
+
+# --- Online packing ---
+
+def per_company_output_tokens(llm_config: dict) -> int:
+    return int(llm_config.get("max_tokens_json_extract", 6500))
+
+
+def max_companies_per_pack(llm_config: dict) -> int:
+    """Largest pack whose full output budget (per company) fits MAX_PACKED_OUTPUT_TOKENS."""
+    return max(1, MAX_PACKED_OUTPUT_TOKENS // per_company_output_tokens(llm_config))
+
+
+def build_multi_company_schema(sub_schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Strict schema wrapping sub_schema into a list of companies tagged by company_key."""
+    return {
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["companies"],
+        "properties": {
+            "companies": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": ["company_key", "data"],
+                    "properties": {
+                        "company_key": {"type": "string", "description": "company_key exactly as given in the input."},
+                        "data": sub_schema,
+                    },
+                },
+            }
+        },
+    }
+
+
+def build_multi_extraction_params(
+    companies: List[Tuple[str, str, str]],
+    sub_schema: Dict[str, Any],
+    schema_name: str,
+    llm_config: dict,
+) -> Dict[str, Any]:
+    """
+    Chat completion parameters extracting several companies at once.
+
+    Args:
+        companies: (company_key, company_name, text) for each company
+    """
+    model_name = extraction_model_name(llm_config, schema_name)
+    system_prompt_content = (
+        "You are a meticulous data extraction AI. You receive texts about SEVERAL companies, each introduced by a "
+        f"'{COMPANY_KEY_MARKER} <key>' line. For EVERY company return one item in 'companies' with the same company_key "
+        f"and 'data' populated strictly according to the JSON schema '{schema_name}'. "
+        "Extract information about a company ONLY from its own text; never mix data between companies. "
+        "If information for a field is not found, use null (or an empty array [] for array fields). "
+        "Adhere strictly to the schema's data types. Do not add any fields not defined in the schema."
+    )
+    sections = [
+        f"{COMPANY_KEY_MARKER} {key}\nCompany: {name}\nText Snippet to Analyze:\n```\n{text}\n```"
+        for key, name, text in companies
+    ]
+    user_prompt_content = (
+        f"Extract information for each of the {len(companies)} companies below. "
+        "Return exactly one item per company_key.\n\n" + "\n\n".join(sections)
+    )
+    return {
+        "model": model_name,
+        "messages": [
+            {"role": "system", "content": system_prompt_content},
+            {"role": "user", "content": user_prompt_content},
+        ],
+        "temperature": llm_config.get("temperature_json_extract", llm_config.get("temperature", 0.05)),
+        "top_p": llm_config.get("top_p_json_extract", llm_config.get("top_p", 0.5)),
+        # ExtractionBatcher keeps packs within MAX_PACKED_OUTPUT_TOKENS, so no company's budget is cut
+        "max_tokens": per_company_output_tokens(llm_config) * len(companies),
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": f"{schema_name}_BATCH",
+                "strict": True,
+                "schema": build_multi_company_schema(sub_schema),
+            },
+        },
+    }
+
+
+def reconcile_packed_response(content: Optional[str], keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """company_key -> extracted data for the keys present in a packed response."""
+    if not content:
+        return {}
+    try:
+        parsed = json.loads(content)
+    except json.JSONDecodeError:
+        logger.error(f"Packed extraction response is not valid JSON: {content[:300]}...")
+        return {}
+    wanted = set(keys)
+    reconciled = {}
+    for item in parsed.get("companies", []) if isinstance(parsed, dict) else []:
+        key = item.get("company_key") if isinstance(item, dict) else None
+        if key in wanted and key not in reconciled and isinstance(item.get("data"), dict):
+            reconciled[key] = item["data"]
+    return reconciled
+
+
+class ExtractionBatcher:
+    """
+    Packs concurrent extract() calls into multi-company LLM requests.
+
+    A pack is sent when it reaches max_companies_per_request (capped by max_companies_per_pack,
+    so every company keeps its full output budget) or max_chars_per_request,
+    or max_wait_seconds after its first company arrived. Used by DescriptionGenerator
+    when batching is enabled; all calls must come from one event loop.
+    """
+
+    def __init__(self, openai_client, llm_config: dict, sub_schema: Dict[str, Any], schema_name: str,
+                 batch_config: Optional[Dict[str, Any]] = None):
+        config = {**DEFAULT_BATCH_CONFIG, **(batch_config or {})}
+        self.openai_client = openai_client
+        self.llm_config = llm_config
+        self.sub_schema = sub_schema
+        self.schema_name = schema_name
+        self.max_companies = max(1, min(int(config["max_companies_per_request"]), max_companies_per_pack(llm_config)))
+        self.max_chars = int(config["max_chars_per_request"])
+        self.max_wait_seconds = float(config["max_wait_seconds"])
+
+        self._keys = itertools.count(1)
+        self._pending: List[Tuple[str, str, str, asyncio.Future]] = []
+        self._pending_chars = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.stats = {"companies": 0, "packed_requests": 0, "single_requests": 0, "fallbacks": 0}
+
+    async def extract(self, company_name: str, text: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((f"c{next(self._keys)}", company_name, text, future))
+        self._pending_chars += len(text)
+        self.stats["companies"] += 1
+
+        if len(self._pending) >= self.max_companies or self._pending_chars >= self.max_chars:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pack, self._pending, self._pending_chars = self._pending, [], 0
+        if pack:
+            task = asyncio.ensure_future(self._run_pack(pack))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _extract_single(self, company_name: str, text: str) -> Dict[str, Any]:
+        self.stats["single_requests"] += 1
+        return await extract_data_with_schema(
+            company_name=company_name,
+            about_snippet=text,
+            sub_schema=self.sub_schema,
+            schema_name=self.schema_name,
+            llm_config=self.llm_config,
+            openai_client=self.openai_client,
+        )
+
+    async def _run_pack(self, pack: List[Tuple[str, str, str, asyncio.Future]]):
+        try:
+            if len(pack) == 1:
+                _, company_name, text, future = pack[0]
+                result = await self._extract_single(company_name, text)
+                if not future.done():
+                    future.set_result(result)
+                return
+
+            reconciled = {}
+            self.stats["packed_requests"] += 1
+            try:
+                api_params = build_multi_extraction_params(
+                    [(key, name, text) for key, name, text, _ in pack], self.sub_schema, self.schema_name, self.llm_config
+                )
+                logger.info(f"Packed extraction for {len(pack)} companies: {', '.join(name for _, name, _, _ in pack)}")
+                response = await self.openai_client.chat.completions.create(**api_params)
+                content = response.choices[0].message.content if response.choices and response.choices[0].message else None
+                reconciled = reconcile_packed_response(content, [key for key, _, _, _ in pack])
+            except Exception as e:
+                logger.error(f"Packed extraction failed for {len(pack)} companies, falling back to single requests: {e}")
+
+            missing = [(key, name, text) for key, name, text, _ in pack if key not in reconciled]
+            if missing:
+                self.stats["fallbacks"] += len(missing)
+                logger.warning(f"Packed extraction returned no data for {len(missing)}/{len(pack)} companies, extracting them one by one")
+                singles = await asyncio.gather(*(self._extract_single(name, text) for _, name, text in missing))
+                reconciled.update({key: result for (key, _, _), result in zip(missing, singles)})
+
+            for key, _, _, future in pack:
+                if not future.done():
+                    future.set_result(reconciled[key])
+        except BaseException as e:
+            for _, _, _, future in pack:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+
+
+# --- OpenAI Batch API ---
+
+def _manifest_path(jsonl_path: Path) -> Path:
+    return jsonl_path.with_suffix(".manifest.json")
+
+
+def _write_batch_file(jsonl_path, lines: List[Dict[str, Any]], manifest: Dict[str, str]) -> Path:
+    jsonl_path = Path(jsonl_path)
+    jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    with open(_manifest_path(jsonl_path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    logger.info(f"Batch file with {len(lines)} requests written to {jsonl_path}")
+    return jsonl_path
+
+
+def load_batch_manifest(jsonl_path) -> Dict[str, str]:
+    """custom_id -> company name saved next to a batch input file."""
+    with open(_manifest_path(Path(jsonl_path)), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def export_extraction_batch(companies: Dict[str, Tuple[str, str]], jsonl_path, sub_schema: Dict[str, Any],
+                            schema_name: str, llm_config: dict) -> Path:
+    """
+    Write a Batch API input file with one extraction request per company.
+
+    Args:
+        companies: custom_id -> (company_name, text)
+    """
+    lines = [
+        {"custom_id": key, "method": "POST", "url": CHAT_COMPLETIONS_URL,
+         "body": build_extraction_params(name, text, sub_schema, schema_name, llm_config)}
+        for key, (name, text) in companies.items()
+    ]
+    return _write_batch_file(jsonl_path, lines, {key: name for key, (name, _) in companies.items()})
+
+
+def export_summary_batch(structured: Dict[str, Tuple[str, Dict[str, Any]]], jsonl_path, llm_config: dict) -> Path:
+    """
+    Write a Batch API input file with one summary request per company.
+
+    Args:
+        structured: custom_id -> (company_name, structured_data)
+    """
+    lines = []
+    for key, (name, data) in structured.items():
+        body = build_summary_params(name, data, llm_config)
+        if isinstance(body, str):
+            logger.error(f"Skipping summary batch request for {name}: {body}")
+            continue
+        lines.append({"custom_id": key, "method": "POST", "url": CHAT_COMPLETIONS_URL, "body": body})
+    return _write_batch_file(jsonl_path, lines, {key: name for key, (name, _) in structured.items()})
+
+
+def read_batch_results(output_path) -> Dict[str, Dict[str, Any]]:
+    """
+    Batch API output file -> custom_id -> {"content": str} or {"error": str}.
+    Lines are matched by custom_id, not by order (the Batch API does not keep it).
+    """
+    results = {}
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            key = record.get("custom_id")
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code", 200) >= 400:
+                results[key] = {"error": str(record.get("error") or response.get("body"))}
+                continue
+            choices = (response.get("body") or {}).get("choices") or []
+            content = choices[0].get("message", {}).get("content") if choices else None
+            results[key] = {"content": content}
+    return results
+
+
+async def submit_batch(openai_client, jsonl_path, completion_window: str = "24h",
+                       metadata: Optional[Dict[str, str]] = None) -> str:
+    """Upload a batch input file and create the batch; returns the batch id."""
+    with open(jsonl_path, "rb") as f:
+        input_file = await openai_client.files.create(file=f, purpose="batch")
+    batch = await openai_client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=CHAT_COMPLETIONS_URL,
+        completion_window=completion_window,
+        metadata=metadata or None,
+    )
+    logger.info(f"Batch {batch.id} submitted from {jsonl_path} (status: {batch.status})")
+    return batch.id
+
+
+async def wait_for_batch(openai_client, batch_id: str, poll_seconds: float = 60.0, timeout_seconds: Optional[float] = None):
+    """Poll until the batch reaches a final state; returns the batch object."""
+    started = time.monotonic()
+    while True:
+        batch = await openai_client.batches.retrieve(batch_id)
+        if batch.status in ("completed", "failed", "expired", "cancelled"):
+            logger.info(f"Batch {batch_id} finished with status {batch.status}")
+            return batch
+        if timeout_seconds is not None and time.monotonic() - started > timeout_seconds:
+            raise TimeoutError(f"Batch {batch_id} is still {batch.status} after {timeout_seconds}s")
+        await asyncio.sleep(poll_seconds)
+
+
+async def download_batch_results(openai_client, batch, output_path) -> Optional[Path]:
+    """Save the batch output file; None if the batch produced no output."""
+    if not batch.output_file_id:
+        logger.error(f"Batch {batch.id} has no output file (status: {batch.status})")
+        return None
+    content = await openai_client.files.content(batch.output_file_id)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_bytes(content.content)
+    return output_path
+
+
+async def run_batch_job(openai_client, jsonl_path, poll_seconds: float = 60.0,
+                        timeout_seconds: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """Submit a batch input file, wait for it and return read_batch_results() of its output."""
+    jsonl_path = Path(jsonl_path)
+    batch_id = await submit_batch(openai_client, jsonl_path)
+    batch = await wait_for_batch(openai_client, batch_id, poll_seconds=poll_seconds, timeout_seconds=timeout_seconds)
+    output_path = await download_batch_results(openai_client, batch, jsonl_path.with_suffix(".output.jsonl"))
+    return read_batch_results(output_path) if output_path else {}
+
+
+def parse_extraction_results(results: Dict[str, Dict[str, Any]], manifest: Dict[str, str], schema_name: str) -> Dict[str, Dict[str, Any]]:
+    """custom_id -> structured data (or error dict) for every company in the manifest."""
+    parsed = {}
+    for key, company_name in manifest.items():
+        result = results.get(key)
+        if result is None:
+            parsed[key] = {"error": f"No batch result for {company_name}"}
+        elif "error" in result:
+            parsed[key] = {"error": f"Batch request failed for schema {schema_name}: {result['error']}"}
+        else:
+            parsed[key] = parse_extraction_content(result["content"], company_name, schema_name)
+    return parsed
+
+
+def parse_summary_results(results: Dict[str, Dict[str, Any]], manifest: Dict[str, str]) -> Dict[str, str]:
+    """custom_id -> summary text (or an error string) for every company in the manifest."""
+    parsed = {}
+    for key, company_name in manifest.items():
+        result = results.get(key)
+        if result is None or "error" in result:
+            parsed[key] = f"Error generating summary (batch): {result['error'] if result else 'no result'}"
+        else:
+            parsed[key] = parse_summary_content(result["content"], company_name)
+    return parsed
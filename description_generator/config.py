@@ -9,6 +9,16 @@ DEFAULT_MODEL_CONFIG = {
     "temperature": 0.3,
 }
 
+# Batched description generation (see batch.py).
+# Enabled per run via the "description_batching" section of llm_config.yaml.
+DEFAULT_BATCH_CONFIG = {
+    "enabled": False,
+    "max_companies_per_request": 4,    # Companies packed into one extraction request (at most 16000 // max_tokens_json_extract)
+    "max_chars_per_request": 100000,   # Send the pack earlier if the texts get this large
+    "max_wait_seconds": 0.5,           # How long the first company waits for others to join its pack
+    "max_concurrent_companies": 8,     # Concurrency of generate_batch_descriptions
+}
+
 # System prompt for the description generator
 SYSTEM_PROMPT = """You are an experienced business analyst specializing in extracting structured information and creating professional company profiles.
 Your task is to help identify key business information from unstructured text, following a structured extraction approach.
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import traceback
@@ -6,14 +7,16 @@ import httpx
 import re
 import yaml
 import os
-from typing import List, Dict, Any, Optional, Union
-from openai import AsyncOpenAI
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Union
 from dotenv import load_dotenv
+from src.external_apis.rate_limiter import create_async_openai_client
 
 from description_generator.config import (
     SYSTEM_PROMPT,
     USER_PROMPT_TEMPLATE,
-    DEFAULT_MODEL_CONFIG
+    DEFAULT_MODEL_CONFIG,
+    DEFAULT_BATCH_CONFIG
 )
 from description_generator.schemas import (
     COMPANY_PROFILE_SCHEMA, 
@@ -25,6 +28,15 @@ from description_generator.schemas import (
     extract_data_with_schema,
     generate_text_summary_from_json_async
 )
+from description_generator.batch import (
+    ExtractionBatcher,
+    export_extraction_batch,
+    export_summary_batch,
+    load_batch_manifest,
+    parse_extraction_results,
+    parse_summary_results,
+    run_batch_job
+)
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -41,30 +53,30 @@ class DescriptionGenerator:
     и OpenAI модель для создания структурированных, информативных описаний.
     """
     
-    def __init__(self, api_key: str, model_config: Dict[str, Any] = None):
+    def __init__(self, api_key: Optional[str], model_config: Dict[str, Any] = None,
+                 openai_client=None, batch_config: Optional[Dict[str, Any]] = None):
         """
         Инициализирует генератор описаний с API ключом и опциональной конфигурацией модели.
         
         Args:
             api_key: API ключ для OpenAI
             model_config: Конфигурация модели (опционально)
+            openai_client: Готовый AsyncOpenAI клиент (если не передан, создается по api_key)
+            batch_config: Настройки пакетной генерации (см. DEFAULT_BATCH_CONFIG); при enabled=True
+                          извлечение данных одновременно обрабатываемых компаний упаковывается в общие запросы
         """
         self.api_key = api_key
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.client = openai_client or create_async_openai_client(api_key)
         self.model_config = model_config or DEFAULT_MODEL_CONFIG
+        self.batch_config = {**DEFAULT_BATCH_CONFIG, **(batch_config or {})}
+        self.batcher = None
+        if self.batch_config["enabled"]:
+            self.batcher = ExtractionBatcher(
+                self.client, self.model_config, COMPANY_PROFILE_SCHEMA, "COMPANY_PROFILE_SCHEMA", self.batch_config
+            )
         
-    async def generate_description(self, company_name: str, findings: list) -> Union[dict, str]:
-        """
-        Генерирует структурированное описание компании на основе собранных данных.
-        
-        Args:
-            company_name: Название компании
-            findings: Список найденных данных о компании
-            
-        Returns:
-            Union[dict, str]: Структурированное описание компании или сообщение об ошибке
-        """
-        # Обработка и подготовка входных данных
+    def _build_sources_text(self, company_name: str, findings: list) -> Optional[str]:
+        """Собирает текст находок для извлечения данных (отчет LLMDeepSearch - первым)."""
         sources_text = ""
         llm_deep_search_report = None
         
@@ -96,26 +108,46 @@ class DescriptionGenerator:
             sources_text = llm_deep_search_report + "\n\n---\n\n" + sources_text
             
         if not sources_text:
-            error_msg = f"Недостаточно данных для генерации описания компании {company_name}"
-            logger.error(error_msg)
-            return error_msg
+            return None
         
         # Обрезаем слишком длинный текст
         max_text_length = 32000  # максимальная длина текста для обработки
         if len(sources_text) > max_text_length:
             logger.warning(f"Текст слишком длинный ({len(sources_text)} символов), обрезаем до {max_text_length}")
             sources_text = sources_text[:max_text_length]
+        return sources_text
+
+    async def generate_description(self, company_name: str, findings: list) -> Union[dict, str]:
+        """
+        Генерирует структурированное описание компании на основе собранных данных.
+        
+        Args:
+            company_name: Название компании
+            findings: Список найденных данных о компании
+            
+        Returns:
+            Union[dict, str]: Структурированное описание компании или сообщение об ошибке
+        """
+        sources_text = self._build_sources_text(company_name, findings)
+        if not sources_text:
+            error_msg = f"Недостаточно данных для генерации описания компании {company_name}"
+            logger.error(error_msg)
+            return error_msg
         
         try:
             # Шаг 1: Извлекаем структурированные данные из текста по схеме
-            structured_data = await extract_data_with_schema(
-                company_name=company_name,
-                about_snippet=sources_text,
-                sub_schema=COMPANY_PROFILE_SCHEMA,
-                schema_name="COMPANY_PROFILE_SCHEMA",
-                llm_config=self.model_config,
-                openai_client=self.client
-            )
+            # (в пакетном режиме - общим запросом с другими компаниями)
+            if self.batcher:
+                structured_data = await self.batcher.extract(company_name, sources_text)
+            else:
+                structured_data = await extract_data_with_schema(
+                    company_name=company_name,
+                    about_snippet=sources_text,
+                    sub_schema=COMPANY_PROFILE_SCHEMA,
+                    schema_name="COMPANY_PROFILE_SCHEMA",
+                    llm_config=self.model_config,
+                    openai_client=self.client
+                )
             
             if not structured_data or isinstance(structured_data, str) or structured_data.get("error"):
                 error_msg = f"Не удалось извлечь структурированные данные для компании {company_name}. Результат: {structured_data}"
@@ -148,40 +180,101 @@ class DescriptionGenerator:
         """
         Генерирует описания для списка результатов поиска компаний.
         
+        Компании обрабатываются параллельно (max_concurrent_companies из batch_config);
+        при включенном пакетном режиме их извлечения упаковываются в общие запросы.
+        
         Args:
             results: Список результатов поиска компаний
             
         Returns:
-            list: Список результатов с добавленными описаниями
+            list: Список результатов с добавленными описаниями (в исходном порядке)
         """
-        enriched_results = []
-        
-        for i, result in enumerate(results):
-            print(f"Generating description for company {i+1}/{len(results)}: {result.get('company', 'Unknown company')}")
-            
-            if result.get("successful"):
+        semaphore = asyncio.Semaphore(max(1, int(self.batch_config["max_concurrent_companies"])))
+
+        async def enrich(i: int, result: Dict[str, Any]) -> Dict[str, Any]:
+            if not result.get("successful"):
+                result["description"] = f"Insufficient data to generate description for {result['company']}."
+                result["structured_data"] = None
+                return result
+
+            async with semaphore:
+                print(f"Generating description for company {i+1}/{len(results)}: {result.get('company', 'Unknown company')}")
                 # Получаем структурированный результат
                 structured_result = await self.generate_description(
                     result["company"], 
                     result["results"]
                 )
-                
-                # Если результат - строка, значит произошла ошибка
-                if isinstance(structured_result, str):
-                    result["description"] = structured_result
-                    result["structured_data"] = None
-                else:
-                    # Извлекаем текстовое описание из структурированного результата
-                    result["description"] = structured_result.get("description", "No description generated.")
-                    # Сохраняем структурированные данные
-                    result["structured_data"] = structured_result
-            else:
-                result["description"] = f"Insufficient data to generate description for {result['company']}."
+            
+            # Если результат - строка, значит произошла ошибка
+            if isinstance(structured_result, str):
+                result["description"] = structured_result
                 result["structured_data"] = None
-                
-            enriched_results.append(result)
+            else:
+                # Извлекаем текстовое описание из структурированного результата
+                result["description"] = structured_result.get("description", "No description generated.")
+                # Сохраняем структурированные данные
+                result["structured_data"] = structured_result
+            return result
+
+        return list(await asyncio.gather(*(enrich(i, result) for i, result in enumerate(results))))
+
+    async def generate_descriptions_via_batch_api(self, companies: List[Tuple[str, list]], work_dir,
+                                                  poll_seconds: float = 60.0,
+                                                  timeout_seconds: Optional[float] = None) -> List[Union[dict, str]]:
+        """
+        Генерирует описания через OpenAI Batch API (дешевле, результат в течение 24 часов - для ночных прогонов).
+        
+        Два пакета: извлечение структурированных данных, затем тексты описаний. Входные JSONL,
+        манифесты (custom_id -> компания) и ответы остаются в work_dir.
+        
+        Args:
+            companies: Список (название компании, findings)
+            work_dir: Каталог для файлов пакетов
+            poll_seconds: Интервал опроса статуса пакета
+            timeout_seconds: Максимальное ожидание одного пакета (None - без ограничения)
             
-        return enriched_results
+        Returns:
+            list: Для каждой компании (в исходном порядке) то же, что вернул бы generate_description
+        """
+        work_dir = Path(work_dir)
+        outcomes: List[Union[dict, str, None]] = [None] * len(companies)
+
+        to_extract = {}
+        for i, (company_name, findings) in enumerate(companies):
+            sources_text = self._build_sources_text(company_name, findings)
+            if sources_text:
+                to_extract[f"company-{i:06d}"] = (company_name, sources_text)
+            else:
+                outcomes[i] = f"Недостаточно данных для генерации описания компании {company_name}"
+
+        if to_extract:
+            extraction_file = export_extraction_batch(
+                to_extract, work_dir / "extraction.jsonl", COMPANY_PROFILE_SCHEMA, "COMPANY_PROFILE_SCHEMA", self.model_config
+            )
+            extraction_results = parse_extraction_results(
+                await run_batch_job(self.client, extraction_file, poll_seconds, timeout_seconds),
+                load_batch_manifest(extraction_file), "COMPANY_PROFILE_SCHEMA"
+            )
+
+            to_summarize = {}
+            for key, structured_data in extraction_results.items():
+                index = int(key.split("-")[1])
+                if not structured_data or structured_data.get("error"):
+                    outcomes[index] = structured_data or f"Не удалось извлечь структурированные данные для компании {to_extract[key][0]}"
+                else:
+                    to_summarize[key] = (to_extract[key][0], structured_data)
+
+            if to_summarize:
+                summary_file = export_summary_batch(to_summarize, work_dir / "summary.jsonl", self.model_config)
+                summaries = parse_summary_results(
+                    await run_batch_job(self.client, summary_file, poll_seconds, timeout_seconds),
+                    load_batch_manifest(summary_file)
+                )
+                for key, (company_name, structured_data) in to_summarize.items():
+                    outcomes[int(key.split("-")[1])] = {"description": summaries.get(key), **structured_data}
+
+        logger.info(f"Batch API descriptions: {sum(isinstance(o, dict) and 'description' in o for o in outcomes)}/{len(companies)} generated")
+        return outcomes
     
     def _prepare_text_source(self, company_name: str, findings: List[Dict[str, Any]]) -> str:
         """
@@ -291,29 +291,25 @@ async def is_url_company_page_llm(company_name: str, page_snippet: str, openai_c
         print(f"  Error during LLM page check for {company_name}: {type(e).__name__} - {e}")
         return False # Default to false on error to be conservative
 
-async def extract_data_with_schema(
-    company_name: str, 
-    about_snippet: str | None, 
-    sub_schema: Dict[str, Any],
-    schema_name: str, 
-    llm_config: dict, 
-    openai_client: AsyncOpenAI,
-) -> Optional[Dict[str, Any]]:
-    """
-    Async: Extracts structured company information into a *specific sub-schema* 
-    using the provided text snippet and an LLM.
-    """
-    if not about_snippet:
-        logger.warning(f"No text (about_snippet) for {company_name} for schema '{schema_name}'. Returning empty dict.")
-        return {}
-    if not llm_config or not isinstance(llm_config, dict):
-        logger.error(f"Invalid LLM config for {company_name} (schema '{schema_name}'). Returning error dict.")
-        return {"error": f"Invalid LLM config for schema {schema_name}"}
-    
+def extraction_model_name(llm_config: dict, schema_name: str) -> str:
     model_name = llm_config.get('model', "gpt-4o-mini") 
     if model_name not in ["gpt-4o-mini", "gpt-4-turbo", "gpt-4o", "gpt-3.5-turbo"]:
         logger.warning(f"Model {model_name} from config might not be ideal for JSON schema mode. Defaulting to gpt-4o-mini for {schema_name}.")
         model_name = "gpt-4o-mini"
+    return model_name
+
+def build_extraction_params(
+    company_name: str,
+    about_snippet: str,
+    sub_schema: Dict[str, Any],
+    schema_name: str,
+    llm_config: dict,
+) -> Dict[str, Any]:
+    """
+    Chat completion parameters for extracting one company into a sub-schema
+    (used directly and as the body of Batch API requests).
+    """
+    model_name = extraction_model_name(llm_config, schema_name)
 
     # Updated System Prompt for schema extraction
     system_prompt_content = (
@@ -340,7 +336,7 @@ async def extract_data_with_schema(
         {"role": "user", "content": user_prompt_content}
     ]
 
-    api_params = {
+    return {
         "model": model_name,
         "messages": messages,
         "temperature": llm_config.get("temperature_json_extract", llm_config.get("temperature", 0.05)), 
@@ -355,22 +351,48 @@ async def extract_data_with_schema(
             }
         }
     }
+
+def parse_extraction_content(response_content: Optional[str], company_name: str, schema_name: str) -> Dict[str, Any]:
+    """Parse the message content of an extraction response (or return an error dict)."""
+    if not response_content:
+        logger.warning(f"OpenAI returned no choices/content for schema '{schema_name}' for {company_name}.")
+        return {"error": f"OpenAI returned no choices/content for schema {schema_name}"}
+    response_content = response_content.strip()
+    try: 
+        parsed_json = json.loads(response_content)
+        logger.info(f"LLM successfully generated JSON for schema '{schema_name}' for {company_name}.")
+        return parsed_json
+    except json.JSONDecodeError: 
+        logger.error(f"Error: LLM response for {company_name} (schema '{schema_name}') not valid JSON. Response: {response_content[:500]}...")
+        return {"error": f"LLM response not valid JSON for schema {schema_name}", "raw_response": response_content}
+
+async def extract_data_with_schema(
+    company_name: str, 
+    about_snippet: str | None, 
+    sub_schema: Dict[str, Any],
+    schema_name: str, 
+    llm_config: dict, 
+    openai_client: AsyncOpenAI,
+) -> Optional[Dict[str, Any]]:
+    """
+    Async: Extracts structured company information into a *specific sub-schema* 
+    using the provided text snippet and an LLM.
+    """
+    if not about_snippet:
+        logger.warning(f"No text (about_snippet) for {company_name} for schema '{schema_name}'. Returning empty dict.")
+        return {}
+    if not llm_config or not isinstance(llm_config, dict):
+        logger.error(f"Invalid LLM config for {company_name} (schema '{schema_name}'). Returning error dict.")
+        return {"error": f"Invalid LLM config for schema {schema_name}"}
+
+    api_params = build_extraction_params(company_name, about_snippet, sub_schema, schema_name, llm_config)
+    model_name = api_params["model"]
     
     logger.info(f"Attempting to extract for schema '{schema_name}' for {company_name} using model {model_name}.")
     try:
         response = await openai_client.chat.completions.create(**api_params)
-        if response.choices and response.choices[0].message and response.choices[0].message.content:
-            response_content = response.choices[0].message.content.strip()
-            try: 
-                parsed_json = json.loads(response_content)
-                logger.info(f"LLM successfully generated JSON for schema '{schema_name}' for {company_name}.")
-                return parsed_json
-            except json.JSONDecodeError: 
-                logger.error(f"Error: LLM response for {company_name} (schema '{schema_name}') not valid JSON. Response: {response_content[:500]}...")
-                return {"error": f"LLM response not valid JSON for schema {schema_name}", "raw_response": response_content}
-        else: 
-            logger.warning(f"OpenAI returned no choices/content for schema '{schema_name}' for {company_name}.")
-            return {"error": f"OpenAI returned no choices/content for schema {schema_name}"}
+        content = response.choices[0].message.content if response.choices and response.choices[0].message else None
+        return parse_extraction_content(content, company_name, schema_name)
     except APIError as e:
         logger.error(f"OpenAI APIError for {company_name} (schema '{schema_name}'): {type(e).__name__} - {str(e)}")
         return {"error": f"OpenAI APIError for schema {schema_name}: {str(e)}"}
@@ -378,19 +400,15 @@ async def extract_data_with_schema(
         logger.error(f"Unexpected error for {company_name} (schema '{schema_name}'): {type(e).__name__} - {str(e)}", exc_info=True)
         return {"error": f"Unexpected error for schema {schema_name}: {str(e)}"}
 
-async def generate_text_summary_from_json_async(
+def build_summary_params(
     company_name: str,
     structured_data: Dict[str, Any],
-    openai_client: AsyncOpenAI,
     llm_config: dict,
-) -> Optional[str]:
+) -> Dict[str, Any] | str:
     """
-    Async: Generates a readable three-paragraph text summary from structured JSON data about a company.
-    Handles new array structures for financial data.
+    Chat completion parameters for the three-paragraph summary
+    (or an error string if the structured data cannot be serialized).
     """
-    if not structured_data:
-        logger.warning(f"No structured data provided for {company_name} to generate text summary.")
-        return "Error: No structured data to summarize."
     model_name = llm_config.get('model_for_summary', llm_config.get('model', "gpt-4o")) # gpt-4o-mini может быть достаточно
     try:
         # Для большей читаемости промпта, отсортируем историю доходов по убыванию года заранее
@@ -468,7 +486,7 @@ Paragraph Structure Guide (use all data fields in the JSON):
         {"role": "user", "content": user_prompt_content}
     ]
 
-    api_params = {
+    return {
         "model": model_name,
         "messages": messages,
         "temperature": llm_config.get("temperature_for_summary", llm_config.get("temperature", 0.7)), 
@@ -476,18 +494,40 @@ Paragraph Structure Guide (use all data fields in the JSON):
         "max_tokens": llm_config.get("max_tokens_for_summary", 5500) 
     }
 
+def parse_summary_content(text_summary: Optional[str], company_name: str) -> str:
+    """Validate the message content of a summary response."""
+    if not text_summary:
+        logger.warning(f"OpenAI returned no choices/content for text summary for {company_name}.")
+        return f"Error: LLM returned no content for summary."
+    text_summary = text_summary.strip()
+    # Более простая проверка на количество параграфов, если текст не пустой
+    paragraph_count = len([p for p in text_summary.split("\n\n") if p.strip()])
+    logger.info(f"Successfully generated {paragraph_count}-paragraph profile for {company_name} (Length: {len(text_summary)}).")
+    return text_summary
+
+async def generate_text_summary_from_json_async(
+    company_name: str,
+    structured_data: Dict[str, Any],
+    openai_client: AsyncOpenAI,
+    llm_config: dict,
+) -> Optional[str]:
+    """
+    Async: Generates a readable three-paragraph text summary from structured JSON data about a company.
+    Handles new array structures for financial data.
+    """
+    if not structured_data:
+        logger.warning(f"No structured data provided for {company_name} to generate text summary.")
+        return "Error: No structured data to summarize."
+    api_params = build_summary_params(company_name, structured_data, llm_config)
+    if isinstance(api_params, str):
+        return api_params
+    model_name = api_params["model"]
+
     logger.info(f"Attempting to generate three-paragraph summary for {company_name} using model {model_name}.")
     try:
         response = await openai_client.chat.completions.create(**api_params)
-        if response.choices and response.choices[0].message and response.choices[0].message.content:
-            text_summary = response.choices[0].message.content.strip()
-            # Более простая проверка на количество параграфов, если текст не пустой
-            paragraph_count = len([p for p in text_summary.split("\n\n") if p.strip()])
-            logger.info(f"Successfully generated {paragraph_count}-paragraph profile for {company_name} (Length: {len(text_summary)}).")
-            return text_summary
-        else:
-            logger.warning(f"OpenAI returned no choices/content for text summary for {company_name}.")
-            return f"Error: LLM returned no content for summary."
+        content = response.choices[0].message.content if response.choices and response.choices[0].message else None
+        return parse_summary_content(content, company_name)
     except APIError as e:
         logger.error(f"OpenAI APIError during text summary generation for {company_name}: {type(e).__name__} - {str(e)}")
         return f"Error generating summary (APIError): {str(e)}"
@@ -5,8 +5,6 @@ import logging
 import sys
 import os
 import asyncio
-from urllib.parse import urlparse
-import time
 
 # Добавляем корневую директорию проекта в путь Python
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,6 +13,8 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from finders.base import Finder
+from normalize_urls import get_url_status_and_final_location_async
+from src.external_apis.url_resolver import get_url_resolver, url_record
 
 logger = logging.getLogger(__name__)
 
@@ -41,151 +41,26 @@ def normalize_name_for_domain_comparison(name: str) -> str:
 async def check_url_liveness(url: str, session: aiohttp.ClientSession, timeout: float = 5.0) -> bool:
     """
     Проверяет "жизнеспособность" полного URL.
-    Сначала пытается разрешить DNS для хоста, затем делает HEAD-запрос.
+    Использует общую проверку get_url_status_and_final_location_async (DNS, HEAD, запасной http://)
+    и ее кэш - URL, уже проверенный в этой сессии, повторно не запрашивается.
     Возвращает True, если URL считается рабочим, False в противном случае.
     """
     if not url:
         logger.warning(f"[URL_CHECK] Empty URL provided for liveness check")
         return False
-        
-    original_url = url
-    # Если URL не начинается с протокола, добавляем его
-    if not url.startswith(("http://", "https://")):
-        logger.info(f"[URL_CHECK] URL без протокола: {url}. Автоматически добавляем https://")
-        url = f"https://{url}"
-        logger.info(f"[URL_CHECK] Преобразованный URL: {url}")
-    
-    try:
-        parsed_url = urlparse(url)
-        hostname = parsed_url.hostname
-
-        if not hostname:
-            logger.warning(f"[URL_CHECK] Could not parse hostname from URL: {url}")
-            # Попробуем альтернативную версию протокола, если исходный URL был модифицирован
-            if original_url != url and url.startswith("https://"):
-                logger.info(f"[URL_CHECK] Пробуем альтернативный протокол http:// для {original_url}")
-                http_url = f"http://{original_url}"
-                return await check_url_liveness(http_url, session, timeout)
-            return False
-
-        logger.debug(f"[URL_CHECK] Checking DNS for host: {hostname} (from URL: {url})")
-        try:
-            dns_result = await asyncio.get_event_loop().getaddrinfo(hostname, None)
-            logger.debug(f"[URL_CHECK] DNS resolved for {hostname}. Addresses: {[r[4][0] for r in dns_result[:2]]}")
-        except socket.gaierror as e_dns:
-            logger.warning(f"[URL_CHECK] DNS resolution FAILED for {hostname} (from URL: {url}). Error: {type(e_dns).__name__} - {e_dns}")
-            # Если не удалось разрешить DNS и мы использовали https://, попробуем http://
-            if original_url != url and url.startswith("https://"):
-                logger.info(f"[URL_CHECK] DNS resolution failed with https://, trying with http:// for {original_url}")
-                http_url = f"http://{original_url}"
-                return await check_url_liveness(http_url, session, timeout)
-            return False 
-        except Exception as e_dns:
-            logger.warning(f"[URL_CHECK] Unexpected DNS error for {hostname} (from URL: {url}): {type(e_dns).__name__} - {e_dns}")
-            return False
-
-        try:
-            logger.info(f"[URL_CHECK] Attempting HEAD request to {url} (timeout={timeout}s)")
-            start_time = time.time()
-            client_timeout = aiohttp.ClientTimeout(total=timeout)
-            
-            try:
-                async with session.head(url, timeout=client_timeout, allow_redirects=True) as response:
-                    elapsed = time.time() - start_time
-                    logger.info(f"[URL_CHECK] HEAD request to {url} completed in {elapsed:.2f}s. Status: {response.status}, Final URL: {response.url}")
-                    
-                    # Запишем заголовки ответа для дополнительной диагностики
-                    headers_str = "\n".join([f"    {k}: {v}" for k, v in response.headers.items()])
-                    logger.debug(f"[URL_CHECK] Response headers for {url}:\n{headers_str}")
-                    
-                    if 200 <= response.status < 400:
-                        logger.info(f"[URL_CHECK] URL {url} is LIVE (status: {response.status})")
-                        return True
-                    elif response.status == 403:
-                        # Считаем 403 (Forbidden) как "живой" URL, так как сервер ответил и домен существует
-                        logger.info(f"[URL_CHECK] URL {url} returned 403 Forbidden, но будет считаться LIVE, так как домен существует.")
-                        return True
-                    elif response.status == 404:
-                        logger.warning(f"[URL_CHECK] URL {url} returned 404 Not Found. Marking as not live.")
-                        # Если получаем 404 и мы использовали https://, попробуем http://
-                        if original_url != url and url.startswith("https://"):
-                            logger.info(f"[URL_CHECK] Got 404 with https://, trying with http:// for {original_url}")
-                            http_url = f"http://{original_url}"
-                            return await check_url_liveness(http_url, session, timeout)
-                        return False
-                    elif response.status >= 500:
-                        logger.warning(f"[URL_CHECK] URL {url} returned server error {response.status}. Marking as not live.")
-                        return False
-                    
-                    # Для других статусов делаем более подробное логирование
-                    logger.warning(f"[URL_CHECK] URL {url} returned non-success status {response.status}. Marking as not live for safety.")
-                    # Если статус не успешен и мы использовали https://, попробуем http://
-                    if original_url != url and url.startswith("https://"):
-                        logger.info(f"[URL_CHECK] Got non-success status with https://, trying with http:// for {original_url}")
-                        http_url = f"http://{original_url}"
-                        return await check_url_liveness(http_url, session, timeout)
-                    return False
-            except asyncio.TimeoutError:
-                elapsed = time.time() - start_time
-                logger.warning(f"[URL_CHECK] HEAD request to {url} TIMED OUT after {elapsed:.2f}s (limit: {timeout}s)")
-                
-                # Попробуем еще раз с GET запросом с большим таймаутом как запасной вариант
-                logger.info(f"[URL_CHECK] Trying backup GET request to {url} with extended timeout")
-                try:
-                    backup_timeout = aiohttp.ClientTimeout(total=timeout * 1.5)
-                    async with session.get(url, timeout=backup_timeout, allow_redirects=True) as get_response:
-                        logger.info(f"[URL_CHECK] Backup GET to {url} status: {get_response.status}")
-                        if 200 <= get_response.status < 400:
-                            logger.info(f"[URL_CHECK] URL {url} is LIVE via backup GET (status: {get_response.status})")
-                            return True
-                        # Если GET не помог и мы использовали https://, попробуем http://
-                        if original_url != url and url.startswith("https://"):
-                            logger.info(f"[URL_CHECK] Backup GET failed with https://, trying with http:// for {original_url}")
-                            http_url = f"http://{original_url}"
-                            return await check_url_liveness(http_url, session, timeout)
-                        return False
-                except Exception as e_backup:
-                    logger.warning(f"[URL_CHECK] Backup GET request to {url} also failed: {type(e_backup).__name__} - {e_backup}")
-                    # Если GET запрос не удался и мы использовали https://, попробуем http://
-                    if original_url != url and url.startswith("https://"):
-                        logger.info(f"[URL_CHECK] Backup GET failed with https://, trying with http:// for {original_url}")
-                        http_url = f"http://{original_url}"
-                        return await check_url_liveness(http_url, session, timeout)
-                    return False
-                
-            except aiohttp.ClientConnectorError as e_connect:
-                logger.warning(f"[URL_CHECK] Connection error for {url}: {type(e_connect).__name__} - {e_connect}")
-                # Если соединение не удалось и мы использовали https://, попробуем http://
-                if original_url != url and url.startswith("https://"):
-                    logger.info(f"[URL_CHECK] Connection error with https://, trying with http:// for {original_url}")
-                    http_url = f"http://{original_url}"
-                    return await check_url_liveness(http_url, session, timeout)
-                return False
-            except aiohttp.ClientSSLError as e_ssl:
-                # SSL ошибки - сайт может существовать, но с проблемным сертификатом
-                logger.warning(f"[URL_CHECK] SSL error for {url}: {type(e_ssl).__name__} - {e_ssl}")
-                # Попробуем с http:// вместо https://
-                if original_url != url and url.startswith("https://"):
-                    logger.info(f"[URL_CHECK] SSL error with https://, trying with http:// for {original_url}")
-                    http_url = f"http://{original_url}"
-                    return await check_url_liveness(http_url, session, timeout)
-                return False
-            except aiohttp.ClientError as e_client: 
-                logger.warning(f"[URL_CHECK] Aiohttp client error for {url}: {type(e_client).__name__} - {e_client}")
-                # Если произошла ошибка клиента и мы использовали https://, попробуем http://
-                if original_url != url and url.startswith("https://"):
-                    logger.info(f"[URL_CHECK] Client error with https://, trying with http:// for {original_url}")
-                    http_url = f"http://{original_url}"
-                    return await check_url_liveness(http_url, session, timeout)
-                return False
-        except Exception as e_head: 
-            logger.warning(f"[URL_CHECK] Unexpected error during request to {url}: {type(e_head).__name__} - {e_head}", exc_info=True)
-            return False
 
+    try:
+        is_live, final_url, error_message = await get_url_status_and_final_location_async(url, session, timeout=timeout)
     except Exception as e_main:
         logger.error(f"[URL_CHECK] General error in check_url_liveness for {url}: {e_main}", exc_info=True)
         return False
 
+    if is_live:
+        logger.info(f"[URL_CHECK] URL {url} is LIVE (final URL: {final_url})")
+    else:
+        logger.warning(f"[URL_CHECK] URL {url} is not live: {error_message}")
+    return is_live
+
 async def check_domain_availability(domain: str, session: aiohttp.ClientSession, timeout: float = 2.0) -> bool:
     """
     Проверяет доступность домена и возвращает валидный HTTP ответ.
@@ -195,7 +70,7 @@ async def check_domain_availability(domain: str, session: aiohttp.ClientSession,
         try:
             # Используем asyncio.get_event_loop().getaddrinfo для асинхронного разрешения DNS
             # Вместо синхронного socket.gethostbyname, который может блокировать event loop
-            await asyncio.get_event_loop().getaddrinfo(domain, None)
+            await get_url_resolver().resolve_host(domain)
             logger.debug(f"DNS resolved for {domain}")
         except socket.gaierror:
             logger.debug(f"DNS resolution failed for {domain}")
@@ -204,12 +79,19 @@ async def check_domain_availability(domain: str, session: aiohttp.ClientSession,
         protocols_to_check = ["https", "http"]
         for protocol in protocols_to_check:
             url_to_check = f"{protocol}://{domain}"
-            try:
+
+            async def probe_head():
                 logger.debug(f"Attempting HEAD request to {url_to_check}")
                 async with session.head(url_to_check, timeout=aiohttp.ClientTimeout(total=timeout), allow_redirects=True) as response:
                     logger.debug(f"HEAD request to {url_to_check} status: {response.status}")
-                    if 200 <= response.status < 400: # Успешный статус или редирект
-                        return True
+                    # Успешный статус или редирект
+                    return url_record(200 <= response.status < 400, str(response.url), response.status)
+
+            try:
+                # Вариант "head" - своя семантика (403 не считается доступностью), кэшируется отдельно
+                record = await get_url_resolver().resolve(url_to_check, probe_head, variant="head")
+                if record["live"]:
+                    return True
             except asyncio.TimeoutError:
                 logger.debug(f"HEAD request to {url_to_check} timed out after {timeout}s.")
             except aiohttp.ClientError as e:
@@ -1,11 +1,12 @@
 from .base import Finder
 import aiohttp
-import json
 import re
 from urllib.parse import urlparse, unquote
-from openai import AsyncOpenAI
 import os
 
+from src.external_apis.serper_client import get_serper_client
+from src.external_apis.rate_limiter import get_async_openai_client, get_rate_limiter
+
 class GoogleFinder(Finder):
     def __init__(self, serper_api_key: str):
         """
@@ -63,24 +64,13 @@ class GoogleFinder(Finder):
         Returns:
             dict | None: Результаты поиска или None в случае ошибки
         """
-        headers = {'X-API-KEY': self.api_key, 'Content-Type': 'application/json'}
-        payload = json.dumps({
-            "q": f"company {company_name} official website wikipedia",
-            "num": 10,
-            "gl": "us",
-            "hl": "en"
-        })
-        
-        try:
-            async with session.post("https://google.serper.dev/search", headers=headers, data=payload) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    print(f"Ошибка при запросе к Serper API: {response.status}")
-                    return None
-        except Exception as e:
-            print(f"Ошибка при запросе к Serper API: {e}")
-            return None
+        results = await get_serper_client(self.api_key, rate_limiter=get_rate_limiter("serper")).search_async(
+            f"company {company_name} official website wikipedia",
+            session=session
+        )
+        if results is None:
+            print(f"Ошибка при запросе к Serper API для {company_name}")
+        return results
             
     def _filter_wikipedia_links(self, results: list, company_name: str) -> list:
         """
@@ -196,7 +186,7 @@ Output ONLY the selected URL. No explanations, no other text."""
 Which single URL is the main Wikipedia page for this company?
 Answer:"""
 
-            openai_client = AsyncOpenAI(api_key=api_key)
+            openai_client = get_async_openai_client(api_key)
             response = await openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
@@ -1,11 +1,16 @@
-import json
 import aiohttp
 import logging
 
+from src.external_apis.serper_client import get_serper_client
+from src.external_apis.rate_limiter import get_rate_limiter
+
 async def search_google(company_name: str, session: aiohttp.ClientSession, serper_api_key: str) -> dict | None:
     """
     Выполняет поиск через Google Serper API.
     
+    Запрос идет через общий SerperClient: ответ кэшируется, а одинаковые
+    одновременные запросы объединяются в один.
+    
     Args:
         company_name: Название компании
         session: aiohttp.ClientSession для HTTP-запросов
@@ -14,25 +19,14 @@ async def search_google(company_name: str, session: aiohttp.ClientSession, serpe
     Returns:
         dict | None: Результаты поиска или None в случае ошибки
     """
-    headers = {'X-API-KEY': serper_api_key, 'Content-Type': 'application/json'}
-    payload = json.dumps({
-        "q": f"{company_name} official website linkedin company profile",
-        "num": 30,
-        "gl": "us",
-        "hl": "en"
-    })
-    
-    try:
-        async with session.post("https://google.serper.dev/search", headers=headers, data=payload, timeout=20) as response:
-            if response.status == 200:
-                results = await response.json()
-                return results
-            else:
-                print(f"Ошибка при запросе к Serper API: {response.status}")
-                return None
-    except Exception as e:
-        print(f"Ошибка при запросе к Serper API: {e}")
-        return None
+    results = await get_serper_client(serper_api_key, rate_limiter=get_rate_limiter("serper")).search_async(
+        f"{company_name} official website linkedin company profile",
+        session=session,
+        num=30
+    )
+    if results is None:
+        print(f"Ошибка при запросе к Serper API для {company_name}")
+    return results
 
 def score_linkedin_url(url: str, title: str, normalized_company_name: str, slug: str) -> tuple[int, list[str]]:
     """
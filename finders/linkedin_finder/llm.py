@@ -1,5 +1,5 @@
 import aiohttp
-from openai import AsyncOpenAI
+from src.external_apis.rate_limiter import get_async_openai_client
 import logging
 
 # Получаем экземпляр логгера
@@ -52,7 +52,7 @@ Output ONLY the selected LinkedIn URL. No explanations, no other text."""
 Which single URL is most likely the official LinkedIn company page for {company_name}?
 Answer:"""
 
-        openai_client = AsyncOpenAI(api_key=openai_api_key)
+        openai_client = get_async_openai_client(openai_api_key)
         response = await openai_client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
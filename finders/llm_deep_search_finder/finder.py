@@ -7,6 +7,8 @@ import re
 from typing import Dict, List, Any, Optional
 import aiohttp
 from openai import AsyncOpenAI, APIError, APITimeoutError, RateLimitError
+from src.external_apis.rate_limiter import create_async_openai_client
+from src.language_detection import needs_translation, record_translation_decision
 
 # Добавляем корневую директорию проекта в путь Python
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -50,19 +52,28 @@ def normalize_markdown_format(markdown_text: str) -> str:
     logger.info("Markdown format normalization complete")
     return normalized
 
-async def translate_to_english(text: str, openai_client: AsyncOpenAI) -> str:
+async def translate_to_english(text: str, openai_client: AsyncOpenAI, force: bool = False) -> str:
     """
-    Принудительно переводит весь текст на английский язык.
+    Переводит весь текст на английский язык.
+    
+    Если локальный детектор (src.language_detection) считает текст английским,
+    LLM не вызывается и текст возвращается как есть.
     
     Args:
         text: Исходный текст
         openai_client: Клиент OpenAI
+        force: Переводить без проверки языка
         
     Returns:
         str: Переведенный текст
     """
     if not text:
         return text
+
+    if not force and not needs_translation(text):
+        record_translation_decision(text, translated=False, call_site="deep_search_report")
+        return text
+    record_translation_decision(text, translated=True, call_site="deep_search_report")
         
     try:
         logger.info(f"Translating text to English (length: {len(text)})")
@@ -310,7 +321,7 @@ class LLMDeepSearchFinder(Finder):
             verbose: Выводить подробные логи поиска (по умолчанию False)
         """
         self.openai_api_key = openai_api_key
-        self.client = AsyncOpenAI(api_key=openai_api_key)
+        self.client = create_async_openai_client(openai_api_key)
         self.verbose = verbose
         self.model = "gpt-4o-search-preview"  # Модель с поддержкой поиска
         
@@ -387,8 +398,8 @@ class LLMDeepSearchFinder(Finder):
             sources = report_dict.get("sources", [])
             extracted_homepage_url = report_dict.get("extracted_homepage_url")
             
-            # ПРИНУДИТЕЛЬНЫЙ ПЕРЕВОД ОТЧЕТА НА АНГЛИЙСКИЙ ЯЗЫК
-            logger.info(f"Translating report for company '{company_name}'")
+            # ПЕРЕВОД ОТЧЕТА НА АНГЛИЙСКИЙ ЯЗЫК (пропускается, если отчет уже на английском)
+            logger.info(f"Checking report language for company '{company_name}'")
             translated_report = await translate_to_english(report_text, self.client)
             
             # НОРМАЛИЗАЦИЯ ФОРМАТИРОВАНИЯ MARKDOWN
@@ -396,10 +407,10 @@ class LLMDeepSearchFinder(Finder):
             
             if self.verbose:
                 logger.info(f"Получен отчет ({len(report_text)} символов) с {len(sources)} источниками. Извлеченный homepage: {extracted_homepage_url}")
-                logger.info(f"Report translated to English ({len(translated_report)} symbols) and format normalized")
+                logger.info(f"Report checked for translation ({len(translated_report)} symbols) and format normalized")
             else:
                 logger.info(f"LLM Deep Search для '{company_name}': получен отчет с {len(sources)} источниками, homepage: {extracted_homepage_url}")
-                logger.info(f"Report translated to English and format normalized")
+                logger.info(f"Report checked for translation and format normalized")
                 
             return {
                 "source": "llm_deep_search", 
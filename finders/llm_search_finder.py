@@ -1,5 +1,5 @@
 from .base import Finder
-from openai import AsyncOpenAI
+from src.external_apis.rate_limiter import create_async_openai_client
 
 class LLMSearchFinder(Finder):
     def __init__(self, api_key: str):
@@ -10,7 +10,7 @@ class LLMSearchFinder(Finder):
             api_key: API ключ для OpenAI
         """
         self.api_key = api_key
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.client = create_async_openai_client(api_key)
         
     async def find(self, company_name: str, **context) -> dict:
         """
@@ -1,14 +1,317 @@
 import re
 import logging
-import time
 import asyncio
-from typing import Dict, Any, List, Optional
-from bs4 import BeautifulSoup
+import importlib.util
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional
+from bs4 import BeautifulSoup, NavigableString, Tag
 import aiohttp
 from finders.base import Finder
 
+# lxml разбирает страницы в несколько раз быстрее html.parser, но не обязателен
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
 logger = logging.getLogger(__name__)
 
+# Паттерны логина на разных языках
+LOGIN_PATTERNS = {
+    "en": ["login", "sign in", "log in", "signin", "register", "sign up", "signup", "account", "my account", "portal", "dashboard", 
+           "profile", "subscription", "stream", "member", "membership", "user", "customer", "client area", "personalized", 
+           "preferences", "cart", "e-commerce", "checkout", "payment", "billing", "plan", "watch", "save", "download", "bookmark"],
+    "ru": ["вход", "войти", "логин", "авторизация", "регистрация", "личный кабинет", "мой аккаунт", "портал", "панель управления",
+           "профиль", "подписка", "стрим", "смотреть", "участник", "пользователь", "клиент", "сохранить", "корзина", "оплата", "план"],
+    "de": ["anmelden", "einloggen", "registrieren", "konto", "mein konto", "dashboard", "kundenportal", 
+           "profil", "abonnement", "stream", "mitglied", "benutzer", "kunde", "warenkorb", "zahlung", "speichern"],
+    "fr": ["connexion", "se connecter", "s'identifier", "inscription", "compte", "mon compte", "tableau de bord",
+           "profil", "abonnement", "diffusion", "membre", "utilisateur", "client", "panier", "paiement", "sauvegarder"],
+    "es": ["iniciar sesión", "acceder", "registrarse", "cuenta", "mi cuenta", "panel", "portal",
+           "perfil", "suscripción", "transmisión", "miembro", "usuario", "cliente", "carrito", "pago", "guardar"],
+    "it": ["accedi", "login", "registrati", "account", "il mio account",
+           "profilo", "abbonamento", "streaming", "utente", "cliente", "carrello", "pagamento", "salvare"],
+    "pt": ["entrar", "login", "cadastro", "registrar", "conta", "minha conta",
+           "perfil", "assinatura", "streaming", "membro", "usuário", "cliente", "carrinho", "pagamento", "salvar"],
+    "zh": ["登录", "注册", "账户", "我的账户", "个人资料", "订阅", "流媒体", "会员", "用户", "购物车", "支付", "保存"],
+    "ja": ["ログイン", "登録", "アカウント", "マイページ", "プロフィール", "購読", "配信", "メンバー", "ユーザー", "カート", "支払い", "保存"],
+    # Добавляем больше языков
+    "ar": ["تسجيل الدخول", "دخول", "حساب", "حسابي", "تسجيل", "اشتراك", "عضوية", "ملف شخصي", "لوحة التحكم", 
+           "مستخدم", "عميل", "سلة التسوق", "الدفع", "حفظ", "مشاهدة", "بث"],
+    "fi": ["kirjaudu", "kirjautuminen", "rekisteröidy", "tili", "oma tili", "profiili", "hallintapaneeli", 
+           "jäsenyys", "tilaus", "käyttäjä", "asiakas", "ostoskori", "maksu", "tallenna", "katso", "suoratoisto"],
+    "sv": ["logga in", "registrera", "konto", "mitt konto", "profil", "kontrollpanel", 
+           "medlemskap", "prenumeration", "användare", "kund", "kundvagn", "betalning", "spara", "titta", "strömma"],
+    "no": ["logg inn", "registrer", "konto", "min konto", "profil", "kontrollpanel", 
+           "medlemskap", "abonnement", "bruker", "kunde", "handlekurv", "betaling", "lagre", "se", "strømme"],
+    "da": ["log ind", "registrer", "konto", "min konto", "profil", "kontrolpanel", 
+           "medlemskab", "abonnement", "bruger", "kunde", "indkøbskurv", "betaling", "gem", "se", "stream"],
+    "nl": ["inloggen", "aanmelden", "registreren", "account", "mijn account", "profiel", "dashboard", 
+           "lidmaatschap", "abonnement", "gebruiker", "klant", "winkelwagen", "betaling", "opslaan", "bekijken", "streamen"],
+    "tr": ["giriş", "kaydol", "hesap", "hesabım", "profil", "kontrol paneli", 
+           "üyelik", "abonelik", "kullanıcı", "müşteri", "sepet", "ödeme", "kaydet", "izle", "yayın"],
+    "ko": ["로그인", "가입", "계정", "내 계정", "프로필", "대시보드", 
+           "멤버십", "구독", "사용자", "고객", "장바구니", "결제", "저장", "시청", "스트리밍"],
+    "hi": ["लॉगिन", "साइन इन", "पंजीकरण", "खाता", "मेरा खाता", "प्रोफाइल", "डैशबोर्ड", 
+           "सदस्यता", "उपयोगकर्ता", "ग्राहक", "कार्ट", "भुगतान", "सहेजें", "देखें", "स्ट्रीमिंग"],
+    "he": ["התחברות", "כניסה", "הרשמה", "חשבון", "החשבון שלי", "פרופיל", "לוח בקרה", 
+           "מנוי", "משתמש", "לקוח", "עגלת קניות", "תשלום", "שמור", "צפה", "הזרמה"]
+}
+
+# Паттерны URL логина
+LOGIN_URL_PATTERNS = [
+    "/login", "/signin", "/register", "/signup", "/account", "/auth", "/profile", 
+    "/portal", "/dashboard", "/customer", "/user", "/my", "/cabinet", "/panel",
+    "/join", "/member", "/subscribe", "/subscription", "/stream", "/plans", "/pricing",
+    "/cart", "/checkout", "/payment", "/billing", "/preferences", "/settings",
+    "/watch", "/player", "/download", "/save", "/library"
+]
+
+# Признаки транзакционного интерфейса
+TRANSACTION_KEYWORDS = [
+    "payment", "checkout", "cart", "buy", "purchase", "order", "shop", "store", 
+    "оплата", "корзина", "купить", "заказ", "магазин", 
+    "zahlung", "warenkorb", "kaufen", "bestellen", 
+    "paiement", "panier", "acheter", "commander"
+]
+
+# Признаки потокового вещания и подписок
+STREAMING_SUBSCRIPTION_KEYWORDS = [
+    "stream", "watch", "play", "video", "listen", "subscribe", "subscription", "plan", "membership",
+    "смотреть", "слушать", "видео", "подписка", "трансляция", "стрим", "подписаться", "тариф",
+    "streamen", "ansehen", "hören", "abonnement", "mitgliedschaft",
+    "diffusion", "regarder", "écouter", "abonnement", "adhésion"
+]
+
+# Признаки персонализации
+PERSONALIZATION_KEYWORDS = [
+    "profile", "account", "settings", "preferences", "my", "personalize", "customize", "save", "bookmark", "history", "favorites",
+    "профиль", "настройки", "предпочтения", "мой", "персонализ", "сохранить", "избранное", "история", "закладки",
+    "profil", "einstellungen", "meine", "anpassen", "speichern", "lesezeichen", "verlauf", "favoriten",
+    "profil", "paramètres", "préférences", "mon", "personnaliser", "enregistrer", "historique", "favoris"
+]
+
+# Бизнес-модели с пользовательским порталом (проверяются в title страницы)
+BUSINESS_MODEL_KEYWORDS = ["shop", "store", "subscription", "account", "streaming", "e-commerce", 
+                           "member", "premium", "customer", "магазин", "подписка", "стриминг"]
+
+TEXT_ATTRS = ("title", "alt", "placeholder", "value", "aria-label")
+LINK_TEXT_ATTRS = TEXT_ATTRS + ("href",)
+DASHBOARD_TAGS = ("a", "button", "input", "div", "span")
+
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1"
+}
+
+
+class _KeywordSet:
+    """
+    Скомпилированные паттерны одной категории: общий regex отсеивает строки без
+    совпадений, regex отдельных ключевых слов (\\bkeyword\\b, без учета регистра) -
+    проверяются только для строк, прошедших отсев.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        unique = list(dict.fromkeys(keywords))
+        self.combined = re.compile("\\b(?:" + "|".join(unique) + ")\\b", re.IGNORECASE)
+        self.patterns = [(keyword, re.compile(f"\\b{keyword}\\b", re.IGNORECASE)) for keyword in unique]
+
+    def matches(self, text: str, skip: Iterable[str] = ()) -> List[str]:
+        """Ключевые слова, найденные в text (кроме уже найденных в skip)"""
+        if not self.combined.search(text):
+            return []
+        return [keyword for keyword, pattern in self.patterns if keyword not in skip and pattern.search(text)]
+
+
+# Паттерны панели управления: (язык, паттерн) в порядке LOGIN_PATTERNS
+DASHBOARD_PATTERNS = [
+    (lang, pattern)
+    for lang, patterns in LOGIN_PATTERNS.items()
+    for pattern in patterns
+    if "dashboard" in pattern.lower() or "панель" in pattern.lower()
+]
+
+# Категории признаков: (ключ, ключевые слова с повторами - порядок доказательств, паттерны, проверяемые атрибуты)
+_CATEGORIES = (
+    ("transaction", TRANSACTION_KEYWORDS, _KeywordSet(TRANSACTION_KEYWORDS), TEXT_ATTRS),
+    ("streaming", STREAMING_SUBSCRIPTION_KEYWORDS, _KeywordSet(STREAMING_SUBSCRIPTION_KEYWORDS), LINK_TEXT_ATTRS),
+    ("personalization", PERSONALIZATION_KEYWORDS, _KeywordSet(PERSONALIZATION_KEYWORDS), LINK_TEXT_ATTRS),
+)
+_DASHBOARD_SET = _KeywordSet(pattern for _, pattern in DASHBOARD_PATTERNS)
+
+
+def _attr_text(value: Any) -> str:
+    # Многозначные атрибуты BeautifulSoup возвращает списком
+    return value if isinstance(value, str) else " ".join(value)
+
+
+def _summarize(evidences: List[str], title: str) -> str:
+    part = f"{title}: {', '.join(evidences[:3])}"
+    if len(evidences) > 3:
+        part += f" и еще {len(evidences) - 3}"
+    return part
+
+
+def analyze_login_page(html_content: str, parser: str = HTML_PARSER) -> Dict[str, Any]:
+    """
+    Анализ HTML страницы на признаки логина, транзакций, дашборда, стриминга и персонализации.
+
+    Документ обходится один раз: текстовые узлы и атрибуты каждого элемента
+    проверяются скомпилированными паттернами всех категорий сразу, формы и ссылки
+    классифицируются по ходу обхода.
+
+    Args:
+        html_content: HTML страницы
+        parser: Парсер BeautifulSoup (по умолчанию lxml, если установлен)
+
+    Returns:
+        Dict[str, Any]: Флаги has_* и текстовое описание найденных признаков
+    """
+    result = {
+        "has_user_portal": False,
+        "has_transaction_interface": False,
+        "has_dashboard": False,
+        "has_streaming_service": False,
+        "has_personalization": False,
+        "description": ""
+    }
+
+    soup = BeautifulSoup(html_content, parser)
+
+    text_found = {key: set() for key, _, _, _ in _CATEGORIES}
+    attr_found = {key: {attr: set() for attr in attrs} for key, _, _, attrs in _CATEGORIES}
+    dashboard_text_counts = Counter()  # (паттерн, тег) -> число элементов
+    dashboard_attr_counts = Counter()  # (паттерн, атрибут) -> число элементов
+    forms = []  # формы в порядке документа
+    forms_by_id = {}
+    link_evidences = []
+    title_tag = None
+
+    for node in soup.descendants:
+        if isinstance(node, NavigableString):
+            for key, _, keyword_set, _ in _CATEGORIES:
+                text_found[key].update(keyword_set.matches(node, text_found[key]))
+            continue
+        if not isinstance(node, Tag):
+            continue
+
+        name = node.name
+        attrs = node.attrs
+
+        # Атрибуты title, alt, placeholder, value, aria-label (и href для части категорий)
+        for attr in LINK_TEXT_ATTRS:
+            value = attrs.get(attr)
+            if value is None:
+                continue
+            value = _attr_text(value)
+            for key, _, keyword_set, category_attrs in _CATEGORIES:
+                if attr in category_attrs:
+                    found = attr_found[key][attr]
+                    found.update(keyword_set.matches(value, found))
+            if attr in TEXT_ATTRS:
+                for pattern in _DASHBOARD_SET.matches(value):
+                    dashboard_attr_counts[(pattern, attr)] += 1
+
+        # Текст ссылок, кнопок и блоков с признаками дашборда
+        if name in DASHBOARD_TAGS:
+            string = node.string
+            if string is not None:
+                for pattern in _DASHBOARD_SET.matches(string):
+                    dashboard_text_counts[(pattern, name)] += 1
+
+        if name == "form":
+            form = {"action": node.get("action", "").lower(), "has_password": False, "has_username": False}
+            forms.append(form)
+            forms_by_id[id(node)] = form
+        elif name == "input" and forms_by_id:
+            input_type = node.get("type")
+            input_name = node.get("name", "").lower()
+            has_password = input_type == "password"
+            has_username = input_type in ("text", "email") or "user" in input_name or "email" in input_name
+            if has_password or has_username:
+                # Поле относится ко всем формам, в которые оно вложено
+                for parent in node.parents:
+                    form = forms_by_id.get(id(parent))
+                    if form is not None:
+                        form["has_password"] = form["has_password"] or has_password
+                        form["has_username"] = form["has_username"] or has_username
+        elif name == "a" and attrs.get("href") is not None:
+            href = _attr_text(attrs["href"]).lower()
+            for pattern in LOGIN_URL_PATTERNS:
+                if pattern in href:
+                    link_evidences.append(f"Ссылка с URL, содержащим '{pattern}'")
+                    break
+        elif name == "title" and title_tag is None:
+            title_tag = node
+
+    # Доказательства собираются в прежнем порядке (язык/ключевое слово/тег/атрибут)
+    login_evidences = []
+    for form in forms:
+        if any(pattern in form["action"] for pattern in LOGIN_URL_PATTERNS):
+            login_evidences.append(f"Форма с action='{form['action']}'")
+        if form["has_password"]:
+            login_evidences.append("Форма с полем для ввода пароля")
+            if form["has_username"]:
+                login_evidences.append("Форма с полями для имени пользователя/email и пароля")
+    login_evidences.extend(link_evidences)
+
+    dashboard_evidences = []
+    for lang, pattern in DASHBOARD_PATTERNS:
+        for tag in DASHBOARD_TAGS:
+            dashboard_evidences.extend(
+                [f"{tag} с текстом '{pattern}' (язык: {lang})"] * dashboard_text_counts[(pattern, tag)]
+            )
+            for attr in TEXT_ATTRS:
+                dashboard_evidences.extend(
+                    [f"{tag} с атрибутом {attr}='{pattern}' (язык: {lang})"] * dashboard_attr_counts[(pattern, attr)]
+                )
+
+    category_evidences = {}
+    for key, keywords, _, attrs in _CATEGORIES:
+        evidences = []
+        for keyword in keywords:
+            if keyword in text_found[key]:
+                evidences.append(f"Найден текст '{keyword}'")
+            for attr in attrs:
+                if keyword in attr_found[key][attr]:
+                    evidences.append(f"Найден атрибут {attr}='{keyword}'")
+        category_evidences[key] = evidences
+
+    # Формируем описание; любой найденный признак означает и наличие пользовательского портала
+    sections = [
+        (login_evidences, None, "Найдены признаки системы логина/регистрации"),
+        (category_evidences["transaction"], "has_transaction_interface", "Найдены признаки транзакционного интерфейса"),
+        (dashboard_evidences, "has_dashboard", "Найдены признаки панели управления/дашборда"),
+        (category_evidences["streaming"], "has_streaming_service", "Найдены признаки сервисов потокового вещания/подписок"),
+        (category_evidences["personalization"], "has_personalization", "Найдены признаки персонализации контента"),
+    ]
+    description_parts = []
+    for evidences, flag, title in sections:
+        if evidences:
+            description_parts.append(_summarize(evidences, title))
+            result["has_user_portal"] = True
+            if flag:
+                result[flag] = True
+
+    if description_parts:
+        result["description"] = " ".join(description_parts)
+    else:
+        result["description"] = "Явных признаков системы логина/регистрации не обнаружено."
+
+    # Учитываем бизнес-модель сайта - если это интернет-магазин, стриминговый сервис или сайт с подпиской,
+    # но мы не нашли явных признаков логина, все равно считаем, что пользовательский интерфейс есть
+    if not result["has_user_portal"] and title_tag is not None and title_tag.string:
+        page_title = title_tag.string.lower()
+        for keyword in BUSINESS_MODEL_KEYWORDS:
+            if keyword.lower() in page_title:
+                result["has_user_portal"] = True
+                result["description"] += f" Предположительно имеется пользовательский портал на основе бизнес-модели ({keyword})."
+                break
+
+    return result
+
+
 class LoginDetectionFinder(Finder):
     """
     Finder для обнаружения систем логина/регистрации на сайте компании.
@@ -16,57 +319,9 @@ class LoginDetectionFinder(Finder):
     пользовательского портала на официальном сайте компании.
     """
     
-    # Паттерны логина на разных языках
-    LOGIN_PATTERNS = {
-        "en": ["login", "sign in", "log in", "signin", "register", "sign up", "signup", "account", "my account", "portal", "dashboard", 
-               "profile", "subscription", "stream", "member", "membership", "user", "customer", "client area", "personalized", 
-               "preferences", "cart", "e-commerce", "checkout", "payment", "billing", "plan", "watch", "save", "download", "bookmark"],
-        "ru": ["вход", "войти", "логин", "авторизация", "регистрация", "личный кабинет", "мой аккаунт", "портал", "панель управления",
-               "профиль", "подписка", "стрим", "смотреть", "участник", "пользователь", "клиент", "сохранить", "корзина", "оплата", "план"],
-        "de": ["anmelden", "einloggen", "registrieren", "konto", "mein konto", "dashboard", "kundenportal", 
-               "profil", "abonnement", "stream", "mitglied", "benutzer", "kunde", "warenkorb", "zahlung", "speichern"],
-        "fr": ["connexion", "se connecter", "s'identifier", "inscription", "compte", "mon compte", "tableau de bord",
-               "profil", "abonnement", "diffusion", "membre", "utilisateur", "client", "panier", "paiement", "sauvegarder"],
-        "es": ["iniciar sesión", "acceder", "registrarse", "cuenta", "mi cuenta", "panel", "portal",
-               "perfil", "suscripción", "transmisión", "miembro", "usuario", "cliente", "carrito", "pago", "guardar"],
-        "it": ["accedi", "login", "registrati", "account", "il mio account",
-               "profilo", "abbonamento", "streaming", "utente", "cliente", "carrello", "pagamento", "salvare"],
-        "pt": ["entrar", "login", "cadastro", "registrar", "conta", "minha conta",
-               "perfil", "assinatura", "streaming", "membro", "usuário", "cliente", "carrinho", "pagamento", "salvar"],
-        "zh": ["登录", "注册", "账户", "我的账户", "个人资料", "订阅", "流媒体", "会员", "用户", "购物车", "支付", "保存"],
-        "ja": ["ログイン", "登録", "アカウント", "マイページ", "プロフィール", "購読", "配信", "メンバー", "ユーザー", "カート", "支払い", "保存"],
-        # Добавляем больше языков
-        "ar": ["تسجيل الدخول", "دخول", "حساب", "حسابي", "تسجيل", "اشتراك", "عضوية", "ملف شخصي", "لوحة التحكم", 
-               "مستخدم", "عميل", "سلة التسوق", "الدفع", "حفظ", "مشاهدة", "بث"],
-        "fi": ["kirjaudu", "kirjautuminen", "rekisteröidy", "tili", "oma tili", "profiili", "hallintapaneeli", 
-               "jäsenyys", "tilaus", "käyttäjä", "asiakas", "ostoskori", "maksu", "tallenna", "katso", "suoratoisto"],
-        "sv": ["logga in", "registrera", "konto", "mitt konto", "profil", "kontrollpanel", 
-               "medlemskap", "prenumeration", "användare", "kund", "kundvagn", "betalning", "spara", "titta", "strömma"],
-        "no": ["logg inn", "registrer", "konto", "min konto", "profil", "kontrollpanel", 
-               "medlemskap", "abonnement", "bruker", "kunde", "handlekurv", "betaling", "lagre", "se", "strømme"],
-        "da": ["log ind", "registrer", "konto", "min konto", "profil", "kontrolpanel", 
-               "medlemskab", "abonnement", "bruger", "kunde", "indkøbskurv", "betaling", "gem", "se", "stream"],
-        "nl": ["inloggen", "aanmelden", "registreren", "account", "mijn account", "profiel", "dashboard", 
-               "lidmaatschap", "abonnement", "gebruiker", "klant", "winkelwagen", "betaling", "opslaan", "bekijken", "streamen"],
-        "tr": ["giriş", "kaydol", "hesap", "hesabım", "profil", "kontrol paneli", 
-               "üyelik", "abonelik", "kullanıcı", "müşteri", "sepet", "ödeme", "kaydet", "izle", "yayın"],
-        "ko": ["로그인", "가입", "계정", "내 계정", "프로필", "대시보드", 
-               "멤버십", "구독", "사용자", "고객", "장바구니", "결제", "저장", "시청", "스트리밍"],
-        "hi": ["लॉगिन", "साइन इन", "पंजीकरण", "खाता", "मेरा खाता", "प्रोफाइल", "डैशबोर्ड", 
-               "सदस्यता", "उपयोगकर्ता", "ग्राहक", "कार्ट", "भुगतान", "सहेजें", "देखें", "स्ट्रीमिंग"],
-        "he": ["התחברות", "כניסה", "הרשמה", "חשבון", "החשבון שלי", "פרופיל", "לוח בקרה", 
-               "מנוי", "משתמש", "לקוח", "עגלת קניות", "תשלום", "שמור", "צפה", "הזרמה"]
-    }
-    
-    # Паттерны URL логина
-    LOGIN_URL_PATTERNS = [
-        "/login", "/signin", "/register", "/signup", "/account", "/auth", "/profile", 
-        "/portal", "/dashboard", "/customer", "/user", "/my", "/cabinet", "/panel",
-        "/join", "/member", "/subscribe", "/subscription", "/stream", "/plans", "/pricing",
-        "/cart", "/checkout", "/payment", "/billing", "/preferences", "/settings",
-        "/watch", "/player", "/download", "/save", "/library"
-    ]
-    
+    LOGIN_PATTERNS = LOGIN_PATTERNS
+    LOGIN_URL_PATTERNS = LOGIN_URL_PATTERNS
+
     def __init__(self, timeout: int = 30, verbose: bool = False):
         """
         Инициализация финдера.
@@ -77,6 +332,7 @@ class LoginDetectionFinder(Finder):
         """
         self.timeout = timeout
         self.verbose = verbose
+        self._session: Optional[aiohttp.ClientSession] = None
     
     async def find(self, company_name: str, **context) -> Dict[str, Any]:
         """
@@ -85,6 +341,7 @@ class LoginDetectionFinder(Finder):
         Args:
             company_name: Название компании
             context: Контекст с результатами предыдущих поисков
+                     (session - общая aiohttp-сессия, переиспользуется при наличии)
             
         Returns:
             Dict[str, Any]: Результат поиска с информацией о наличии системы логина
@@ -126,7 +383,7 @@ class LoginDetectionFinder(Finder):
         
         try:
             logger.info(f"LoginDetectionFinder: Сканирование {homepage_url} для '{company_name}'")
-            login_details = await self._scan_website_for_login(homepage_url)
+            login_details = await self._scan_website_for_login(homepage_url, context.get("session"))
             
             if self.verbose:
                 logger.info(f"LoginDetectionFinder для {company_name}: {login_details}")
@@ -153,12 +410,13 @@ class LoginDetectionFinder(Finder):
                 "_finder_instance_type": self.__class__.__name__
             }
     
-    async def _scan_website_for_login(self, url: str) -> Dict[str, Any]:
+    async def _scan_website_for_login(self, url: str, session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Any]:
         """
-        Сканирует веб-сайт на наличие систем логина/регистрации.
+        Загружает главную страницу сайта и анализирует ее на наличие систем логина/регистрации.
         
         Args:
             url: URL сайта компании
+            session: Общая aiohttp-сессия пайплайна (если не передана - собственная сессия финдера)
             
         Returns:
             Dict[str, Any]: Информация о наличии систем логина и деталях
@@ -177,238 +435,36 @@ class LoginDetectionFinder(Finder):
             url = 'https://' + url
         
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1"
-            }
-            
-            login_evidences = []
-            transaction_evidences = []
-            dashboard_evidences = []
+            if session is None or session.closed:
+                session = self._get_session()
+            try:
+                async with session.get(url, headers=REQUEST_HEADERS, timeout=aiohttp.ClientTimeout(total=self.timeout), ssl=False) as response:
+                    if response.status != 200:
+                        result["description"] = f"Ошибка загрузки страницы. Код статуса: {response.status}"
+                        return result
+                    html_content = await response.text()
+            except aiohttp.ClientError as e:
+                result["description"] = f"Ошибка HTTP-клиента: {str(e)}"
+                return result
             
-            # Асинхронный HTTP-клиент
-            async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.get(url, headers=headers, timeout=self.timeout, ssl=False) as response:
-                        if response.status != 200:
-                            result["description"] = f"Ошибка загрузки страницы. Код статуса: {response.status}"
-                            return result
-                            
-                        html_content = await response.text()
-                        
-                        # Используем BeautifulSoup для парсинга HTML
-                        soup = BeautifulSoup(html_content, 'html.parser')
-                        
-                        # 1. Ищем ссылки с текстом, связанным с логином
-                        all_login_elements = []
-                        
-                        # Проходим по всем языкам и проверяем паттерны
-                        for lang, patterns in self.LOGIN_PATTERNS.items():
-                            for pattern in patterns:
-                                # Ищем в тексте ссылок и кнопок
-                                for tag in ['a', 'button', 'input', 'div', 'span']:
-                                    elements = soup.find_all(tag, text=re.compile(f"\\b{pattern}\\b", re.IGNORECASE))
-                                    for el in elements:
-                                        all_login_elements.append((el, pattern, lang))
-                                        if "dashboard" in pattern.lower() or "панель" in pattern.lower():
-                                            dashboard_evidences.append(f"{tag} с текстом '{pattern}' (язык: {lang})")
-                                    
-                                    # Ищем в атрибутах title, alt, placeholder
-                                    for attr in ['title', 'alt', 'placeholder', 'value', 'aria-label']:
-                                        elements = soup.find_all(attrs={attr: re.compile(f"\\b{pattern}\\b", re.IGNORECASE)})
-                                        for el in elements:
-                                            all_login_elements.append((el, pattern, lang))
-                                            if "dashboard" in pattern.lower() or "панель" in pattern.lower():
-                                                dashboard_evidences.append(f"{tag} с атрибутом {attr}='{pattern}' (язык: {lang})")
-                                
-                                # Ищем в классах и id
-                                for attr_type in ['class', 'id', 'name']:
-                                    elements = soup.find_all(attrs={attr_type: re.compile(f".*{pattern}.*", re.IGNORECASE)})
-                                    for el in elements:
-                                        all_login_elements.append((el, pattern, lang))
-                            
-                        # 2. Ищем формы логина
-                        login_forms = soup.find_all('form')
-                        for form in login_forms:
-                            # Проверяем атрибуты формы
-                            form_action = form.get('action', '').lower()
-                            if any(pattern in form_action for pattern in self.LOGIN_URL_PATTERNS):
-                                all_login_elements.append((form, "form with login action", "en"))
-                                login_evidences.append(f"Форма с action='{form_action}'")
-                            
-                            # Проверяем наличие полей ввода пароля
-                            password_fields = form.find_all('input', {'type': 'password'})
-                            if password_fields:
-                                all_login_elements.append((form, "form with password field", "en"))
-                                login_evidences.append("Форма с полем для ввода пароля")
-                            
-                            # Проверяем на наличие полей для email/username и password вместе
-                            inputs = form.find_all('input')
-                            has_username = any(inp.get('type') == 'text' or inp.get('type') == 'email' or 
-                                             'user' in inp.get('name', '').lower() or 'email' in inp.get('name', '').lower()
-                                             for inp in inputs)
-                            
-                            if has_username and password_fields:
-                                login_evidences.append("Форма с полями для имени пользователя/email и пароля")
-                        
-                        # 3. Ищем характерные URL-паттерны в ссылках
-                        login_urls = []
-                        for link in soup.find_all('a', href=True):
-                            href = link['href'].lower()
-                            for pattern in self.LOGIN_URL_PATTERNS:
-                                if pattern in href:
-                                    login_urls.append(href)
-                                    all_login_elements.append((link, f"link with {pattern}", "en"))
-                                    login_evidences.append(f"Ссылка с URL, содержащим '{pattern}'")
-                                    break
-                        
-                        # 4. Проверяем наличие признаков транзакционного интерфейса
-                        transaction_keywords = [
-                            "payment", "checkout", "cart", "buy", "purchase", "order", "shop", "store", 
-                            "оплата", "корзина", "купить", "заказ", "магазин", 
-                            "zahlung", "warenkorb", "kaufen", "bestellen", 
-                            "paiement", "panier", "acheter", "commander"
-                        ]
-                        
-                        for keyword in transaction_keywords:
-                            # Ищем в ссылках, кнопках, формах
-                            elements = soup.find_all(text=re.compile(f"\\b{keyword}\\b", re.IGNORECASE))
-                            if elements:
-                                transaction_evidences.append(f"Найден текст '{keyword}'")
-                            
-                            # Проверяем атрибуты
-                            for attr in ['title', 'alt', 'placeholder', 'value', 'aria-label']:
-                                elements = soup.find_all(attrs={attr: re.compile(f"\\b{keyword}\\b", re.IGNORECASE)})
-                                if elements:
-                                    transaction_evidences.append(f"Найден атрибут {attr}='{keyword}'")
-                        
-                        # 5. Проверяем наличие признаков потокового вещания и подписок
-                        streaming_subscription_keywords = [
-                            "stream", "watch", "play", "video", "listen", "subscribe", "subscription", "plan", "membership",
-                            "смотреть", "слушать", "видео", "подписка", "трансляция", "стрим", "подписаться", "тариф",
-                            "streamen", "ansehen", "hören", "abonnement", "mitgliedschaft",
-                            "diffusion", "regarder", "écouter", "abonnement", "adhésion"
-                        ]
-                        
-                        streaming_evidences = []
-                        
-                        for keyword in streaming_subscription_keywords:
-                            # Ищем в тексте страницы
-                            elements = soup.find_all(text=re.compile(f"\\b{keyword}\\b", re.IGNORECASE))
-                            if elements:
-                                streaming_evidences.append(f"Найден текст '{keyword}'")
-                            
-                            # Проверяем атрибуты
-                            for attr in ['title', 'alt', 'placeholder', 'value', 'aria-label', 'href']:
-                                elements = soup.find_all(attrs={attr: re.compile(f"\\b{keyword}\\b", re.IGNORECASE)})
-                                if elements:
-                                    streaming_evidences.append(f"Найден атрибут {attr}='{keyword}'")
-                                    
-                        # 6. Проверяем наличие признаков персонализации
-                        personalization_keywords = [
-                            "profile", "account", "settings", "preferences", "my", "personalize", "customize", "save", "bookmark", "history", "favorites",
-                            "профиль", "настройки", "предпочтения", "мой", "персонализ", "сохранить", "избранное", "история", "закладки",
-                            "profil", "einstellungen", "meine", "anpassen", "speichern", "lesezeichen", "verlauf", "favoriten",
-                            "profil", "paramètres", "préférences", "mon", "personnaliser", "enregistrer", "historique", "favoris"
-                        ]
-                        
-                        personalization_evidences = []
-                        
-                        for keyword in personalization_keywords:
-                            # Ищем в тексте страницы
-                            elements = soup.find_all(text=re.compile(f"\\b{keyword}\\b", re.IGNORECASE))
-                            if elements:
-                                personalization_evidences.append(f"Найден текст '{keyword}'")
-                            
-                            # Проверяем атрибуты
-                            for attr in ['title', 'alt', 'placeholder', 'value', 'aria-label', 'href']:
-                                elements = soup.find_all(attrs={attr: re.compile(f"\\b{keyword}\\b", re.IGNORECASE)})
-                                if elements:
-                                    personalization_evidences.append(f"Найден атрибут {attr}='{keyword}'")
-                    
-                except aiohttp.ClientError as e:
-                    result["description"] = f"Ошибка HTTP-клиента: {str(e)}"
-                    return result
-                    
-            # Анализируем результаты
-            unique_login_elements_count = len(set(str(el[0])[:50] for el in all_login_elements))
-            
-            # Формируем описание
-            description_parts = []
-            
-            # Для логин-портала
-            if login_evidences:
-                description_parts.append(f"Найдены признаки системы логина/регистрации: {', '.join(login_evidences[:3])}")
-                if len(login_evidences) > 3:
-                    description_parts[-1] += f" и еще {len(login_evidences) - 3}"
-                result["has_user_portal"] = True
-            
-            # Для транзакционного интерфейса
-            if transaction_evidences:
-                description_parts.append(f"Найдены признаки транзакционного интерфейса: {', '.join(transaction_evidences[:3])}")
-                if len(transaction_evidences) > 3:
-                    description_parts[-1] += f" и еще {len(transaction_evidences) - 3}"
-                result["has_transaction_interface"] = True
-                # Если есть транзакционный интерфейс, также считаем, что есть и пользовательский портал
-                result["has_user_portal"] = True
-            
-            # Для дашборда
-            if dashboard_evidences:
-                description_parts.append(f"Найдены признаки панели управления/дашборда: {', '.join(dashboard_evidences[:3])}")
-                if len(dashboard_evidences) > 3:
-                    description_parts[-1] += f" и еще {len(dashboard_evidences) - 3}"
-                result["has_dashboard"] = True
-                # Если есть дашборд, также считаем, что есть и пользовательский портал
-                result["has_user_portal"] = True
-            
-            # Для потокового вещания и подписок
-            if streaming_evidences:
-                description_parts.append(f"Найдены признаки сервисов потокового вещания/подписок: {', '.join(streaming_evidences[:3])}")
-                if len(streaming_evidences) > 3:
-                    description_parts[-1] += f" и еще {len(streaming_evidences) - 3}"
-                result["has_streaming_service"] = True
-                # Если есть сервисы подписок/стриминга, с высокой вероятностью есть и пользовательский портал
-                result["has_user_portal"] = True
-            
-            # Для функций персонализации
-            if personalization_evidences:
-                description_parts.append(f"Найдены признаки персонализации контента: {', '.join(personalization_evidences[:3])}")
-                if len(personalization_evidences) > 3:
-                    description_parts[-1] += f" и еще {len(personalization_evidences) - 3}"
-                result["has_personalization"] = True
-                # Если есть персонализация, весьма вероятно есть и пользовательский портал
-                result["has_user_portal"] = True
-                
-            # Финальное описание
-            if description_parts:
-                result["description"] = " ".join(description_parts)
-            else:
-                result["description"] = "Явных признаков системы логина/регистрации не обнаружено."
-                
-            # Учитываем бизнес-модель сайта - если это интернет-магазин, стриминговый сервис или сайт с подпиской,
-            # но мы не нашли явных признаков логина, все равно считаем, что пользовательский интерфейс есть
-            if not result["has_user_portal"]:
-                # Проверяем наличие ключевых слов, указывающих на бизнес-модель с пользовательским порталом
-                business_model_keywords = ["shop", "store", "subscription", "account", "streaming", "e-commerce", 
-                                           "member", "premium", "customer", "магазин", "подписка", "стриминг"]
-                
-                # Ищем ключевые слова в title страницы
-                if soup.title and soup.title.string:
-                    for keyword in business_model_keywords:
-                        if keyword.lower() in soup.title.string.lower():
-                            result["has_user_portal"] = True
-                            result["description"] += f" Предположительно имеется пользовательский портал на основе бизнес-модели ({keyword})."
-                            break
-                
-            return result
+            return analyze_login_page(html_content)
             
         except Exception as e:
             result["description"] = f"Ошибка при сканировании: {str(e)}"
             logger.error(f"LoginDetectionFinder: Ошибка при анализе {url}: {str(e)}")
             return result
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Собственная сессия финдера (создается один раз, если общая сессия не передана)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+    
+    async def close(self):
+        """Закрыть собственную сессию финдера"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
 # Для тестирования
 if __name__ == "__main__":
@@ -435,6 +491,8 @@ if __name__ == "__main__":
                 print(f"Ошибка: {result['error']}")
             else:
                 print(f"Результат: {result['result']}")
+        
+        await finder.close()
     
     # Запускаем тест
     asyncio.run(test_finder()) 
\ No newline at end of file
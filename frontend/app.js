@@ -46,6 +46,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
     let currentSessionId = null;
     let pollingInterval = null;
+    let statusEventSource = null;
+    let lastResultsRefresh = 0;
     let ws = null;
     let resultsTable = null;
 
@@ -150,11 +152,8 @@ document.addEventListener('DOMContentLoaded', () => {
         }
         enableHubSpotToggle();
         
-        // Останавливаем polling если он активен
-        if (pollingInterval) {
-            clearInterval(pollingInterval);
-            pollingInterval = null;
-        }
+        // Останавливаем обновления статуса (SSE или polling), если они активны
+        stopStatusUpdates();
         
         // Очищаем глобальные переменные
         window.deduplicationInfo = null;
@@ -480,7 +479,76 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    // Обновление результатов при событиях прогресса - не чаще одного раза за интервал
+    const RESULTS_REFRESH_INTERVAL_MS = 2000;
+
+    async function applySessionStatus(sessionId, sessionData, forceResults = true) {
+        updateStatus(`Status: ${sessionData.status}`);
+
+        const finished = sessionData.status === 'completed' || sessionData.status === 'error';
+        const now = Date.now();
+        if (forceResults || finished || now - lastResultsRefresh >= RESULTS_REFRESH_INTERVAL_MS) {
+            lastResultsRefresh = now;
+            await fetchAndDisplayResults(sessionId, sessionData);
+        }
+
+        if (finished) {
+            stopPollingStatus();
+            // Активируем HubSpot toggle когда сессия завершена
+            enableHubSpotToggle();
+            if (sessionData.status === 'completed'){
+                let finalCount = (sessionData.deduplication_info && sessionData.deduplication_info.final_count) 
+                                 ? sessionData.deduplication_info.final_count 
+                                 : sessionData.total_companies;
+                updateProgressBar(finalCount, finalCount, true, sessionData);
+                
+                // 🔄 ОБНОВЛЯЕМ информацию о последней сессии на второй вкладке
+                if (window.criteriaAnalysis && typeof window.criteriaAnalysis.refreshLatestSessionInfo === 'function') {
+                    console.log('🔄 Triggering latest session update on criteria tab...');
+                    window.criteriaAnalysis.refreshLatestSessionInfo();
+                } else if (typeof window.refreshLatestSessionInfo === 'function') {
+                    console.log('🔄 Using global function to refresh latest session info...');
+                    window.refreshLatestSessionInfo();
+                }
+            }
+            ensureResultsControlsAvailable();
+            makeResultsControlsVisible(true);
+        }
+    }
+
     function startPollingStatus(sessionId) {
+        stopStatusUpdates();
+        if (typeof EventSource === 'undefined') {
+            startIntervalPolling(sessionId);
+            return;
+        }
+
+        // Сервер присылает метаданные и прогресс сессии сам (SSE) - опрос /api/sessions не нужен
+        const source = new EventSource(`/api/sessions/${sessionId}/events`);
+        statusEventSource = source;
+        source.addEventListener('progress', (event) => {
+            const sessionData = JSON.parse(event.data);
+            applySessionStatus(sessionId, sessionData, false).catch(() => {
+                // Результатов может еще не быть
+            });
+        });
+        source.addEventListener('end', () => {
+            source.close();
+            if (statusEventSource === source) {
+                statusEventSource = null;
+            }
+        });
+        source.onerror = () => {
+            if (statusEventSource !== source || source.readyState !== EventSource.CLOSED) {
+                return; // EventSource переподключится сам
+            }
+            // Поток закрыт сервером с ошибкой - возвращаемся к опросу
+            statusEventSource = null;
+            startIntervalPolling(sessionId);
+        };
+    }
+
+    function startIntervalPolling(sessionId) {
         if (pollingInterval) {
             clearInterval(pollingInterval);
         }
@@ -489,32 +557,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const response = await fetch(`/api/sessions/${sessionId}`);
                 if (!response.ok) return;
                 const sessionData = await response.json(); // Получаем свежие данные о сессии
-                updateStatus(`Status: ${sessionData.status}`);
-                
-                await fetchAndDisplayResults(sessionId, sessionData); 
-                
-                if (sessionData.status === 'completed' || sessionData.status === 'error') {
-                    stopPollingStatus();
-                    // Активируем HubSpot toggle когда сессия завершена
-                    enableHubSpotToggle();
-                    if (sessionData.status === 'completed'){
-                        let finalCount = (sessionData.deduplication_info && sessionData.deduplication_info.final_count) 
-                                         ? sessionData.deduplication_info.final_count 
-                                         : sessionData.total_companies;
-                        updateProgressBar(finalCount, finalCount, true, sessionData);
-                        
-                        // 🔄 ОБНОВЛЯЕМ информацию о последней сессии на второй вкладке
-                        if (window.criteriaAnalysis && typeof window.criteriaAnalysis.refreshLatestSessionInfo === 'function') {
-                            console.log('🔄 Triggering latest session update on criteria tab...');
-                            window.criteriaAnalysis.refreshLatestSessionInfo();
-                        } else if (typeof window.refreshLatestSessionInfo === 'function') {
-                            console.log('🔄 Using global function to refresh latest session info...');
-                            window.refreshLatestSessionInfo();
-                        }
-                    }
-                    ensureResultsControlsAvailable();
-                    makeResultsControlsVisible(true);
-                }
+                await applySessionStatus(sessionId, sessionData);
             } catch (error) {
                 // Не показываем тревожных сообщений, если результатов ещё нет
                 // Можно добавить console.error для отладки, если необходимо
@@ -523,11 +566,19 @@ document.addEventListener('DOMContentLoaded', () => {
         }, 2000);
     }
 
-    function stopPollingStatus() {
+    function stopStatusUpdates() {
+        if (statusEventSource) {
+            statusEventSource.close();
+            statusEventSource = null;
+        }
         if (pollingInterval) {
             clearInterval(pollingInterval);
             pollingInterval = null;
         }
+    }
+
+    function stopPollingStatus() {
+        stopStatusUpdates();
         if (progressStatus) progressStatus.style.display = 'none';
     }
 
@@ -5,7 +5,8 @@
 class CriteriaAnalysis {
     constructor() {
         this.currentSessionId = null;
-        this.statusCheckInterval = null;
+        this.statusEventSource = null;
+        this.statusCheckTimeout = null;
         this.criteriaFiles = [];
         this.availableProducts = [];
         this.selectedCriteria = [];  // Now stores selected product names
@@ -397,18 +398,58 @@ class CriteriaAnalysis {
     }
 
     startStatusChecking() {
-        this.statusCheckInterval = setInterval(() => {
+        this.stopStatusChecking();
+        if (!this.currentSessionId) {
+            return;
+        }
+        if (typeof EventSource === 'undefined') {
             this.checkStatus();
-        }, 10000); // Check every 10 seconds
+            return;
+        }
+
+        // Сервер сам присылает прогресс сессии (SSE) - опрос /progress не нужен
+        const source = new EventSource(`/api/criteria/sessions/${this.currentSessionId}/events`);
+        this.statusEventSource = source;
+        source.addEventListener('progress', (event) => {
+            this.renderProgress(JSON.parse(event.data));
+        });
+        source.addEventListener('end', () => {
+            source.close();
+            if (this.statusEventSource === source) {
+                this.statusEventSource = null;
+            }
+        });
+        source.onerror = () => {
+            if (this.statusEventSource !== source || source.readyState !== EventSource.CLOSED) {
+                return; // EventSource переподключится сам
+            }
+            // Поток закрыт сервером с ошибкой (например, сессия не найдена) - возвращаемся к опросу
+            this.statusEventSource = null;
+            this.checkStatus();
+        };
     }
 
     stopStatusChecking() {
-        if (this.statusCheckInterval) {
-            clearInterval(this.statusCheckInterval);
-            this.statusCheckInterval = null;
+        if (this.statusEventSource) {
+            this.statusEventSource.close();
+            this.statusEventSource = null;
+        }
+        if (this.statusCheckTimeout) {
+            clearTimeout(this.statusCheckTimeout);
+            this.statusCheckTimeout = null;
         }
     }
 
+    scheduleStatusCheck(delay) {
+        if (this.statusCheckTimeout) {
+            clearTimeout(this.statusCheckTimeout);
+        }
+        this.statusCheckTimeout = setTimeout(() => {
+            this.statusCheckTimeout = null;
+            this.checkStatus();
+        }, delay);
+    }
+
     async checkStatus() {
         if (!this.currentSessionId) {
             console.log('No session ID for status check');
@@ -425,61 +466,11 @@ class CriteriaAnalysis {
             }
 
             console.log('Progress data:', data);
+            this.renderProgress(data);
 
-            // Обновляем прогресс бар с процентом
-            this.updateProgressBar(data.percentage || 0);
-            
-            // Создаем детальное сообщение о прогрессе
-            let statusMessage = data.message || 'Processing...';
-            
-            if (data.detailed_progress && data.progress) {
-                // Добавляем детальную информацию о критериях
-                if (data.progress.criteria && data.progress.criteria !== "0/0") {
-                    statusMessage += `\n Criteria: ${data.progress.criteria}`;
-                }
-                
-                // Добавляем информацию о компаниях
-                if (data.progress.companies && data.progress.companies !== "0/0") {
-                    statusMessage += `\n Companies: ${data.progress.companies}`;
-                }
-                
-                // Добавляем breakdown по типам критериев
-                if (data.criteria_summary) {
-                    statusMessage += `\n ${data.criteria_summary}`;
-                }
-                
-                // Добавляем текущую информацию
-                if (data.current && data.current.company && data.current.product) {
-                    statusMessage += `\n Processing: ${data.current.company} → ${data.current.product}`;
-                }
-                
-                // Добавляем информацию об аудитории
-                if (data.current && data.current.audience) {
-                    statusMessage += ` (${data.current.audience})`;
-                }
-            }
-
-            if (data.status === 'processing') {
-                this.showStatus(statusMessage, 'processing');
-                // Продолжаем проверять статус
-                setTimeout(() => this.checkStatus(), 3000); // Проверяем каждые 3 секунды
-            } else if (data.status === 'completed') {
-                this.showStatus('Analysis completed successfully!', 'completed');
-                this.updateProgressBar(100);
-                this.stopStatusChecking();
-                // Автоматически загружаем результаты при завершении
-                setTimeout(() => this.loadResults(), 1000);
-            } else if (data.status === 'failed') {
-                const errorMsg = data.error || 'Analysis failed';
-                this.showStatus(`Analysis failed: ${errorMsg}`, 'error');
-                this.updateProgressBar(0);
-                this.stopStatusChecking();
-            } else if (data.status === 'cancelled') {
-                this.showStatus('Analysis cancelled', 'error');
-                this.updateProgressBar(0);
-                this.stopStatusChecking();
-            } else {
-                this.showStatus(`Status: ${data.status}`, 'info');
+            if (data.status === 'processing' && !this.statusEventSource) {
+                // Опрос только без потока событий
+                this.scheduleStatusCheck(3000); // Проверяем каждые 3 секунды
             }
 
         } catch (error) {
@@ -494,7 +485,7 @@ class CriteriaAnalysis {
                                   fallbackData.status === 'processing' ? 'processing' : 'info');
                     
                     if (fallbackData.status === 'processing') {
-                        setTimeout(() => this.checkStatus(), 5000);
+                        this.scheduleStatusCheck(5000);
                     } else {
                         this.stopStatusChecking();
                     }
@@ -508,6 +499,66 @@ class CriteriaAnalysis {
         }
     }
 
+    renderProgress(data) {
+        if (data.session_id && data.session_id !== this.currentSessionId) {
+            return;
+        }
+
+        // Обновляем прогресс бар с процентом
+        this.updateProgressBar(data.percentage || 0);
+        
+        // Создаем детальное сообщение о прогрессе
+        let statusMessage = data.message || 'Processing...';
+        
+        if (data.detailed_progress && data.progress) {
+            // Добавляем детальную информацию о критериях
+            if (data.progress.criteria && data.progress.criteria !== "0/0") {
+                statusMessage += `\n Criteria: ${data.progress.criteria}`;
+            }
+            
+            // Добавляем информацию о компаниях
+            if (data.progress.companies && data.progress.companies !== "0/0") {
+                statusMessage += `\n Companies: ${data.progress.companies}`;
+            }
+            
+            // Добавляем breakdown по типам критериев
+            if (data.criteria_summary) {
+                statusMessage += `\n ${data.criteria_summary}`;
+            }
+            
+            // Добавляем текущую информацию
+            if (data.current && data.current.company && data.current.product) {
+                statusMessage += `\n Processing: ${data.current.company} → ${data.current.product}`;
+            }
+            
+            // Добавляем информацию об аудитории
+            if (data.current && data.current.audience) {
+                statusMessage += ` (${data.current.audience})`;
+            }
+        }
+
+        if (data.status === 'processing') {
+            this.showStatus(statusMessage, 'processing');
+        } else if (data.status === 'completed') {
+            this.showStatus('Analysis completed successfully!', 'completed');
+            this.updateProgressBar(100);
+            this.stopStatusChecking();
+            // Автоматически загружаем результаты при завершении
+            setTimeout(() => this.loadResults(), 1000);
+        } else if (data.status === 'failed') {
+            const errorMsg = data.error || 'Analysis failed';
+            this.showStatus(`Analysis failed: ${errorMsg}`, 'error');
+            this.updateProgressBar(0);
+            this.stopStatusChecking();
+        } else if (data.status === 'cancelled') {
+            this.showStatus('Analysis cancelled', 'error');
+            this.updateProgressBar(0);
+            this.stopStatusChecking();
+        } else {
+            this.showStatus(`Status: ${data.status}`, 'info');
+        }
+    }
+
     updateProgressBar(percentage) {
         const progressBar = document.querySelector('#criteria-progress div');
         if (progressBar) {
@@ -19,6 +19,8 @@ from typing import Optional, Tuple, List
 import ssl
 from src.input_validators import normalize_domain
 from src.external_apis.scrapingbee_client import CustomScrapingBeeClient
+from src.external_apis.rate_limiter import get_rate_limiter
+from src.external_apis.url_resolver import get_url_resolver, url_record
 
 # Настройка логирования
 logging.basicConfig(
@@ -36,6 +38,10 @@ async def get_url_status_and_final_location_async(
     """
     Асинхронно проверяет "жизнеспособность" URL, следует редиректам и возвращает финальный URL.
 
+    Результат берется из общего кэша проверок (get_url_resolver): за сессию каждый URL
+    проверяется один раз, одновременные проверки одного URL объединяются.
+    Отрицательный результат, полученный без ScrapingBee, не используется, если клиент ScrapingBee передан.
+
     Args:
         url: URL для проверки.
         session: Экземпляр aiohttp.ClientSession.
@@ -51,6 +57,27 @@ async def get_url_status_and_final_location_async(
     if not url or not isinstance(url, str):
         return False, None, "URL отсутствует или имеет неверный тип"
 
+    async def probe():
+        is_live, final_url, error_message, status = await _probe_url_status_async(url, session, timeout, scrapingbee_client)
+        return url_record(is_live, final_url, status, error_message, scrapingbee=scrapingbee_client is not None)
+
+    def accept(record):
+        return record["live"] or record.get("scrapingbee") or scrapingbee_client is None
+
+    record = await get_url_resolver().resolve(url, probe, variant="liveness", accept=accept)
+    return record["live"], record["final_url"], record["error"]
+
+
+async def _probe_url_status_async(
+    url: str,
+    session: aiohttp.ClientSession,
+    timeout: float = 10.0,
+    scrapingbee_client: Optional[CustomScrapingBeeClient] = None
+) -> Tuple[bool, Optional[str], Optional[str], Optional[int]]:
+    """Проверка URL без кэша; возвращает (is_live, final_url, error_message, http_status)"""
+    if not url or not isinstance(url, str):
+        return False, None, "URL отсутствует или имеет неверный тип", None
+
     # Более реалистичные заголовки для обхода блокировок
     common_headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -108,7 +135,7 @@ async def get_url_status_and_final_location_async(
 
             # 1. Проверка DNS (опционально, но может ускорить отказ для неверных доменов)
             try:
-                await asyncio.get_event_loop().getaddrinfo(hostname, None)
+                await get_url_resolver().resolve_host(hostname)
                 logger.debug(f"[URL_CHECK] DNS для {hostname} успешно разрешен.")
             except socket.gaierror:
                 logger.warning(f"[URL_CHECK] Ошибка разрешения DNS для {hostname} (из URL: {current_url_to_try})")
@@ -126,18 +153,18 @@ async def get_url_status_and_final_location_async(
                 logger.info(f"[URL_CHECK] HEAD для {current_url_to_try}: статус {response.status}, финальный URL: {final_url_after_redirect}")
 
                 if 200 <= response.status < 400: # Успешный статус или редирект, который разрешился успешно
-                    return True, final_url_after_redirect, None
+                    return True, final_url_after_redirect, None, response.status
                 elif response.status == 500 and final_url_after_redirect != current_url_to_try:
                     # Если сервер вернул 500, но есть редирект на другой URL - проверим конечный URL
                     logger.info(f"[URL_CHECK] Статус 500 для {current_url_to_try}, но есть редирект на {final_url_after_redirect}. Считаем успешным.")
-                    return True, final_url_after_redirect, None
+                    return True, final_url_after_redirect, None, response.status
                 elif response.status in [403, 429]: # Forbidden или Too Many Requests - сайт живой, но блокирует боты
                      logger.warning(f"[URL_CHECK] HEAD для {current_url_to_try} вернул {response.status} (блокировка ботов). Считаем сайт живым.")
                      
                      # Проверяем был ли редирект даже при 403/429
                      final_url = final_url_after_redirect if final_url_after_redirect != current_url_to_try else current_url_to_try
                      logger.info(f"[URL_CHECK] Сайт {current_url_to_try} блокирует ботов ({response.status}), но сайт живой. Финальный URL: {final_url}")
-                     return True, final_url, f"Website blocks bots (HTTP {response.status}) but is alive"
+                     return True, final_url, f"Website blocks bots (HTTP {response.status}) but is alive", response.status
                      
                 else: # Другие ошибки (404, 5xx и т.д.)
                     error_msg = f"Статус HEAD {response.status} для {current_url_to_try}"
@@ -168,10 +195,10 @@ async def get_url_status_and_final_location_async(
                             final_url_no_ssl = str(response_no_ssl.url)
                             logger.info(f"[URL_CHECK] HEAD (без SSL проверки) для {current_url_to_try}: статус {response_no_ssl.status}, финальный URL: {final_url_no_ssl}")
                             if 200 <= response_no_ssl.status < 400:
-                                return True, final_url_no_ssl, None
+                                return True, final_url_no_ssl, None, response_no_ssl.status
                             elif response_no_ssl.status in [403, 429]: # Блокировка ботов
                                 logger.info(f"[URL_CHECK] Сайт {current_url_to_try} блокирует ботов ({response_no_ssl.status}), но сайт живой.")
-                                return True, final_url_no_ssl, f"Website blocks bots (HTTP {response_no_ssl.status}) but is alive"
+                                return True, final_url_no_ssl, f"Website blocks bots (HTTP {response_no_ssl.status}) but is alive", response_no_ssl.status
                             # Если и это не помогло, вторая итерация цикла (с http) все равно будет
                  except Exception as e_no_ssl:
                      logger.warning(f"[URL_CHECK] Ошибка при попытке без SSL проверки для {current_url_to_try}: {e_no_ssl}")
@@ -217,13 +244,13 @@ async def get_url_status_and_final_location_async(
                 logger.info(f"[URL_CHECK] HEAD базового домена {base_domain_url}: статус {response.status}, финальный URL: {final_url_base}")
                 
                 if 200 <= response.status < 400:
-                    return True, final_url_base, None
+                    return True, final_url_base, None, response.status
                 elif response.status == 500 and final_url_base != base_domain_url:
                     logger.info(f"[URL_CHECK] Статус 500 для базового домена {base_domain_url}, но есть редирект на {final_url_base}. Считаем успешным.")
-                    return True, final_url_base, None
+                    return True, final_url_base, None, response.status
                 elif response.status == 403 and final_url_base != base_domain_url:
                     logger.info(f"[URL_CHECK] Статус 403 для базового домена {base_domain_url}, но есть редирект на {final_url_base}. Считаем успешным.")
-                    return True, final_url_base, None
+                    return True, final_url_base, None, response.status
         except Exception as e_base:
             logger.warning(f"[URL_CHECK] Ошибка при проверке базового домена {base_domain_url}: {e_base}")
     
@@ -251,7 +278,7 @@ async def get_url_status_and_final_location_async(
                 if "Ошибка разрешения DNS" in last_aiohttp_error_message:
                     logger.warning(f"[URL_CHECK] ПОДОЗРИТЕЛЬНО: DNS не резолвится, но ScrapingBee вернул {status_code} для {url_for_sb}")
                     logger.warning(f"[URL_CHECK] Это может быть redirect на поисковик или заглушка. Считаем URL мертвым.")
-                    return False, None, f"{last_aiohttp_error_message}; ScrapingBee suspicious success (possible search engine redirect)"
+                    return False, None, f"{last_aiohttp_error_message}; ScrapingBee suspicious success (possible search engine redirect)", status_code
                 
                 # Проверяем, не является ли финальный URL поисковиком или заглушкой
                 search_engines = ['google.com', 'bing.com', 'yahoo.com', 'duckduckgo.com', 'search.yahoo.com']
@@ -260,33 +287,33 @@ async def get_url_status_and_final_location_async(
                 final_domain = normalize_domain(final_sb_url) if final_sb_url else ""
                 if any(engine in final_domain for engine in search_engines):
                     logger.warning(f"[URL_CHECK] ScrapingBee перенаправил на поисковик: {final_sb_url}. URL считается мертвым.")
-                    return False, None, f"ScrapingBee redirected to search engine: {final_sb_url}"
+                    return False, None, f"ScrapingBee redirected to search engine: {final_sb_url}", status_code
                 
                 if any(indicator in final_domain for indicator in dummy_indicators):
                     logger.warning(f"[URL_CHECK] ScrapingBee перенаправил на парковочную страницу: {final_sb_url}. URL считается мертвым.")
-                    return False, None, f"ScrapingBee redirected to parking page: {final_sb_url}"
+                    return False, None, f"ScrapingBee redirected to parking page: {final_sb_url}", status_code
                 
                 logger.info(f"[URL_CHECK] ScrapingBee для {url_for_sb}: статус {status_code}, финальный URL: {final_sb_url}")
-                return True, final_sb_url, None
+                return True, final_sb_url, None, status_code
             elif status_code and status_code in [403, 429]:  # Блокировка ботов - сайт живой
                 final_sb_url = final_url_or_error if final_url_or_error else url_for_sb
                 logger.info(f"[URL_CHECK] ScrapingBee: сайт {url_for_sb} блокирует ботов (статус {status_code}), но сайт живой")
-                return True, final_sb_url, f"Website blocks bots (HTTP {status_code}) but is alive"
+                return True, final_sb_url, f"Website blocks bots (HTTP {status_code}) but is alive", status_code
             else:
                 error_msg_sb = f"ScrapingBee не смог получить {url_for_sb}, статус: {status_code}, ответ: {final_url_or_error}"
                 logger.warning(f"[URL_CHECK] {error_msg_sb}")
                 # Возвращаем исходную ошибку aiohttp и добавляем ошибку ScrapingBee
-                return False, None, f"{last_aiohttp_error_message}; ScrapingBee: {error_msg_sb}"
+                return False, None, f"{last_aiohttp_error_message}; ScrapingBee: {error_msg_sb}", status_code
 
 
         except Exception as e_sb:
             logger.error(f"[URL_CHECK] Ошибка при использовании ScrapingBee для {original_url}: {e_sb}", exc_info=True)
             # Возвращаем исходную ошибку aiohttp и добавляем ошибку ScrapingBee
-            return False, None, f"{last_aiohttp_error_message}; ScrapingBee error: {str(e_sb)}"
+            return False, None, f"{last_aiohttp_error_message}; ScrapingBee error: {str(e_sb)}", None
 
     # Если и ScrapingBee не помог (или не был доступен), возвращаем последнюю ошибку от aiohttp
     logger.warning(f"[URL_CHECK] Все попытки проверки для {original_url} не удались (включая ScrapingBee, если использовался).")
-    return False, None, last_aiohttp_error_message
+    return False, None, last_aiohttp_error_message, None
 
 def normalize_urls_in_file(input_file: str, output_file: str = None) -> str:
     """
@@ -577,12 +604,14 @@ async def normalize_and_remove_duplicates(
     # Семафор для ограничения одновременных проверок URL
     max_concurrent_validations = 7  # Компромисс: больше чем 5, но не перегружает API
     semaphore = asyncio.Semaphore(max_concurrent_validations)
+    # Общий темп проверок задает ограничитель "url_check" (RATE_LIMIT_URL_CHECK_RPS); ScrapingBee - свой
+    url_check_limiter = get_rate_limiter("url_check")
     
     async def validate_url_with_semaphore(original_url, session, scrapingbee_client):
         """Валидация URL с семафором для ограничения одновременных соединений"""
         async with semaphore:
-            # Короткая задержка для предотвращения rate limiting, но не блокирующая асинхронность
-            await asyncio.sleep(0.2)  # Компромисс: короче чем 0.5с, но защищает от rate limiting
+            if get_url_resolver().get(original_url) is None:  # проверка из кэша не расходует лимит
+                await url_check_limiter.acquire()
             return await get_url_status_and_final_location_async(original_url, session, scrapingbee_client=scrapingbee_client)
     
     async with aiohttp.ClientSession(connector=conn) as session:
@@ -721,31 +750,29 @@ async def normalize_and_remove_duplicates(
 def _update_session_metadata_light(session_id: str, dedup_info: dict, new_messages: Optional[List[dict]] = None):
     """Вспомогательная функция для обновления метаданных сессии."""
     try:
-        from src.data_io import load_session_metadata, save_session_metadata
+        from src.data_io import update_session_metadata
         logger.info(f"Обновление метаданных (light) для сессии {session_id}...")
-        all_metadata = load_session_metadata()
-        session_updated = False
-        for session_meta in all_metadata:
-            if session_meta.get("session_id") == session_id:
-                session_meta["total_companies"] = dedup_info.get("final_count", 0)
-                session_meta["companies_count"] = dedup_info.get("final_count", 0)
-                session_meta["deduplication_info"] = dedup_info # Сохраняем все детали сюда
-
-                current_messages = session_meta.get("processing_messages", [])
-                if new_messages:
-                    # Добавляем только действительно новые сообщения, проверяя по тексту и типу
-                    existing_message_tuples = {(m.get("type"), m.get("message")) for m in current_messages}
-                    messages_to_add_now = [
-                        msg for msg in new_messages
-                        if (msg.get("type"), msg.get("message")) not in existing_message_tuples
-                    ]
-                    if messages_to_add_now:
-                         session_meta["processing_messages"] = current_messages + messages_to_add_now
-                session_updated = True
-                break
-        
-        if session_updated:
-            save_session_metadata(all_metadata)
+
+        def changes(session_meta):
+            fields = {
+                "total_companies": dedup_info.get("final_count", 0),
+                "companies_count": dedup_info.get("final_count", 0),
+                "deduplication_info": dedup_info, # Сохраняем все детали сюда
+            }
+            current_messages = session_meta.get("processing_messages", [])
+            if new_messages:
+                # Добавляем только действительно новые сообщения, проверяя по тексту и типу
+                existing_message_tuples = {(m.get("type"), m.get("message")) for m in current_messages}
+                messages_to_add_now = [
+                    msg for msg in new_messages
+                    if (msg.get("type"), msg.get("message")) not in existing_message_tuples
+                ]
+                if messages_to_add_now:
+                    fields["processing_messages"] = current_messages + messages_to_add_now
+            return fields
+
+        # Чтение и запись одной сессии - одна транзакция, параллельные обновления других полей не теряются
+        if update_session_metadata(session_id, changes) is not None:
             logger.info(f"Метаданные сессии {session_id} обновлены (light).")
         else:
             logger.warning(f"Сессия {session_id} не найдена в метаданных для обновления (light).")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк анализа страниц LoginDetectionFinder: однопроходный analyze_login_page против прежней реализации
+
+Корпус - главные страницы, сохраненные в кэше ScrapingBee (cache/scrapingbee_pages.sqlite,
+вариант html), и/или сохраненные .html файлы. Для каждой страницы результаты обеих реализаций
+(на html.parser) сравниваются, затем замеряется время; если установлен lxml, отдельно
+замеряется analyze_login_page на lxml.
+
+Запуск из корня проекта:
+    python scripts/benchmark_login_detection.py
+    python scripts/benchmark_login_detection.py --corpus "output/**/*.html" --repeat 5
+"""
+
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from finders.login_detection_finder import (
+    HTML_PARSER, LOGIN_PATTERNS, LOGIN_URL_PATTERNS, TRANSACTION_KEYWORDS,
+    STREAMING_SUBSCRIPTION_KEYWORDS, PERSONALIZATION_KEYWORDS, BUSINESS_MODEL_KEYWORDS,
+    analyze_login_page
+)
+from src.external_apis.page_cache import DEFAULT_CACHE_PATH, PageCache
+
+
+def analyze_login_page_legacy(html_content):
+    """Прежняя реализация: find_all с новым regex для каждой пары язык × паттерн × тег × атрибут"""
+    result = {
+        "has_user_portal": False,
+        "has_transaction_interface": False,
+        "has_dashboard": False,
+        "has_streaming_service": False,
+        "has_personalization": False,
+        "description": ""
+    }
+    login_evidences = []
+    transaction_evidences = []
+    dashboard_evidences = []
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    all_login_elements = []
+    for lang, patterns in LOGIN_PATTERNS.items():
+        for pattern in patterns:
+            for tag in ['a', 'button', 'input', 'div', 'span']:
+                elements = soup.find_all(tag, text=re.compile(f"\\b{pattern}\\b", re.IGNORECASE))
+                for el in elements:
+                    all_login_elements.append((el, pattern, lang))
+                    if "dashboard" in pattern.lower() or "панель" in pattern.lower():
+                        dashboard_evidences.append(f"{tag} с текстом '{pattern}' (язык: {lang})")
+                for attr in ['title', 'alt', 'placeholder', 'value', 'aria-label']:
+                    elements = soup.find_all(attrs={attr: re.compile(f"\\b{pattern}\\b", re.IGNORECASE)})
+                    for el in elements:
+                        all_login_elements.append((el, pattern, lang))
+                        if "dashboard" in pattern.lower() or "панель" in pattern.lower():
+                            dashboard_evidences.append(f"{tag} с атрибутом {attr}='{pattern}' (язык: {lang})")
+            for attr_type in ['class', 'id', 'name']:
+                elements = soup.find_all(attrs={attr_type: re.compile(f".*{pattern}.*", re.IGNORECASE)})
+                for el in elements:
+                    all_login_elements.append((el, pattern, lang))
+
+    for form in soup.find_all('form'):
+        form_action = form.get('action', '').lower()
+        if any(pattern in form_action for pattern in LOGIN_URL_PATTERNS):
+            login_evidences.append(f"Форма с action='{form_action}'")
+        password_fields = form.find_all('input', {'type': 'password'})
+        if password_fields:
+            login_evidences.append("Форма с полем для ввода пароля")
+        inputs = form.find_all('input')
+        has_username = any(inp.get('type') == 'text' or inp.get('type') == 'email' or
+                           'user' in inp.get('name', '').lower() or 'email' in inp.get('name', '').lower()
+                           for inp in inputs)
+        if has_username and password_fields:
+            login_evidences.append("Форма с полями для имени пользователя/email и пароля")
+
+    for link in soup.find_all('a', href=True):
+        href = link['href'].lower()
+        for pattern in LOGIN_URL_PATTERNS:
+            if pattern in href:
+                login_evidences.append(f"Ссылка с URL, содержащим '{pattern}'")
+                break
+
+    for keyword in TRANSACTION_KEYWORDS:
+        if soup.find_all(text=re.compile(f"\\b{keyword}\\b", re.IGNORECASE)):
+            transaction_evidences.append(f"Найден текст '{keyword}'")
+        for attr in ['title', 'alt', 'placeholder', 'value', 'aria-label']:
+            if soup.find_all(attrs={attr: re.compile(f"\\b{keyword}\\b", re.IGNORECASE)}):
+                transaction_evidences.append(f"Найден атрибут {attr}='{keyword}'")
+
+    streaming_evidences = []
+    for keyword in STREAMING_SUBSCRIPTION_KEYWORDS:
+        if soup.find_all(text=re.compile(f"\\b{keyword}\\b", re.IGNORECASE)):
+            streaming_evidences.append(f"Найден текст '{keyword}'")
+        for attr in ['title', 'alt', 'placeholder', 'value', 'aria-label', 'href']:
+            if soup.find_all(attrs={attr: re.compile(f"\\b{keyword}\\b", re.IGNORECASE)}):
+                streaming_evidences.append(f"Найден атрибут {attr}='{keyword}'")
+
+    personalization_evidences = []
+    for keyword in PERSONALIZATION_KEYWORDS:
+        if soup.find_all(text=re.compile(f"\\b{keyword}\\b", re.IGNORECASE)):
+            personalization_evidences.append(f"Найден текст '{keyword}'")
+        for attr in ['title', 'alt', 'placeholder', 'value', 'aria-label', 'href']:
+            if soup.find_all(attrs={attr: re.compile(f"\\b{keyword}\\b", re.IGNORECASE)}):
+                personalization_evidences.append(f"Найден атрибут {attr}='{keyword}'")
+
+    len(set(str(el[0])[:50] for el in all_login_elements))
+
+    description_parts = []
+    for evidences, flag, title in [
+        (login_evidences, None, "Найдены признаки системы логина/регистрации"),
+        (transaction_evidences, "has_transaction_interface", "Найдены признаки транзакционного интерфейса"),
+        (dashboard_evidences, "has_dashboard", "Найдены признаки панели управления/дашборда"),
+        (streaming_evidences, "has_streaming_service", "Найдены признаки сервисов потокового вещания/подписок"),
+        (personalization_evidences, "has_personalization", "Найдены признаки персонализации контента"),
+    ]:
+        if evidences:
+            description_parts.append(f"{title}: {', '.join(evidences[:3])}")
+            if len(evidences) > 3:
+                description_parts[-1] += f" и еще {len(evidences) - 3}"
+            result["has_user_portal"] = True
+            if flag:
+                result[flag] = True
+
+    if description_parts:
+        result["description"] = " ".join(description_parts)
+    else:
+        result["description"] = "Явных признаков системы логина/регистрации не обнаружено."
+
+    if not result["has_user_portal"]:
+        if soup.title and soup.title.string:
+            for keyword in BUSINESS_MODEL_KEYWORDS:
+                if keyword.lower() in soup.title.string.lower():
+                    result["has_user_portal"] = True
+                    result["description"] += f" Предположительно имеется пользовательский портал на основе бизнес-модели ({keyword})."
+                    break
+    return result
+
+
+def load_page_cache(cache_path):
+    """HTML страницы из кэша ScrapingBee (без учета TTL)"""
+    if not os.path.exists(cache_path):
+        return []
+    with sqlite3.connect(cache_path) as conn:
+        urls = [row[0] for row in conn.execute(
+            "SELECT url FROM pages WHERE variant = 'html' AND content_hash IS NOT NULL ORDER BY url"
+        )]
+    cache = PageCache(cache_path, default_ttl_seconds=None)
+    pages = []
+    for url in urls:
+        cached = cache.get(url, variant="html")
+        if cached and cached["text"]:
+            pages.append(cached["text"])
+    cache.close()
+    return pages
+
+
+def load_corpus(pattern):
+    pages = []
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append(f.read())
+    return pages
+
+
+def timed(func, pages, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            func(page)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LoginDetectionFinder page analysis on saved homepages")
+    parser.add_argument('--page-cache', default=DEFAULT_CACHE_PATH,
+                        help='SQLite кэш страниц ScrapingBee (по умолчанию cache/scrapingbee_pages.sqlite)')
+    parser.add_argument('--corpus', default=None, help='Glob с сохраненными .html страницами')
+    parser.add_argument('--limit', type=int, default=200, help='Максимум страниц')
+    parser.add_argument('--repeat', type=int, default=3, help='Количество повторов, берется лучшее время')
+    args = parser.parse_args()
+
+    pages = load_page_cache(args.page_cache)
+    if args.corpus:
+        pages.extend(load_corpus(args.corpus))
+    pages = pages[:args.limit]
+    if not pages:
+        print(f"❌ Нет страниц: кэш {args.page_cache}, corpus {args.corpus}")
+        return 1
+
+    # Прежняя реализация использует устаревший аргумент text= у find_all
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    mismatches = 0
+    for page in pages:
+        if analyze_login_page(page, parser="html.parser") != analyze_login_page_legacy(page):
+            mismatches += 1
+
+    total_chars = sum(len(page) for page in pages)
+    legacy = timed(analyze_login_page_legacy, pages, args.repeat)
+    single_pass = timed(lambda page: analyze_login_page(page, parser="html.parser"), pages, args.repeat)
+
+    print(f"📄 Страниц: {len(pages)} ({total_chars} символов)")
+    print(f"🐢 Прежняя реализация:             {legacy * 1000:.1f} ms")
+    print(f"🚀 Один проход (html.parser):      {single_pass * 1000:.1f} ms  (x{legacy / single_pass:.1f})")
+    if HTML_PARSER != "html.parser":
+        fast = timed(lambda page: analyze_login_page(page, parser=HTML_PARSER), pages, args.repeat)
+        print(f"🚀 Один проход ({HTML_PARSER}):             {fast * 1000:.1f} ms  (x{legacy / fast:.1f})")
+    print(f"{'✅' if not mismatches else '❌'} Расхождений результатов (html.parser): {mismatches}")
+    return 0 if not mismatches else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Пул процессов движка анализа критериев
+
+Бэкенд запускает анализ через CriteriaEngine.run() вместо `python main.py` на каждый анализ:
+
+- воркеры - отдельные процессы (spawn): падение или утечка памяти анализа не затрагивает бэкенд;
+  аварийное завершение воркера ломает весь пул (BrokenProcessPool) - ошибкой завершаются
+  все анализы, выполнявшиеся в нем, а следующие анализы получают новый пул
+- воркер один раз импортирует pandas/openai/модули анализа и разбирает файлы критериев,
+  следующие анализы в нем начинаются сразу
+- входной файл передается абсолютным путем из папки сессии - общая папка data/ не используется,
+  одновременные анализы не мешают друг другу
+
+- прогресс ProcessingStateManager воркера передается бэкенду через очередь процессов
+  (set_progress_callback) - бэкенд рассылает его подписчикам SSE/WebSocket без чтения файлов
+
+Модуль импортируется бэкендом как верхнеуровневый (у сервиса свой пакет src), поэтому
+пакет src сервиса импортируется только внутри воркера.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CRITERIA_PROCESSOR_PATH = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MAX_WORKERS = int(os.getenv("CRITERIA_ENGINE_WORKERS", "2"))
+# Не чаще одного события прогресса сессии за интервал (смена статуса отправляется всегда)
+PROGRESS_MIN_INTERVAL = 0.25
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def _use_service_package():
+    """Пакет src в процессе воркера - пакет criteria_processor, а не src корня проекта"""
+    if CRITERIA_PROCESSOR_PATH in sys.path:
+        sys.path.remove(CRITERIA_PROCESSOR_PATH)
+    sys.path.insert(0, CRITERIA_PROCESSOR_PATH)
+    loaded = sys.modules.get("src")
+    service_src = os.path.join(CRITERIA_PROCESSOR_PATH, "src")
+    if loaded is not None and not os.path.dirname(os.path.abspath(getattr(loaded, "__file__", "") or "")) == service_src:
+        # При повторном импорте главного модуля бэкенда в воркере мог загрузиться src проекта
+        for name in [name for name in sys.modules if name == "src" or name.startswith("src.")]:
+            del sys.modules[name]
+
+
+class _ProgressForwarder:
+    """
+    Слушатель прогресса в воркере: состояние сессии -> очередь процессов бэкенда.
+    Не чаще min_interval на сессию; пропущенное последнее состояние отправляется по таймеру.
+    """
+
+    def __init__(self, progress_queue, min_interval: float = PROGRESS_MIN_INTERVAL):
+        self.progress_queue = progress_queue
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._last: Dict[str, tuple] = {}
+        # session_id -> (сериализованное состояние, таймер его отправки)
+        self._pending: Dict[str, tuple] = {}
+
+    def __call__(self, session_id: str, state: Dict[str, Any]):
+        # Состояние сериализуется сразу: очередь отправляет данные из своего потока, а state продолжает меняться
+        payload = json.dumps(state, ensure_ascii=False, default=str)
+        status = state.get("status")
+        with self._lock:
+            now = time.monotonic()
+            last = self._last.get(session_id)
+            if last is not None and last[1] == status and now - last[0] < self.min_interval:
+                pending = self._pending.get(session_id)
+                if pending is not None:
+                    self._pending[session_id] = (payload, pending[1])
+                else:
+                    timer = threading.Timer(self.min_interval - (now - last[0]), self._flush, args=(session_id,))
+                    timer.daemon = True
+                    self._pending[session_id] = (payload, timer)
+                    timer.start()
+                return
+            pending = self._pending.pop(session_id, None)
+            if pending is not None:
+                pending[1].cancel()
+            self._send(session_id, payload, status, now)
+
+    def _flush(self, session_id: str):
+        with self._lock:
+            pending = self._pending.pop(session_id, None)
+            if pending is None:
+                return
+            status = self._last.get(session_id, (None, None))[1]
+            self._send(session_id, pending[0], status, time.monotonic())
+
+    def _send(self, session_id: str, payload: str, status, now: float):
+        self._last[session_id] = (now, status)
+        self.progress_queue.put_nowait((session_id, payload))
+
+
+def _init_worker(progress_queue=None):
+    """Инициализация воркера: окружение как у `python main.py` и прогрев модулей и критериев"""
+    _use_service_package()
+    os.chdir(CRITERIA_PROCESSOR_PATH)
+    os.environ.setdefault("PYTHONIOENCODING", "utf-8")
+
+    from src.utils.logging import setup_logging
+    setup_logging()
+
+    if progress_queue is not None:
+        from src.utils.state_manager import set_progress_listener
+        set_progress_listener(_ProgressForwarder(progress_queue))
+
+    from src.core.engine import warm_up
+    warm_up()
+
+
+def _run_job(options: Dict[str, Any]) -> Dict[str, Any]:
+    from src.core.engine import run_criteria_job
+    return run_criteria_job(**options)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class CriteriaEngine:
+    """Пул процессов, выполняющих анализы критериев (один анализ на воркер одновременно)"""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._mp_context = multiprocessing.get_context("spawn")
+        self._progress_queue = None
+        self._progress_thread: Optional[threading.Thread] = None
+        self._progress_callback: Optional[ProgressCallback] = None
+
+    def set_progress_callback(self, callback: Optional[ProgressCallback]):
+        """callback(session_id, состояние прогресса) вызывается из потока чтения очереди прогресса воркеров"""
+        self._progress_callback = callback
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._progress_queue is None:
+                self._progress_queue = self._mp_context.Queue()
+                self._progress_thread = threading.Thread(
+                    target=self._forward_progress, args=(self._progress_queue,),
+                    name="criteria-engine-progress", daemon=True
+                )
+                self._progress_thread.start()
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=self._mp_context,
+                    initializer=_init_worker,
+                    initargs=(self._progress_queue,)
+                )
+            return self._pool
+
+    def _forward_progress(self, progress_queue):
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                return
+            callback = self._progress_callback
+            if callback is None:
+                continue
+            session_id, payload = item
+            try:
+                callback(session_id, json.loads(payload))
+            except Exception as e:
+                logger.error(f"Criteria engine progress callback failed for {session_id}: {e}")
+
+    def _reset_pool(self, pool: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def warm_up(self):
+        """Запустить воркер заранее (импорт модулей и разбор критериев до первого анализа)"""
+        pool = self._get_pool()
+        try:
+            pid = await asyncio.get_running_loop().run_in_executor(pool, _ping)
+            logger.info(f"Criteria engine worker {pid} is ready")
+        except BrokenProcessPool as e:
+            logger.error(f"Criteria engine worker failed to start: {e}")
+            self._reset_pool(pool)
+
+    async def run(self, **options) -> Dict[str, Any]:
+        """
+        Выполнить анализ в воркере; параметры - как у src/core/engine.run_criteria_job
+
+        Returns:
+            {"status": "success", "companies": N} или {"status": "error", "error": "..."}
+        """
+        companies_file = options.get("companies_file")
+        if companies_file:
+            # Воркер работает в папке criteria_processor - относительный путь бэкенда там недействителен
+            options["companies_file"] = os.path.abspath(companies_file)
+
+        pool = self._get_pool()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, _run_job, options)
+        except BrokenProcessPool as e:
+            # Воркер аварийно завершился: пул сломан, и ошибкой завершаются все анализы, которые
+            # в нем выполнялись (не только анализ упавшего воркера). Заново они не запускаются -
+            # частично выполненный анализ мог уже записать результаты (например, в HubSpot).
+            # Следующие анализы получат новый пул
+            logger.error(f"Criteria engine pool broke during analysis {options.get('session_id')}: {e}")
+            self._reset_pool(pool)
+            return {"status": "error", "error": f"Criteria engine worker pool crashed (a worker died; all analyses running in it were stopped): {e}"}
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            progress_queue, self._progress_queue = self._progress_queue, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+        if progress_queue is not None:
+            progress_queue.put(None)
+
+
+_engine: Optional[CriteriaEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_criteria_engine() -> CriteriaEngine:
+    """Общий пул движка на процесс бэкенда"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = CriteriaEngine()
+        return _engine
@@ -89,6 +89,30 @@ def parse_arguments():
         help='Отключить Circuit Breaker (не рекомендуется)'
     )
     
+    parser.add_argument(
+        '--no-llm-cache',
+        action='store_true',
+        help='Отключить персистентный кэш ответов LLM (все запросы уйдут в OpenAI)'
+    )
+    
+    parser.add_argument(
+        '--no-serper-cache',
+        action='store_true',
+        help='Отключить кэш ответов Serper (одинаковые запросы все равно объединяются)'
+    )
+    
+    parser.add_argument(
+        '--no-page-cache',
+        action='store_true',
+        help='Отключить хранилище страниц ScrapingBee (все страницы скрапятся заново)'
+    )
+    
+    parser.add_argument(
+        '--thread-engine',
+        action='store_true',
+        help='Использовать потоковый движок (ThreadPoolExecutor) вместо единого asyncio движка'
+    )
+    
     parser.add_argument(
         '--selected-products',
         type=str,
@@ -136,6 +160,27 @@ def main():
             log_info("💡 Для возобновления используйте: --resume-session SESSION_ID")
             return
         
+        # Disable LLM response cache if requested
+        if args.no_llm_cache:
+            log_info("⚠️ LLM cache отключен по запросу")
+            from src.utils.config import LLM_CACHE_CONFIG
+            LLM_CACHE_CONFIG['enable_llm_cache'] = False
+        
+        if args.no_serper_cache:
+            log_info("⚠️ Serper cache отключен по запросу")
+            from src.utils.config import SERPER_CACHE_CONFIG
+            SERPER_CACHE_CONFIG['enable_serper_cache'] = False
+        
+        if args.no_page_cache:
+            log_info("⚠️ ScrapingBee page cache отключен по запросу")
+            from src.utils.config import SCRAPINGBEE_CACHE_CONFIG
+            SCRAPINGBEE_CACHE_CONFIG['enable_page_cache'] = False
+        
+        if args.thread_engine:
+            log_info("⚠️ Async engine отключен - используем потоковый движок")
+            from src.utils.config import ASYNC_ENGINE_CONFIG
+            ASYNC_ENGINE_CONFIG['enable_async_engine'] = False
+        
         # Handle resume session command
         if args.resume_session:
             log_info(f"🔄 Возобновление сессии: {args.resume_session}")
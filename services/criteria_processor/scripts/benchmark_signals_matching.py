@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк поиска Signals: скомпилированный SignalsMatcher против прежней реализации
+
+Корпус - сохраненные файлы search_data/*.md из папок сессий, ключевые слова - колонка
+Signals всех файлов критериев. Для каждой пары (страница, Signals) результаты обеих
+реализаций сравниваются, затем замеряется время.
+
+Запуск из services/criteria_processor:
+    python scripts/benchmark_signals_matching.py
+    python scripts/benchmark_signals_matching.py --corpus "output/*/search_data/*.md" --repeat 5
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import SMART_FILTERING_CONFIG, CRITERIA_DIR
+from src.utils.encoding_handler import read_csv_with_encoding
+from src.utils.signals_processor import extract_signals_keywords, find_signal_matches, _index_page
+
+
+def find_signal_matches_legacy(content, signals_keywords):
+    """Прежняя реализация: regex split, затем `in` для каждой пары keyword × sentence"""
+    if not content or not signals_keywords:
+        return []
+
+    matches = []
+    case_sensitive = SMART_FILTERING_CONFIG['case_sensitive_matching']
+    context_sentences = SMART_FILTERING_CONFIG['context_sentences_around_match']
+
+    sentences = re.split(r'[.!?]+', content)
+    sentences = [s.strip() for s in sentences if s.strip()]
+
+    for i, sentence in enumerate(sentences):
+        sentence_matches = []
+        search_text = sentence if case_sensitive else sentence.lower()
+
+        for keyword in signals_keywords:
+            search_keyword = keyword if case_sensitive else keyword.lower()
+            if search_keyword in search_text:
+                sentence_matches.append(keyword)
+
+        if sentence_matches:
+            start_idx = max(0, i - context_sentences)
+            end_idx = min(len(sentences), i + context_sentences + 1)
+            context = '. '.join(sentences[start_idx:end_idx])
+            matches.append({
+                'sentence_index': i,
+                'matched_keywords': sentence_matches,
+                'sentence': sentence,
+                'context': context,
+                'keyword_count': len(sentence_matches),
+                'sentence_length': len(sentence)
+            })
+
+    matches.sort(key=lambda x: (x['keyword_count'], x['sentence_length']), reverse=True)
+
+    # Как в prioritize_content: повторное разбиение каждого контекста
+    for match in matches:
+        len(re.split(r'[.!?]+', match['context']))
+    return matches
+
+
+def load_corpus(pattern):
+    pages = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append(f.read())
+    return pages
+
+
+def load_signals():
+    signals = []
+    for path in sorted(glob.glob(os.path.join(CRITERIA_DIR, "*.csv"))):
+        df, _ = read_csv_with_encoding(path)
+        if 'Signals' not in df.columns:
+            continue
+        for _, row in df.iterrows():
+            keywords = extract_signals_keywords(row)
+            if keywords and keywords not in signals:
+                signals.append(keywords)
+    return signals
+
+
+def strip_new_fields(matches):
+    return [{key: value for key, value in match.items() if key != 'context_sentence_count'} for match in matches]
+
+
+def timed(func, pages, signals, repeat):
+    best = None
+    for _ in range(repeat):
+        # Разбор страниц кэшируется между критериями, но не между повторами
+        _index_page.cache_clear()
+        start = time.perf_counter()
+        for page in pages:
+            for keywords in signals:
+                func(page, keywords)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Signals matching on saved search_data corpora")
+    parser.add_argument('--corpus', default=os.path.join("output", "*", "search_data", "*.md"),
+                        help='Glob с сохраненными страницами (по умолчанию output/*/search_data/*.md)')
+    parser.add_argument('--repeat', type=int, default=3, help='Количество повторов, берется лучшее время')
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    signals = load_signals()
+    if not pages or not signals:
+        print(f"❌ Нет данных: страниц {len(pages)}, списков Signals {len(signals)}")
+        return 1
+
+    mismatches = 0
+    for page in pages:
+        for keywords in signals:
+            if strip_new_fields(find_signal_matches(page, keywords)) != find_signal_matches_legacy(page, keywords):
+                mismatches += 1
+
+    total_chars = sum(len(page) for page in pages)
+    legacy = timed(find_signal_matches_legacy, pages, signals, args.repeat)
+    compiled = timed(find_signal_matches, pages, signals, args.repeat)
+
+    print(f"📄 Страниц: {len(pages)} ({total_chars} символов), списков Signals: {len(signals)}")
+    print(f"🐢 Прежняя реализация:  {legacy * 1000:.1f} ms")
+    print(f"🚀 SignalsMatcher:      {compiled * 1000:.1f} ms  (x{legacy / compiled:.1f})")
+    print(f"{'✅' if not mismatches else '❌'} Расхождений результатов: {mismatches}")
+    return 0 if not mismatches else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Единый asyncio движок для анализа критериев
+
+Вместо ThreadPoolExecutor с отдельным event loop на каждый вызов все компании,
+продукты и аудитории обрабатываются корутинами на ОДНОМ event loop:
+- один aiohttp session для Serper и ScrapingBee (src.external.async_resources)
+- один AsyncOpenAI клиент с общим пулом соединений (src.external.openai_pool)
+- лимиты одновременных запросов по провайдерам (ASYNC_ENGINE_CONFIG['provider_limits'])
+- граф критериев продукта (src.criteria.dag): квалификация открывает аудитории,
+  mandatory открывает NTH, решенные ветки отменяются
+
+Записи результатов собираются теми же функциями, что и в потоковом режиме
+(src.core.parallel_processor), поэтому выходные файлы идентичны.
+"""
+
+import asyncio
+
+from src.criteria.general import check_general_criteria_async, check_general_criteria_multi_async
+from src.criteria.qualification import check_qualification_questions_async
+from src.criteria.mandatory import check_mandatory_criteria_async
+from src.criteria.nth import check_nth_criteria_async
+from src.core.parallel_processor import (
+    criteria_company_info,
+    init_product_record,
+    general_failed_records,
+    record_qualification_results,
+    qualification_failed_records,
+    build_audience_record,
+    finalize_product_records,
+    product_error_record,
+    consolidate_company_results,
+    store_mandatory_details,
+    store_nth_details,
+    circuit_breaker_wait_seconds,
+    general_companies_and_chunks,
+    record_general_chunk_results,
+    log_company_stage_start,
+    handle_company_failure,
+    record_external_cache_stats,
+)
+from src.criteria.dag import get_product_dag, record_product_pruned, record_audiences_pruned, record_nth_pruned
+from src.external.async_resources import close_async_resources
+from src.utils.config import PROCESSING_CONFIG
+from src.utils.logging import log_info, log_error
+
+
+async def run_analysis_stages_async(companies_df, products, products_data, general_criteria,
+                                    session_id=None, use_deep_analysis=False,
+                                    max_concurrent_companies=12, state_manager=None):
+    """
+    Этап 1 (General) и Этап 2 (компании через все продукты) на одном event loop
+
+    Returns:
+        tuple: (general_status, all_results)
+    """
+    try:
+        log_info(f"\n🌐 Этап 1: Проверяем General критерии для ВСЕХ компаний...")
+        general_status = await run_general_criteria_stage_async(
+            companies_df, general_criteria, max_concurrent_companies, state_manager
+        )
+
+        all_results = await run_company_stage_async(
+            companies_df, products, products_data, general_status,
+            session_id, use_deep_analysis, max_concurrent_companies, state_manager
+        )
+        return general_status, all_results
+    finally:
+        await close_async_resources()
+
+
+async def run_general_criteria_stage_async(companies_df, general_criteria, max_concurrent_companies, state_manager=None):
+    """Async версия run_general_criteria_stage"""
+    companies, chunks = general_companies_and_chunks(companies_df)
+    log_info(f"🌐 General: {len(companies)} компаний, {len(chunks)} запросов, до {max_concurrent_companies} параллельно")
+
+    semaphore = asyncio.Semaphore(max_concurrent_companies)
+
+    async def check_chunk(chunk):
+        async with semaphore:
+            retry_after = circuit_breaker_wait_seconds()
+            if retry_after:
+                log_info(f"🔴 Circuit Breaker открыт - General проверка ждет {retry_after:.1f}s")
+                await asyncio.sleep(retry_after)
+
+            try:
+                if len(chunk) == 1:
+                    company_name, description = chunk[0]
+                    log_info(f"🌐 General для: {company_name}")
+                    temp_general_info = {}
+                    general_passed = await check_general_criteria_async(description, temp_general_info, general_criteria)
+                    return chunk, {company_name: (general_passed, temp_general_info)}
+                log_info(f"🌐 General для: {', '.join(name for name, _ in chunk)}")
+                return chunk, await check_general_criteria_multi_async(chunk, general_criteria)
+            except Exception as e:
+                log_error(f"❌ Ошибка проверки general критериев для {', '.join(name for name, _ in chunk)}: {e}")
+                return chunk, {company_name: (False, {}) for company_name, _ in chunk}
+
+    general_status = {}
+    completed = 0
+
+    for next_done in asyncio.as_completed([check_chunk(chunk) for chunk in chunks]):
+        chunk, chunk_results = await next_done
+        record_general_chunk_results(general_status, chunk_results)
+
+        completed += len(chunk)
+        if state_manager:
+            state_manager.save_progress(0, completed, stage="general_criteria")
+
+    return general_status
+
+
+async def run_company_stage_async(companies_df, products, products_data, general_status,
+                                  session_id, use_deep_analysis, max_concurrent_companies, state_manager=None):
+    """
+    Async версия run_company_stage: до max_concurrent_companies компаний одновременно,
+    продукты одной компании и аудитории одного продукта - тоже параллельно
+    """
+    all_results = []
+    log_company_stage_start(companies_df, products)
+
+    semaphore = asyncio.Semaphore(max_concurrent_companies)
+
+    async def process_company(company_row):
+        company_name = company_row.get("Company_Name", "Unknown")
+        async with semaphore:
+            try:
+                results = await process_single_company_all_products_async(
+                    company_row, products, products_data, general_status, session_id, use_deep_analysis
+                )
+                return company_name, results, None
+            except Exception as e:
+                return company_name, None, e
+
+    tasks = [asyncio.create_task(process_company(company_row)) for _, company_row in companies_df.iterrows()]
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            company_name, company_results, error = await next_done
+
+            if error is not None:
+                if handle_company_failure(company_name, error, state_manager):
+                    break  # Stop processing
+                continue
+
+            all_results.extend(company_results)
+            log_info(f"🎉 Компания {company_name} завершена: {len(company_results)} записей")
+
+            if state_manager:
+                record_external_cache_stats(state_manager)
+                state_manager.mark_company_completed(company_name, "ALL_PRODUCTS", success=True)
+                state_manager.save_partial_results(company_results)
+
+    except Exception as e:
+        log_error(f"❌ Критическая ошибка параллельной обработки: {e}")
+        if state_manager:
+            state_manager.record_circuit_breaker_event("critical_error", {
+                "error": str(e),
+                "stage": "parallel_processing"
+            })
+    finally:
+        # После срабатывания Circuit Breaker оставшиеся компании не обрабатываем
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    return all_results
+
+
+async def process_single_company_all_products_async(company_row, products, products_data, general_status, session_id, use_deep_analysis):
+    """Async версия process_single_company_all_products - продукты обрабатываются параллельно"""
+    company_data = company_row.to_dict()
+    company_name = company_data.get("Company_Name", "Unknown")
+
+    log_info(f"🏢 Обрабатываем компанию: {company_name} через ВСЕ продукты: {', '.join(products)}")
+
+    product_results = await asyncio.gather(*[
+        process_single_company_for_product_async(
+            company_data, product, products_data[product], general_status, session_id, use_deep_analysis
+        )
+        for product in products
+    ], return_exceptions=True)
+
+    results_by_product = dict(zip(products, product_results))
+    return [consolidate_company_results(company_data, products, results_by_product)]
+
+
+async def process_single_company_for_product_async(company_data, product, product_data, general_status, session_id, use_deep_analysis):
+    """Async версия process_single_company_for_product"""
+    company_name = company_data.get("Company_Name", "Unknown")
+    description = company_data.get("Description", "")
+
+    log_info(f"🔄 [{product}] Обрабатываем: {company_name}")
+
+    try:
+        record, product_results = init_product_record(company_data, product, general_status)
+        dag = get_product_dag(product, product_data)
+
+        if not product_results["general_status"]:
+            record_product_pruned(dag, company_data)
+            return general_failed_records(record, product_results, product, company_name)
+
+        qualification_questions = product_data["qualification_questions"]
+        temp_qualification_info = {}
+        if PROCESSING_CONFIG['use_general_desc_for_qualification']:
+            await check_qualification_questions_async(description, temp_qualification_info, qualification_questions)
+
+        qualified = record_qualification_results(product_results, qualification_questions, temp_qualification_info, product, company_name)
+        record_audiences_pruned(dag, product_results["qualified_audiences"], company_data)
+        if not qualified:
+            return qualification_failed_records(record, product_results, product, company_name)
+
+        # Аудитории независимы - проверяем параллельно, записи собираем в исходном порядке
+        audiences = product_results["qualified_audiences"]
+        audience_checks = await asyncio.gather(*[
+            check_audience_async(company_data, product, audience, product_data, session_id, use_deep_analysis)
+            for audience in audiences
+        ])
+
+        results_list = [
+            build_audience_record(
+                record, product_results, product, company_name, audience,
+                mandatory_passed, temp_mandatory_info, temp_nth_info
+            )
+            for audience, (mandatory_passed, temp_mandatory_info, temp_nth_info) in zip(audiences, audience_checks)
+        ]
+
+        return finalize_product_records(record, product_results, results_list)
+
+    except Exception as e:
+        log_error(f"❌ Ошибка обработки {company_name} для продукта {product}: {e}")
+        return [product_error_record(company_data, product, e)]
+
+
+async def check_audience_async(company_data, product, audience, product_data, session_id, use_deep_analysis):
+    """
+    Mandatory, затем NTH (только если mandatory пройдены) для одной аудитории
+
+    Returns:
+        tuple: (mandatory_passed, temp_mandatory_info, temp_nth_info или None)
+    """
+    company_name = company_data.get("Company_Name", "Unknown")
+    log_info(f"🎯 [{product}] {company_name} → {audience}")
+
+    mandatory_df = product_data["mandatory_df"]
+    temp_mandatory_info = criteria_company_info(company_data)
+    mandatory_passed = await check_mandatory_criteria_async(
+        temp_mandatory_info, audience, mandatory_df,
+        session_id=session_id, use_deep_analysis=use_deep_analysis
+    )
+    store_mandatory_details(temp_mandatory_info, audience, mandatory_df)
+
+    if not mandatory_passed:
+        record_nth_pruned(get_product_dag(product, product_data), audience, company_data)
+        return mandatory_passed, temp_mandatory_info, None
+
+    log_info(f"✅ [{product}] {company_name} mandatory пройдены для {audience}")
+    nth_df = product_data["nth_df"]
+    temp_nth_info = criteria_company_info(company_data)
+    await check_nth_criteria_async(
+        temp_nth_info, audience, nth_df,
+        session_id=session_id, use_deep_analysis=use_deep_analysis
+    )
+    store_nth_details(temp_nth_info, audience, nth_df)
+
+    return mandatory_passed, temp_mandatory_info, temp_nth_info
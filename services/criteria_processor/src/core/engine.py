@@ -0,0 +1,96 @@
+"""
+Встроенный движок анализа критериев
+
+run_criteria_job() выполняет один анализ в текущем процессе - то же, что main.py с аргументами
+--file/--all-files, --session-id, --parallel и т.д., но без запуска нового интерпретатора.
+Бэкенд вызывает его в воркерах пула процессов (criteria_engine.py в корне сервиса): модули,
+клиенты и разобранные файлы критериев воркера переиспользуются между анализами.
+"""
+
+from src.utils.config import CIRCUIT_BREAKER_CONFIG, validate_config
+from src.utils.logging import log_info, log_error
+from src.data.loaders import load_all_criteria_files
+
+
+def warm_up():
+    """Импортировать модули анализа и разобрать файлы критериев заранее (инициализация воркера)"""
+    from src.core import parallel_processor, processor  # noqa: F401
+    try:
+        criteria_df = load_all_criteria_files()
+        log_info(f"🔥 Воркер движка критериев готов: {len(criteria_df)} критериев в памяти")
+    except Exception as e:
+        # Ошибка в файлах критериев будет показана при запуске анализа
+        log_error(f"⚠️ Не удалось заранее загрузить критерии: {e}")
+
+
+def products_from_criteria_files(selected_criteria_files):
+    """Продукты выбранных файлов критериев (по разобранным критериям, без повторного чтения CSV)"""
+    criteria_df = load_all_criteria_files()
+    selected_df = criteria_df[criteria_df['Criteria File'].isin(selected_criteria_files)]
+    products = [str(p).strip() for p in selected_df['Product'].dropna().unique() if str(p).strip()]
+    log_info(f"📁 Продукты выбранных файлов критериев {selected_criteria_files}: {products}")
+    return products
+
+
+def run_criteria_job(companies_file=None, load_all_companies=False, session_id=None, use_deep_analysis=False,
+                     use_parallel=True, max_concurrent=12, selected_products=None, selected_criteria_files=None,
+                     write_to_hubspot_criteria=False, disable_circuit_breaker=False):
+    """
+    Выполнить анализ критериев
+
+    Returns:
+        {"status": "success", "companies": N} или {"status": "error", "error": "..."}
+    """
+    # Флаг disable_circuit_breaker действует только на этот анализ: значение восстанавливается
+    # в finally (воркер выполняет один анализ одновременно)
+    circuit_breaker_enabled = CIRCUIT_BREAKER_CONFIG['enable_circuit_breaker']
+    try:
+        from src.core.processor import run_analysis
+        from src.core.parallel_processor import run_parallel_analysis
+
+        if disable_circuit_breaker:
+            CIRCUIT_BREAKER_CONFIG['enable_circuit_breaker'] = False
+            log_info("⚠️ Circuit Breaker отключен по запросу")
+
+        if load_all_companies:
+            log_info("РЕЖИМ: Загрузка ВСЕХ файлов компаний из папки data/")
+        else:
+            log_info(f"РЕЖИМ: Загрузка конкретного файла: {companies_file}")
+
+        # Выбранные файлы критериев имеют приоритет над списком продуктов
+        if selected_criteria_files:
+            selected_products = products_from_criteria_files(selected_criteria_files) or None
+        if selected_products:
+            log_info(f"🎯 Будут обрабатываться только выбранные продукты: {selected_products}")
+
+        validate_config(require_data_files=load_all_companies)
+
+        log_info(f"🚀 Анализ критериев {session_id}: parallel={use_parallel}, max_concurrent={max_concurrent}, "
+                 f"write_to_hubspot_criteria={write_to_hubspot_criteria}")
+        if use_parallel:
+            results = run_parallel_analysis(
+                companies_file=companies_file,
+                load_all_companies=load_all_companies,
+                session_id=session_id,
+                use_deep_analysis=use_deep_analysis,
+                max_concurrent_companies=max_concurrent,
+                selected_products=selected_products,
+                write_to_hubspot_criteria=write_to_hubspot_criteria
+            )
+        else:
+            results = run_analysis(
+                companies_file=companies_file,
+                load_all_companies=load_all_companies,
+                session_id=session_id,
+                use_deep_analysis=use_deep_analysis,
+                selected_products=selected_products
+            )
+
+        log_info(f"Анализ завершен успешно! Обработано компаний: {len(results)}")
+        return {"status": "success", "companies": len(results)}
+
+    except Exception as e:
+        log_error(f"Критическая ошибка: {e}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        CIRCUIT_BREAKER_CONFIG['enable_circuit_breaker'] = circuit_breaker_enabled
@@ -5,6 +5,7 @@
 
 import asyncio
 import sys
+import time
 from pathlib import Path
 from typing import List, Dict, Any
 import pandas as pd
@@ -15,16 +16,25 @@ CRITERIA_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(CRITERIA_ROOT))
 
 from src.data.loaders import load_data
-from src.criteria.general import check_general_criteria
+from src.criteria.general import check_general_criteria, check_general_criteria_multi
 from src.criteria.qualification import check_qualification_questions
 from src.criteria.mandatory import check_mandatory_criteria
 from src.criteria.nth import check_nth_criteria
 from src.formatters.json_format import create_structured_output
 from src.data.savers import save_results
 from src.utils.logging import log_info, log_error
-from src.utils.config import PROCESSING_CONFIG, ASYNC_GPT_CONFIG, CIRCUIT_BREAKER_CONFIG
+from src.utils.config import PROCESSING_CONFIG, ASYNC_GPT_CONFIG, CIRCUIT_BREAKER_CONFIG, ASYNC_ENGINE_CONFIG
 from src.utils.state_manager import ProcessingStateManager
 from src.data.search_data_saver import initialize_search_data_saver, finalize_search_data_saving
+from src.external.openai_pool import configure_openai_pool
+from src.external.llm_cache import get_llm_cache_stats, reset_llm_cache_stats
+from src.external.shared_serper import get_serper_cache_stats
+from src.external.page_store import get_page_cache_stats
+from src.utils.token_budget import get_token_usage_stats, reset_token_usage_stats, log_token_usage_summary
+from src.criteria.dag import (
+    compile_products_dags, get_product_dag, reset_pruning_stats, get_pruning_stats, log_pruning_summary,
+    record_product_pruned, record_audiences_pruned, record_nth_pruned
+)
 
 # Import async components
 from src.llm.async_gpt_analyzer import run_async_gpt_analysis_sync
@@ -36,7 +46,7 @@ def process_single_company_for_product(args):
     Обрабатывает одну компанию для одного продукта.
     Эта функция может выполняться параллельно для нескольких компаний.
     """
-    company_row, product, product_data, general_status, session_id, use_deep_analysis = args
+    company_row, product, product_data, general_status, session_id, use_deep_analysis, state_manager = args
     
     company_data = company_row.to_dict()
     company_name = company_data.get("Company_Name", "Unknown")
@@ -45,43 +55,13 @@ def process_single_company_for_product(args):
     log_info(f"🔄 [{product}] Обрабатываем: {company_name}")
     
     try:
-        # Create SEPARATE record for this company-product combination
-        record = {
-            **company_data,  # Исходные данные компании
-            "Product": product,  # Указываем для какого продукта эта запись
-            "All_Results": {},  # JSON с ВСЕМИ результатами
-            "Qualified_Products": "NOT QUALIFIED"  # По умолчанию негативный результат
-        }
-        
-        # Initialize results for this product
-        general_passed = general_status.get(company_name, False)
-        
-        # Get detailed general criteria results if available
-        general_detailed_info = general_status.get(f"{company_name}_detailed", {})
-        general_detailed_results = general_detailed_info.get("General_Detailed_Results", [])
-        general_passed_count = general_detailed_info.get("General_Passed_Count", 0)
-        general_total_count = general_detailed_info.get("General_Total_Count", 0)
-        
-        product_results = {
-            "product": product,
-            "general_status": general_passed,
-            "general_criteria": {
-                "passed": general_passed,
-                "passed_count": general_passed_count,
-                "total_count": general_total_count,
-                "detailed_criteria": general_detailed_results
-            },
-            "qualification_results": {},
-            "qualified_audiences": [],
-            "detailed_results": {}
-        }
+        record, product_results = init_product_record(company_data, product, general_status)
+        dag = get_product_dag(product, product_data)
         
         # CRITICAL: If general criteria failed, stop processing immediately
-        if not general_passed:
-            log_info(f"❌ [{product}] {company_name} НЕ ПРОШЛА general критерии - ПРЕРЫВАЕМ анализ")
-            record["Qualified_Products"] = "NOT QUALIFIED - Failed General Criteria"
-            record["All_Results"] = product_results
-            return [record]
+        if not product_results["general_status"]:
+            record_product_pruned(dag, company_data)
+            return general_failed_records(record, product_results, product, company_name)
         
         # Check Qualification Questions for this product
         qualification_questions = product_data["qualification_questions"]
@@ -89,21 +69,11 @@ def process_single_company_for_product(args):
         if PROCESSING_CONFIG['use_general_desc_for_qualification']:
             check_qualification_questions(description, temp_qualification_info, qualification_questions)
         
-        # Record qualification results for ALL audiences
-        for audience in qualification_questions.keys():
-            qualification_result = temp_qualification_info.get(f"Qualification_{audience}", "No")
-            product_results["qualification_results"][audience] = qualification_result
-            
-            if qualification_result == "Yes":
-                product_results["qualified_audiences"].append(audience)
-                log_info(f"✅ [{product}] {company_name} квалифицирована для: {audience}")
-        
         # If no qualified audiences, record this as NOT QUALIFIED (failed qualification)
-        if not product_results["qualified_audiences"]:
-            log_info(f"❌ [{product}] {company_name} не квалифицирована - НЕ ДОШЛА до анализа критериев")
-            record["Qualified_Products"] = "NOT QUALIFIED - Failed Qualification Questions"
-            record["All_Results"] = product_results
-            return [record]
+        qualified = record_qualification_results(product_results, qualification_questions, temp_qualification_info, product, company_name)
+        record_audiences_pruned(dag, product_results["qualified_audiences"], company_data)
+        if not qualified:
+            return qualification_failed_records(record, product_results, product, company_name)
         
         # Process each qualified audience with criteria batching
         results_list = []
@@ -111,149 +81,296 @@ def process_single_company_for_product(args):
         for audience in product_results["qualified_audiences"]:
             log_info(f"🎯 [{product}] {company_name} → {audience}")
             
-            # Initialize detailed results for this audience
-            audience_results = {
-                "audience": audience,
-                "qualification_status": "Passed",
-                "mandatory_status": "Not Started",
-                "mandatory_criteria": [],
-                "nth_results": {},
-                "final_status": "Failed"
-            }
-            
             # Check Mandatory Criteria with batching
-            temp_mandatory_info = {
-                "Company_Name": company_data.get("Company_Name"),
-                "Official_Website": company_data.get("Official_Website"),
-                "Description": description
-            }
-            
+            temp_mandatory_info = criteria_company_info(company_data)
             mandatory_passed = check_mandatory_criteria_batch(
                 temp_mandatory_info, audience, product_data["mandatory_df"], 
-                session_id=session_id, use_deep_analysis=use_deep_analysis
+                session_id=session_id, use_deep_analysis=use_deep_analysis, state_manager=state_manager
             )
             
-            # Get detailed mandatory results - они сохраняются в temp_mandatory_info функцией check_mandatory_criteria_batch
-            mandatory_detailed = temp_mandatory_info.get(f"Mandatory_Detailed_{audience}", [])
-            audience_results["mandatory_criteria"] = mandatory_detailed
-            
+            # Check NTH Criteria with batching - только если mandatory пройдены
+            temp_nth_info = None
             if not mandatory_passed:
-                log_info(f"❌ [{product}] {company_name} mandatory НЕ пройдены для {audience} - НЕ ДОШЛА до NTH")
-                audience_results["mandatory_status"] = "Failed"
-                audience_results["final_status"] = "Failed Mandatory"
-                product_results["detailed_results"][audience] = audience_results
-                
-                # Create detailed NOT QUALIFIED record for failed mandatory
-                failed_mandatory_record = record.copy()
-                
-                # Формируем детальный текст с иконками
-                details = format_mandatory_details_with_icons(mandatory_detailed)
-                text_parts = [f"{audience}:"]
-                if details:
-                    text_parts.extend(details)
-                qualified_text = "\n".join(text_parts)
-                
-                failed_mandatory_record["Qualified_Products"] = qualified_text
-                failed_mandatory_record["All_Results"] = product_results
-                results_list.append(failed_mandatory_record)
-                continue
-            
-            log_info(f"✅ [{product}] {company_name} mandatory пройдены для {audience}")
-            audience_results["mandatory_status"] = "Passed"
-            
-            # Check NTH Criteria with batching
-            temp_nth_info = {
-                "Company_Name": company_data.get("Company_Name"),
-                "Official_Website": company_data.get("Official_Website"),
-                "Description": description
-            }
-            
-            check_nth_criteria_batch(
-                temp_nth_info, audience, product_data["nth_df"], 
-                session_id=session_id, use_deep_analysis=use_deep_analysis
-            )
-            
-            # Record NTH results - они сохраняются в temp_nth_info функцией check_nth_criteria_batch
-            nth_score = temp_nth_info.get(f"NTH_Score_{audience}", 0)
-            nth_total = temp_nth_info.get(f"NTH_Total_{audience}", 0)
-            nth_passed = temp_nth_info.get(f"NTH_Passed_{audience}", 0)
-            nth_nd = temp_nth_info.get(f"NTH_ND_{audience}", 0)
-            nth_detailed = temp_nth_info.get(f"NTH_Detailed_{audience}", [])
-            
-            # Calculate pass_rate safely
-            if nth_total > 0:
-                pass_rate = round(nth_passed / nth_total, 3)
-                # Ensure valid float range
-                if not isinstance(pass_rate, (int, float)) or not (-1e308 <= pass_rate <= 1e308):
-                    pass_rate = 0.0
+                record_nth_pruned(dag, audience, company_data)
             else:
-                pass_rate = 0.0
-            
-            audience_results["nth_results"] = {
-                "score": nth_score,
-                "total_criteria": nth_total,
-                "passed_criteria": nth_passed,
-                "nd_criteria": nth_nd,
-                "pass_rate": pass_rate,
-                "detailed_criteria": nth_detailed
-            }
-            
-            # ВСЕГДА добавляем detailed_results для каждой проверенной аудитории
-            product_results["detailed_results"][audience] = audience_results
+                log_info(f"✅ [{product}] {company_name} mandatory пройдены для {audience}")
+                temp_nth_info = criteria_company_info(company_data)
+                check_nth_criteria_batch(
+                    temp_nth_info, audience, product_data["nth_df"], 
+                    session_id=session_id, use_deep_analysis=use_deep_analysis, state_manager=state_manager
+                )
             
-            # ИСПРАВЛЕНИЕ ЛОГИКИ: если компания дошла до NTH, сохраняем результаты ВСЕГДА
-            # независимо от счета (даже если nth_score = 0)
-            
-            if nth_score > 0:
-                # SUCCESS! This is a QUALIFIED result with positive score
-                audience_results["final_status"] = "Qualified"
-                status_text = "QUALIFIED"
-                log_message = f"🎉 [{product}] {company_name} QUALIFIED для {audience} (Score: {nth_score:.3f})"
-            else:
-                # This is also QUALIFIED (passed qualification/mandatory) but with 0 NTH score
-                audience_results["final_status"] = "Qualified" 
-                status_text = "QUALIFIED"
-                log_message = f"✅ [{product}] {company_name} QUALIFIED для {audience} (Score: {nth_score:.3f}) - прошла все этапы"
-            
-            # Create readable text format for ALL completed NTH analyses
-            result_text_parts = [
-                f"{status_text}: {audience}",
-                f"NTH Score: {nth_score:.3f}",
-                f"Total NTH Criteria: {nth_total}",
-                f"Passed: {nth_passed}",
-                f"ND (No Data): {nth_nd}"
-            ]
-            
-            result_text = "\n".join(result_text_parts)
-            
-            # Create a copy of the record for this completed analysis
-            result_record = record.copy()
-            result_record["Qualified_Products"] = result_text
-            result_record["All_Results"] = product_results
-            results_list.append(result_record)
-            
-            log_info(log_message)
-        
-        # If no results at all (no audiences analyzed), return the base record
-        if not results_list:
-            record["All_Results"] = product_results
-            record["Qualified_Products"] = "NO AUDIENCES ANALYZED"
-            results_list.append(record)
-        
-        return results_list
+            results_list.append(build_audience_record(
+                record, product_results, product, company_name, audience,
+                mandatory_passed, temp_mandatory_info, temp_nth_info
+            ))
+        
+        return finalize_product_records(record, product_results, results_list)
         
     except Exception as e:
         log_error(f"❌ Ошибка обработки {company_name} для продукта {product}: {e}")
-        error_record = {
-            **company_data,
-            "Product": product,
-            "Qualified_Products": f"ERROR: {str(e)}",
-            "All_Results": {"error": str(e)}
-        }
-        return [error_record]
+        return [product_error_record(company_data, product, e)]
+
+
+def criteria_company_info(company_data):
+    """Минимальный company_info для проверки mandatory/NTH критериев одной аудитории"""
+    return {
+        "Company_Name": company_data.get("Company_Name"),
+        "Official_Website": company_data.get("Official_Website"),
+        "Description": company_data.get("Description", "")
+    }
 
 
-def check_mandatory_criteria_batch(company_info, audience, mandatory_df, session_id=None, use_deep_analysis=False):
+def init_product_record(company_data, product, general_status):
+    """Базовая запись компания+продукт и заготовка All_Results с general результатами"""
+    company_name = company_data.get("Company_Name", "Unknown")
+    
+    # Create SEPARATE record for this company-product combination
+    record = {
+        **company_data,  # Исходные данные компании
+        "Product": product,  # Указываем для какого продукта эта запись
+        "All_Results": {},  # JSON с ВСЕМИ результатами
+        "Qualified_Products": "NOT QUALIFIED"  # По умолчанию негативный результат
+    }
+    
+    # Initialize results for this product
+    general_passed = general_status.get(company_name, False)
+    
+    # Get detailed general criteria results if available
+    general_detailed_info = general_status.get(f"{company_name}_detailed", {})
+    general_detailed_results = general_detailed_info.get("General_Detailed_Results", [])
+    general_passed_count = general_detailed_info.get("General_Passed_Count", 0)
+    general_total_count = general_detailed_info.get("General_Total_Count", 0)
+    
+    product_results = {
+        "product": product,
+        "general_status": general_passed,
+        "general_criteria": {
+            "passed": general_passed,
+            "passed_count": general_passed_count,
+            "total_count": general_total_count,
+            "detailed_criteria": general_detailed_results
+        },
+        "qualification_results": {},
+        "qualified_audiences": [],
+        "detailed_results": {}
+    }
+    return record, product_results
+
+
+def general_failed_records(record, product_results, product, company_name):
+    log_info(f"❌ [{product}] {company_name} НЕ ПРОШЛА general критерии - ПРЕРЫВАЕМ анализ")
+    record["Qualified_Products"] = "NOT QUALIFIED - Failed General Criteria"
+    record["All_Results"] = product_results
+    return [record]
+
+
+def record_qualification_results(product_results, qualification_questions, temp_qualification_info, product, company_name):
+    """Записывает квалификацию по ВСЕМ аудиториям; возвращает True если есть квалифицированные"""
+    for audience in qualification_questions.keys():
+        qualification_result = temp_qualification_info.get(f"Qualification_{audience}", "No")
+        product_results["qualification_results"][audience] = qualification_result
+        
+        if qualification_result == "Yes":
+            product_results["qualified_audiences"].append(audience)
+            log_info(f"✅ [{product}] {company_name} квалифицирована для: {audience}")
+    
+    return bool(product_results["qualified_audiences"])
+
+
+def qualification_failed_records(record, product_results, product, company_name):
+    log_info(f"❌ [{product}] {company_name} не квалифицирована - НЕ ДОШЛА до анализа критериев")
+    record["Qualified_Products"] = "NOT QUALIFIED - Failed Qualification Questions"
+    record["All_Results"] = product_results
+    return [record]
+
+
+def build_audience_record(record, product_results, product, company_name, audience, mandatory_passed, temp_mandatory_info, temp_nth_info):
+    """
+    Собирает запись по одной аудитории из результатов mandatory/NTH проверок
+    и добавляет detailed_results аудитории в product_results.
+    temp_nth_info=None если mandatory не пройдены.
+    """
+    # Initialize detailed results for this audience
+    audience_results = {
+        "audience": audience,
+        "qualification_status": "Passed",
+        "mandatory_status": "Not Started",
+        "mandatory_criteria": [],
+        "nth_results": {},
+        "final_status": "Failed"
+    }
+    
+    # Get detailed mandatory results - они сохраняются в temp_mandatory_info функцией check_mandatory_criteria_batch
+    mandatory_detailed = temp_mandatory_info.get(f"Mandatory_Detailed_{audience}", [])
+    audience_results["mandatory_criteria"] = mandatory_detailed
+    
+    if not mandatory_passed:
+        log_info(f"❌ [{product}] {company_name} mandatory НЕ пройдены для {audience} - НЕ ДОШЛА до NTH")
+        audience_results["mandatory_status"] = "Failed"
+        audience_results["final_status"] = "Failed Mandatory"
+        product_results["detailed_results"][audience] = audience_results
+        
+        # Create detailed NOT QUALIFIED record for failed mandatory
+        failed_mandatory_record = record.copy()
+        
+        # Формируем детальный текст с иконками
+        details = format_mandatory_details_with_icons(mandatory_detailed)
+        text_parts = [f"{audience}:"]
+        if details:
+            text_parts.extend(details)
+        qualified_text = "\n".join(text_parts)
+        
+        failed_mandatory_record["Qualified_Products"] = qualified_text
+        failed_mandatory_record["All_Results"] = product_results
+        return failed_mandatory_record
+    
+    audience_results["mandatory_status"] = "Passed"
+    
+    # Record NTH results - они сохраняются в temp_nth_info функцией check_nth_criteria_batch
+    nth_score = temp_nth_info.get(f"NTH_Score_{audience}", 0)
+    nth_total = temp_nth_info.get(f"NTH_Total_{audience}", 0)
+    nth_passed = temp_nth_info.get(f"NTH_Passed_{audience}", 0)
+    nth_nd = temp_nth_info.get(f"NTH_ND_{audience}", 0)
+    nth_detailed = temp_nth_info.get(f"NTH_Detailed_{audience}", [])
+    
+    # Calculate pass_rate safely
+    if nth_total > 0:
+        pass_rate = round(nth_passed / nth_total, 3)
+        # Ensure valid float range
+        if not isinstance(pass_rate, (int, float)) or not (-1e308 <= pass_rate <= 1e308):
+            pass_rate = 0.0
+    else:
+        pass_rate = 0.0
+    
+    audience_results["nth_results"] = {
+        "score": nth_score,
+        "total_criteria": nth_total,
+        "passed_criteria": nth_passed,
+        "nd_criteria": nth_nd,
+        "pass_rate": pass_rate,
+        "detailed_criteria": nth_detailed
+    }
+    
+    # ВСЕГДА добавляем detailed_results для каждой проверенной аудитории
+    product_results["detailed_results"][audience] = audience_results
+    
+    # ИСПРАВЛЕНИЕ ЛОГИКИ: если компания дошла до NTH, сохраняем результаты ВСЕГДА
+    # независимо от счета (даже если nth_score = 0)
+    
+    if nth_score > 0:
+        # SUCCESS! This is a QUALIFIED result with positive score
+        audience_results["final_status"] = "Qualified"
+        status_text = "QUALIFIED"
+        log_message = f"🎉 [{product}] {company_name} QUALIFIED для {audience} (Score: {nth_score:.3f})"
+    else:
+        # This is also QUALIFIED (passed qualification/mandatory) but with 0 NTH score
+        audience_results["final_status"] = "Qualified" 
+        status_text = "QUALIFIED"
+        log_message = f"✅ [{product}] {company_name} QUALIFIED для {audience} (Score: {nth_score:.3f}) - прошла все этапы"
+    
+    # Create readable text format for ALL completed NTH analyses
+    result_text_parts = [
+        f"{status_text}: {audience}",
+        f"NTH Score: {nth_score:.3f}",
+        f"Total NTH Criteria: {nth_total}",
+        f"Passed: {nth_passed}",
+        f"ND (No Data): {nth_nd}"
+    ]
+    
+    result_text = "\n".join(result_text_parts)
+    
+    # Create a copy of the record for this completed analysis
+    result_record = record.copy()
+    result_record["Qualified_Products"] = result_text
+    result_record["All_Results"] = product_results
+    
+    log_info(log_message)
+    return result_record
+
+
+def finalize_product_records(record, product_results, results_list):
+    # If no results at all (no audiences analyzed), return the base record
+    if not results_list:
+        record["All_Results"] = product_results
+        record["Qualified_Products"] = "NO AUDIENCES ANALYZED"
+        results_list.append(record)
+    
+    return results_list
+
+
+def product_error_record(company_data, product, error):
+    return {
+        **company_data,
+        "Product": product,
+        "Qualified_Products": f"ERROR: {str(error)}",
+        "All_Results": {"error": str(error)}
+    }
+
+
+def consolidate_company_results(company_data, products, results_by_product):
+    """
+    Объединяет результаты компании по всем продуктам в ОДНУ запись.
+    
+    Args:
+        results_by_product: {product: список записей process_single_company_for_product или Exception}
+    """
+    company_name = company_data.get("Company_Name", "Unknown")
+    
+    # Create ONE consolidated record for this company
+    consolidated_record = {
+        **company_data,  # Базовые данные компании
+        "All_Results": {},  # JSON со ВСЕМИ продуктами и результатами
+        "Qualified_Products": ""  # Текстовые результаты по всем продуктам
+    }
+    
+    all_products_results = {}
+    qualified_products_text = []
+    
+    for product in products:
+        product_results = results_by_product.get(product)
+        
+        if isinstance(product_results, Exception):
+            log_error(f"  ❌ Ошибка обработки {company_name} для продукта {product}: {product_results}")
+            all_products_results[product] = {"error": str(product_results)}
+            qualified_products_text.append(f"{product.upper()}\nERROR: {str(product_results)}")
+            continue
+        
+        # Extract the product results from the returned list
+        if product_results and len(product_results) > 0:
+            # ИСПРАВЛЕНИЕ: Объединяем результаты ВСЕХ аудиторий для этого продукта
+            product_all_results = None
+            all_qualified_texts = []
+            
+            for product_result in product_results:
+                # Берем All_Results из любого результата (они одинаковые для продукта)
+                if product_all_results is None:
+                    product_all_results = product_result.get("All_Results", {})
+                
+                # Собираем текст квалификации от каждой аудитории
+                product_qualified_text = product_result.get("Qualified_Products", "")
+                if product_qualified_text and product_qualified_text != "NOT QUALIFIED":
+                    all_qualified_texts.append(product_qualified_text)
+            
+            # Store results for this product
+            all_products_results[product] = product_all_results or {}
+            
+            # Объединяем все квалификации для этого продукта
+            if all_qualified_texts:
+                combined_qualified_text = "\n\n".join(all_qualified_texts)
+                qualified_products_text.append(f"{product.upper()}\n{combined_qualified_text}")
+            else:
+                qualified_products_text.append(f"{product.upper()}\nNOT QUALIFIED")
+    
+    # Consolidate all results
+    consolidated_record["All_Results"] = all_products_results
+    consolidated_record["Qualified_Products"] = "\n\n".join(qualified_products_text) if qualified_products_text else "NOT QUALIFIED"
+    
+    log_info(f"✅ Завершена обработка компании {company_name}: ОДНА консолидированная запись с {len(products)} продуктами")
+    return consolidated_record
+
+
+def check_mandatory_criteria_batch(company_info, audience, mandatory_df, session_id=None, use_deep_analysis=False, state_manager=None):
     """Асинхронная проверка mandatory критериев с пакетной обработкой"""
     # Check for Circuit Breaker exceptions
     if CIRCUIT_BREAKER_CONFIG['enable_circuit_breaker']:
@@ -264,15 +381,6 @@ def check_mandatory_criteria_batch(company_info, audience, mandatory_df, session
             log_error(f"🔴 Circuit Breaker блокирует mandatory критерии для {audience}: {e}")
             return False  # Fail mandatory when circuit is open
     
-    # Получаем state_manager если доступен
-    state_manager = None
-    if session_id:
-        try:
-            from src.utils.state_manager import ProcessingStateManager
-            state_manager = ProcessingStateManager(session_id)
-        except Exception as e:
-            log_error(f"⚠️ Не удалось получить StateManager: {e}")
-    
     if ASYNC_GPT_CONFIG['enable_async_gpt'] and not mandatory_df.empty:
         log_info(f"🤖 Using async GPT for mandatory criteria: {audience}")
         try:
@@ -359,59 +467,17 @@ def check_mandatory_criteria_batch(company_info, audience, mandatory_df, session
             if ASYNC_GPT_CONFIG['fallback_to_sync']:
                 log_info("🔄 Falling back to sync mandatory analysis...")
                 sync_result = check_mandatory_criteria(company_info, audience, mandatory_df, session_id, use_deep_analysis)
-                
-                # Create detailed results from sync function results
-                audience_mandatory_df = mandatory_df[mandatory_df['Target Audience'] == audience].copy()
-                detailed_mandatory_results = []
-                
-                for _, criterion_row in audience_mandatory_df.iterrows():
-                    crit_text = criterion_row.get("Criteria", "Unknown")
-                    # Try to get result from sync function
-                    sync_key = f"Mandatory_{audience}_{crit_text}"
-                    sync_value = company_info.get(sync_key, "Unknown")
-                    
-                    criterion_info = {
-                        "criteria_text": crit_text,
-                        "result": "Pass" if sync_value == "Passed" else "Fail" if sync_value == "Not Passed" else "ND" if sync_value == "ND" else "Unknown"
-                    }
-                    
-                    # Убираем отслеживание individual критериев
-                    
-                    detailed_mandatory_results.append(criterion_info)
-                
-                # Store detailed results
-                company_info[f"Mandatory_Detailed_{audience}"] = detailed_mandatory_results
+                store_mandatory_details(company_info, audience, mandatory_df)
                 return sync_result
             return False
     else:
         # Use original sync function
         sync_result = check_mandatory_criteria(company_info, audience, mandatory_df, session_id, use_deep_analysis)
-        
-        # Create detailed results from sync function results
-        audience_mandatory_df = mandatory_df[mandatory_df['Target Audience'] == audience].copy()
-        detailed_mandatory_results = []
-        
-        for _, criterion_row in audience_mandatory_df.iterrows():
-            crit_text = criterion_row.get("Criteria", "Unknown")
-            # Try to get result from sync function
-            sync_key = f"Mandatory_{audience}_{crit_text}"
-            sync_value = company_info.get(sync_key, "Unknown")
-            
-            criterion_info = {
-                "criteria_text": crit_text,
-                "result": "Pass" if sync_value == "Passed" else "Fail" if sync_value == "Not Passed" else "ND" if sync_value == "ND" else "Unknown"
-            }
-            
-            # Убираем отслеживание individual критериев
-            
-            detailed_mandatory_results.append(criterion_info)
-        
-        # Store detailed results
-        company_info[f"Mandatory_Detailed_{audience}"] = detailed_mandatory_results
+        store_mandatory_details(company_info, audience, mandatory_df)
         return sync_result
 
 
-def check_nth_criteria_batch(company_info, audience, nth_df, session_id=None, use_deep_analysis=False):
+def check_nth_criteria_batch(company_info, audience, nth_df, session_id=None, use_deep_analysis=False, state_manager=None):
     """Асинхронная проверка NTH критериев с пакетной обработкой"""
     # Check for Circuit Breaker exceptions  
     if CIRCUIT_BREAKER_CONFIG['enable_circuit_breaker']:
@@ -427,15 +493,6 @@ def check_nth_criteria_batch(company_info, audience, nth_df, session_id=None, us
             company_info[f"NTH_ND_{audience}"] = 0
             return
     
-    # Получаем state_manager если доступен
-    state_manager = None
-    if session_id:
-        try:
-            from src.utils.state_manager import ProcessingStateManager
-            state_manager = ProcessingStateManager(session_id)
-        except Exception as e:
-            log_error(f"⚠️ Не удалось получить StateManager: {e}")
-    
     if ASYNC_GPT_CONFIG['enable_async_gpt'] and not nth_df.empty:
         log_info(f"🤖 Using async GPT for NTH criteria: {audience}")
         try:
@@ -540,65 +597,250 @@ def check_nth_criteria_batch(company_info, audience, nth_df, session_id=None, us
             if ASYNC_GPT_CONFIG['fallback_to_sync']:
                 log_info("🔄 Falling back to sync NTH analysis...")
                 check_nth_criteria(company_info, audience, nth_df, session_id, use_deep_analysis)
-                
-                # Create detailed results from sync function results
-                audience_nth_df = nth_df[nth_df['Target Audience'] == audience].copy()
-                detailed_criteria_results = []
-                qualified_count = 0
-                total_criteria = len(audience_nth_df)
-                
-                for _, criterion_row in audience_nth_df.iterrows():
-                    crit_text = criterion_row.get("Criteria", "Unknown")
-                    # Try to get result from sync function
-                    sync_key = f"NTH_{audience}_{crit_text}"
-                    sync_value = company_info.get(sync_key, "Unknown")
-                    
-                    criterion_info = {
-                        "criteria_text": crit_text,
-                        "result": "Pass" if sync_value == "Passed" else "Fail" if sync_value == "Not Passed" else "ND" if sync_value == "ND" else "Unknown"
-                    }
-                    
-                    if sync_value == "Passed":
-                        qualified_count += 1
-                    
-                    # Убираем отслеживание individual критериев
-                    
-                    detailed_criteria_results.append(criterion_info)
-                
-                # Store detailed results if not already set by sync function
-                if f"NTH_Detailed_{audience}" not in company_info:
-                    company_info[f"NTH_Detailed_{audience}"] = detailed_criteria_results
+                store_nth_details(company_info, audience, nth_df)
     else:
         # Use original sync function
         check_nth_criteria(company_info, audience, nth_df, session_id, use_deep_analysis)
+        store_nth_details(company_info, audience, nth_df)
+
+
+def _sync_result_to_detail(sync_value):
+    return "Pass" if sync_value == "Passed" else "Fail" if sync_value == "Not Passed" else "ND" if sync_value == "ND" else "Unknown"
+
+
+def store_mandatory_details(company_info, audience, mandatory_df):
+    """Mandatory_Detailed_{audience} из результатов check_mandatory_criteria (ключи Mandatory_{audience}_{crit})"""
+    audience_mandatory_df = mandatory_df[mandatory_df['Target Audience'] == audience].copy()
+    detailed_mandatory_results = []
+    
+    for _, criterion_row in audience_mandatory_df.iterrows():
+        crit_text = criterion_row.get("Criteria", "Unknown")
+        # Try to get result from sync function
+        sync_value = company_info.get(f"Mandatory_{audience}_{crit_text}", "Unknown")
+        
+        detailed_mandatory_results.append({
+            "criteria_text": crit_text,
+            "result": _sync_result_to_detail(sync_value)
+        })
+    
+    # Store detailed results
+    company_info[f"Mandatory_Detailed_{audience}"] = detailed_mandatory_results
+
+
+def store_nth_details(company_info, audience, nth_df):
+    """NTH_Detailed_{audience} из результатов check_nth_criteria (ключи NTH_{audience}_{crit})"""
+    audience_nth_df = nth_df[nth_df['Target Audience'] == audience].copy()
+    detailed_criteria_results = []
+    
+    for _, criterion_row in audience_nth_df.iterrows():
+        crit_text = criterion_row.get("Criteria", "Unknown")
+        # Try to get result from sync function
+        sync_value = company_info.get(f"NTH_{audience}_{crit_text}", "Unknown")
+        
+        detailed_criteria_results.append({
+            "criteria_text": crit_text,
+            "result": _sync_result_to_detail(sync_value)
+        })
+    
+    # Store detailed results if not already set by sync function
+    if f"NTH_Detailed_{audience}" not in company_info:
+        company_info[f"NTH_Detailed_{audience}"] = detailed_criteria_results
+
+
+def circuit_breaker_wait_seconds():
+    """Сколько ждать пока Circuit Breaker открыт (0 если запросы разрешены)"""
+    if not CIRCUIT_BREAKER_CONFIG['enable_circuit_breaker']:
+        return 0
+    from src.utils.circuit_breaker import get_circuit_breaker
+    state_info = get_circuit_breaker().get_state_info()
+    retry_after = state_info.get("time_until_retry") or 0
+    if state_info.get("state") == "OPEN" and retry_after > 0:
+        return retry_after
+    return 0
+
+
+def general_companies_and_chunks(companies_df):
+    """(Company_Name, Description) всех компаний, разбитые на запросы по general_companies_per_request"""
+    companies = []
+    for _, company_row in companies_df.iterrows():
+        company_data = company_row.to_dict()
+        companies.append((company_data.get("Company_Name", "Unknown"), company_data.get("Description", "")))
+    
+    per_request = max(1, int(PROCESSING_CONFIG.get('general_companies_per_request', 1)))
+    chunks = [companies[i:i + per_request] for i in range(0, len(companies), per_request)]
+    return companies, chunks
+
+
+def record_general_chunk_results(general_status, chunk_results):
+    for company_name, (general_passed, temp_general_info) in chunk_results.items():
+        general_status[company_name] = general_passed
+        # Store detailed general criteria information
+        general_status[f"{company_name}_detailed"] = temp_general_info
+        log_info(f"{'✅' if general_passed else '❌'} General {'пройдены' if general_passed else 'НЕ пройдены'}: {company_name}")
+
+
+def run_general_criteria_stage(companies_df, general_criteria, max_concurrent_companies, state_manager=None):
+    """
+    Этап 1: General критерии для всех компаний параллельно.
+    При PROCESSING_CONFIG['general_companies_per_request'] > 1 несколько описаний
+    проверяются одним запросом к OpenAI.
+    
+    Returns:
+        general_status: {company_name: passed, f"{company_name}_detailed": info}
+    """
+    companies, chunks = general_companies_and_chunks(companies_df)
+    log_info(f"🌐 General: {len(companies)} компаний, {len(chunks)} запросов, до {max_concurrent_companies} параллельно")
+    
+    def check_chunk(chunk):
+        retry_after = circuit_breaker_wait_seconds()
+        if retry_after:
+            log_info(f"🔴 Circuit Breaker открыт - General проверка ждет {retry_after:.1f}s")
+            time.sleep(retry_after)
+        if len(chunk) == 1:
+            company_name, description = chunk[0]
+            log_info(f"🌐 General для: {company_name}")
+            temp_general_info = {}
+            general_passed = check_general_criteria(description, temp_general_info, general_criteria)
+            return {company_name: (general_passed, temp_general_info)}
+        log_info(f"🌐 General для: {', '.join(name for name, _ in chunk)}")
+        return check_general_criteria_multi(chunk, general_criteria)
+    
+    general_status = {}
+    completed = 0
+    
+    with ThreadPoolExecutor(max_workers=max_concurrent_companies) as executor:
+        future_to_chunk = {executor.submit(check_chunk, chunk): chunk for chunk in chunks}
         
-        # Create detailed results from sync function results
-        audience_nth_df = nth_df[nth_df['Target Audience'] == audience].copy()
-        detailed_criteria_results = []
-        qualified_count = 0
-        total_criteria = len(audience_nth_df)
-        
-        for _, criterion_row in audience_nth_df.iterrows():
-            crit_text = criterion_row.get("Criteria", "Unknown")
-            # Try to get result from sync function
-            sync_key = f"NTH_{audience}_{crit_text}"
-            sync_value = company_info.get(sync_key, "Unknown")
-            
-            criterion_info = {
-                "criteria_text": crit_text,
-                "result": "Pass" if sync_value == "Passed" else "Fail" if sync_value == "Not Passed" else "ND" if sync_value == "ND" else "Unknown"
-            }
+        for future in as_completed(future_to_chunk):
+            chunk = future_to_chunk[future]
+            try:
+                chunk_results = future.result()
+            except Exception as e:
+                log_error(f"❌ Ошибка проверки general критериев для {', '.join(name for name, _ in chunk)}: {e}")
+                chunk_results = {company_name: (False, {}) for company_name, _ in chunk}
             
-            if sync_value == "Passed":
-                qualified_count += 1
+            record_general_chunk_results(general_status, chunk_results)
             
-            # Убираем отслеживание individual критериев
+            # Save progress for general criteria (из основного потока, по мере завершения)
+            completed += len(chunk)
+            if state_manager:
+                state_manager.save_progress(0, completed, stage="general_criteria")
+    
+    return general_status
+
+
+def process_single_company_all_products(company_row, products, products_data, general_status, session_id, use_deep_analysis, state_manager=None):
+    """
+    Обрабатывает ОДНУ компанию через ВСЕ продукты.
+    Возвращает ОДНУ объединенную запись с результатами по всем продуктам.
+    """
+    company_data = company_row.to_dict()
+    company_name = company_data.get("Company_Name", "Unknown")
+    
+    log_info(f"🏢 Обрабатываем компанию: {company_name} через ВСЕ продукты: {', '.join(products)}")
+    
+    # Process this company through ALL products
+    results_by_product = {}
+    for product in products:
+        try:
+            log_info(f"  📦 {company_name} → {product}")
             
-            detailed_criteria_results.append(criterion_info)
-        
-        # Store detailed results if not already set by sync function
-        if f"NTH_Detailed_{audience}" not in company_info:
-            company_info[f"NTH_Detailed_{audience}"] = detailed_criteria_results
+            # Use the existing function for this company-product combination
+            args = (company_row, product, products_data[product], general_status, session_id, use_deep_analysis, state_manager)
+            results_by_product[product] = process_single_company_for_product(args)
+        except Exception as e:
+            results_by_product[product] = e
+    
+    return [consolidate_company_results(company_data, products, results_by_product)]  # Return as list for consistency
+
+
+def log_company_stage_start(companies_df, products):
+    log_info("\n🚀 Этап 2: ПРАВИЛЬНЫЙ ПОРЯДОК - каждая компания через все продукты")
+    log_info(f"⚡ Компании: {len(companies_df)}")
+    log_info(f"📦 Продукты: {', '.join(products)}")
+    log_info(f"📊 Ожидаем записей: {len(companies_df)} (по одной на компанию с консолидированными результатами)")
+
+
+def run_company_stage(companies_df, products, products_data, general_status, session_id, use_deep_analysis, max_concurrent_companies, state_manager=None):
+    """
+    Этап 2 (потоки): каждая компания через все продукты, до max_concurrent_companies параллельно
+    
+    Returns:
+        all_results: по одной консолидированной записи на компанию
+    """
+    all_results = []
+    log_company_stage_start(companies_df, products)
+    
+    # ПАРАЛЛЕЛЬНАЯ ОБРАБОТКА компаний с Circuit Breaker
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrent_companies) as executor:
+            # Отправляем все компании для обработки через ВСЕ продукты
+            future_to_company = {
+                executor.submit(
+                    process_single_company_all_products,
+                    company_row, products, products_data, general_status, session_id, use_deep_analysis, state_manager
+                ): company_row.get("Company_Name", f"Company_{i}")
+                for i, (_, company_row) in enumerate(companies_df.iterrows())
+            }
+            
+            # Собираем результаты по мере завершения
+            for future in as_completed(future_to_company):
+                company_name = future_to_company[future]
+                try:
+                    company_results = future.result()
+                except Exception as e:
+                    if handle_company_failure(company_name, e, state_manager):
+                        break  # Stop processing
+                    continue
+                
+                all_results.extend(company_results)
+                log_info(f"🎉 Компания {company_name} завершена: {len(company_results)} записей")
+                
+                # Mark company as completed in state manager (только один раз на компанию)
+                if state_manager:
+                    record_external_cache_stats(state_manager)
+                    state_manager.mark_company_completed(company_name, "ALL_PRODUCTS", success=True)
+                    state_manager.save_partial_results(company_results)
+            
+    except Exception as e:
+        log_error(f"❌ Критическая ошибка параллельной обработки: {e}")
+        if state_manager:
+            state_manager.record_circuit_breaker_event("critical_error", {
+                "error": str(e),
+                "stage": "parallel_processing"
+            })
+    
+    return all_results
+
+
+def record_external_cache_stats(state_manager):
+    """Текущая статистика кэшей Serper и ScrapingBee в progress JSON сессии"""
+    for key, stats in (("serper_cache", get_serper_cache_stats()), ("scrapingbee_cache", get_page_cache_stats())):
+        if stats:
+            state_manager.record_session_stats(key, stats)
+
+
+def handle_company_failure(company_name, error, state_manager=None):
+    """
+    Обрабатывает ошибку компании на Этапе 2.
+    Возвращает True если сработал Circuit Breaker и обработку нужно остановить.
+    """
+    # Handle Circuit Breaker exceptions
+    if CIRCUIT_BREAKER_CONFIG['enable_circuit_breaker']:
+        from src.utils.circuit_breaker import CircuitOpenException
+        if isinstance(error, CircuitOpenException):
+            log_error(f"🔴 Circuit Breaker сработал для {company_name}: {error}")
+            if state_manager:
+                state_manager.record_circuit_breaker_event("triggered_during_processing", {
+                    "company": company_name,
+                    "error": str(error)
+                })
+            return True
+    
+    log_error(f"❌ Ошибка обработки компании {company_name}: {error}")
+    if state_manager:
+        state_manager.mark_company_completed(company_name, "ALL_PRODUCTS", success=False)
+    return False
 
 
 def run_parallel_analysis(companies_file=None, load_all_companies=False, session_id=None, use_deep_analysis=False, max_concurrent_companies=12, selected_products=None, write_to_hubspot_criteria=False):
@@ -607,7 +849,7 @@ def run_parallel_analysis(companies_file=None, load_all_companies=False, session
     """
     try:
         # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ ПАРАМЕТРОВ
-        log_info(f"🔍 run_parallel_analysis ВЫЗВАНА С ПАРАМЕТРАМИ:")
+        log_info("🔍 run_parallel_analysis ВЫЗВАНА С ПАРАМЕТРАМИ:")
         log_info(f"   📄 companies_file: {companies_file}")
         log_info(f"   📁 load_all_companies: {load_all_companies}")
         log_info(f"   🆔 session_id: {session_id}")
@@ -617,6 +859,12 @@ def run_parallel_analysis(companies_file=None, load_all_companies=False, session
         log_info(f"   🔗 write_to_hubspot_criteria: {write_to_hubspot_criteria}")
         log_info(f"   📝 Тип write_to_hubspot_criteria: {type(write_to_hubspot_criteria)}")
         
+        # Размер пула OpenAI соединений под количество параллельных компаний
+        configure_openai_pool(max_concurrent_companies)
+        reset_pruning_stats()
+        reset_token_usage_stats()
+        reset_llm_cache_stats()
+        
         # Initialize search data saver for this session
         if session_id:
             initialize_search_data_saver(session_id)
@@ -635,7 +883,10 @@ def run_parallel_analysis(companies_file=None, load_all_companies=False, session
         products_data = data_dict["products_data"]
         general_criteria = data_dict["general_criteria"]
         
-        log_info(f"🏢 ИСПРАВЛЕННЫЙ ПАРАЛЛЕЛЬНЫЙ ПОРЯДОК: Каждая компания через все продукты")
+        # Граф зависимостей критериев компилируется один раз на продукт
+        compile_products_dags(products_data)
+        
+        log_info("🏢 ИСПРАВЛЕННЫЙ ПАРАЛЛЕЛЬНЫЙ ПОРЯДОК: Каждая компания через все продукты")
         log_info(f"📊 Компаний: {len(companies_df)}")
         log_info(f"📦 Продукты: {', '.join(products)}")
         log_info(f"🎯 Ожидаем записей: {len(companies_df)} × {len(products)} = {len(companies_df) * len(products)}")
@@ -652,188 +903,34 @@ def run_parallel_analysis(companies_file=None, load_all_companies=False, session
             except Exception as e:
                 log_error(f"⚠️ Не удалось инициализировать StateManager: {e}")
         
-        # 1. Check General Criteria ONCE for all companies
-        log_info(f"\n🌐 Этап 1: Проверяем General критерии для ВСЕХ компаний...")
-        general_status = {}
-        
-        for index, company_row in companies_df.iterrows():
-            company_data = company_row.to_dict()
-            company_name = company_data.get("Company_Name", "Unknown")
-            description = company_data.get("Description", "")
-            
-            log_info(f"🌐 General для: {company_name}")
-            
-            try:
-                temp_general_info = {}
-                general_passed = check_general_criteria(description, temp_general_info, general_criteria)
-                general_status[company_name] = general_passed
-                
-                # Store detailed general criteria information
-                general_status[f"{company_name}_detailed"] = temp_general_info
-                
-                # Не отслеживаем individual критерии, только компании
-                
-                if general_passed:
-                    log_info("✅ General пройдены")
-                else:
-                    log_info("❌ General НЕ пройдены")
-                
-                # Save progress for general criteria
-                if state_manager:
-                    state_manager.save_progress(0, index + 1, stage="general_criteria")
-                    
-            except Exception as e:
-                log_error(f"❌ Ошибка проверки general критериев для {company_name}: {e}")
-                general_status[company_name] = False
-                # Убираем отслеживание individual критериев
-                if state_manager:
-                    state_manager.save_progress(0, index + 1, stage="general_criteria")
-        
-        # 2. ПРАВИЛЬНЫЙ ПОРЯДОК: Process each COMPANY through all PRODUCTS
-        all_results = []
-
-        def process_single_company_all_products(company_args):
-            """
-            Обрабатывает ОДНУ компанию через ВСЕ продукты.
-            Возвращает ОДНУ объединенную запись с результатами по всем продуктам.
-            """
-            company_row, products_data, general_status, session_id, use_deep_analysis = company_args
-            
-            company_data = company_row.to_dict()
-            company_name = company_data.get("Company_Name", "Unknown")
-            
-            log_info(f"🏢 Обрабатываем компанию: {company_name} через ВСЕ продукты: {', '.join(products)}")
-            
-            # Create ONE consolidated record for this company
-            consolidated_record = {
-                **company_data,  # Базовые данные компании
-                "All_Results": {},  # JSON со ВСЕМИ продуктами и результатами
-                "Qualified_Products": ""  # Текстовые результаты по всем продуктам
-            }
-            
-            all_products_results = {}
-            qualified_products_text = []
-            
-            # Process this company through ALL products
-            for product in products:
-                try:
-                    log_info(f"  📦 {company_name} → {product}")
-                    
-                    # Use the existing function for this company-product combination
-                    args = (company_row, product, products_data[product], general_status, session_id, use_deep_analysis)
-                    product_results = process_single_company_for_product(args)
-                    
-                    # Extract the product results from the returned list
-                    if product_results and len(product_results) > 0:
-                        # ИСПРАВЛЕНИЕ: Объединяем результаты ВСЕХ аудиторий для этого продукта
-                        product_all_results = None
-                        all_qualified_texts = []
-                        
-                        for product_result in product_results:
-                            # Берем All_Results из любого результата (они одинаковые для продукта)
-                            if product_all_results is None:
-                                product_all_results = product_result.get("All_Results", {})
-                            
-                            # Собираем текст квалификации от каждой аудитории
-                            product_qualified_text = product_result.get("Qualified_Products", "")
-                            if product_qualified_text and product_qualified_text != "NOT QUALIFIED":
-                                all_qualified_texts.append(product_qualified_text)
-                        
-                        # Store results for this product
-                        all_products_results[product] = product_all_results or {}
-                        
-                        # Объединяем все квалификации для этого продукта
-                        if all_qualified_texts:
-                            combined_qualified_text = "\n\n".join(all_qualified_texts)
-                            qualified_products_text.append(f"{product.upper()}\n{combined_qualified_text}")
-                        else:
-                            qualified_products_text.append(f"{product.upper()}\nNOT QUALIFIED")
-                    
-                except Exception as e:
-                    log_error(f"  ❌ Ошибка обработки {company_name} для продукта {product}: {e}")
-                    all_products_results[product] = {"error": str(e)}
-                    qualified_products_text.append(f"{product.upper()}\nERROR: {str(e)}")
-            
-            # Consolidate all results
-            consolidated_record["All_Results"] = all_products_results
-            consolidated_record["Qualified_Products"] = "\n\n".join(qualified_products_text) if qualified_products_text else "NOT QUALIFIED"
-            
-            log_info(f"✅ Завершена обработка компании {company_name}: ОДНА консолидированная запись с {len(products)} продуктами")
-            return [consolidated_record]  # Return as list for consistency
-        
-        # ПАРАЛЛЕЛЬНАЯ ОБРАБОТКА компаний (каждая компания через ВСЕ продукты)
-        log_info(f"\n🚀 Этап 2: ПРАВИЛЬНЫЙ ПОРЯДОК - каждая компания через все продукты")
-        log_info(f"⚡ Компании: {len(companies_df)}")
-        log_info(f"📦 Продукты: {', '.join(products)}")
-        log_info(f"📊 Ожидаем записей: {len(companies_df)} (по одной на компанию с консолидированными результатами)")
-        
-        # Подготавливаем аргументы для параллельной обработки
-        company_args = []
-        for index, company_row in companies_df.iterrows():
-            args = (company_row, products_data, general_status, session_id, use_deep_analysis)
-            company_args.append(args)
-        
-        # ПАРАЛЛЕЛЬНАЯ ОБРАБОТКА компаний с Circuit Breaker
-        circuit_breaker_triggered = False
-        
-        try:
-            with ThreadPoolExecutor(max_workers=max_concurrent_companies) as executor:
-                # Отправляем все компании для обработки через ВСЕ продукты
-                future_to_company = {
-                    executor.submit(process_single_company_all_products, args): args[0].get("Company_Name", f"Company_{i}")
-                    for i, args in enumerate(company_args)
-                }
-                
-                # Собираем результаты по мере завершения
-                for future in as_completed(future_to_company):
-                    company_name = future_to_company[future]
-                    try:
-                        company_results = future.result()
-                        all_results.extend(company_results)
-                        log_info(f"🎉 Компания {company_name} завершена: {len(company_results)} записей")
-                        
-                        # Mark company as completed in state manager (только один раз на компанию)
-                        if state_manager:
-                            state_manager.mark_company_completed(company_name, "ALL_PRODUCTS", success=True)
-                                
-                    except Exception as e:
-                        # Handle Circuit Breaker exceptions
-                        if CIRCUIT_BREAKER_CONFIG['enable_circuit_breaker']:
-                            from src.utils.circuit_breaker import CircuitOpenException
-                            if isinstance(e, CircuitOpenException):
-                                log_error(f"🔴 Circuit Breaker сработал для {company_name}: {e}")
-                                circuit_breaker_triggered = True
-                                if state_manager:
-                                    state_manager.record_circuit_breaker_event("triggered_during_processing", {
-                                        "company": company_name,
-                                        "error": str(e)
-                                    })
-                                break  # Stop processing
-                        
-                        log_error(f"❌ Ошибка обработки компании {company_name}: {e}")
-                        if state_manager:
-                            state_manager.mark_company_completed(company_name, "ALL_PRODUCTS", success=False)
-            
-            # Save partial results
-            if state_manager and all_results:
-                state_manager.save_partial_results(all_results)
-                
-        except Exception as e:
-            log_error(f"❌ Критическая ошибка параллельной обработки: {e}")
-            if state_manager:
-                state_manager.record_circuit_breaker_event("critical_error", {
-                    "error": str(e),
-                    "stage": "parallel_processing"
-                })
+        if ASYNC_ENGINE_CONFIG['enable_async_engine']:
+            # Оба этапа на одном event loop: общий aiohttp session, AsyncOpenAI клиент и лимиты провайдеров
+            from src.core.async_engine import run_analysis_stages_async
+            log_info("⚡ Async engine: General + компании на одном event loop")
+            general_status, all_results = asyncio.run(run_analysis_stages_async(
+                companies_df, products, products_data, general_criteria,
+                session_id=session_id, use_deep_analysis=use_deep_analysis,
+                max_concurrent_companies=max_concurrent_companies, state_manager=state_manager
+            ))
+        else:
+            # 1. Check General Criteria ONCE for all companies (параллельно, с тем же лимитом что и Этап 2)
+            log_info("\n🌐 Этап 1: Проверяем General критерии для ВСЕХ компаний...")
+            general_status = run_general_criteria_stage(companies_df, general_criteria, max_concurrent_companies, state_manager)
+            
+            # 2. ПРАВИЛЬНЫЙ ПОРЯДОК: Process each COMPANY through all PRODUCTS
+            all_results = run_company_stage(
+                companies_df, products, products_data, general_status,
+                session_id, use_deep_analysis, max_concurrent_companies, state_manager
+            )
         
         # Count qualified companies
         qualified_count = sum(1 for result in all_results if result["Qualified_Products"] != "NOT QUALIFIED")
         
         # Save results
         log_info("💾 Сохраняем результаты...")
-        log_info(f"🔍 ПАРАМЕТРЫ ДЛЯ save_results:")
+        log_info("🔍 ПАРАМЕТРЫ ДЛЯ save_results:")
         log_info(f"   📊 all_results: {len(all_results)} записей")
-        log_info(f"   📦 product: PARALLEL_BY_COMPANIES")
+        log_info("   📦 product: PARALLEL_BY_COMPANIES")
         log_info(f"   🆔 session_id: {session_id}")
         log_info(f"   🔗 write_to_hubspot_criteria: {write_to_hubspot_criteria}")
         log_info(f"   📝 Тип write_to_hubspot_criteria: {type(write_to_hubspot_criteria)}")
@@ -855,8 +952,26 @@ def run_parallel_analysis(companies_file=None, load_all_companies=False, session
    📄 JSON результаты: {json_path}
    📋 CSV результаты: {csv_path}""")
         
+        pruning_summary = get_pruning_stats().summary()
+        log_pruning_summary(pruning_summary)
+        
+        serper_stats = get_serper_cache_stats()
+        if serper_stats:
+            log_info(f"🔎 Serper: {serper_stats['requests']} HTTP запросов, {serper_stats['cache_hits']} из кэша "
+                     f"({serper_stats['cache_hit_rate']:.0%}), {serper_stats['coalesced']} объединено")
+        token_summary = get_token_usage_stats().summary()
+        log_token_usage_summary(token_summary)
+        page_stats = get_page_cache_stats()
+        if page_stats:
+            log_info(f"🐝 ScrapingBee: {page_stats['hits']} страниц из кэша ({page_stats['hit_rate']:.0%}), "
+                     f"{page_stats['deduplicated']} дубликатов содержимого")
+        
         # Mark session as completed
         if state_manager:
+            state_manager.record_llm_cache_stats(get_llm_cache_stats())
+            state_manager.record_pruning_stats(pruning_summary)
+            record_external_cache_stats(state_manager)
+            state_manager.record_session_stats("token_usage", token_summary)
             state_manager.mark_completed("completed")
         
         return all_results
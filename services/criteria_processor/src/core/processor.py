@@ -20,6 +20,7 @@ from src.data.savers import save_results
 from src.utils.logging import log_info, log_error
 from src.utils.config import PROCESSING_CONFIG, USE_SCRAPINGBEE_DEEP_ANALYSIS
 from src.data.search_data_saver import initialize_search_data_saver, finalize_search_data_saving
+from src.external.openai_pool import configure_openai_pool
 
 async def process_company_all_products_async(company_data, products_data, general_criteria, session_id=None, use_deep_analysis=False):
     """
@@ -407,6 +408,9 @@ async def run_analysis_super_optimized_async(companies_file=None, load_all_compa
     СУПЕР-оптимизированный анализ: обрабатывает несколько компаний одновременно + каждая компания асинхронно для всех продуктов
     """
     try:
+        # Размер пула OpenAI соединений под количество параллельных компаний
+        configure_openai_pool(max_concurrent_companies)
+        
         # Initialize search data saver for this session
         if session_id:
             initialize_search_data_saver(session_id)
@@ -7,6 +7,7 @@ from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 from src.utils.logging import log_info, log_error, log_debug
 from src.utils.state_manager import ProcessingStateManager
+from src.utils.progress_journal import has_progress
 from src.core.parallel_processor import run_parallel_analysis
 from src.data.search_data_saver import initialize_search_data_saver, finalize_search_data_saving
 
@@ -197,10 +198,10 @@ def get_resumable_sessions(base_output_dir: str = None) -> List[Dict[str, Any]]:
             session_id = session_dir.name
             
             try:
-                # Проверяем есть ли файлы состояния
+                # Проверяем есть ли файлы состояния (снапшот или журнал прогресса)
                 progress_file = session_dir / f"{session_id}_progress.json"
                 
-                if progress_file.exists():
+                if has_progress(progress_file):
                     state_manager = ProcessingStateManager(session_id, base_output_dir)
                     can_resume, reason = state_manager.can_resume()
                     
@@ -2,13 +2,13 @@
 Базовые функции для проверки критериев
 """
 
-from src.external.openai_client import get_openai_response
+from src.external.openai_client import get_openai_response, get_openai_response_async
+from src.utils.config import OPENAI_CLIENT_CONFIG
 from src.utils.logging import log_debug, log_error
+from src.utils.token_budget import log_criterion_tokens
 
-def get_structured_response(criteria_type, information, criteria_text, format_type="standard"):
-    """Get structured response for criteria evaluation"""
-    try:
-        prompt = f"""
+def _build_structured_prompt(information, criteria_text):
+    return f"""
 Analyze the following information and determine if it meets this criterion:
 
 Information: {information}
@@ -17,19 +17,38 @@ Criterion: {criteria_text}
 Respond with exactly one of: "Passed", "Not Passed", or "ND" (if insufficient data).
 """
 
+def _parse_structured_response(response):
+    # Clean up response
+    result = response.strip()
+    if "passed" in result.lower() and "not" not in result.lower():
+        return "Passed", None
+    elif "not passed" in result.lower():
+        return "Not Passed", None
+    elif "nd" in result.lower():
+        return "ND", None
+    else:
+        return "ND", None
+
+def get_structured_response(criteria_type, information, criteria_text, format_type="standard"):
+    """Get structured response for criteria evaluation"""
+    try:
+        prompt = _build_structured_prompt(information, criteria_text)
+        log_criterion_tokens(criteria_text, OPENAI_CLIENT_CONFIG['default_model'], prompt)
         response = get_openai_response(prompt, max_tokens=20)
-        
-        # Clean up response
-        result = response.strip()
-        if "passed" in result.lower() and "not" not in result.lower():
-            return "Passed", None
-        elif "not passed" in result.lower():
-            return "Not Passed", None  
-        elif "nd" in result.lower():
-            return "ND", None
-        else:
-            return "ND", None
-            
+        return _parse_structured_response(response)
+
+    except Exception as e:
+        log_error(f"❌ Ошибка получения ответа: {e}")
+        return "ND", str(e)
+
+async def get_structured_response_async(criteria_type, information, criteria_text, format_type="standard"):
+    """Async version of get_structured_response for the asyncio engine"""
+    try:
+        prompt = _build_structured_prompt(information, criteria_text)
+        log_criterion_tokens(criteria_text, OPENAI_CLIENT_CONFIG['default_model'], prompt)
+        response = await get_openai_response_async(prompt, max_tokens=20)
+        return _parse_structured_response(response)
+
     except Exception as e:
         log_error(f"❌ Ошибка получения ответа: {e}")
-        return "ND", str(e) 
\ No newline at end of file
+        return "ND", str(e)
@@ -0,0 +1,237 @@
+"""
+Граф зависимостей критериев продукта и планировщик с коротким замыканием
+
+Для каждого продукта критерии компилируются один раз:
+    general → qualification → аудитории → mandatory → NTH
+- qualification открывает аудитории
+- mandatory открывает NTH аудитории
+- первый "Not Passed" в mandatory закрывает остальные mandatory и весь NTH аудитории
+
+PruningStats разделяет две величины:
+- skipped: вызовы, которые закрытые ветки не сделали. Последовательный путь без графа
+  отсекает те же ветки, поэтому это объем работы, отсеченной гейтами, а не экономия
+- speculative: шаги, запущенные run_short_circuit после шага, закрывшего ветку
+  (отменены в полете или выброшены готовыми). Последовательный путь их не делает,
+  поэтому llm_calls_saved (разница с последовательным путем) = -speculative
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from src.utils.config import PROCESSING_CONFIG
+from src.utils.logging import log_info
+
+
+class AudienceBranch:
+    """Mandatory и NTH критерии одной аудитории (строки уже отфильтрованы)"""
+
+    def __init__(self, audience: str, mandatory_rows: List[pd.Series], nth_rows: List[pd.Series]):
+        self.audience = audience
+        self.mandatory_rows = mandatory_rows
+        self.nth_rows = nth_rows
+
+
+class ProductCriteriaDAG:
+    """
+    Скомпилированный граф критериев одного продукта
+    """
+
+    def __init__(self, product: str, product_data: Dict[str, Any]):
+        self.product = product
+        self.qualification_questions = product_data["qualification_questions"]
+
+        mandatory_df = product_data["mandatory_df"]
+        nth_df = product_data["nth_df"]
+
+        self.audiences: Dict[str, AudienceBranch] = {}
+        for audience in self.qualification_questions.keys():
+            self.audiences[audience] = AudienceBranch(
+                audience,
+                [row for _, row in mandatory_df[mandatory_df["Target Audience"] == audience].iterrows()],
+                [row for _, row in nth_df[nth_df["Target Audience"] == audience].iterrows()],
+            )
+
+    def branch(self, audience: str) -> AudienceBranch:
+        """Ветка аудитории; для аудитории без критериев - пустая ветка (граф не меняется)"""
+        branch = self.audiences.get(audience)
+        return branch if branch is not None else AudienceBranch(audience, [], [])
+
+    def rows_cost(self, rows: List[pd.Series], company_info: Dict[str, Any], mandatory: bool = False) -> Dict[str, int]:
+        """Сколько вызовов LLM и Serper стоит проверка этих критериев для компании"""
+        return {
+            "llm_calls": len(rows),
+            "serper_calls": sum(1 for row in rows if _needs_search(row, company_info, mandatory)),
+        }
+
+    def audience_cost(self, audience: str, company_info: Dict[str, Any], include_mandatory: bool = True) -> Dict[str, int]:
+        branch = self.branch(audience)
+        cost = self.rows_cost(branch.nth_rows, company_info)
+        if include_mandatory:
+            cost = _add_costs(cost, self.rows_cost(branch.mandatory_rows, company_info, mandatory=True))
+        return cost
+
+    def product_cost(self, company_info: Dict[str, Any]) -> Dict[str, int]:
+        """Стоимость всего продукта после general: qualification (один батч-запрос) + все аудитории"""
+        cost = {"llm_calls": 1 if PROCESSING_CONFIG['use_general_desc_for_qualification'] else 0, "serper_calls": 0}
+        for audience in self.audiences:
+            cost = _add_costs(cost, self.audience_cost(audience, company_info))
+        return cost
+
+
+def _needs_search(row: pd.Series, company_info: Dict[str, Any], mandatory: bool) -> bool:
+    """Повторяет выбор источника из get_information_for_criterion"""
+    place = row.get("Place", "gen_descr")
+    if mandatory and PROCESSING_CONFIG['use_serper_for_mandatory'] and place == "gen_descr":
+        place = "website"
+
+    search_query = row.get("Search Query", None)
+    if str(place).lower() != "website" or search_query is None or pd.isna(search_query) or not str(search_query).strip():
+        return False
+
+    website = str(company_info.get("Official_Website") or "").strip().lower()
+    return bool(website) and website not in ["not found", "none", "n/a", "nan"]
+
+
+def _add_costs(first: Dict[str, int], second: Dict[str, int]) -> Dict[str, int]:
+    return {key: first.get(key, 0) + second.get(key, 0) for key in ("llm_calls", "serper_calls")}
+
+
+def compile_products_dags(products_data: Dict[str, Dict[str, Any]]):
+    """Компилирует граф для каждого продукта и кладет его в product_data["criteria_dag"]"""
+    for product, product_data in products_data.items():
+        product_data["criteria_dag"] = ProductCriteriaDAG(product, product_data)
+
+
+def get_product_dag(product: str, product_data: Dict[str, Any]) -> ProductCriteriaDAG:
+    dag = product_data.get("criteria_dag")
+    if dag is None:
+        dag = ProductCriteriaDAG(product, product_data)
+        product_data["criteria_dag"] = dag
+    return dag
+
+
+async def run_short_circuit(factories: List[Callable], settles: Callable[[Any], bool], width: Optional[int] = None):
+    """
+    Запускает шаги ветки параллельно (не более width впереди), но принимает результаты
+    строго по порядку. Как только принятый результат закрывает ветку (settles), остальные
+    шаги отменяются - итог совпадает с последовательной проверкой.
+    При width=1 шаги выполняются строго последовательно и лишних вызовов нет.
+
+    Returns:
+        tuple: (принятые результаты, индексы не запущенных шагов,
+                число шагов, запущенных после закрытия ветки - отмененных или выброшенных)
+    """
+    width = max(1, width or len(factories) or 1)
+    tasks = []
+    committed = []
+
+    try:
+        while len(committed) < len(factories):
+            while len(tasks) < len(factories) and len(tasks) - len(committed) < width:
+                tasks.append(asyncio.create_task(factories[len(tasks)]()))
+
+            result = await tasks[len(committed)]
+            committed.append(result)
+            if settles(result):
+                break
+    finally:
+        leftover = tasks[len(committed):]
+        in_flight = [task for task in leftover if not task.done()]
+        for task in in_flight:
+            task.cancel()
+        if leftover:
+            await asyncio.gather(*leftover, return_exceptions=True)
+
+    return committed, list(range(len(tasks), len(factories))), len(leftover)
+
+
+class PruningStats:
+    """
+    Thread-safe счетчики отсеченных вызовов по причинам:
+    general_failed, qualification_failed, mandatory_failed, mandatory_short_circuit,
+    и спекулятивных шагов, которых нет в последовательном пути
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._by_reason: Dict[str, Dict[str, int]] = {}
+        self._speculative = 0
+
+    def record(self, reason: str, cost: Dict[str, int], branches: int = 1):
+        if not branches and not cost.get("llm_calls") and not cost.get("serper_calls"):
+            return
+        with self._lock:
+            entry = self._by_reason.setdefault(reason, {"branches": 0, "llm_calls": 0, "serper_calls": 0})
+            entry["branches"] += branches
+            entry["llm_calls"] += cost.get("llm_calls", 0)
+            entry["serper_calls"] += cost.get("serper_calls", 0)
+
+    def record_speculative(self, count: int):
+        if count:
+            with self._lock:
+                self._speculative += count
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            by_reason = {reason: dict(entry) for reason, entry in self._by_reason.items()}
+            speculative = self._speculative
+        # Каждый спекулятивный шаг - не больше одного LLM вызова (и Serper поиска) сверх последовательного пути
+        return {
+            "llm_calls_skipped": sum(entry["llm_calls"] for entry in by_reason.values()),
+            "serper_calls_skipped": sum(entry["serper_calls"] for entry in by_reason.values()),
+            "speculative_calls_discarded": speculative,
+            "llm_calls_saved": -speculative,
+            "by_reason": by_reason,
+        }
+
+
+_pruning_stats = PruningStats()
+
+
+def get_pruning_stats() -> PruningStats:
+    return _pruning_stats
+
+
+def reset_pruning_stats():
+    _pruning_stats.reset()
+
+
+def record_product_pruned(dag: ProductCriteriaDAG, company_info: Dict[str, Any]):
+    """General не пройдены - продукт целиком не проверяется"""
+    _pruning_stats.record("general_failed", dag.product_cost(company_info))
+
+
+def record_audiences_pruned(dag: ProductCriteriaDAG, qualified_audiences: List[str], company_info: Dict[str, Any]):
+    """Неквалифицированные аудитории не доходят до mandatory/NTH"""
+    for audience in dag.audiences:
+        if audience not in qualified_audiences:
+            _pruning_stats.record("qualification_failed", dag.audience_cost(audience, company_info))
+
+
+def record_nth_pruned(dag: ProductCriteriaDAG, audience: str, company_info: Dict[str, Any]):
+    """Mandatory не пройдены - NTH аудитории не проверяется"""
+    _pruning_stats.record("mandatory_failed", dag.audience_cost(audience, company_info, include_mandatory=False))
+
+
+def record_mandatory_short_circuit(rows: List[pd.Series], company_info: Dict[str, Any]):
+    """Mandatory после первого "Not Passed" не проверяются"""
+    if rows:
+        _pruning_stats.record("mandatory_short_circuit", {
+            "llm_calls": len(rows),
+            "serper_calls": sum(1 for row in rows if _needs_search(row, company_info, True)),
+        })
+
+
+def log_pruning_summary(summary: Dict[str, Any]):
+    log_info(f"✂️ Отсечение веток: не выполнено {summary['llm_calls_skipped']} LLM и "
+             f"{summary['serper_calls_skipped']} Serper вызовов (как и в последовательном пути); "
+             f"спекулятивно выброшено: {summary['speculative_calls_discarded']}, "
+             f"разница с последовательным путем: {summary['llm_calls_saved']} LLM")
+    for reason, entry in summary["by_reason"].items():
+        log_info(f"   {reason}: {entry['branches']} веток, {entry['llm_calls']} LLM, {entry['serper_calls']} Serper")
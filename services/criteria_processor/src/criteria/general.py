@@ -2,17 +2,107 @@
 Модуль для проверки общих критериев
 """
 
-from src.external.openai_client import get_openai_response
+import json
+import re
+
+from src.external.openai_client import get_openai_response, get_openai_response_async
 from src.utils.logging import log_info, log_debug
 
 def check_general_criteria(description, company_info, general_criteria):
     """Check general criteria for a company - batch processing with detailed results"""
     log_debug(f"🌐 Проверяем {len(general_criteria)} общих критериев одним запросом")
     
+    try:
+        response = get_openai_response(_build_general_prompt(description, general_criteria), max_tokens=100)
+        answers = _parse_general_lines(response, len(general_criteria))
+    except Exception as e:
+        log_debug(f"   ⚠️ Ошибка батчевой проверки: {e}")
+        answers = None
+
+    return _store_general_results(company_info, general_criteria, answers)
+
+
+async def check_general_criteria_async(description, company_info, general_criteria):
+    """Async version of check_general_criteria for the asyncio engine"""
+    log_debug(f"🌐 Проверяем {len(general_criteria)} общих критериев одним запросом")
+
+    try:
+        response = await get_openai_response_async(_build_general_prompt(description, general_criteria), max_tokens=100)
+        answers = _parse_general_lines(response, len(general_criteria))
+    except Exception as e:
+        log_debug(f"   ⚠️ Ошибка батчевой проверки: {e}")
+        answers = None
+
+    return _store_general_results(company_info, general_criteria, answers)
+
+
+def check_general_criteria_multi(companies, general_criteria):
+    """
+    Check general criteria for several companies with ONE request
+
+    Args:
+        companies: list of (key, description) tuples
+        general_criteria: list of general criteria texts
+
+    Returns:
+        dict key -> (passed, company_info) for every company. Companies whose
+        answers are missing from the batch response are re-checked one by one.
+    """
+    log_debug(f"🌐 Проверяем {len(general_criteria)} общих критериев для {len(companies)} компаний одним запросом")
+
+    parsed_answers = {}
+    try:
+        prompt, max_tokens = _build_multi_company_prompt(companies, general_criteria)
+        response = get_openai_response(prompt, max_tokens=max_tokens)
+        parsed_answers = _parse_multi_company_response(response, len(companies), len(general_criteria))
+    except Exception as e:
+        log_debug(f"   ⚠️ Ошибка мульти-компанийной проверки: {e}")
+
+    results = {}
+    for i, (key, description) in enumerate(companies):
+        company_info = {}
+        answers = parsed_answers.get(i)
+        if answers is None:
+            log_debug(f"   🔄 Нет ответа в батче для компании {i+1} - проверяем отдельно")
+            passed = check_general_criteria(description, company_info, general_criteria)
+        else:
+            passed = _store_general_results(company_info, general_criteria, answers)
+        results[key] = (passed, company_info)
+
+    return results
+
+
+async def check_general_criteria_multi_async(companies, general_criteria):
+    """Async version of check_general_criteria_multi for the asyncio engine"""
+    log_debug(f"🌐 Проверяем {len(general_criteria)} общих критериев для {len(companies)} компаний одним запросом")
+
+    parsed_answers = {}
+    try:
+        prompt, max_tokens = _build_multi_company_prompt(companies, general_criteria)
+        response = await get_openai_response_async(prompt, max_tokens=max_tokens)
+        parsed_answers = _parse_multi_company_response(response, len(companies), len(general_criteria))
+    except Exception as e:
+        log_debug(f"   ⚠️ Ошибка мульти-компанийной проверки: {e}")
+
+    results = {}
+    for i, (key, description) in enumerate(companies):
+        company_info = {}
+        answers = parsed_answers.get(i)
+        if answers is None:
+            log_debug(f"   🔄 Нет ответа в батче для компании {i+1} - проверяем отдельно")
+            passed = await check_general_criteria_async(description, company_info, general_criteria)
+        else:
+            passed = _store_general_results(company_info, general_criteria, answers)
+        results[key] = (passed, company_info)
+
+    return results
+
+
+def _build_general_prompt(description, general_criteria):
     # Create batch prompt for all criteria
     criteria_list = "\n".join([f"{i+1}. {criteria}" for i, criteria in enumerate(general_criteria)])
     
-    prompt = f"""
+    return f"""
 Analyze this company description against the following criteria. 
 For each criterion, respond with only "Yes" or "No".
 
@@ -27,44 +117,89 @@ Response format (one line per criterion):
 3. Yes/No
 ... etc
 """
-    
+
+
+def _parse_general_lines(response, criteria_count):
+    """One Yes/No answer per line; missing lines count as No"""
+    lines = response.strip().split('\n')
+    answers = []
+    for i in range(criteria_count):
+        if i < len(lines):
+            answers.append("Yes" if "yes" in lines[i].strip().lower() else "No")
+        else:
+            answers.append("No")
+    return answers
+
+
+def _build_multi_company_prompt(companies, general_criteria):
+    """Prompt and max_tokens for a multi-company general criteria request"""
+    criteria_list = "\n".join([f"{i+1}. {criteria}" for i, criteria in enumerate(general_criteria)])
+    companies_list = "\n\n".join([f"Company {i+1}: {description}" for i, (_, description) in enumerate(companies)])
+
+    prompt = f"""
+Analyze each company description below against the following criteria.
+For each company and each criterion, answer only "Yes" or "No".
+
+Criteria:
+{criteria_list}
+
+Companies:
+{companies_list}
+
+Respond with JSON only, in this exact format (one entry per company, answers in criteria order):
+{{"companies": [{{"company": 1, "answers": ["Yes", "No", ...]}}, {{"company": 2, "answers": [...]}}]}}
+"""
+    max_tokens = 50 + len(companies) * (15 + 6 * len(general_criteria))
+    return prompt, max_tokens
+
+
+def _parse_multi_company_response(response, companies_count, criteria_count):
+    """Parse JSON answers of a multi-company prompt into {company_index: [Yes/No, ...]}"""
+    match = re.search(r"\{.*\}", response, re.DOTALL)
+    if not match:
+        return {}
+
+    data = json.loads(match.group(0))
+    parsed = {}
+    for entry in data.get("companies", []):
+        try:
+            index = int(entry.get("company")) - 1
+        except (TypeError, ValueError):
+            continue
+        answers = entry.get("answers")
+        if not (0 <= index < companies_count) or not isinstance(answers, list) or len(answers) != criteria_count:
+            continue
+        parsed[index] = ["Yes" if "yes" in str(answer).lower() else "No" for answer in answers]
+    return parsed
+
+
+def _store_general_results(company_info, general_criteria, answers):
+    """Fill company_info with detailed general results; answers=None means the check failed"""
     detailed_general_results = []
     passed_count = 0
     
-    try:
-        response = get_openai_response(prompt, max_tokens=100)
-        lines = response.strip().split('\n')
-        
-        for i, criteria in enumerate(general_criteria):
-            if i < len(lines):
-                line = lines[i].strip()
-                result = "Yes" if "yes" in line.lower() else "No"
-            else:
-                result = "No"
-            
-            # Store detailed information about each general criterion
-            criterion_info = {
-                "criteria_text": criteria,
-                "result": "Pass" if result == "Yes" else "Fail"
-            }
-            detailed_general_results.append(criterion_info)
-            
-            if result == "Yes":
-                passed_count += 1
-                log_debug(f"   ✅ Критерий {i+1}: {result}")
-            else:
-                log_debug(f"   ❌ Критерий {i+1}: {result}")
-                
-    except Exception as e:
-        log_debug(f"   ⚠️ Ошибка батчевой проверки: {e}")
-        # If error, create failed entries for all criteria
-        for i, criteria in enumerate(general_criteria):
-            criterion_info = {
+    for i, criteria in enumerate(general_criteria):
+        if answers is None:
+            detailed_general_results.append({
                 "criteria_text": criteria,
                 "result": "Error"
-            }
-            detailed_general_results.append(criterion_info)
-        passed_count = 0
+            })
+            continue
+
+        result = answers[i]
+
+        # Store detailed information about each general criterion
+        criterion_info = {
+            "criteria_text": criteria,
+            "result": "Pass" if result == "Yes" else "Fail"
+        }
+        detailed_general_results.append(criterion_info)
+
+        if result == "Yes":
+            passed_count += 1
+            log_debug(f"   ✅ Критерий {i+1}: {result}")
+        else:
+            log_debug(f"   ❌ Критерий {i+1}: {result}")
     
     # Store detailed results in company_info for later use
     company_info["General_Detailed_Results"] = detailed_general_results
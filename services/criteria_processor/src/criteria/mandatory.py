@@ -2,8 +2,10 @@
 Модуль для проверки Mandatory критериев
 """
 
-from src.criteria.base import get_structured_response
-from src.external.serper import get_information_for_criterion
+from src.criteria.base import get_structured_response, get_structured_response_async
+from src.external.serper import get_information_for_criterion, get_information_for_criterion_async
+from src.external.shared_serper import serper_cache_ttl
+from src.criteria.dag import run_short_circuit, record_mandatory_short_circuit, get_pruning_stats
 from src.utils.config import PROCESSING_CONFIG
 from src.utils.logging import log_info, log_error
 
@@ -11,49 +13,28 @@ def check_mandatory_criteria(company_info, audience, mandatory_df, session_id=No
     """Check mandatory criteria for an audience - updated for manager requirements"""
     description = company_info.get("Description", "")
     mandatory = mandatory_df[mandatory_df["Target Audience"] == audience]
+    rows = [row for _, row in mandatory.iterrows()]
     failed = False
     nd_count = 0
     total = 0
     
-    for _, row in mandatory.iterrows():
+    for row in rows:
         crit = row["Criteria"]
         place = row.get("Place", "gen_descr")
         search_query = row.get("Search Query", None)
         
         log_info(f"⚠️  Mandatory {audience}: {crit}", console=False)
-        
-        # НОВОЕ ТРЕБОВАНИЕ: Обязательно использовать Serper для mandatory критериев
-        if PROCESSING_CONFIG['use_serper_for_mandatory'] and place == "gen_descr":
-            log_info(f"🔄 Принудительно переключаем на website поиск для mandatory критерия", console=False)
-            place = "website"
+        place = _mandatory_place(place)
         
         # Get information based on the Place field
-        information, source_desc = get_information_for_criterion(company_info, place, search_query, session_id=session_id, use_deep_analysis=use_deep_analysis)
+        information, source_desc = get_information_for_criterion(company_info, place, search_query, session_id=session_id, use_deep_analysis=use_deep_analysis, cache_ttl=serper_cache_ttl(row))
         log_info(f"🔍 Источник: {source_desc}", console=False)
         
         result, error = get_structured_response("mandatory", information, crit, "standard")
         
-        if error:
-            log_error(f"❌ Ошибка Mandatory {audience} {crit}: {error}")
-            company_info[f"Mandatory_{audience}_{crit}"] = "Error"
-            # Считаем ошибки как ND для статистики
+        failed, is_nd = _record_mandatory_result(company_info, audience, crit, result, error)
+        if is_nd:
             nd_count += 1
-        else:
-            # Дополнительная проверка на None
-            if result is None:
-                log_error(f"❌ Получен None результат для Mandatory {audience} {crit}")
-                result = "ND"
-            
-            log_info(f"➡️  {result}", console=False)
-            company_info[f"Mandatory_{audience}_{crit}"] = result
-            
-            # НОВОЕ ТРЕБОВАНИЕ: "Not Pass" исключает, ND не исключает
-            if result == "Not Passed":
-                failed = True
-                log_info(f"🚫 КРИТИЧЕСКИЙ ПРОВАЛ mandatory критерия - аудитория исключается", console=False)
-            elif result == "ND":
-                nd_count += 1
-                log_info(f"❓ ND на mandatory критерии - продолжаем обработку", console=False)
         
         total += 1
         
@@ -61,9 +42,91 @@ def check_mandatory_criteria(company_info, audience, mandatory_df, session_id=No
         if failed:
             break
     
+    record_mandatory_short_circuit(rows[total:], company_info)
+    
     # Статистика ND для mandatory критериев
     if total > 0:
         company_info[f"ND_Rate_Mandatory_{audience}"] = round(nd_count / total, 2)
     
     # Возвращаем True если НЕ провалился ни один mandatory (ND разрешены)
-    return not failed 
\ No newline at end of file
+    return not failed
+
+
+async def check_mandatory_criteria_async(company_info, audience, mandatory_df, session_id=None, use_deep_analysis=False):
+    """
+    Async version of check_mandatory_criteria.
+    Up to PROCESSING_CONFIG['mandatory_parallel_width'] criteria run at once, results are
+    accepted in order and the first "Not Passed" cancels the rest - same output as the sync version.
+    With width > 1 criteria started after the failing one are extra calls (speculative in PruningStats).
+    """
+    mandatory = mandatory_df[mandatory_df["Target Audience"] == audience]
+    rows = [row for _, row in mandatory.iterrows()]
+    
+    def make_check(row):
+        async def check():
+            crit = row["Criteria"]
+            place = _mandatory_place(row.get("Place", "gen_descr"))
+            search_query = row.get("Search Query", None)
+            
+            log_info(f"⚠️  Mandatory {audience}: {crit}", console=False)
+            
+            information, source_desc = await get_information_for_criterion_async(company_info, place, search_query, session_id=session_id, use_deep_analysis=use_deep_analysis, cache_ttl=serper_cache_ttl(row))
+            log_info(f"🔍 Источник: {source_desc}", console=False)
+            
+            result, error = await get_structured_response_async("mandatory", information, crit, "standard")
+            return crit, result, error
+        return check
+    
+    committed, skipped_indexes, speculative = await run_short_circuit(
+        [make_check(row) for row in rows],
+        settles=lambda outcome: outcome[2] is None and outcome[1] == "Not Passed",
+        width=PROCESSING_CONFIG.get('mandatory_parallel_width')
+    )
+    record_mandatory_short_circuit([rows[i] for i in skipped_indexes], company_info)
+    get_pruning_stats().record_speculative(speculative)
+    
+    failed = False
+    nd_count = 0
+    for crit, result, error in committed:
+        failed, is_nd = _record_mandatory_result(company_info, audience, crit, result, error)
+        if is_nd:
+            nd_count += 1
+    
+    if committed:
+        company_info[f"ND_Rate_Mandatory_{audience}"] = round(nd_count / len(committed), 2)
+    
+    return not failed
+
+
+def _mandatory_place(place):
+    # НОВОЕ ТРЕБОВАНИЕ: Обязательно использовать Serper для mandatory критериев
+    if PROCESSING_CONFIG['use_serper_for_mandatory'] and place == "gen_descr":
+        log_info(f"🔄 Принудительно переключаем на website поиск для mandatory критерия", console=False)
+        return "website"
+    return place
+
+
+def _record_mandatory_result(company_info, audience, crit, result, error):
+    """Store one mandatory result; returns (failed, is_nd)"""
+    if error:
+        log_error(f"❌ Ошибка Mandatory {audience} {crit}: {error}")
+        company_info[f"Mandatory_{audience}_{crit}"] = "Error"
+        # Считаем ошибки как ND для статистики
+        return False, True
+    
+    # Дополнительная проверка на None
+    if result is None:
+        log_error(f"❌ Получен None результат для Mandatory {audience} {crit}")
+        result = "ND"
+    
+    log_info(f"➡️  {result}", console=False)
+    company_info[f"Mandatory_{audience}_{crit}"] = result
+    
+    # НОВОЕ ТРЕБОВАНИЕ: "Not Pass" исключает, ND не исключает
+    if result == "Not Passed":
+        log_info(f"🚫 КРИТИЧЕСКИЙ ПРОВАЛ mandatory критерия - аудитория исключается", console=False)
+        return True, False
+    elif result == "ND":
+        log_info(f"❓ ND на mandatory критерии - продолжаем обработку", console=False)
+        return False, True
+    return False, False
@@ -2,34 +2,73 @@
 Модуль для проверки NTH критериев
 """
 
-from src.criteria.base import get_structured_response
-from src.external.serper import get_information_for_criterion
+import asyncio
+
+from src.criteria.base import get_structured_response, get_structured_response_async
+from src.external.serper import get_information_for_criterion, get_information_for_criterion_async
+from src.external.shared_serper import serper_cache_ttl
 from src.utils.logging import log_info, log_error
 
 def check_nth_criteria(company_info, audience, nth_df, session_id=None, use_deep_analysis=False):
     """Check NTH criteria for an audience - updated for manager requirements"""
     description = company_info.get("Description", "")
     filtered_df = nth_df[nth_df["Target Audience"] == audience]
-    passed_count = 0
-    nd_count = 0
-    total = 0
-    
+    results = []
+
     log_info(f"Начинаем проверку {len(filtered_df)} NTH критериев для {audience}", console=False)
-    
+
     # НОВОЕ ТРЕБОВАНИЕ: Обрабатывать ВСЕ NTH критерии независимо от результатов
     for _, row in filtered_df.iterrows():
         crit = row["Criteria"]
         place = row.get("Place", "gen_descr")
         search_query = row.get("Search Query", None)
-        
+
         log_info(f"NTH {audience}: {crit}", console=False)
-        
+
         # Get information based on the Place field
-        information, source_desc = get_information_for_criterion(company_info, place, search_query, session_id=session_id, use_deep_analysis=use_deep_analysis)
+        information, source_desc = get_information_for_criterion(company_info, place, search_query, session_id=session_id, use_deep_analysis=use_deep_analysis, cache_ttl=serper_cache_ttl(row))
         log_info(f"Источник: {source_desc}", console=False)
-        
+
         result, error = get_structured_response("nth", information, crit, "standard")
-        
+        results.append((crit, result, error))
+
+    _store_nth_results(company_info, audience, results)
+    return None
+
+
+async def check_nth_criteria_async(company_info, audience, nth_df, session_id=None, use_deep_analysis=False):
+    """Async version of check_nth_criteria - all NTH criteria are independent, so they run concurrently"""
+    filtered_df = nth_df[nth_df["Target Audience"] == audience]
+
+    log_info(f"Начинаем проверку {len(filtered_df)} NTH критериев для {audience}", console=False)
+
+    async def check_one(row):
+        crit = row["Criteria"]
+        place = row.get("Place", "gen_descr")
+        search_query = row.get("Search Query", None)
+
+        log_info(f"NTH {audience}: {crit}", console=False)
+
+        information, source_desc = await get_information_for_criterion_async(company_info, place, search_query, session_id=session_id, use_deep_analysis=use_deep_analysis, cache_ttl=serper_cache_ttl(row))
+        log_info(f"Источник: {source_desc}", console=False)
+
+        result, error = await get_structured_response_async("nth", information, crit, "standard")
+        return crit, result, error
+
+    # gather сохраняет порядок критериев, поэтому ключи в company_info идут как в sync версии
+    results = await asyncio.gather(*[check_one(row) for _, row in filtered_df.iterrows()])
+
+    _store_nth_results(company_info, audience, results)
+    return None
+
+
+def _store_nth_results(company_info, audience, results):
+    """Store (crit, result, error) tuples and NTH scoring statistics in company_info"""
+    passed_count = 0
+    nd_count = 0
+    total = 0
+
+    for crit, result, error in results:
         if error:
             log_error(f"Ошибка NTH {audience} {crit}: {error}")
             company_info[f"NTH_{audience}_{crit}"] = "Error"
@@ -38,7 +77,7 @@ def check_nth_criteria(company_info, audience, nth_df, session_id=None, use_deep
         else:
             log_info(f"{result}", console=False)
             company_info[f"NTH_{audience}_{crit}"] = result
-            
+
             if result == "Passed":
                 passed_count += 1
                 log_info(f"NTH критерий пройден", console=False)
@@ -47,22 +86,20 @@ def check_nth_criteria(company_info, audience, nth_df, session_id=None, use_deep
                 log_info(f"Недостаточно данных для NTH критерия", console=False)
             else:
                 log_info(f"NTH критерий не пройден", console=False)
-        
+
         total += 1
-    
+
     # НОВОЕ ТРЕБОВАНИЕ: Детальная статистика для скоринга
     if total > 0:
         success_rate = passed_count / total
         nd_rate = nd_count / total
-        
+
         company_info[f"NTH_Score_{audience}"] = round(success_rate, 3)
         company_info[f"NTH_Total_{audience}"] = total
         company_info[f"NTH_Passed_{audience}"] = passed_count
         company_info[f"NTH_ND_{audience}"] = nd_count
         company_info[f"NTH_ND_Rate_{audience}"] = round(nd_rate, 3)
-        
+
         log_info(f"NTH Статистика для {audience}:", console=False)
         log_info(f"   Пройдено: {passed_count}/{total} ({success_rate:.1%})", console=False)
         log_info(f"   ND: {nd_count}/{total} ({nd_rate:.1%})", console=False)
-    
-    return None 
\ No newline at end of file
@@ -0,0 +1,313 @@
+"""
+Скомпилированный каталог критериев
+
+Файлы критериев (criteria/*.csv) разбираются один раз: кодировка, нормализация текста,
+проверка колонок. CriteriaCatalog хранит результат в памяти процесса и в снапшоте (pickle):
+
+- разобранные строки каждого файла и сводка по нему (продукты, строки, колонки)
+- продукты, аудитории, типы критериев, шаблоны Search Query с их плейсхолдерами
+  и разобранные ключевые слова Signals (parse_signals)
+- refresh() проверяет файлы по (mtime, размер); если они изменились, сравнивается
+  SHA-1 содержимого, и заново разбирается только файл с другим содержимым
+- invalidate() сбрасывает каталог после изменения файлов через API (/criteria/files)
+
+Модуль не импортирует ничего из пакета src, поэтому backend загружает его по пути к файлу.
+"""
+
+import fnmatch
+import hashlib
+import logging
+import os
+import pickle
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+SUMMARY_COLUMNS = ['Product', 'Criteria', 'Target Audience']
+PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+
+ParseFile = Callable[[str], pd.DataFrame]
+
+# Разобранные Signals: заполняется каталогом, parse_signals берет готовый результат отсюда
+_parsed_signals: Dict[str, Tuple[str, ...]] = {}
+
+
+def parse_signals(signals_text: str) -> Tuple[str, ...]:
+    """Ключевые слова из текста колонки Signals: фразы в кавычках и элементы через , ; |"""
+    keywords = _parsed_signals.get(signals_text)
+    if keywords is not None:
+        return keywords
+
+    # Handle quoted phrases (e.g., "API documentation", "enterprise solutions")
+    quoted_phrases = re.findall(r'"([^"]+)"', signals_text)
+
+    # Remove quoted phrases from text to avoid double processing
+    text_without_quotes = re.sub(r'"[^"]+"', '', signals_text)
+
+    # Split remaining text by common separators
+    individual_keywords = re.split(r'[,;|]', text_without_quotes)
+
+    all_keywords = [phrase.strip() for phrase in quoted_phrases if phrase.strip()]
+    for keyword in individual_keywords:
+        keyword = keyword.strip()
+        if keyword and keyword not in ['', 'N/A', 'n/a', 'None']:
+            all_keywords.append(keyword)
+
+    # Remove duplicates while preserving order
+    keywords = tuple(dict.fromkeys(all_keywords))
+    _parsed_signals[signals_text] = keywords
+    return keywords
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _unique(values: Iterable[Any]) -> List[str]:
+    """Непустые значения в порядке первого появления"""
+    return list(dict.fromkeys(str(v).strip() for v in values if pd.notna(v) and str(v).strip()))
+
+
+def _summarize(df: pd.DataFrame) -> Dict[str, Any]:
+    """Сводка файла для списка /criteria/files: строки с данными, колонки, продукты"""
+    existing_columns = [col for col in SUMMARY_COLUMNS if col in df.columns]
+    if existing_columns:
+        # Строки, где ВСЕ основные колонки пустые, не считаются
+        filtered = df.dropna(subset=existing_columns, how='all')
+        total_rows = len(filtered[filtered[existing_columns].ne('').any(axis=1)])
+    else:
+        total_rows = len(df.dropna(how='all'))
+    return {
+        "total_rows": total_rows,
+        "columns": list(df.columns),
+        "products": _unique(df['Product']) if 'Product' in df.columns else []
+    }
+
+
+class CriteriaCatalog:
+    """Thread-safe каталог разобранных файлов критериев одной папки"""
+
+    def __init__(
+        self,
+        criteria_dir: str,
+        parse_file: ParseFile,
+        snapshot_path: Optional[str] = None,
+        patterns: Tuple[str, ...] = ("*.csv",),
+        exclude: Tuple[str, ...] = (),
+        parser_id: str = "default"
+    ):
+        """
+        Args:
+            parse_file: путь -> DataFrame критериев файла (исключение - файл с ошибкой, в критерии не входит)
+            snapshot_path: файл снапшота (None - каталог только в памяти)
+            exclude: подстроки имен файлов, которые не входят в каталог (например ".backup_")
+            parser_id: идентификатор parse_file - снапшот другого разборщика не используется
+        """
+        self.criteria_dir = str(criteria_dir)
+        self.parse_file = parse_file
+        self.snapshot_path = str(snapshot_path) if snapshot_path else None
+        self.patterns = patterns
+        self.exclude = exclude
+        self.parser_id = parser_id
+        self._lock = threading.RLock()
+        self._snapshot_checked = False
+        # filename -> {"mtime_ns", "size", "sha1", "df", "summary", "error"}
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._reset_views()
+
+    def refresh(self) -> bool:
+        """Проверить файлы и разобрать изменившиеся; True, если содержимое каталога изменилось"""
+        with self._lock:
+            if not self._snapshot_checked:
+                self._snapshot_checked = True
+                self._load_snapshot()
+
+            paths = self._list_files()
+            files: Dict[str, Dict[str, Any]] = {}
+            content_changed = set(self._files) != set(paths)
+            stat_changed = False
+            for name, path in paths.items():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Файл удален между listdir и stat
+                    content_changed = True
+                    continue
+                entry = self._files.get(name)
+                if entry is not None and (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+                    files[name] = entry
+                    continue
+
+                stat_changed = True
+                digest = _file_digest(path)
+                if entry is not None and entry["sha1"] == digest:
+                    # Файл перезаписан тем же содержимым - разбирать заново не нужно
+                    files[name] = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                    continue
+
+                files[name] = self._compile_file(path, stat, digest)
+                content_changed = True
+
+            self._files = files
+            if content_changed:
+                self._build_views()
+            if content_changed or stat_changed:
+                self._save_snapshot()
+            return content_changed
+
+    def invalidate(self, filename: Optional[str] = None):
+        """Сбросить разобранный файл (или весь каталог) и снапшот; следующий refresh() разберет их заново"""
+        with self._lock:
+            if filename is None:
+                self._files = {}
+            else:
+                self._files.pop(os.path.basename(filename), None)
+            self._reset_views()
+            self._snapshot_checked = True
+            remove_snapshot(self.snapshot_path)
+        logger.info(f"Criteria catalog invalidated: {filename or self.criteria_dir}")
+
+    @property
+    def file_names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._files)
+
+    def files(self) -> List[Dict[str, Any]]:
+        """Сводка по файлам: filename, size, mtime_ns, total_rows, columns, products или error"""
+        with self._lock:
+            items = sorted(self._files.items())
+        result = []
+        for name, entry in items:
+            info = {"filename": name, "size": entry["size"], "mtime_ns": entry["mtime_ns"]}
+            if entry["error"]:
+                info.update({"error": entry["error"], "products": []})
+            else:
+                info.update(entry["summary"])
+            result.append(info)
+        return result
+
+    # --- служебное (вызывается под self._lock) ---
+
+    def _reset_views(self):
+        self.criteria: Optional[pd.DataFrame] = None
+        self.version: Optional[str] = None
+        self.products: List[str] = []
+        self.audiences: List[str] = []
+        self.criteria_types: List[str] = []
+        self.search_templates: Dict[str, Tuple[str, ...]] = {}
+        self.signals: Dict[str, Tuple[str, ...]] = {}
+
+    def _list_files(self) -> Dict[str, str]:
+        if not os.path.isdir(self.criteria_dir):
+            return {}
+        names = sorted(os.listdir(self.criteria_dir))
+        return {
+            name: os.path.join(self.criteria_dir, name)
+            for name in names
+            if any(fnmatch.fnmatch(name.lower(), pattern) for pattern in self.patterns)
+            and not any(marker in name for marker in self.exclude)
+        }
+
+    def _compile_file(self, path: str, stat: os.stat_result, digest: str) -> Dict[str, Any]:
+        entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha1": digest,
+                 "df": None, "summary": None, "error": None}
+        try:
+            df = self.parse_file(path)
+            entry["df"] = df
+            entry["summary"] = _summarize(df)
+        except Exception as e:
+            logger.error(f"Error compiling criteria file {path}: {e}")
+            entry["error"] = str(e)
+        return entry
+
+    def _build_views(self):
+        """Общие представления каталога по разобранным файлам"""
+        self._reset_views()
+        frames = [entry["df"] for _, entry in sorted(self._files.items()) if entry["df"] is not None]
+        self.version = hashlib.sha1(
+            "|".join(f"{name}:{entry['sha1']}" for name, entry in sorted(self._files.items())).encode()
+        ).hexdigest()
+        if not frames:
+            return
+        criteria = pd.concat(frames, ignore_index=True)
+        self.criteria = criteria
+
+        column = lambda name: criteria[name] if name in criteria.columns else ()  # noqa: E731
+        self.products = _unique(column('Product'))
+        self.audiences = _unique(column('Target Audience'))
+        self.criteria_types = _unique(column('Criteria Type'))
+        self.search_templates = {
+            template: tuple(dict.fromkeys(PLACEHOLDER_RE.findall(template)))
+            for template in _unique(column('Search Query'))
+        }
+        self.signals = {text: parse_signals(text) for text in _unique(column('Signals'))}
+
+    def _load_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Criteria catalog snapshot {self.snapshot_path} is unreadable, rebuilding: {e}")
+            return
+        if (snapshot.get("format"), snapshot.get("parser_id"), snapshot.get("pandas")) != (SNAPSHOT_FORMAT, self.parser_id, pd.__version__):
+            return
+        self._files = snapshot["files"]
+        self._build_views()
+
+    def _save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        snapshot = {"format": SNAPSHOT_FORMAT, "parser_id": self.parser_id, "pandas": pd.__version__, "files": self._files}
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # Атомарная замена: воркеры, читающие снапшот параллельно, не увидят недописанный файл
+            os.replace(tmp_path, self.snapshot_path)
+        except (OSError, pickle.PicklingError) as e:
+            logger.error(f"Could not save criteria catalog snapshot {self.snapshot_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def remove_snapshot(snapshot_path: Optional[str]):
+    """Удалить снапшот каталога (например, из процесса, который изменил файлы критериев)"""
+    if not snapshot_path:
+        return
+    try:
+        os.remove(snapshot_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Could not remove criteria catalog snapshot {snapshot_path}: {e}")
+
+
+_catalogs: Dict[Tuple[str, str], CriteriaCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_criteria_catalog(criteria_dir: str, parse_file: ParseFile, parser_id: str = "default", **kwargs) -> CriteriaCatalog:
+    """Общий каталог на процесс для папки criteria_dir и разборщика parser_id"""
+    key = (os.path.abspath(str(criteria_dir)), parser_id)
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(key)
+            if catalog is None:
+                catalog = CriteriaCatalog(criteria_dir, parse_file, parser_id=parser_id, **kwargs)
+                _catalogs[key] = catalog
+    return catalog
@@ -5,7 +5,8 @@
 import os
 import glob
 import pandas as pd
-from src.utils.config import DATA_DIR, COMPANIES_LIMIT, CRITERIA_DIR, CRITERIA_TYPE, INDUSTRY_MAPPING
+from src.utils.config import DATA_DIR, COMPANIES_LIMIT, CRITERIA_DIR, CRITERIA_TYPE, INDUSTRY_MAPPING, CRITERIA_CATALOG_PATH
+from src.data.criteria_catalog import get_criteria_catalog
 from src.utils.logging import log_info, log_error, log_debug
 from src.utils.encoding_handler import (
     read_csv_with_encoding, 
@@ -188,77 +189,127 @@ def load_all_companies_from_data_folder():
     log_info(f"🎯 Объединено компаний: {len(combined_companies)}")
     return combined_companies
 
-def load_all_criteria_files():
-    """Load and combine all criteria files from criteria/ directory"""
+def _criteria_catalog():
+    """Каталог критериев процесса: файлы разбираются заново только после изменения (src/data/criteria_catalog.py)"""
+    return get_criteria_catalog(
+        CRITERIA_DIR,
+        parse_file=_parse_criteria_file,
+        parser_id="criteria_processor",
+        snapshot_path=CRITERIA_CATALOG_PATH
+    )
+
+def load_criteria_catalog():
+    """Актуальный каталог критериев (проверка файлов по mtime/размеру, разбор только изменившихся)"""
     criteria_dir = CRITERIA_DIR
     
     if not os.path.exists(criteria_dir):
         raise FileNotFoundError(f"❌ Папка criteria не найдена: {criteria_dir}")
     
-    # Find all CSV files in criteria directory
-    criteria_files = glob.glob(os.path.join(criteria_dir, "*.csv"))
+    catalog = _criteria_catalog()
+    if catalog.refresh():
+        log_info(f"📁 Каталог критериев собран: {len(catalog.file_names)} файлов")
+        if catalog.criteria is not None:
+            log_info(f"🎯 Объединено критериев: {len(catalog.criteria)}")
+            log_info(f"📊 Найдены продукты: {', '.join(catalog.products)}")
+            log_info(f"📊 Типы критериев: {', '.join(catalog.criteria_types)}")
     
-    if not criteria_files:
+    if not catalog.file_names:
         raise FileNotFoundError(f"❌ Не найдено файлов критериев в папке: {criteria_dir}")
     
-    log_info(f"📁 Найдено файлов критериев: {len(criteria_files)}")
+    if catalog.criteria is None:
+        raise ValueError("❌ Не удалось загрузить ни одного файла критериев")
     
-    all_criteria = []
+    return catalog
+
+def load_all_criteria_files():
+    """Load and combine all criteria files from criteria/ directory (from the compiled criteria catalog)"""
+    return load_criteria_catalog().criteria.copy()
+
+def _parse_criteria_file(file_path):
+    """Прочитать и нормализовать один файл критериев (вызывается каталогом только для изменившихся файлов)"""
+    filename = os.path.basename(file_path)
+    log_info(f"📋 Загружаем критерии из: {filename}")
     
-    for file_path in criteria_files:
-        filename = os.path.basename(file_path)
-        log_info(f"📋 Загружаем критерии из: {filename}")
-        
-        try:
-            # Используем encoding handler для файлов критериев
-            file_info = get_file_info(file_path)
-            log_debug(f"📁 Критерии: {filename} ({file_info.get('detected_encoding', 'unknown')})")
-            
-            df, used_encoding = read_csv_with_encoding(file_path)
-            log_debug(f"✅ Критерии загружены с кодировкой: {used_encoding}")
-            
-            # НОРМАЛИЗАЦИЯ ТЕКСТА в критериях
-            text_columns = ['Product', 'Target Audience', 'Criteria Type', 'Criteria', 'Place', 'Search Query', 'Signals']
-            normalized_columns = []
-            for col in text_columns:
-                if col in df.columns:
-                    df[col] = df[col].apply(lambda x: normalize_text_encoding(str(x)) if pd.notna(x) else x)
-                    normalized_columns.append(col)
-            
-            if normalized_columns:
-                log_debug(f"🧹 Нормализованы критерии: {', '.join(normalized_columns)}")
-            
-            # Validate required columns
-            required_columns = ['Product', 'Target Audience', 'Criteria Type', 'Criteria']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                log_error(f"❌ В файле {filename} отсутствуют колонки: {missing_columns}")
-                continue
-            
-            log_info(f"✅ Загружено из {filename}: {len(df)} критериев")
-            all_criteria.append(df)
-            
-        except Exception as e:
-            log_error(f"❌ Ошибка загрузки {filename}: {e}")
-            continue
+    # Используем encoding handler для файлов критериев
+    file_info = get_file_info(file_path)
+    log_debug(f"📁 Критерии: {filename} ({file_info.get('detected_encoding', 'unknown')})")
     
-    if not all_criteria:
-        raise ValueError("❌ Не удалось загрузить ни одного файла критериев")
+    df, used_encoding = read_csv_with_encoding(file_path)
+    log_debug(f"✅ Критерии загружены с кодировкой: {used_encoding}")
+    
+    # НОРМАЛИЗАЦИЯ ТЕКСТА в критериях
+    text_columns = ['Product', 'Target Audience', 'Criteria Type', 'Criteria', 'Place', 'Search Query', 'Signals']
+    normalized_columns = []
+    for col in text_columns:
+        if col in df.columns:
+            df[col] = df[col].apply(lambda x: normalize_text_encoding(str(x)) if pd.notna(x) else x)
+            normalized_columns.append(col)
+    
+    if normalized_columns:
+        log_debug(f"🧹 Нормализованы критерии: {', '.join(normalized_columns)}")
     
-    # Combine all criteria into single DataFrame
-    combined_criteria = pd.concat(all_criteria, ignore_index=True)
+    # Validate required columns
+    required_columns = ['Product', 'Target Audience', 'Criteria Type', 'Criteria']
+    missing_columns = [col for col in required_columns if col not in df.columns]
     
-    log_info(f"🎯 Объединено критериев: {len(combined_criteria)}")
+    if missing_columns:
+        log_error(f"❌ В файле {filename} отсутствуют колонки: {missing_columns}")
+        raise ValueError(f"Missing columns: {missing_columns}")
     
-    # Show products and types summary
-    products = combined_criteria['Product'].unique()
-    criteria_types = combined_criteria['Criteria Type'].unique()
+    # Имя файла нужно для TTL кэша Serper по файлу критериев (SERPER_CACHE_CONFIG)
+    df['Criteria File'] = filename
     
-    log_info(f"📊 Найдены продукты: {', '.join(products)}")
-    log_info(f"📊 Типы критериев: {', '.join(criteria_types)}")
+    log_info(f"✅ Загружено из {filename}: {len(df)} критериев")
+    return df
+
+# УМНАЯ ДЕДУПЛИКАЦИЯ General критериев
+def deduplicate_general_criteria(criteria_list):
+    """Remove duplicate and similar criteria"""
+    import re
+    
+    deduplicated = []
+    seen_patterns = []
+    
+    for criteria in criteria_list:
+        criteria_lower = criteria.lower()
+        
+        # Skip WAAP-specific criteria for non-WAAP analysis
+        if "waap" in criteria_lower or "special protocols" in criteria_lower:
+            log_debug(f"   ⚠️ Пропускаем WAAP-специфичный критерий: {criteria[:50]}...")
+            continue
+        
+        # Check for HQ/headquarters duplicates
+        is_hq_criteria = ("headquarter" in criteria_lower or "hq" in criteria_lower) and any(country in criteria_lower for country in ["china", "iran", "russia"])
+        
+        if is_hq_criteria:
+            # Check if we already have a similar HQ criteria
+            has_similar_hq = any("hq_criteria" in pattern for pattern in seen_patterns)
+            if has_similar_hq:
+                log_debug(f"   🔄 Пропускаем дублирующий HQ критерий: {criteria[:50]}...")
+                continue
+            else:
+                seen_patterns.append("hq_criteria")
+                deduplicated.append(criteria)
+                log_debug(f"   ✅ Добавлен HQ критерий: {criteria[:50]}...")
+        else:
+            # For non-HQ criteria, check for exact duplicates
+            if criteria not in deduplicated:
+                deduplicated.append(criteria)
+                log_debug(f"   ✅ Добавлен критерий: {criteria[:50]}...")
+            else:
+                log_debug(f"   🔄 Пропускаем дубликат: {criteria[:50]}...")
     
-    return combined_criteria
+    return deduplicated
+
+# Дедупликация General критериев зависит только от файлов критериев - результат хранится по версии каталога
+_general_criteria_cache = {}
+
+def _general_criteria(catalog_version, all_general_raw):
+    cached = _general_criteria_cache.get(catalog_version)
+    if cached is None:
+        _general_criteria_cache.clear()
+        cached = _general_criteria_cache[catalog_version] = deduplicate_general_criteria(all_general_raw)
+    return list(cached)
 
 def load_data(companies_file=None, load_all_companies=False, selected_products=None):
     """Load all data files - updated for ALL PRODUCTS processing
@@ -284,8 +335,9 @@ def load_data(companies_file=None, load_all_companies=False, selected_products=N
         
         log_info(f"✅ Итого загружено компаний: {len(companies_df)}")
         
-        # Load all criteria files automatically
-        df_criteria = load_all_criteria_files()
+        # Load all criteria files automatically (compiled criteria catalog)
+        catalog = load_criteria_catalog()
+        df_criteria = catalog.criteria.copy()
         
         # Фильтруем продукты если указаны выбранные
         all_available_products = df_criteria['Product'].unique()
@@ -303,46 +355,7 @@ def load_data(companies_file=None, load_all_companies=False, selected_products=N
         # ПРОСТОЕ ИСПРАВЛЕНИЕ: собираем General критерии от всех файлов, но потом будем считать только для выбранных
         all_general_raw = df_criteria[df_criteria["Criteria Type"] == "General"]["Criteria"].dropna().tolist()
         
-        # УМНАЯ ДЕДУПЛИКАЦИЯ General критериев
-        def deduplicate_general_criteria(criteria_list):
-            """Remove duplicate and similar criteria"""
-            import re
-            
-            deduplicated = []
-            seen_patterns = []
-            
-            for criteria in criteria_list:
-                criteria_lower = criteria.lower()
-                
-                # Skip WAAP-specific criteria for non-WAAP analysis
-                if "waap" in criteria_lower or "special protocols" in criteria_lower:
-                    log_debug(f"   ⚠️ Пропускаем WAAP-специфичный критерий: {criteria[:50]}...")
-                    continue
-                
-                # Check for HQ/headquarters duplicates
-                is_hq_criteria = ("headquarter" in criteria_lower or "hq" in criteria_lower) and any(country in criteria_lower for country in ["china", "iran", "russia"])
-                
-                if is_hq_criteria:
-                    # Check if we already have a similar HQ criteria
-                    has_similar_hq = any("hq_criteria" in pattern for pattern in seen_patterns)
-                    if has_similar_hq:
-                        log_debug(f"   🔄 Пропускаем дублирующий HQ критерий: {criteria[:50]}...")
-                        continue
-                    else:
-                        seen_patterns.append("hq_criteria")
-                        deduplicated.append(criteria)
-                        log_debug(f"   ✅ Добавлен HQ критерий: {criteria[:50]}...")
-                else:
-                    # For non-HQ criteria, check for exact duplicates
-                    if criteria not in deduplicated:
-                        deduplicated.append(criteria)
-                        log_debug(f"   ✅ Добавлен критерий: {criteria[:50]}...")
-                    else:
-                        log_debug(f"   🔄 Пропускаем дубликат: {criteria[:50]}...")
-            
-            return deduplicated
-        
-        all_general_criteria = deduplicate_general_criteria(all_general_raw)
+        all_general_criteria = _general_criteria(catalog.version, all_general_raw)
         log_info(f"✅ Найдено уникальных General критериев для выбранных продуктов: {len(all_general_criteria)} (было {len(all_general_raw)})")
         for i, criteria in enumerate(all_general_criteria, 1):
             log_info(f"   {i}. {criteria}")
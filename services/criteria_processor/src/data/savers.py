@@ -121,78 +121,77 @@ def save_results(results, product, timestamp=None, session_id=None, write_to_hub
             
             # Создаем клиент
             log_info("🔧 Создаем HubSpot клиент...")
-            hubspot_client = HubSpotClient(api_key=hubspot_api_key)
+            from src.external.project_modules import load_project_module
+            rate_limiter = load_project_module("rate_limiter.py").get_rate_limiter("hubspot")
+            hubspot_cache = load_project_module("hubspot_cache.py").get_hubspot_cache()
+            hubspot_cache_snapshot = hubspot_cache.snapshot()
+            hubspot_client = HubSpotClient(api_key=hubspot_api_key, rate_limiter=rate_limiter, cache=hubspot_cache)
             log_info("✅ HubSpot клиент создан успешно")
             
             stats = {"processed": 0, "updated": 0, "errors": 0, "skipped": 0}
             
             log_info(f"🔄 Начинаем обработку {len(results)} компаний...")
             
+            # Собираем ai_criteria всех компаний и отправляем их пакетами (batch/update)
+            updates = {}
+            company_names = {}
             for i, result in enumerate(results):
+                company_name = result.get("Company_Name", "")
                 try:
-                    company_name = result.get("Company_Name", "")
                     hubspot_company_id = result.get("HubSpot_Company_ID")
                     
-                    log_info(f"🏢 [{i+1}/{len(results)}] Обрабатываем: {company_name}")
-                    log_info(f"   🆔 HubSpot_Company_ID: {hubspot_company_id}")
-                    
                     if not company_name or not hubspot_company_id:
-                        log_info(f"   ⚠️ Пропускаем - отсутствует Company_Name или HubSpot_Company_ID")
+                        log_info(f"   ⚠️ [{i+1}/{len(results)}] Пропускаем - отсутствует Company_Name или HubSpot_Company_ID")
                         stats["skipped"] += 1
                         continue
                     
                     # Извлекаем ID из URL если нужно
-                    original_id = hubspot_company_id
                     if isinstance(hubspot_company_id, str) and "hubspot.com" in hubspot_company_id:
                         hubspot_company_id = hubspot_company_id.split("/")[-1]
-                        log_info(f"   🔗 Извлечен ID {hubspot_company_id} из URL {original_id}")
                     
                     # Подготавливаем данные для записи - ТОЛЬКО ai_criteria
                     criteria_data = result.get("All_Results", {})
-                    log_info(f"   📊 All_Results содержит {len(criteria_data)} продуктов: {list(criteria_data.keys())}")
-                    
-                    # Формируем данные для обновления
                     criteria_json = json.dumps(criteria_data, ensure_ascii=False, separators=(',', ':'))
-                    update_data = {
-                        "ai_criteria": criteria_json
-                    }
-                    log_info(f"   📝 Подготовлены данные для записи: ai_criteria ({len(criteria_json)} символов)")
-                    
-                    # Обновляем компанию в HubSpot синхронно
-                    log_info(f"   🚀 Отправляем данные в HubSpot для компании ID {hubspot_company_id}...")
-                    import asyncio
+                    updates[str(hubspot_company_id)] = {"ai_criteria": criteria_json}
+                    company_names[str(hubspot_company_id)] = company_name
                     
-                    # Простой способ запуска async функции
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
+                except Exception as e:
+                    log_info(f"   ❌ Ошибка обработки {company_name}: {e}")
+                    import traceback
+                    log_info(f"   📋 Traceback: {traceback.format_exc()}")
+                    stats["errors"] += 1
+            
+            if updates:
+                log_info(f"   🚀 Отправляем ai_criteria {len(updates)} компаний в HubSpot (пакетами по {HubSpotClient.BATCH_LIMIT})...")
+                import asyncio
+                
+                async def write_criteria():
                     try:
-                        success = loop.run_until_complete(
-                            hubspot_client.update_company_properties(hubspot_company_id, update_data)
-                        )
-                        log_info(f"   📡 HubSpot API вернул: {success}")
+                        return await hubspot_client.batch_update_companies(updates)
                     finally:
-                        loop.close()
-                    
+                        await hubspot_client.close()
+                
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                try:
+                    outcomes = loop.run_until_complete(write_criteria())
+                finally:
+                    loop.close()
+                
+                for company_id, success in outcomes.items():
                     if success:
-                        log_info(f"   ✅ {company_name}: критерии записаны в HubSpot")
                         stats["updated"] += 1
                     else:
-                        log_info(f"   ❌ {company_name}: ошибка записи в HubSpot")
+                        log_info(f"   ❌ {company_names[company_id]}: ошибка записи в HubSpot")
                         stats["errors"] += 1
-                    
                     stats["processed"] += 1
-                    
-                except Exception as e:
-                    log_info(f"   ❌ Ошибка обработки {company_name}: {e}")
-                    import traceback
-                    log_info(f"   📋 Traceback: {traceback.format_exc()}")
-                    stats["errors"] += 1
             
             log_info(f"🎉 HubSpot интеграция завершена:")
             log_info(f"   📊 Обработано: {stats['processed']}")
             log_info(f"   ✅ Обновлено: {stats['updated']}")
             log_info(f"   ❌ Ошибок: {stats['errors']}")
             log_info(f"   ⏭️ Пропущено: {stats['skipped']}")
+            log_info(f"   🗃️ Кэш поиска HubSpot: {hubspot_cache.get_stats(since=hubspot_cache_snapshot)}")
             
         except Exception as e:
             log_info(f"❌ КРИТИЧЕСКАЯ ОШИБКА HubSpot интеграции: {e}")
@@ -0,0 +1,90 @@
+"""
+Общие async ресурсы для движка анализа критериев
+Один aiohttp session и набор семафоров по провайдерам на event loop
+"""
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import aiohttp
+
+from src.external.openai_pool import close_async_openai_client
+from src.utils.config import ASYNC_ENGINE_CONFIG
+from src.utils.logging import log_debug
+
+
+class AsyncResources:
+    """
+    Ресурсы, привязанные к одному event loop
+
+    - http_session: общий aiohttp.ClientSession для Serper и ScrapingBee
+    - semaphores: лимиты одновременных запросов по провайдерам (openai, serper, scrapingbee)
+    """
+
+    def __init__(self, provider_limits: Dict[str, int]):
+        self.provider_limits = dict(provider_limits)
+        self.semaphores = {
+            provider: asyncio.Semaphore(limit)
+            for provider, limit in self.provider_limits.items()
+        }
+        self._http_session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def http_session(self) -> aiohttp.ClientSession:
+        if self._http_session is None or self._http_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=ASYNC_ENGINE_CONFIG['http_connection_limit'],
+                ttl_dns_cache=300
+            )
+            self._http_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=ASYNC_ENGINE_CONFIG['http_timeout'])
+            )
+            log_debug("🌐 Создан общий aiohttp session")
+        return self._http_session
+
+    def semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self.semaphores:
+            self.semaphores[provider] = asyncio.Semaphore(self.provider_limits.get(provider, 10))
+        return self.semaphores[provider]
+
+    async def close(self):
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
+
+
+_loop_resources = weakref.WeakKeyDictionary()
+
+
+def get_async_resources() -> AsyncResources:
+    """Ресурсы текущего event loop (создаются при первом обращении)"""
+    loop = asyncio.get_running_loop()
+    resources = _loop_resources.get(loop)
+    if resources is None:
+        resources = AsyncResources(ASYNC_ENGINE_CONFIG['provider_limits'])
+        _loop_resources[loop] = resources
+    return resources
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Общий aiohttp session текущего event loop"""
+    return get_async_resources().http_session
+
+
+@asynccontextmanager
+async def provider_slot(provider: str):
+    """Занять слот провайдера: async with provider_slot('serper'): ..."""
+    async with get_async_resources().semaphore(provider):
+        yield
+
+
+async def close_async_resources():
+    """Закрыть общий session и async OpenAI клиент текущего event loop (в конце прогона)"""
+    loop = asyncio.get_running_loop()
+    resources = _loop_resources.pop(loop, None)
+    if resources is not None:
+        await resources.close()
+    await close_async_openai_client()
@@ -12,8 +12,11 @@ import pandas as pd
 
 from src.utils.config import SCRAPINGBEE_API_KEY, SCRAPE_TOP_N_RESULTS, SMART_FILTERING_CONFIG
 from src.utils.logging import log_info, log_debug, log_error
-from src.utils.signals_processor import extract_signals_keywords, prioritize_content, clean_scraped_content, extract_content_metadata
-from src.external.scrapingbee_client import save_scrapingbee_result
+from src.utils.signals_processor import extract_signals_keywords, clean_scraped_content, extract_content_metadata
+from src.external.scrapingbee_client import save_scrapingbee_result, cached_page_text, apply_signals_filtering
+from src.external.page_store import store_page
+from src.external.async_resources import provider_slot
+from src.data.search_data_saver import save_scrapingbee_data
 
 
 class AsyncScrapingBeeClient:
@@ -21,20 +24,23 @@ class AsyncScrapingBeeClient:
     Асинхронный клиент для ScrapingBee API с поддержкой пакетной обработки
     """
     
-    def __init__(self, max_concurrent_requests=5, rate_limit_delay=0.2):
+    def __init__(self, max_concurrent_requests=5, rate_limit_delay=0.2, session: aiohttp.ClientSession = None):
         self.max_concurrent = max_concurrent_requests
         self.rate_limit_delay = rate_limit_delay
-        self.session = None
+        self.session = session
+        # Чужой (общий) session не закрываем при выходе
+        self._owns_session = session is None
         self.api_url = "https://app.scrapingbee.com/api/v1/"
     
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession()
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
     
     async def scrape_single_url_async(self, url: str, session_id: str, company_name: str, serper_query: str, criterion: pd.Series = None) -> str:
@@ -47,6 +53,10 @@ class AsyncScrapingBeeClient:
         
         log_debug(f"🐝 Async scraping URL: {url}")
         
+        cached_text = cached_page_text(url, session_id, company_name, serper_query)
+        if cached_text is not None:
+            return apply_signals_filtering(cached_text, criterion)
+        
         try:
             # Rate limiting
             await asyncio.sleep(self.rate_limit_delay)
@@ -59,58 +69,46 @@ class AsyncScrapingBeeClient:
                 "extract_rules": extract_rules_json,
             }
             
-            async with self.session.get(self.api_url, params=params, timeout=120) as response:
-                response.raise_for_status()
-                data = await response.json()
-                
-                # Save result using sync function (it's fast file I/O)
-                save_scrapingbee_result(session_id, company_name, url, {
-                    "status_code": response.status,
-                    "headers": dict(response.headers),
-                    "response_body": data
-                }, serper_query)
-                
-                scraped_text = data.get('text')
-                
-                if data.get("error"):
-                    log_error(f"❌ ScrapingBee API error for {url}: {data.get('message')}")
-                    return None
-                
-                if not scraped_text:
-                    log_debug(f"⚠️ Scraped content is empty for {url}")
-                    return None
-                
-                log_debug(f"✅ Async scraping successful, content length: {len(scraped_text)} chars")
-                
-                # Apply smart filtering if enabled and criterion provided
-                if SMART_FILTERING_CONFIG['enable_signals_prioritization'] and criterion is not None:
-                    signals_keywords = extract_signals_keywords(criterion)
-                    if signals_keywords:
-                        # Clean content first
-                        cleaned_content = clean_scraped_content(scraped_text)
-                        
-                        # Apply signals-based prioritization
-                        priority_content, structured_content = prioritize_content(cleaned_content, signals_keywords)
-                        
-                        if priority_content:
-                            log_info(f"🎯 Applied async signals filtering for {len(signals_keywords)} keywords")
-                            return structured_content
-                        else:
-                            log_debug("No priority content found, returning cleaned content")
-                            return cleaned_content
-                    else:
-                        log_debug("No signals keywords found, returning cleaned content")
-                        return clean_scraped_content(scraped_text)
-                else:
-                    # Basic cleaning without signals processing
-                    return clean_scraped_content(scraped_text)
-                
+            async with provider_slot('scrapingbee'):
+                async with self.session.get(self.api_url, params=params, timeout=aiohttp.ClientTimeout(total=120)) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+                    status_code = response.status
+                    headers = dict(response.headers)
+            
+            # Save result using sync function (it's fast file I/O)
+            save_scrapingbee_result(session_id, company_name, url, {
+                "status_code": status_code,
+                "headers": headers,
+                "response_body": data
+            }, serper_query)
+            
+            scraped_text = data.get('text')
+            
+            # Также сохраняем в markdown через SearchDataSaver
+            save_scrapingbee_data(company_name, url, scraped_text or "", serper_query, status_code)
+            
+            if data.get("error"):
+                log_error(f"❌ ScrapingBee API error for {url}: {data.get('message')}")
+                return None
+            
+            if not scraped_text:
+                log_debug(f"⚠️ Scraped content is empty for {url}")
+                return None
+            
+            log_debug(f"✅ Async scraping successful, content length: {len(scraped_text)} chars")
+            
+            cleaned_content = clean_scraped_content(scraped_text)
+            store_page(url, cleaned_content, status_code)
+            return apply_signals_filtering(cleaned_content, criterion)
+            
         except Exception as e:
             log_error(f"❌ Async scraping failed for {url}: {e}")
             save_scrapingbee_result(session_id, company_name, url, {
                 "status_code": "N/A",
                 "error": f"AsyncRequestException: {str(e)}"
             }, serper_query)
+            save_scrapingbee_data(company_name, url, "", serper_query, 0, f"AsyncRequestException: {str(e)}")
             return None
     
     async def scrape_multiple_urls_async(self, search_results: List[Dict], criterion: pd.Series, session_id: str, company_name: str, serper_query: str) -> str:
@@ -216,14 +214,24 @@ Scraping time: {elapsed:.2f}s
         return final_content
 
 
-async def async_scrape_multiple_urls_with_signals(search_results: List[Dict], criterion: pd.Series, session_id: str, company_name: str, serper_query: str, max_concurrent=5) -> str:
+async def async_scrape_multiple_urls_with_signals(search_results: List[Dict], criterion: pd.Series, session_id: str, company_name: str, serper_query: str, max_concurrent=5, session: aiohttp.ClientSession = None) -> str:
     """
     Публичная асинхронная функция для скрапинга нескольких URL
+    
+    session - общий aiohttp session (например из async_resources); если не передан, создается свой
     """
-    async with AsyncScrapingBeeClient(max_concurrent_requests=max_concurrent) as client:
+    async with AsyncScrapingBeeClient(max_concurrent_requests=max_concurrent, session=session) as client:
         return await client.scrape_multiple_urls_async(search_results, criterion, session_id, company_name, serper_query)
 
 
+async def scrape_website_text_async(url: str, session_id: str, company_name: str, serper_query: str, criterion: pd.Series = None, session: aiohttp.ClientSession = None) -> str:
+    """
+    Асинхронный аналог scrape_website_text для одного URL
+    """
+    async with AsyncScrapingBeeClient(rate_limit_delay=0, session=session) as client:
+        return await client.scrape_single_url_async(url, session_id, company_name, serper_query, criterion)
+
+
 def run_async_scrape_sync(search_results: List[Dict], criterion: pd.Series, session_id: str, company_name: str, serper_query: str, max_concurrent=5) -> str:
     """
     Синхронная обертка для асинхронного скрапинга
@@ -0,0 +1,240 @@
+"""
+Персистентный кэш ответов LLM (SQLite)
+Ключ - sha256 от (model, temperature, max_tokens, prompt), поэтому повторный
+запуск с неизмененными критериями не делает ни одного вызова OpenAI
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any
+
+from src.utils.config import LLM_CACHE_CONFIG
+from src.utils.logging import log_info, log_error, log_debug
+
+
+class LLMResponseCache:
+    """
+    Thread-safe кэш ответов LLM на SQLite
+
+    - TTL: записи старше ttl_seconds считаются промахом и удаляются при очистке
+    - Размер: при превышении max_entries удаляются давно не использованные записи
+    - Счетчики hits/misses/writes/evictions для метаданных сессии
+    - get_async/set_async - для корутин: запрос к SQLite выполняется в пуле потоков,
+      а не блокирует event loop
+    """
+
+    def __init__(self,
+                 cache_path: str,
+                 ttl_seconds: int = 30 * 24 * 3600,
+                 max_entries: int = 200000,
+                 eviction_check_interval: int = 500):
+        """
+        Args:
+            cache_path: Путь к файлу SQLite базы
+            ttl_seconds: Время жизни записи
+            max_entries: Максимальное количество записей
+            eviction_check_interval: Запускать очистку каждые N записей
+        """
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.eviction_check_interval = max(1, eviction_check_interval)
+
+        self._lock = threading.Lock()
+        self._writes_since_eviction = 0
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_responses_last_accessed ON llm_responses(last_accessed)"
+        )
+        self._conn.commit()
+
+        log_debug(f"🗄️ LLM cache открыт: {cache_path}")
+
+    @staticmethod
+    def make_key(model: str, temperature: float, max_tokens: int, prompt: str) -> str:
+        """Content-addressed ключ запроса"""
+        payload = json.dumps(
+            [model, float(temperature), int(max_tokens), prompt],
+            ensure_ascii=False, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, model: str, temperature: float, max_tokens: int, prompt: str) -> Optional[str]:
+        """Вернуть закэшированный ответ или None"""
+        key = self.make_key(model, temperature, max_tokens, prompt)
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                    self._stats["misses"] += 1
+                    return None
+
+                self._conn.execute(
+                    "UPDATE llm_responses SET last_accessed = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+                self._stats["hits"] += 1
+                return row[0]
+        except sqlite3.Error as e:
+            log_error(f"❌ Ошибка чтения LLM cache: {e}")
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, model: str, temperature: float, max_tokens: int, prompt: str, response: str):
+        """Сохранить ответ"""
+        key = self.make_key(model, temperature, max_tokens, prompt)
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, model, response, created_at, last_accessed) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, model, response, now, now)
+                )
+                self._conn.commit()
+                self._stats["writes"] += 1
+
+                self._writes_since_eviction += 1
+                if self._writes_since_eviction >= self.eviction_check_interval:
+                    self._writes_since_eviction = 0
+                    self._evict_locked(now)
+        except sqlite3.Error as e:
+            log_error(f"❌ Ошибка записи LLM cache: {e}")
+
+    async def get_async(self, model: str, temperature: float, max_tokens: int, prompt: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get, model, temperature, max_tokens, prompt)
+
+    async def set_async(self, model: str, temperature: float, max_tokens: int, prompt: str, response: str):
+        await asyncio.to_thread(self.set, model, temperature, max_tokens, prompt, response)
+
+    def evict(self):
+        """Удалить просроченные записи и записи сверх max_entries"""
+        try:
+            with self._lock:
+                self._evict_locked(time.time())
+        except sqlite3.Error as e:
+            log_error(f"❌ Ошибка очистки LLM cache: {e}")
+
+    def _evict_locked(self, now: float):
+        removed = 0
+        if self.ttl_seconds:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            removed += max(cursor.rowcount, 0)
+
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        overflow = count - self.max_entries
+        if self.max_entries and overflow > 0:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_responses WHERE key IN ("
+                "SELECT key FROM llm_responses ORDER BY last_accessed ASC LIMIT ?)",
+                (overflow,)
+            )
+            removed += max(cursor.rowcount, 0)
+
+        self._conn.commit()
+        if removed:
+            self._stats["evictions"] += removed
+            log_debug(f"🧹 LLM cache: удалено {removed} записей")
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий/промахов для метаданных сессии"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Глобальный инстанс кэша
+_global_llm_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Получить глобальный LLM cache (None если кэш отключен)"""
+    global _global_llm_cache
+
+    if not LLM_CACHE_CONFIG['enable_llm_cache']:
+        return None
+
+    if _global_llm_cache is None:
+        with _cache_lock:
+            if _global_llm_cache is None:
+                try:
+                    _global_llm_cache = LLMResponseCache(
+                        cache_path=LLM_CACHE_CONFIG['cache_path'],
+                        ttl_seconds=LLM_CACHE_CONFIG['ttl_seconds'],
+                        max_entries=LLM_CACHE_CONFIG['max_entries'],
+                        eviction_check_interval=LLM_CACHE_CONFIG['eviction_check_interval']
+                    )
+                    log_info(f"🗄️ LLM cache включен: {LLM_CACHE_CONFIG['cache_path']}")
+                except Exception as e:
+                    log_error(f"❌ Не удалось открыть LLM cache, работаем без кэша: {e}")
+                    LLM_CACHE_CONFIG['enable_llm_cache'] = False
+                    return None
+
+    return _global_llm_cache
+
+
+# Счетчики кэша общие для процесса (воркер движка выполняет много анализов) -
+# статистика сессии считается от снимка, сделанного при ее старте
+_session_baseline: Dict[str, Any] = {}
+
+
+def reset_llm_cache_stats():
+    """Начать отсчет статистики кэша для новой сессии"""
+    global _session_baseline
+    cache = get_llm_cache()
+    _session_baseline = cache.stats() if cache is not None else {}
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """Статистика кэша текущей сессии для записи в ее метаданные"""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    stats = cache.stats()
+    for key in ("hits", "misses", "writes", "evictions"):
+        stats[key] -= _session_baseline.get(key, 0)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    return {"enabled": True, **stats}
+
+
+def reset_llm_cache():
+    """Сброс глобального кэша (для тестов)"""
+    global _global_llm_cache, _session_baseline
+    with _cache_lock:
+        if _global_llm_cache is not None:
+            _global_llm_cache.close()
+        _global_llm_cache = None
+        _session_baseline = {}
@@ -2,75 +2,170 @@
 OpenAI API client with Circuit Breaker integration
 """
 
+import asyncio
 import time
-from openai import OpenAI
-from src.utils.config import OPENAI_API_KEY, CIRCUIT_BREAKER_CONFIG
+from src.external.openai_pool import openai_client_lease, get_async_openai_client
+from src.external.llm_cache import get_llm_cache
+from src.external.async_resources import provider_slot
+from src.utils.config import CIRCUIT_BREAKER_CONFIG, OPENAI_CLIENT_CONFIG
 from src.utils.logging import log_debug, log_error, log_info
 
-def get_openai_response(prompt, max_tokens=500, model="gpt-4o"):
-    """Get response from OpenAI API with Circuit Breaker and retry logic"""
+OPENAI_TEMPERATURE = 0.1
+OPENAI_MAX_RETRIES = 3
+
+
+def _get_cached_response(model, max_tokens, prompt):
+    """Identical prompts are answered from the persistent cache without an API call"""
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        cached = llm_cache.get(model, OPENAI_TEMPERATURE, max_tokens, prompt)
+        if cached is not None:
+            log_debug(f"🗄️ OpenAI ответ из кэша: {cached}")
+            return cached
+    return None
+
+
+def _store_cached_response(model, max_tokens, prompt, result):
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        llm_cache.set(model, OPENAI_TEMPERATURE, max_tokens, prompt, result)
+
+
+async def _get_cached_response_async(model, max_tokens, prompt):
+    """_get_cached_response for coroutines: the SQLite lookup runs off the event loop"""
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        cached = await llm_cache.get_async(model, OPENAI_TEMPERATURE, max_tokens, prompt)
+        if cached is not None:
+            log_debug(f"🗄️ OpenAI ответ из кэша: {cached}")
+            return cached
+    return None
+
+
+async def _store_cached_response_async(model, max_tokens, prompt, result):
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        await llm_cache.set_async(model, OPENAI_TEMPERATURE, max_tokens, prompt, result)
+
+
+def _acquire_circuit_breaker():
+    """Return the circuit breaker (or None if disabled); raise if it blocks execution"""
     # Import circuit breaker here to avoid circular imports
-    if CIRCUIT_BREAKER_CONFIG['enable_circuit_breaker']:
-        from src.utils.circuit_breaker import get_circuit_breaker, CircuitOpenException
-        circuit_breaker = get_circuit_breaker()
-        
-        # Check if circuit breaker allows execution
-        if not circuit_breaker.can_execute():
-            state_info = circuit_breaker.get_state_info()
-            retry_after = state_info.get('time_until_retry', 0)
-            raise CircuitOpenException(
-                f"🔴 Circuit Breaker OPEN - OpenAI запросы заблокированы на {retry_after:.1f}s", 
-                retry_after=retry_after
-            )
+    if not CIRCUIT_BREAKER_CONFIG['enable_circuit_breaker']:
+        return None
+
+    from src.utils.circuit_breaker import get_circuit_breaker, CircuitOpenException
+    circuit_breaker = get_circuit_breaker()
+
+    # Check if circuit breaker allows execution
+    if not circuit_breaker.can_execute():
+        state_info = circuit_breaker.get_state_info()
+        retry_after = state_info.get('time_until_retry', 0)
+        raise CircuitOpenException(
+            f"🔴 Circuit Breaker OPEN - OpenAI запросы заблокированы на {retry_after:.1f}s",
+            retry_after=retry_after
+        )
+    return circuit_breaker
+
+
+def _retry_delay(error, attempt, circuit_breaker):
+    """Record the failure and return seconds to wait before the next attempt (None = give up)"""
+    # Record failure in circuit breaker (only for rate limit errors)
+    if circuit_breaker:
+        is_rate_limit = circuit_breaker.record_failure(error)
+        if is_rate_limit:
+            log_error(f"🛡️ Rate limit ошибка записана в Circuit Breaker")
+
+    # Original retry logic with enhanced rate limit detection
+    error_str = str(error).lower()
+    is_rate_limit = any(keyword in error_str for keyword in
+                        CIRCUIT_BREAKER_CONFIG['rate_limit_keywords'])
+
+    if is_rate_limit and attempt < OPENAI_MAX_RETRIES - 1:
+        wait_time = (2 ** attempt) * 5
+        log_info(f"⏳ Rate limit detected - ждем {wait_time} секунд...")
+        return wait_time
+    elif attempt < OPENAI_MAX_RETRIES - 1:
+        log_error(f"⚠️ Попытка {attempt + 1} неудачна: {error}")
+        return 2
     else:
-        circuit_breaker = None
-    
-    max_retries = 3
-    
-    for attempt in range(max_retries):
+        log_error(f"❌ Ошибка OpenAI API после {OPENAI_MAX_RETRIES} попыток: {error}")
+        return None
+
+
+def get_openai_response(prompt, max_tokens=500, model=None):
+    """Get response from OpenAI API with Circuit Breaker and retry logic"""
+    model = model or OPENAI_CLIENT_CONFIG['default_model']
+    cached = _get_cached_response(model, max_tokens, prompt)
+    if cached is not None:
+        return cached
+
+    circuit_breaker = _acquire_circuit_breaker()
+
+    for attempt in range(OPENAI_MAX_RETRIES):
         try:
             log_debug(f"🤖 OpenAI запрос: {prompt[:100]}...")
-            
-            # Initialize client inside function
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                temperature=0.1
-            )
-            
+
+            # Shared pooled client - keep-alive connections reused across calls
+            with openai_client_lease(model) as client:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=OPENAI_TEMPERATURE
+                )
+
             result = response.choices[0].message.content.strip()
             log_debug(f"🤖 OpenAI ответ: {result}")
-            
+
+            _store_cached_response(model, max_tokens, prompt, result)
+
             # Record success in circuit breaker
             if circuit_breaker:
                 circuit_breaker.record_success()
-            
+
             return result
-            
+
         except Exception as e:
-            # Record failure in circuit breaker (only for rate limit errors)
+            wait_time = _retry_delay(e, attempt, circuit_breaker)
+            if wait_time is None:
+                raise
+            time.sleep(wait_time)
+
+
+async def get_openai_response_async(prompt, max_tokens=500, model=None):
+    """Async twin of get_openai_response: same cache, Circuit Breaker and retries, shared AsyncOpenAI client"""
+    model = model or OPENAI_CLIENT_CONFIG['default_model']
+    cached = await _get_cached_response_async(model, max_tokens, prompt)
+    if cached is not None:
+        return cached
+
+    circuit_breaker = _acquire_circuit_breaker()
+
+    for attempt in range(OPENAI_MAX_RETRIES):
+        try:
+            log_debug(f"🤖 OpenAI async запрос: {prompt[:100]}...")
+
+            async with provider_slot('openai'):
+                response = await get_async_openai_client(model).chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=OPENAI_TEMPERATURE
+                )
+
+            result = response.choices[0].message.content.strip()
+            log_debug(f"🤖 OpenAI ответ: {result}")
+
+            await _store_cached_response_async(model, max_tokens, prompt, result)
+
             if circuit_breaker:
-                is_rate_limit = circuit_breaker.record_failure(e)
-                if is_rate_limit:
-                    log_error(f"🛡️ Rate limit ошибка записана в Circuit Breaker")
-            
-            # Original retry logic with enhanced rate limit detection
-            error_str = str(e).lower()
-            is_rate_limit = any(keyword in error_str for keyword in 
-                              CIRCUIT_BREAKER_CONFIG['rate_limit_keywords'])
-            
-            if is_rate_limit and attempt < max_retries - 1:
-                wait_time = (2 ** attempt) * 5
-                log_info(f"⏳ Rate limit detected - ждем {wait_time} секунд...")
-                time.sleep(wait_time)
-                continue
-            elif attempt < max_retries - 1:
-                log_error(f"⚠️ Попытка {attempt + 1} неудачна: {e}")
-                time.sleep(2)
-                continue
-            else:
-                log_error(f"❌ Ошибка OpenAI API после {max_retries} попыток: {e}")
-                raise 
\ No newline at end of file
+                circuit_breaker.record_success()
+
+            return result
+
+        except Exception as e:
+            wait_time = _retry_delay(e, attempt, circuit_breaker)
+            if wait_time is None:
+                raise
+            await asyncio.sleep(wait_time)
@@ -0,0 +1,240 @@
+"""
+Общий реестр OpenAI клиентов с пулом keep-alive соединений
+Один sync клиент на процесс и один async клиент на event loop
+"""
+
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+from src.utils.config import OPENAI_API_KEY, OPENAI_CLIENT_CONFIG, OPENAI_MODEL_SETTINGS
+from src.utils.logging import log_info, log_debug
+
+
+class OpenAIClientRegistry:
+    """
+    Thread-safe реестр OpenAI клиентов
+
+    - Sync клиент общий для всех потоков (httpx.Client потокобезопасен)
+    - Async клиент создается отдельно для каждого event loop, т.к. соединения
+      httpx.AsyncClient привязаны к loop, в котором были открыты
+    - Для каждой модели возвращается копия клиента (with_options) с ее таймаутом
+      и ретраями, но с тем же пулом соединений
+    - Sync клиент, замененный в configure(), закрывается, как только завершатся
+      запросы, взятые через lease_client(); async клиент loop закрывается
+      close_async_client() в конце прогона на этом loop
+    """
+
+    def __init__(self, pool_size: Optional[int] = None):
+        self._lock = threading.RLock()
+        self._pool_size = pool_size or OPENAI_CLIENT_CONFIG['min_pool_size']
+        self._sync_client: Optional[OpenAI] = None
+        self._sync_model_clients = {}
+        # Клиенты, замененные в configure(): их запросы еще выполняются, закрываются после последнего
+        self._retired_sync_clients = []
+        # Базовый sync клиент -> число запросов в lease_client()
+        self._sync_in_flight = {}
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
+
+    def configure(self, max_concurrent_companies: int):
+        """
+        Подстроить размер пула под количество параллельных компаний
+
+        Args:
+            max_concurrent_companies: Количество одновременно обрабатываемых компаний
+        """
+        pool_size = max(
+            OPENAI_CLIENT_CONFIG['min_pool_size'],
+            max_concurrent_companies * OPENAI_CLIENT_CONFIG['connections_per_company']
+        )
+        with self._lock:
+            if pool_size == self._pool_size:
+                return
+            self._pool_size = pool_size
+            # Новый sync клиент создается с новым лимитом при следующем get_client();
+            # старый закрывается сразу или после последнего запроса в других потоках.
+            # Async клиенты подхватят новый размер на следующем event loop
+            idle = self._retire_sync_client()
+        self._close_clients(idle)
+        log_info(f"🔌 OpenAI пул соединений: {pool_size} (компаний параллельно: {max_concurrent_companies})")
+
+    def get_client(self, model: Optional[str] = None) -> OpenAI:
+        """
+        Получить sync клиент (с настройками модели если указана).
+        Запрос через клиент, полученный здесь, не защищен от закрытия при замене клиента -
+        для запросов используйте lease_client()
+        """
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = OpenAI(
+                    api_key=OPENAI_API_KEY,
+                    timeout=OPENAI_CLIENT_CONFIG['default_timeout'],
+                    max_retries=OPENAI_CLIENT_CONFIG['default_max_retries'],
+                    http_client=httpx.Client(limits=self._limits())
+                )
+                log_debug(f"🔌 Создан общий OpenAI клиент (pool={self._pool_size})")
+
+            if not model or model not in OPENAI_MODEL_SETTINGS:
+                return self._sync_client
+
+            client = self._sync_model_clients.get(model)
+            if client is None:
+                client = self._sync_client.with_options(**OPENAI_MODEL_SETTINGS[model])
+                self._sync_model_clients[model] = client
+            return client
+
+    @contextmanager
+    def lease_client(self, model: Optional[str] = None) -> Iterator[OpenAI]:
+        """
+        Sync клиент на время запроса: with registry.lease_client(model) as client: ...
+        Замененный в configure() клиент закрывается после выхода последнего запроса
+        """
+        with self._lock:
+            client = self.get_client(model)
+            base = self._sync_client
+            self._sync_in_flight[base] = self._sync_in_flight.get(base, 0) + 1
+        try:
+            yield client
+        finally:
+            idle = []
+            with self._lock:
+                # Счетчик мог быть сброшен в close()
+                remaining = self._sync_in_flight.pop(base, 1) - 1
+                if remaining:
+                    self._sync_in_flight[base] = remaining
+                elif base in self._retired_sync_clients:
+                    self._retired_sync_clients.remove(base)
+                    idle.append(base)
+            self._close_clients(idle)
+
+    def get_async_client(self, model: Optional[str] = None) -> AsyncOpenAI:
+        """Получить async клиент для текущего event loop (с настройками модели если указана)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                base_client = AsyncOpenAI(
+                    api_key=OPENAI_API_KEY,
+                    timeout=OPENAI_CLIENT_CONFIG['default_timeout'],
+                    max_retries=OPENAI_CLIENT_CONFIG['default_max_retries'],
+                    http_client=httpx.AsyncClient(limits=self._limits())
+                )
+                entry = {"base": base_client, "models": {}}
+                self._async_clients[loop] = entry
+                log_debug(f"🔌 Создан async OpenAI клиент для event loop (pool={self._pool_size})")
+
+            if not model or model not in OPENAI_MODEL_SETTINGS:
+                return entry["base"]
+
+            client = entry["models"].get(model)
+            if client is None:
+                client = entry["base"].with_options(**OPENAI_MODEL_SETTINGS[model])
+                entry["models"][model] = client
+            return client
+
+    async def close_async_client(self):
+        """Закрыть async клиент текущего event loop (в конце прогона на этом loop)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.pop(loop, None)
+        if entry is not None:
+            try:
+                await entry["base"].close()
+                log_debug("🔌 Закрыт async OpenAI клиент event loop")
+            except Exception:
+                pass
+
+    def close(self):
+        """Закрыть sync клиенты (текущий и замененные) и забыть async клиенты"""
+        with self._lock:
+            self._retire_sync_client()
+            retired, self._retired_sync_clients = self._retired_sync_clients, []
+            self._sync_in_flight = {}
+            self._async_clients = weakref.WeakKeyDictionary()
+        self._close_clients(retired)
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self._pool_size,
+            max_keepalive_connections=self._pool_size,
+            keepalive_expiry=OPENAI_CLIENT_CONFIG['keepalive_expiry']
+        )
+
+    def _retire_sync_client(self) -> list:
+        """Убрать текущий sync клиент; возвращает [клиент], если запросов нет и его можно закрыть сразу"""
+        client, self._sync_client = self._sync_client, None
+        self._sync_model_clients = {}
+        if client is None:
+            return []
+        if self._sync_in_flight.get(client):
+            self._retired_sync_clients.append(client)
+            return []
+        return [client]
+
+    @staticmethod
+    def _close_clients(clients):
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+
+# Глобальный инстанс реестра
+_global_registry: Optional[OpenAIClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> OpenAIClientRegistry:
+    """Получить глобальный реестр OpenAI клиентов (thread-safe singleton)"""
+    global _global_registry
+
+    if _global_registry is None:
+        with _registry_lock:
+            if _global_registry is None:
+                _global_registry = OpenAIClientRegistry()
+
+    return _global_registry
+
+
+def configure_openai_pool(max_concurrent_companies: int):
+    """Настроить размер пула соединений под max_concurrent_companies"""
+    get_client_registry().configure(max_concurrent_companies)
+
+
+def get_openai_client(model: Optional[str] = None) -> OpenAI:
+    """Общий sync OpenAI клиент"""
+    return get_client_registry().get_client(model)
+
+
+def openai_client_lease(model: Optional[str] = None):
+    """Общий sync OpenAI клиент на время запроса: with openai_client_lease(model) as client: ..."""
+    return get_client_registry().lease_client(model)
+
+
+def get_async_openai_client(model: Optional[str] = None) -> AsyncOpenAI:
+    """Общий async OpenAI клиент для текущего event loop"""
+    return get_client_registry().get_async_client(model)
+
+
+async def close_async_openai_client():
+    """Закрыть async OpenAI клиент текущего event loop"""
+    await get_client_registry().close_async_client()
+
+
+def reset_client_registry():
+    """Сброс глобального реестра (для тестов)"""
+    global _global_registry
+    with _registry_lock:
+        if _global_registry is not None:
+            _global_registry.close()
+        _global_registry = None
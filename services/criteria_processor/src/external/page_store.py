@@ -0,0 +1,43 @@
+"""
+Хранилище страниц ScrapingBee проекта (src/external_apis/page_cache.py в корне)
+
+Хранится уже очищенный текст страницы (clean_scraped_content), поэтому при попадании
+в кэш остается только фильтрация по Signals конкретного критерия.
+"""
+
+from src.external.project_modules import load_project_module, is_project_module_loaded
+from src.utils.config import SCRAPINGBEE_CACHE_CONFIG
+
+PAGE_CACHE_MODULE = "page_cache.py"
+PAGE_VARIANT = "criteria_text"
+
+
+def get_page_cache():
+    """Общий PageCache или None, если кэш отключен"""
+    if not SCRAPINGBEE_CACHE_CONFIG['enable_page_cache']:
+        return None
+    return load_project_module(PAGE_CACHE_MODULE).get_page_cache(
+        SCRAPINGBEE_CACHE_CONFIG['cache_path'],
+        default_ttl_seconds=SCRAPINGBEE_CACHE_CONFIG['ttl_seconds'],
+    )
+
+
+def get_cached_page(url):
+    """Очищенный текст страницы и статус из кэша: {"text", "status_code", ...} или None"""
+    cache = get_page_cache()
+    if cache is None:
+        return None
+    return cache.get(url, variant=PAGE_VARIANT)
+
+
+def store_page(url, cleaned_text, status_code):
+    cache = get_page_cache()
+    if cache is not None:
+        cache.set(url, cleaned_text, variant=PAGE_VARIANT, status_code=status_code)
+
+
+def get_page_cache_stats():
+    """Статистика хранилища или None, если ScrapingBee в этой сессии не использовался"""
+    if not is_project_module_loaded(PAGE_CACHE_MODULE) or not SCRAPINGBEE_CACHE_CONFIG['enable_page_cache']:
+        return None
+    return get_page_cache().stats()
@@ -0,0 +1,44 @@
+"""
+Загрузка модулей из src/external_apis корня проекта
+
+У criteria_processor свой пакет src, поэтому общие клиенты проекта загружаются по пути
+через importlib (как HubSpot клиент в src/data/savers.py) и регистрируются в sys.modules
+под отдельным именем, чтобы модуль и его общие объекты создавались один раз на процесс.
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+
+from src.utils.logging import log_debug
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+EXTERNAL_APIS_DIR = os.path.join(PROJECT_ROOT, "src", "external_apis")
+
+_lock = threading.Lock()
+
+
+def _module_name(filename):
+    return f"project_{os.path.splitext(filename)[0]}"
+
+
+def load_project_module(filename):
+    """Загрузить src/external_apis/<filename> корня проекта (один раз на процесс)"""
+    name = _module_name(filename)
+    module = sys.modules.get(name)
+    if module is None:
+        with _lock:
+            module = sys.modules.get(name)
+            if module is None:
+                path = os.path.join(EXTERNAL_APIS_DIR, filename)
+                spec = importlib.util.spec_from_file_location(name, path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                sys.modules[name] = module
+                log_debug(f"📦 Модуль проекта загружен: {path}")
+    return module
+
+
+def is_project_module_loaded(filename):
+    return _module_name(filename) in sys.modules
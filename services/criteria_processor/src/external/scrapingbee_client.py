@@ -15,6 +15,7 @@ from src.utils.signals_processor import (
 )
 from urllib.parse import urlparse
 from src.data.search_data_saver import save_scrapingbee_data
+from src.external.page_store import get_cached_page, store_page
 
 
 def _sanitize_filename(name: str) -> str:
@@ -74,6 +75,42 @@ def save_scrapingbee_result(session_id: str, company_name: str, url: str, result
     except Exception as e:
         log_error(f"Failed to save ScrapingBee log for {company_name}: {e}")
 
+def cached_page_text(url: str, session_id: str, company_name: str, serper_query: str) -> str | None:
+    """
+    Cleaned page text from the page store, or None on a miss.
+    A hit is still written to the session logs so search data stays complete.
+    """
+    cached = get_cached_page(url)
+    if cached is None or cached["text"] is None:
+        return None
+
+    log_debug(f"🗄️ Page cache hit: {url} ({len(cached['text'])} chars)")
+    save_scrapingbee_result(session_id, company_name, url, {
+        "status_code": cached["status_code"],
+        "response_body": {"text": cached["text"]}
+    }, serper_query)
+    save_scrapingbee_data(company_name, url, cached["text"], serper_query, cached["status_code"])
+    return cached["text"]
+
+def apply_signals_filtering(cleaned_content: str, criterion: pd.Series = None) -> str:
+    """Prioritize cleaned page content by the criterion's Signals keywords (if enabled)"""
+    if not SMART_FILTERING_CONFIG['enable_signals_prioritization'] or criterion is None:
+        # Basic cleaning without signals processing
+        return cleaned_content
+
+    signals_keywords = extract_signals_keywords(criterion)
+    if not signals_keywords:
+        log_debug("No signals keywords found, returning cleaned content")
+        return cleaned_content
+
+    priority_content, structured_content = prioritize_content(cleaned_content, signals_keywords)
+    if priority_content:
+        log_info(f"🎯 Applied signals filtering for {len(signals_keywords)} keywords")
+        return structured_content
+
+    log_debug("No priority content found, returning cleaned content")
+    return cleaned_content
+
 def scrape_website_text(url: str, session_id: str, company_name: str, serper_query: str, criterion: pd.Series = None) -> str | None:
     """
     Scrapes the text content of a given URL using the ScrapingBee API with Signals-based smart filtering.
@@ -96,6 +133,10 @@ def scrape_website_text(url: str, session_id: str, company_name: str, serper_que
         return None
 
     log_debug(f"🐝 Scraping URL: {url} for {company_name}")
+    cached_text = cached_page_text(url, session_id, company_name, serper_query)
+    if cached_text is not None:
+        return apply_signals_filtering(cached_text, criterion)
+
     response = None
     try:
         # The 'extract_rules' parameter must be a JSON-encoded string.
@@ -137,28 +178,9 @@ def scrape_website_text(url: str, session_id: str, company_name: str, serper_que
 
         log_debug(f"✅ Raw scraping successful, content length: {len(scraped_text)} chars")
         
-        # Apply smart filtering if enabled and criterion provided
-        if SMART_FILTERING_CONFIG['enable_signals_prioritization'] and criterion is not None:
-            signals_keywords = extract_signals_keywords(criterion)
-            if signals_keywords:
-                # Clean content first
-                cleaned_content = clean_scraped_content(scraped_text)
-                
-                # Apply signals-based prioritization
-                priority_content, structured_content = prioritize_content(cleaned_content, signals_keywords)
-                
-                if priority_content:
-                    log_info(f"🎯 Applied signals filtering for {len(signals_keywords)} keywords")
-                    return structured_content
-                else:
-                    log_debug("No priority content found, returning cleaned content")
-                    return cleaned_content
-            else:
-                log_debug("No signals keywords found, returning cleaned content")
-                return clean_scraped_content(scraped_text)
-        else:
-            # Basic cleaning without signals processing
-            return clean_scraped_content(scraped_text)
+        cleaned_content = clean_scraped_content(scraped_text)
+        store_page(url, cleaned_content, response.status_code)
+        return apply_signals_filtering(cleaned_content, criterion)
 
     except requests.exceptions.RequestException as e:
         log_error(f"❌ Failed to scrape {url}: {e}")
@@ -6,10 +6,14 @@ import os
 import re
 import time
 import json
-import requests
-from src.utils.config import SERPER_API_KEY, SERPER_API_URL, SERPER_MAX_RETRIES, SERPER_RETRY_DELAY, DEBUG_SERPER, OUTPUT_DIR, USE_SCRAPINGBEE_DEEP_ANALYSIS, SCRAPE_TOP_N_RESULTS
+import asyncio
+from src.utils.config import SERPER_MAX_RETRIES, TOKEN_BUDGET_CONFIG, OPENAI_CLIENT_CONFIG, DEBUG_SERPER, OUTPUT_DIR, USE_SCRAPINGBEE_DEEP_ANALYSIS, SCRAPE_TOP_N_RESULTS
 from src.utils.logging import log_info, log_error, log_debug
 from src.external.scrapingbee_client import scrape_website_text
+from src.external.async_scrapingbee import scrape_website_text_async
+from src.external.async_resources import get_http_session, provider_slot
+from src.external.shared_serper import get_serper_client
+from src.utils.token_budget import ContextBudget
 from src.data.search_data_saver import save_serper_search_data
 
 def save_serper_result(session_id, company_name, query, data):
@@ -41,7 +45,7 @@ def save_serper_result(session_id, company_name, query, data):
     except Exception as e:
         log_error(f"Failed to save Serper result for session {session_id}: {e}")
 
-def perform_google_search(query, session_id=None, company_name=None, retries=None):
+def perform_google_search(query, session_id=None, company_name=None, retries=None, cache_ttl=None):
     """
     Perform a Google search using the serper.dev API
     
@@ -50,66 +54,66 @@ def perform_google_search(query, session_id=None, company_name=None, retries=Non
         session_id (str, optional): The session ID for saving results.
         company_name (str, optional): The company name for saving results.
         retries (int, optional): Number of retries if API call fails. Defaults to config value.
+        cache_ttl (float, optional): Max age of a cached response in seconds. Defaults to SERPER_CACHE_CONFIG.
     
     Returns:
         dict: Search results in JSON format or None if failed
     """
-    retries = retries or SERPER_MAX_RETRIES
-    headers = {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "q": query,
-        "gl": "us",  # Set geography to US by default
-        "hl": "en",  # Set language to English
-        "num": 10    # Number of results to return
-    }
+    start_time = time.time()
+    log_debug(f"🔎 Searching: {query}")
+    
+    # Общий клиент: кэш запросов, объединение одинаковых запросов разных компаний, пул соединений и повторы
+    response_json = get_serper_client().search(query, ttl_seconds=cache_ttl, max_retries=retries or SERPER_MAX_RETRIES)
+    return _finish_search(query, session_id, company_name, response_json, start_time)
+
+async def perform_google_search_async(query, session_id=None, company_name=None, retries=None, cache_ttl=None):
+    """
+    Async version of perform_google_search for the asyncio engine.
+    Uses the shared aiohttp session and the 'serper' provider limit.
     
+    Returns:
+        dict: Search results in JSON format or None if failed
+    """
     start_time = time.time()
-    for attempt in range(retries):
-        try:
-            log_debug(f"🔎 Searching: {query}")
-            response = requests.post(SERPER_API_URL, headers=headers, json=payload)
-            response_time = time.time() - start_time
-            
-            # Raise an exception for 4XX/5XX responses
-            response.raise_for_status()
-            
-            response_json = response.json()
-            log_debug(f"✅ Search successful! Response time: {response_time:.2f} seconds")
-            
-            if session_id and company_name:
-                save_serper_result(session_id, company_name, query, response_json)
-                # Также сохраняем в markdown через SearchDataSaver
-                save_serper_search_data(company_name, query, response_json)
-            
-            # Debug output if enabled
-            if DEBUG_SERPER:
-                log_debug(f"\n===== SERPER.DEV RESPONSE =====")
-                log_debug(f"💡 Search Query: {query}")
-                log_debug(f"📊 Response status: {response.status_code}")
-                log_debug(f"📄 Response size: {len(response.content)} bytes")
-                
-                if "organic" in response_json:
-                    log_debug(f"📊 Found {len(response_json['organic'])} organic results")
-                    for i, result in enumerate(response_json["organic"][:3]):  # Show first 3 results
-                        log_debug(f"  {i+1}. {result.get('title', 'No title')}")
-                        log_debug(f"     URL: {result.get('link', 'No link')}")
-                        snippet = result.get('snippet', 'No snippet')
-                        log_debug(f"     Snippet: {snippet[:100]}..." if len(snippet) > 100 else f"     Snippet: {snippet}")
-                log_debug(f"=================================\n")
-            
-            return response_json
-        except requests.exceptions.RequestException as e:
-            log_error(f"⚠️ Serper API request failed (attempt {attempt + 1}/{retries}): {e}")
-            if attempt < retries - 1:
-                log_debug(f"Retrying in {SERPER_RETRY_DELAY} seconds...")
-                time.sleep(SERPER_RETRY_DELAY)
-            else:
-                log_error("❌ All retries failed. Could not get search results.")
-                return None
+    log_debug(f"🔎 Async searching: {query}")
+    
+    async with provider_slot('serper'):
+        response_json = await get_serper_client().search_async(
+            query, session=get_http_session(), ttl_seconds=cache_ttl, max_retries=retries or SERPER_MAX_RETRIES
+        )
+    return _finish_search(query, session_id, company_name, response_json, start_time)
+
+def _finish_search(query, session_id, company_name, response_json, start_time):
+    if response_json is None:
+        log_error(f"❌ All retries failed. Could not get search results for: {query}")
+        return None
+    
+    log_debug(f"✅ Search successful! Response time: {time.time() - start_time:.2f} seconds")
+    _handle_serper_response(query, session_id, company_name, response_json, 200, len(json.dumps(response_json)))
+    return response_json
+
+def _handle_serper_response(query, session_id, company_name, response_json, status_code, content_length):
+    """Save a successful Serper response and print debug output"""
+    if session_id and company_name:
+        save_serper_result(session_id, company_name, query, response_json)
+        # Также сохраняем в markdown через SearchDataSaver
+        save_serper_search_data(company_name, query, response_json)
+    
+    # Debug output if enabled
+    if DEBUG_SERPER:
+        log_debug(f"\n===== SERPER.DEV RESPONSE =====")
+        log_debug(f"💡 Search Query: {query}")
+        log_debug(f"📊 Response status: {status_code}")
+        log_debug(f"📄 Response size: {content_length} bytes")
+        
+        if "organic" in response_json:
+            log_debug(f"📊 Found {len(response_json['organic'])} organic results")
+            for i, result in enumerate(response_json["organic"][:3]):  # Show first 3 results
+                log_debug(f"  {i+1}. {result.get('title', 'No title')}")
+                log_debug(f"     URL: {result.get('link', 'No link')}")
+                snippet = result.get('snippet', 'No snippet')
+                log_debug(f"     Snippet: {snippet[:100]}..." if len(snippet) > 100 else f"     Snippet: {snippet}")
+        log_debug(f"=================================\n")
 
 def extract_website_from_company(company_info):
     """
@@ -183,7 +187,7 @@ def format_search_query(query_template, website):
     log_debug(f"📝 Formatted query: {formatted_query}")
     return formatted_query
 
-def get_information_for_criterion(company_info, place, search_query=None, session_id=None, use_deep_analysis=False):
+def get_information_for_criterion(company_info, place, search_query=None, session_id=None, use_deep_analysis=False, cache_ttl=None):
     """
     Get information for evaluating a criterion based on its "Place" value
     
@@ -193,6 +197,7 @@ def get_information_for_criterion(company_info, place, search_query=None, sessio
         search_query (str, optional): The search query template to use if place is "website"
         session_id (str, optional): The session ID for saving results.
         use_deep_analysis (bool, optional): Whether to use deep analysis
+        cache_ttl (float, optional): Serper cache TTL for this criterion (see serper_cache_ttl)
     
     Returns:
         tuple: (information_text, source_description)
@@ -202,13 +207,88 @@ def get_information_for_criterion(company_info, place, search_query=None, sessio
     description = company_info.get("Description", "")
     company_name = company_info.get("Company_Name", "Unknown Company")
     
+    formatted_query, fallback = _resolve_search_query(company_info, place, search_query)
+    if fallback:
+        return fallback
+    
+    # Perform the search
+    search_results = perform_google_search(formatted_query, session_id=session_id, company_name=company_name, cache_ttl=cache_ttl)
+    
+    if not search_results:
+        log_debug(f"ℹ️ Search failed for {company_name}, using general description instead")
+        return description, "General Description (search failed)"
+    
+    # --- DEEP ANALYSIS LOGIC ---
+    if use_deep_analysis:
+        log_info(f"🐝 Starting deep analysis for '{formatted_query}'...")
+        
+        scraped_texts = []
+        for link in _links_to_scrape(search_results):
+            scraped_content = scrape_website_text(link, session_id=session_id, company_name=company_name, serper_query=formatted_query)
+            if scraped_content:
+                scraped_texts.append(f"--- CONTENT FROM {link} ---\n\n{scraped_content}")
+        
+        if scraped_texts:
+            return _combine_scraped_information(formatted_query, scraped_texts, description)
+    
+    # If deep analysis was not performed or failed, use search snippets
+    return _snippets_information(search_results)
+
+async def get_information_for_criterion_async(company_info, place, search_query=None, session_id=None, use_deep_analysis=False, cache_ttl=None):
+    """
+    Async version of get_information_for_criterion for the asyncio engine.
+    Deep analysis scrapes the top results concurrently over the shared session.
+    """
+    description = company_info.get("Description", "")
+    company_name = company_info.get("Company_Name", "Unknown Company")
+    
+    formatted_query, fallback = _resolve_search_query(company_info, place, search_query)
+    if fallback:
+        return fallback
+    
+    search_results = await perform_google_search_async(formatted_query, session_id=session_id, company_name=company_name, cache_ttl=cache_ttl)
+    
+    if not search_results:
+        log_debug(f"ℹ️ Search failed for {company_name}, using general description instead")
+        return description, "General Description (search failed)"
+    
+    if use_deep_analysis:
+        log_info(f"🐝 Starting deep analysis for '{formatted_query}'...")
+        
+        links = _links_to_scrape(search_results)
+        session = get_http_session()
+        contents = await asyncio.gather(*[
+            scrape_website_text_async(link, session_id, company_name, formatted_query, session=session)
+            for link in links
+        ])
+        scraped_texts = [
+            f"--- CONTENT FROM {link} ---\n\n{content}"
+            for link, content in zip(links, contents) if content
+        ]
+        
+        if scraped_texts:
+            return _combine_scraped_information(formatted_query, scraped_texts, description)
+    
+    return _snippets_information(search_results)
+
+def _resolve_search_query(company_info, place, search_query):
+    """
+    Decide where the information for a criterion comes from.
+    
+    Returns:
+        tuple: (formatted_query, None) when a web search is needed,
+               (None, (information_text, source_description)) otherwise
+    """
+    description = company_info.get("Description", "")
+    company_name = company_info.get("Company_Name", "Unknown Company")
+    
     # Convert place to string and lowercase for consistent comparison
     place_str = str(place).lower() if place is not None else ""
     
     # If place is empty or gen_descr, use the general description
     if not place_str or place_str == "gen_descr":
         log_debug(f"🔍 Using general description for criterion evaluation")
-        return description, "General Description"
+        return None, (description, "General Description")
     
     # If place is website and we have a search query, do a web search
     elif place_str == "website" and search_query:
@@ -219,50 +299,43 @@ def get_information_for_criterion(company_info, place, search_query=None, sessio
         
         if not website:
             log_debug(f"ℹ️ No valid website found for {company_name}, using general description instead")
-            return description, "General Description (website not available)"
+            return None, (description, "General Description (website not available)")
         
         # Format the search query
-        formatted_query = format_search_query(search_query, website)
-        
-        # Perform the search
-        search_results = perform_google_search(formatted_query, session_id=session_id, company_name=company_name)
-        
-        if not search_results:
-            log_debug(f"ℹ️ Search failed for {company_name}, using general description instead")
-            return description, "General Description (search failed)"
-        
-                # --- DEEP ANALYSIS LOGIC ---
-        if use_deep_analysis:
-            log_info(f"🐝 Starting deep analysis for '{formatted_query}'...")
-            
-            scraped_texts = []
-            links_to_scrape = [result['link'] for result in search_results.get('organic', [])[:SCRAPE_TOP_N_RESULTS]]
-            
-            for link in links_to_scrape:
-                scraped_content = scrape_website_text(link, session_id=session_id, company_name=company_name, serper_query=formatted_query)
-                if scraped_content:
-                    scraped_texts.append(f"--- CONTENT FROM {link} ---\n\n{scraped_content}")
-
-            if scraped_texts:
-                scraped_info = "\n\n".join(scraped_texts)
-                combined_information = (
-                    f"SCRAPED CONTENT FOR: {formatted_query}\n\n"
-                    f"{scraped_info}\n\n"
-                    f"GENERAL DESCRIPTION:\n{description}"
-                )
-                log_info(f"✅ Deep analysis complete. Total scraped length: {len(scraped_info)} chars")
-                return combined_information, f"Deep Analysis of top {len(scraped_texts)} search results"
-        
-        # If deep analysis was not performed or failed, use search snippets
-        log_info(f"Using search snippets for criterion evaluation")
-        
-        # --- SNIPPET ANALYSIS (FALLBACK) ---
-        search_snippets = [result.get('snippet', '') for result in search_results.get('organic', [])]
-        combined_snippets = "\n".join(search_snippets)
-        
-        source_description = "Google Search Snippets"
-        log_debug(f"🔍 Using {source_description} for criterion evaluation")
-        return combined_snippets, source_description
+        return format_search_query(search_query, website), None
     
     # Fallback for any other case
-    return description, "General Description (fallback)" 
\ No newline at end of file
+    return None, (description, "General Description (fallback)")
+
+def _links_to_scrape(search_results):
+    return [result['link'] for result in search_results.get('organic', [])[:SCRAPE_TOP_N_RESULTS]]
+
+def _combine_scraped_information(formatted_query, scraped_texts, description):
+    scraped_info = "\n\n".join(scraped_texts)
+    if TOKEN_BUDGET_CONFIG['enable_token_budget']:
+        # Описание упаковывается первым, текст страниц получает остаток бюджета
+        # (бюджет и токенизатор - модели get_structured_response)
+        budget = ContextBudget(OPENAI_CLIENT_CONFIG['default_model'])
+        budget.add("description", description, header="GENERAL DESCRIPTION:\n",
+                   max_tokens=TOKEN_BUDGET_CONFIG['section_limits']['description'])
+        budget.add("page_text", scraped_info, header=f"SCRAPED CONTENT FOR: {formatted_query}\n\n")
+        combined_information = budget.render(separator="\n\n", order=["page_text", "description"])
+    else:
+        combined_information = (
+            f"SCRAPED CONTENT FOR: {formatted_query}\n\n"
+            f"{scraped_info}\n\n"
+            f"GENERAL DESCRIPTION:\n{description}"
+        )
+    log_info(f"✅ Deep analysis complete. Total scraped length: {len(scraped_info)} chars")
+    return combined_information, f"Deep Analysis of top {len(scraped_texts)} search results"
+
+def _snippets_information(search_results):
+    log_info(f"Using search snippets for criterion evaluation")
+    
+    # --- SNIPPET ANALYSIS (FALLBACK) ---
+    search_snippets = [result.get('snippet', '') for result in search_results.get('organic', [])]
+    combined_snippets = "\n".join(search_snippets)
+    
+    source_description = "Google Search Snippets"
+    log_debug(f"🔍 Using {source_description} for criterion evaluation")
+    return combined_snippets, source_description
@@ -0,0 +1,42 @@
+"""
+Общий Serper клиент проекта (src/external_apis/serper_client.py в корне)
+
+Кэш, объединение одинаковых запросов, пул соединений и ограничитель скорости
+(src/external_apis/rate_limiter.py) общие для всех компаний сессии.
+"""
+
+from src.external.project_modules import load_project_module, is_project_module_loaded
+from src.utils.config import SERPER_API_KEY, SERPER_MAX_RETRIES, SERPER_RETRY_DELAY, SERPER_CACHE_CONFIG
+
+SERPER_CLIENT_MODULE = "serper_client.py"
+RATE_LIMITER_MODULE = "rate_limiter.py"
+
+
+def get_serper_client():
+    """Общий SerperClient, настроенный по SERPER_CACHE_CONFIG"""
+    cache_path = SERPER_CACHE_CONFIG['cache_path'] if SERPER_CACHE_CONFIG['enable_serper_cache'] else None
+    rate_limiter = None
+    if SERPER_CACHE_CONFIG['enable_rate_limiter']:
+        rate_limiter = load_project_module(RATE_LIMITER_MODULE).get_rate_limiter("serper")
+    return load_project_module(SERPER_CLIENT_MODULE).get_serper_client(
+        SERPER_API_KEY,
+        cache_path=cache_path,
+        default_ttl_seconds=SERPER_CACHE_CONFIG['default_ttl_seconds'],
+        max_retries=SERPER_MAX_RETRIES,
+        backoff_seconds=SERPER_RETRY_DELAY,
+        pool_size=SERPER_CACHE_CONFIG['pool_size'],
+        rate_limiter=rate_limiter,
+    )
+
+
+def serper_cache_ttl(row):
+    """TTL кэша для критерия: по имени его файла критериев или None (значение по умолчанию)"""
+    criteria_file = row.get("Criteria File") if row is not None else None
+    return SERPER_CACHE_CONFIG['ttl_by_criteria_file'].get(criteria_file)
+
+
+def get_serper_cache_stats():
+    """Статистика клиента или None, если Serper в этой сессии не использовался"""
+    if not is_project_module_loaded(SERPER_CLIENT_MODULE):
+        return None
+    return get_serper_client().stats()
@@ -5,16 +5,19 @@
 import asyncio
 import pandas as pd
 import openai
-from openai import AsyncOpenAI
 import re
 from typing import List, Tuple, Dict, Any
 from concurrent.futures import ThreadPoolExecutor
 
 from src.utils.logging import log_info, log_debug, log_error
-from src.external.serper import perform_google_search, save_serper_result, format_search_query
+from src.external.serper import perform_google_search_async, save_serper_result, format_search_query
 from src.external.scrapingbee_client import scrape_multiple_urls_with_signals
-from src.external.async_scrapingbee import run_async_scrape_sync
+from src.external.async_scrapingbee import async_scrape_multiple_urls_with_signals
+from src.external.async_resources import get_http_session, provider_slot, close_async_resources
+from src.external.openai_pool import get_async_openai_client
+from src.external.llm_cache import get_llm_cache
 from src.utils.signals_processor import extract_signals_keywords
+from src.utils.token_budget import pack_criterion_context, log_criterion_tokens
 from src.utils.config import ASYNC_SCRAPING_CONFIG
 
 
@@ -23,11 +26,17 @@ class AsyncGPTAnalyzer:
     Асинхронный класс для анализа данных с помощью GPT с пакетной обработкой критериев
     """
     
+    model = "gpt-4-turbo"
+
     def __init__(self, session_id: str = None, max_concurrent_gpt_requests: int = 10):
-        self.client = AsyncOpenAI()
         self.session_id = session_id
         self.max_concurrent = max_concurrent_gpt_requests
         self.website = None
+
+    @property
+    def client(self):
+        """Общий async клиент для текущего event loop (пул соединений переиспользуется)"""
+        return get_async_openai_client(self.model)
     
     async def analyze_criteria_async(self, context: str, criteria_df: pd.DataFrame, website: str = None) -> dict:
         """
@@ -121,7 +130,9 @@ class AsyncGPTAnalyzer:
     async def _process_dynamic_criterion_async(self, company_name: str, criterion: pd.Series, context: str) -> Tuple[bool, str, str]:
         """Асинхронно обрабатывает один критерий, выполняя поиск и анализ если необходимо."""
         criterion_text = criterion['Criteria']
-        full_context = context
+        search_context = ""
+        scraped_text = ""
+        scraped_header = "--- Deep Analysis Content ---"
 
         if pd.notna(criterion.get('Search Query')):
             search_query_template = str(criterion['Search Query'])
@@ -143,29 +154,25 @@ class AsyncGPTAnalyzer:
             
             log_debug(f"🔍 Async dynamic search: {search_query}")
             
-            # Выполняем поиск в отдельном потоке (SERPER API синхронный)
-            loop = asyncio.get_event_loop()
-            search_response = await loop.run_in_executor(
-                None, perform_google_search, search_query, self.session_id, company_name
-            )
+            # Поиск через общий aiohttp session текущего loop
+            loop = asyncio.get_running_loop()
+            search_response = await perform_google_search_async(search_query, self.session_id, company_name)
             search_results = search_response.get('organic', []) if search_response else []
             
             if search_results:
-                search_context = "\\n".join([f"Title: {r.get('title', '')}\\nSnippet: {r.get('snippet', '')}" for r in search_results])
-                full_context += "\\n--- Dynamic Search Results ---\\n" + search_context
+                search_context = "\n".join([f"Title: {r.get('title', '')}\nSnippet: {r.get('snippet', '')}" for r in search_results])
 
                 if str(criterion.get('Deep Analysis')).lower() == 'true':
                     # Use async scraping
                     if ASYNC_SCRAPING_CONFIG['enable_async_scraping']:
                         log_info(f"🐝 Starting async deep analysis with signals for '{search_query}'...")
                         try:
-                            scraped_text = await loop.run_in_executor(
-                                None, run_async_scrape_sync,
+                            scraped_text = await async_scrape_multiple_urls_with_signals(
                                 search_results, criterion, self.session_id, company_name, search_query,
-                                ASYNC_SCRAPING_CONFIG['max_concurrent_scrapes']
+                                ASYNC_SCRAPING_CONFIG['max_concurrent_scrapes'],
+                                session=get_http_session()
                             )
-                            if scraped_text:
-                                full_context += "\\n--- Deep Analysis Content (Async) ---\\n" + scraped_text
+                            scraped_header = "--- Deep Analysis Content (Async) ---"
                         except Exception as e:
                             log_error(f"❌ Async scraping failed: {e}")
                             if ASYNC_SCRAPING_CONFIG['fallback_to_sync']:
@@ -174,22 +181,23 @@ class AsyncGPTAnalyzer:
                                     None, scrape_multiple_urls_with_signals,
                                     search_results, criterion, self.session_id, company_name, search_query
                                 )
-                                if scraped_text:
-                                    full_context += "\\n--- Deep Analysis Content (Sync Fallback) ---\\n" + scraped_text
+                                scraped_header = "--- Deep Analysis Content (Sync Fallback) ---"
                     else:
                         log_info(f"🐝 Starting sync deep analysis with signals for '{search_query}'...")
                         scraped_text = await loop.run_in_executor(
                             None, scrape_multiple_urls_with_signals,
                             search_results, criterion, self.session_id, company_name, search_query
                         )
-                        if scraped_text:
-                            full_context += "\\n--- Deep Analysis Content ---\\n" + scraped_text
+                        scraped_header = "--- Deep Analysis Content ---"
+        
+        # Контекст в бюджете токенов модели: совпадения Signals, описание, сниппеты, текст страниц
+        full_context, context_summary = pack_criterion_context(self.model, context, search_context, scraped_text, scraped_header)
         
         # Enhance prompt with signals context
         signals_keywords = extract_signals_keywords(criterion)
         signals_context = ""
         if signals_keywords:
-            signals_context = f"\\nKey signals to look for: {', '.join(signals_keywords)}"
+            signals_context = f"\nKey signals to look for: {', '.join(signals_keywords)}"
         
         prompt = f"""
         Context:
@@ -203,20 +211,31 @@ class AsyncGPTAnalyzer:
         Example: Yes, the company provides cloud services which aligns with the criterion.
         """
         
+        log_criterion_tokens(criterion_text, self.model, prompt, context_summary)
         response_text = await self._get_gpt_response_async(prompt)
         parsed_response = GPTResponse(response_text)
         return parsed_response.is_yes(), parsed_response.get_reason(), response_text
     
     async def _get_gpt_response_async(self, prompt: str) -> str:
         """Асинхронно отправляет запрос в GPT и возвращает текстовый ответ."""
+        llm_cache = get_llm_cache()
+        if llm_cache:
+            cached = await llm_cache.get_async(self.model, 0, 100, prompt)
+            if cached is not None:
+                return cached
+        
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0,
-                max_tokens=100
-            )
-            return response.choices[0].message.content.strip()
+            async with provider_slot('openai'):
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0,
+                    max_tokens=100
+                )
+            result = response.choices[0].message.content.strip()
+            if llm_cache:
+                await llm_cache.set_async(self.model, 0, 100, prompt, result)
+            return result
         except Exception as e:
             log_error(f"❌ Async OpenAI API error: {e}")
             return f"Error: {e}"
@@ -263,7 +282,11 @@ def run_async_gpt_analysis_sync(context: str, criteria_df: pd.DataFrame, session
     """
     async def _run_async_analysis():
         analyzer = AsyncGPTAnalyzer(session_id=session_id, max_concurrent_gpt_requests=max_concurrent)
-        return await analyzer.analyze_criteria_async(context, criteria_df, website)
+        try:
+            return await analyzer.analyze_criteria_async(context, criteria_df, website)
+        finally:
+            # Общий session привязан к этому loop - закрываем вместе с ним
+            await close_async_resources()
     
     # Run async function in new event loop
     try:
@@ -1,12 +1,14 @@
 import pandas as pd
 import openai
-from openai import OpenAI
 import re
 from src.utils.logging import log_info, log_debug, log_error
 from src.external.serper import perform_google_search, save_serper_result, format_search_query
 from src.external.scrapingbee_client import scrape_website_text, scrape_multiple_urls_with_signals
 from src.external.async_scrapingbee import run_async_scrape_sync
+from src.external.openai_pool import openai_client_lease
+from src.external.llm_cache import get_llm_cache
 from src.utils.signals_processor import extract_signals_keywords
+from src.utils.token_budget import pack_criterion_context, log_criterion_tokens
 from src.utils.config import ASYNC_SCRAPING_CONFIG
 from typing import Tuple
 
@@ -14,10 +16,16 @@ class GPTAnalyzer:
     """
     Класс для анализа данных с помощью GPT.
     """
+    model = "gpt-4-turbo"
+
     def __init__(self, session_id: str = None):
-        self.client = OpenAI()
         self.session_id = session_id
 
+    def client(self):
+        # Берется из реестра на каждый запрос: configure_openai_pool может заменить клиент,
+        # старый закрывается после выхода последнего запроса
+        return openai_client_lease(self.model)
+
     def analyze_criteria(self, context: str, criteria_df: pd.DataFrame, website: str = None) -> dict:
         """
         Итеративно проверяет соответствие компании критериям по разным продуктам и аудиториям.
@@ -84,7 +92,9 @@ class GPTAnalyzer:
     def _process_dynamic_criterion(self, company_name: str, criterion: pd.Series, context: str) -> Tuple[bool, str, str]:
         """Обрабатывает один критерий, выполняя поиск и анализ если необходимо."""
         criterion_text = criterion['Criteria']
-        full_context = context
+        search_context = ""
+        scraped_text = ""
+        scraped_header = "--- Deep Analysis Content ---"
 
         if pd.notna(criterion.get('Search Query')):
             search_query_template = str(criterion['Search Query'])
@@ -110,8 +120,7 @@ class GPTAnalyzer:
             search_results = search_response.get('organic', []) if search_response else []
             
             if search_results:
-                search_context = "\\n".join([f"Title: {r.get('title', '')}\\nSnippet: {r.get('snippet', '')}" for r in search_results])
-                full_context += "\\n--- Dynamic Search Results ---\\n" + search_context
+                search_context = "\n".join([f"Title: {r.get('title', '')}\nSnippet: {r.get('snippet', '')}" for r in search_results])
 
                 if str(criterion.get('Deep Analysis')).lower() == 'true':
                     # Use async or sync scraping based on configuration
@@ -122,8 +131,7 @@ class GPTAnalyzer:
                                 search_results, criterion, self.session_id, company_name, search_query, 
                                 max_concurrent=ASYNC_SCRAPING_CONFIG['max_concurrent_scrapes']
                             )
-                            if scraped_text:
-                                full_context += "\\n--- Deep Analysis Content (Async) ---\\n" + scraped_text
+                            scraped_header = "--- Deep Analysis Content (Async) ---"
                         except Exception as e:
                             log_error(f"❌ Async scraping failed: {e}")
                             if ASYNC_SCRAPING_CONFIG['fallback_to_sync']:
@@ -131,21 +139,22 @@ class GPTAnalyzer:
                                 scraped_text = scrape_multiple_urls_with_signals(
                                     search_results, criterion, self.session_id, company_name, search_query
                                 )
-                                if scraped_text:
-                                    full_context += "\\n--- Deep Analysis Content (Sync Fallback) ---\\n" + scraped_text
+                                scraped_header = "--- Deep Analysis Content (Sync Fallback) ---"
                     else:
                         log_info(f"🐝 Starting sync deep analysis with signals for '{search_query}'...")
                         scraped_text = scrape_multiple_urls_with_signals(
                             search_results, criterion, self.session_id, company_name, search_query
                         )
-                        if scraped_text:
-                            full_context += "\\n--- Deep Analysis Content ---\\n" + scraped_text
+                        scraped_header = "--- Deep Analysis Content ---"
+        
+        # Контекст в бюджете токенов модели: совпадения Signals, описание, сниппеты, текст страниц
+        full_context, context_summary = pack_criterion_context(self.model, context, search_context, scraped_text, scraped_header)
         
         # Enhance prompt with signals context
         signals_keywords = extract_signals_keywords(criterion)
         signals_context = ""
         if signals_keywords:
-            signals_context = f"\\nKey signals to look for: {', '.join(signals_keywords)}"
+            signals_context = f"\nKey signals to look for: {', '.join(signals_keywords)}"
         
         prompt = f"""
         Context:
@@ -159,6 +168,7 @@ class GPTAnalyzer:
         Example: Yes, the company provides cloud services which aligns with the criterion.
         """
         
+        log_criterion_tokens(criterion_text, self.model, prompt, context_summary)
         response_text = self._get_gpt_response(prompt)
         parsed_response = GPTResponse(response_text)
         return parsed_response.is_yes(), parsed_response.get_reason(), response_text
@@ -182,14 +192,24 @@ class GPTAnalyzer:
 
     def _get_gpt_response(self, prompt: str) -> str:
         """Отправляет запрос в GPT и возвращает текстовый ответ."""
+        llm_cache = get_llm_cache()
+        if llm_cache:
+            cached = llm_cache.get(self.model, 0, 100, prompt)
+            if cached is not None:
+                return cached
+        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0,
-                max_tokens=100
-            )
-            return response.choices[0].message.content.strip()
+            with self.client() as client:
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0,
+                    max_tokens=100
+                )
+            result = response.choices[0].message.content.strip()
+            if llm_cache:
+                llm_cache.set(self.model, 0, 100, prompt, result)
+            return result
         except Exception as e:
             log_error(f"Ошибка вызова OpenAI API: {e}")
             return f"Error: {e}"
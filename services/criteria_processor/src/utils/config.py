@@ -44,7 +44,9 @@ PROCESSING_CONFIG = {
     'use_general_desc_for_qualification': True,  # General description для квалификации
     'json_output_format': True,              # JSON структура вывода
     'calculate_nth_scores': True,            # Расчет скоров NTH
-    'exclude_on_mandatory_fail': True        # Исключать при провале mandatory
+    'exclude_on_mandatory_fail': True,       # Исключать при провале mandatory
+    'general_companies_per_request': 1,      # >1 = проверять General критерии для N компаний одним запросом
+    'mandatory_parallel_width': 1            # Async: сколько mandatory критериев проверять одновременно; >1 - спекуляция: после первого "Not Passed" запущенные шаги выбрасываются (лишние вызовы)
 }
 
 # Debug settings
@@ -88,6 +90,18 @@ ASYNC_GPT_CONFIG = {
     'fallback_to_sync': True                 # Fallback to sync GPT if async fails
 }
 
+# Единый asyncio движок (один event loop, общий aiohttp session и AsyncOpenAI клиент)
+ASYNC_ENGINE_CONFIG = {
+    'enable_async_engine': True,             # False = старый путь ThreadPoolExecutor + вложенные event loops
+    'provider_limits': {                     # Максимум одновременных запросов к каждому провайдеру
+        'openai': 24,
+        'serper': 10,
+        'scrapingbee': 8
+    },
+    'http_connection_limit': 50,             # Общий лимит соединений aiohttp session
+    'http_timeout': 120                      # Таймаут HTTP запросов (seconds)
+}
+
 # Circuit Breaker configuration для OpenAI API rate limiting
 CIRCUIT_BREAKER_CONFIG = {
     'enable_circuit_breaker': True,          # Мастер-переключатель Circuit Breaker
@@ -102,6 +116,74 @@ CIRCUIT_BREAKER_CONFIG = {
     'max_half_open_requests': 3              # Максимум тестовых запросов в HALF_OPEN состоянии
 }
 
+# Общий пул OpenAI клиентов (keep-alive соединения вместо нового клиента на каждый запрос)
+OPENAI_CLIENT_CONFIG = {
+    'connections_per_company': 2,            # Соединений в пуле на одну параллельную компанию
+    'min_pool_size': 10,                     # Минимальный размер пула соединений
+    'keepalive_expiry': 60,                  # Секунд держать простаивающее соединение открытым
+    'default_timeout': 60,                   # Таймаут запроса по умолчанию (seconds)
+    'default_max_retries': 2,                # Встроенные ретраи SDK по умолчанию
+    'default_model': os.getenv("OPENAI_CRITERIA_MODEL", "gpt-4o")  # Модель проверки критериев (get_structured_response) и токенизатор ее промптов
+}
+
+# Настройки по моделям (переопределяют значения по умолчанию из OPENAI_CLIENT_CONFIG)
+OPENAI_MODEL_SETTINGS = {
+    'gpt-4o': {'timeout': 60, 'max_retries': 2},
+    'gpt-4o-mini': {'timeout': 45, 'max_retries': 2},
+    'gpt-4-turbo': {'timeout': 90, 'max_retries': 2}
+}
+
+# Persistent LLM response cache (SQLite, content-addressed по model/temperature/max_tokens/prompt)
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+LLM_CACHE_CONFIG = {
+    'enable_llm_cache': True,                # Мастер-переключатель (отключается флагом --no-llm-cache)
+    'cache_path': os.path.join(CACHE_DIR, "llm_responses.sqlite"),
+    'ttl_seconds': 30 * 24 * 3600,           # Время жизни ответа (30 дней)
+    'max_entries': 200000,                   # Размер кэша, сверх которого удаляются давно не использованные записи
+    'eviction_check_interval': 500           # Проверять TTL/размер каждые N записей
+}
+
+SERPER_CACHE_CONFIG = {
+    'enable_serper_cache': True,             # Общий кэш Serper (src/external_apis/serper_client.py в корне проекта)
+    'cache_path': os.path.join(CACHE_DIR, "serper_responses.sqlite"),
+    'default_ttl_seconds': 7 * 24 * 3600,    # Время жизни ответа поиска (7 дней)
+    'ttl_by_criteria_file': {},              # Переопределение TTL по имени файла критериев, например {"criteria_news.csv": 86400}
+    'pool_size': 20,                         # Размер пула соединений requests.Session
+    'enable_rate_limiter': True              # Общий ограничитель скорости (src/external_apis/rate_limiter.py), лимиты через RATE_LIMIT_SERPER_*
+}
+
+# Скомпилированный каталог критериев (src/data/criteria_catalog.py): снапшот разобранных файлов criteria/
+CRITERIA_CATALOG_PATH = os.path.join(CACHE_DIR, "criteria_catalog.pkl")
+
+SCRAPINGBEE_CACHE_CONFIG = {
+    'enable_page_cache': True,               # Хранилище страниц ScrapingBee (src/external_apis/page_cache.py в корне проекта)
+    'cache_path': os.path.join(CACHE_DIR, "scrapingbee_pages.sqlite"),
+    'ttl_seconds': 14 * 24 * 3600            # Время жизни страницы (14 дней)
+}
+
+# Журнал прогресса сессии (src/utils/progress_journal.py): события дописываются в {session}_progress.jsonl,
+# снапшот {session}_progress.json перезаписывается только при компактификации
+PROGRESS_JOURNAL_CONFIG = {
+    'compact_every_events': 500,             # Компактифицировать журнал в снапшот каждые N событий
+    'fsync': False                           # os.fsync после каждого события (надежнее, но медленнее)
+}
+
+# Бюджет токенов контекста промптов критериев (src/utils/token_budget.py)
+TOKEN_BUDGET_CONFIG = {
+    'enable_token_budget': True,             # False - контекст не обрезается, токены только логируются
+    'default_context_budget': 8000,          # Токенов контекста, если модели нет в model_context_budgets
+    'model_context_budgets': {
+        'gpt-4o': 12000,
+        'gpt-4o-mini': 12000,
+        'gpt-4-turbo': 12000
+    },
+    'section_limits': {                      # Лимиты секций; текст страниц получает остаток бюджета
+        'description': 2000,
+        'signals': 3000,
+        'snippets': 2500
+    }
+}
+
 # Smart filtering configuration
 SMART_FILTERING_CONFIG = {
     'enable_signals_prioritization': True,    # Use Signals column for content prioritization
@@ -136,8 +218,12 @@ SERPER_RETRY_DELAY = 3
 # Output directory for results and logs
 LOGS_DIR = "logs"
 
-def validate_config():
-    """Validate that all required files exist"""
+def validate_config(require_data_files=True):
+    """Validate that all required files exist
+
+    require_data_files=False - входной файл передается явно (встроенный движок, src/core/engine.py),
+    наличие CSV в папке data не проверяется
+    """
     required_files = {
         "YAML_PATH": YAML_PATH
     }
@@ -167,7 +253,7 @@ def validate_config():
     
     # Check for CSV files in data directory
     csv_files = [f for f in os.listdir(DATA_DIR) if f.endswith('.csv')]
-    if not csv_files:
+    if require_data_files and not csv_files:
         raise FileNotFoundError(f"No CSV files found in data directory: {DATA_DIR}")
     
     # Check for required API keys
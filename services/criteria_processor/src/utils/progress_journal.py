@@ -0,0 +1,222 @@
+"""
+Журнал прогресса сессии: append-only JSONL + периодическая компактификация
+
+- каждое изменение состояния - одна строка в {session}_progress.jsonl (постоянное время на событие)
+- {session}_progress.json - снапшот; перезаписывается только при компактификации,
+  после чего журнал обрезается. Снапшот хранит "_journal_seq" последнего вошедшего события,
+  поэтому сбой между записью снапшота и обрезкой журнала не приводит к двойному применению
+- текущее состояние = снапшот + события журнала (read_progress)
+
+Операции события:
+    "set":  {"path": value}                      - записать значение
+    "inc":  {"path": n}                          - увеличить счетчик (события разных экземпляров складываются)
+    "push": {"path": {"item": x, "limit": 50}}   - добавить в список, оставив последние limit элементов
+Путь - ключи через точку, например "criteria_breakdown.mandatory.processed".
+
+Модуль не импортирует ничего из пакета src, поэтому backend загружает его по пути к файлу.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEQ_KEY = "_journal_seq"
+
+
+def journal_path_for(snapshot_path) -> Path:
+    """Путь журнала для снапшота: foo_progress.json -> foo_progress.jsonl"""
+    return Path(snapshot_path).with_suffix(".jsonl")
+
+
+def _resolve(state: Dict[str, Any], path: str) -> Tuple[Dict[str, Any], str]:
+    *parents, key = path.split(".")
+    for parent in parents:
+        node = state.get(parent)
+        if not isinstance(node, dict):
+            node = state[parent] = {}
+        state = node
+    return state, key
+
+
+def apply_event(state: Dict[str, Any], event: Dict[str, Any]):
+    """Применить событие журнала к состоянию (in place)"""
+    for path, value in event.get("set", {}).items():
+        node, key = _resolve(state, path)
+        node[key] = value
+    for path, delta in event.get("inc", {}).items():
+        node, key = _resolve(state, path)
+        node[key] = (node.get(key) or 0) + delta
+    for path, entry in event.get("push", {}).items():
+        node, key = _resolve(state, path)
+        items = node.get(key)
+        if not isinstance(items, list):
+            items = []
+        items.append(entry["item"])
+        limit = entry.get("limit")
+        node[key] = items[-limit:] if limit else items
+
+
+def _replay(snapshot_path: Path, journal_path: Path) -> Tuple[Optional[Dict[str, Any]], int, int]:
+    """
+    Returns:
+        tuple: (состояние или None, seq последнего события, число событий в журнале после снапшота)
+    """
+    state = None
+    seq = 0
+    if snapshot_path.exists():
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        seq = state.pop(SEQ_KEY, 0)
+
+    applied = 0
+    if journal_path.exists():
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # Оборванная последняя строка после сбоя процесса
+                    logger.warning(f"Skipping unreadable progress journal line {line_number} in {journal_path}")
+                    continue
+                if event.get("seq", 0) <= seq:
+                    continue
+                if state is None:
+                    state = {}
+                apply_event(state, event)
+                seq = event["seq"]
+                applied += 1
+
+    return state, seq, applied
+
+
+def read_progress(snapshot_path, journal_path=None) -> Optional[Dict[str, Any]]:
+    """Текущее состояние сессии (снапшот + журнал) или None, если прогресс еще не сохранялся"""
+    snapshot_path = Path(snapshot_path)
+    journal_path = Path(journal_path) if journal_path is not None else journal_path_for(snapshot_path)
+    state, _, _ = _replay(snapshot_path, journal_path)
+    return state
+
+
+def has_progress(snapshot_path) -> bool:
+    snapshot_path = Path(snapshot_path)
+    return snapshot_path.exists() or journal_path_for(snapshot_path).exists()
+
+
+class ProgressJournal:
+    """Thread-safe писатель журнала; один на файл в процессе (get_progress_journal)"""
+
+    def __init__(self, snapshot_path, compact_every: int = 500, fsync: bool = False):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = journal_path_for(self.snapshot_path)
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._file = None
+        _, self._seq, self._pending = _replay(self.snapshot_path, self.journal_path)
+
+    def append(self, fields: Optional[Dict[str, Any]] = None, inc: Optional[Dict[str, Any]] = None,
+               push: Optional[Dict[str, Any]] = None) -> int:
+        """Дописать событие; раз в compact_every событий журнал сворачивается в снапшот"""
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "ts": datetime.now().isoformat()}
+            if fields:
+                event["set"] = fields
+            if inc:
+                event["inc"] = inc
+            if push:
+                event["push"] = push
+
+            if self._file is None:
+                self._file = self._open_for_append()
+            self._file.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+            self._pending += 1
+            if self.compact_every and self._pending >= self.compact_every:
+                self.compact()
+            return self._seq
+
+    def _open_for_append(self):
+        # После сбоя последняя строка может быть оборвана: новое событие начинаем с новой строки
+        torn = False
+        if self.journal_path.exists() and self.journal_path.stat().st_size > 0:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        journal_file = open(self.journal_path, 'a', encoding='utf-8')
+        if torn:
+            journal_file.write("\n")
+        return journal_file
+
+    def compact(self, initial_state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Свернуть журнал в снапшот и обрезать журнал
+
+        Args:
+            initial_state: Состояние для снапшота, если прогресс еще не сохранялся
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            state, seq, _ = _replay(self.snapshot_path, self.journal_path)
+            if state is None:
+                state = dict(initial_state or {})
+
+            snapshot = dict(state)
+            snapshot[SEQ_KEY] = seq
+            tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.snapshot_path)
+
+            if self._file is not None:
+                self._file.seek(0)
+                self._file.truncate()
+            elif self.journal_path.exists():
+                open(self.journal_path, 'w', encoding='utf-8').close()
+
+            self._seq = seq
+            self._pending = 0
+            return state
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_journals: Dict[str, ProgressJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_progress_journal(snapshot_path, compact_every: int = 500, fsync: bool = False) -> ProgressJournal:
+    """Общий писатель журнала на процесс для файла снапшота snapshot_path"""
+    key = str(Path(snapshot_path).resolve())
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = ProgressJournal(snapshot_path, compact_every=compact_every, fsync=fsync)
+            _journals[key] = journal
+        return journal
+
+
+def close_progress_journal(snapshot_path):
+    """Закрыть и забыть писатель (например перед удалением файлов сессии)"""
+    key = str(Path(snapshot_path).resolve())
+    with _journals_lock:
+        journal = _journals.pop(key, None)
+    if journal is not None:
+        journal.close()
@@ -2,11 +2,14 @@
 Utility module for processing Signals keywords from criteria files
 """
 
+import bisect
 import re
+from functools import lru_cache
 import pandas as pd
 from typing import List, Dict, Tuple, Optional
 from src.utils.logging import log_debug, log_info
 from src.utils.config import SMART_FILTERING_CONFIG
+from src.data.criteria_catalog import parse_signals
 
 
 def extract_signals_keywords(criterion: pd.Series) -> List[str]:
@@ -25,42 +28,152 @@ def extract_signals_keywords(criterion: pd.Series) -> List[str]:
         log_debug(f"No signals found for criterion: {criterion.get('Criteria', 'Unknown')}")
         return []
     
-    signals_text = str(signals_text).strip()
-    
-    # Handle quoted phrases (e.g., "API documentation", "enterprise solutions")
-    quoted_phrases = re.findall(r'"([^"]+)"', signals_text)
-    
-    # Remove quoted phrases from text to avoid double processing
-    text_without_quotes = re.sub(r'"[^"]+"', '', signals_text)
-    
-    # Split remaining text by common separators
-    individual_keywords = re.split(r'[,;|]', text_without_quotes)
-    
-    # Clean and combine all keywords
-    all_keywords = []
-    
-    # Add quoted phrases (preserve as complete phrases)
-    for phrase in quoted_phrases:
-        phrase = phrase.strip()
-        if phrase:
-            all_keywords.append(phrase)
-    
-    # Add individual keywords
-    for keyword in individual_keywords:
-        keyword = keyword.strip()
-        if keyword and keyword not in ['', 'N/A', 'n/a', 'None']:
-            all_keywords.append(keyword)
-    
-    # Remove duplicates while preserving order
-    unique_keywords = []
-    for kw in all_keywords:
-        if kw not in unique_keywords:
-            unique_keywords.append(kw)
+    # Разбор кэшируется по тексту Signals (каталог критериев разбирает их при компиляции)
+    unique_keywords = list(parse_signals(str(signals_text).strip()))
     
     log_debug(f"Extracted {len(unique_keywords)} signals keywords: {unique_keywords}")
     return unique_keywords
 
 
+_SENTENCE_SEPARATORS = '.!?'
+# Sentence = maximal run without [.!?] that is not only whitespace (same pieces as re.split(r'[.!?]+') + strip)
+_SENTENCE_RE = re.compile(r'[^.!?]*[^\s.!?][^.!?]*')
+
+
+class _PageIndex:
+    """Lowercased text and lazily computed sentence spans of one scraped page"""
+    
+    __slots__ = ('content', 'lowered', '_spans', '_starts')
+    
+    def __init__(self, content: str):
+        self.content = content
+        lowered = content.lower()
+        # lower() почти никогда не меняет длину; если меняет, смещения разъедутся - ищем по исходному тексту
+        self.lowered = lowered if len(lowered) == len(content) else None
+        self._spans = None
+        self._starts = None
+    
+    def _split(self):
+        # Страница разбивается на предложения при первом обращении
+        if self._spans is None:
+            self._spans = [m.span() for m in _SENTENCE_RE.finditer(self.content)]
+            self._starts = [start for start, _ in self._spans]
+    
+    @property
+    def spans(self) -> List[Tuple[int, int]]:
+        self._split()
+        return self._spans
+    
+    def sentence_index(self, position: int) -> int:
+        self._split()
+        return bisect.bisect_right(self._starts, position) - 1
+    
+    def sentence(self, index: int) -> str:
+        start, end = self.spans[index]
+        return self.content[start:end].strip()
+
+
+@lru_cache(maxsize=32)
+def _index_page(content: str) -> _PageIndex:
+    # Одна страница проверяется по Signals нескольких критериев - разбор делается один раз
+    return _PageIndex(content)
+
+
+def _keywords_overlap(keywords: List[str]) -> bool:
+    """Can occurrences of two different keywords overlap in text (substring or suffix/prefix)?"""
+    for a in keywords:
+        for b in keywords:
+            if a == b:
+                continue
+            if a in b:
+                return True
+            if any(a.endswith(b[:size]) for size in range(1, min(len(a), len(b)))):
+                return True
+    return False
+
+
+class SignalsMatcher:
+    """
+    Compiled matcher for one Signals keyword list.
+    
+    All keywords are combined into a single regex, so a page is scanned once. If keyword
+    occurrences can overlap (one keyword contains another, or a suffix of one is a prefix
+    of another), the regex uses a lookahead and tests every start position; keywords that
+    are prefixes of the matched one are added from a precomputed table. Either way the
+    result is the same as checking `keyword in sentence` for every pair.
+    """
+    
+    def __init__(self, signals_keywords: Tuple[str, ...], case_sensitive: bool = False):
+        self.keywords = list(signals_keywords)
+        self.case_sensitive = case_sensitive
+        
+        normalized = [kw if case_sensitive else kw.lower() for kw in self.keywords]
+        self._order: Dict[str, List[int]] = {}
+        for i, kw in enumerate(normalized):
+            self._order.setdefault(kw, []).append(i)
+        
+        # Keywords with sentence separators never match inside a sentence
+        alternatives = sorted(
+            (kw for kw in self._order if kw and not any(ch in _SENTENCE_SEPARATORS for ch in kw)),
+            key=len, reverse=True
+        )
+        self.overlapping = _keywords_overlap(alternatives)
+        self._prefixes = {
+            kw: [other for other in alternatives if other != kw and kw.startswith(other)]
+            for kw in alternatives
+        } if self.overlapping else {}
+        
+        self._pattern = None
+        if alternatives:
+            body = "|".join(re.escape(kw) for kw in alternatives)
+            flags = 0 if case_sensitive else re.IGNORECASE
+            self._pattern = re.compile(f"(?=({body}))" if self.overlapping else f"({body})")
+            # Fallback for pages where lower() changes the text length
+            self._pattern_ignorecase = re.compile(self._pattern.pattern, flags)
+    
+    def match_sentences(self, content: str) -> Tuple[_PageIndex, Dict[int, List[str]]]:
+        """
+        Returns:
+            tuple: (page index, {sentence_index: matched keywords in Signals order})
+        """
+        page = _index_page(content)
+        if self._pattern is None:
+            return page, {}
+        
+        if self.case_sensitive:
+            text, pattern = content, self._pattern
+        elif page.lowered is not None:
+            text, pattern = page.lowered, self._pattern
+        else:
+            text, pattern = content, self._pattern_ignorecase
+        
+        found: Dict[int, set] = {}
+        for match in pattern.finditer(text):
+            keyword = match.group(1)
+            if pattern is self._pattern_ignorecase and not self.case_sensitive:
+                keyword = keyword.lower()
+            index = page.sentence_index(match.start())
+            if index < 0:
+                continue
+            segment_end = page.spans[index][1]
+            for candidate in [keyword] + self._prefixes.get(keyword, []):
+                keyword_indexes = self._order.get(candidate)
+                if keyword_indexes and match.start() + len(candidate) <= segment_end:
+                    found.setdefault(index, set()).update(keyword_indexes)
+        
+        matched = {
+            index: [self.keywords[i] for i in sorted(keyword_indexes)]
+            for index, keyword_indexes in found.items()
+        }
+        return page, matched
+
+
+@lru_cache(maxsize=256)
+def get_signals_matcher(signals_keywords: Tuple[str, ...], case_sensitive: bool = False) -> SignalsMatcher:
+    """Matcher is compiled once per Signals list and reused for every scraped page"""
+    return SignalsMatcher(signals_keywords, case_sensitive)
+
+
 def find_signal_matches(content: str, signals_keywords: List[str]) -> List[Dict[str, any]]:
     """
     Find paragraphs and sentences containing signals keywords.
@@ -75,40 +188,28 @@ def find_signal_matches(content: str, signals_keywords: List[str]) -> List[Dict[
     if not content or not signals_keywords:
         return []
     
-    matches = []
-    case_sensitive = SMART_FILTERING_CONFIG['case_sensitive_matching']
     context_sentences = SMART_FILTERING_CONFIG['context_sentences_around_match']
+    matcher = get_signals_matcher(tuple(signals_keywords), SMART_FILTERING_CONFIG['case_sensitive_matching'])
+    page, matched = matcher.match_sentences(content)
     
-    # Split content into sentences
-    sentences = re.split(r'[.!?]+', content)
-    sentences = [s.strip() for s in sentences if s.strip()]
-    
-    for i, sentence in enumerate(sentences):
-        sentence_matches = []
-        search_text = sentence if case_sensitive else sentence.lower()
+    matches = []
+    for i in sorted(matched):
+        sentence = page.sentence(i)
+        sentence_matches = matched[i]
         
-        for keyword in signals_keywords:
-            search_keyword = keyword if case_sensitive else keyword.lower()
-            
-            # Check for keyword match
-            if search_keyword in search_text:
-                sentence_matches.append(keyword)
+        # Extract context around the match
+        start_idx = max(0, i - context_sentences)
+        end_idx = min(len(page.spans), i + context_sentences + 1)
         
-        if sentence_matches:
-            # Extract context around the match
-            start_idx = max(0, i - context_sentences)
-            end_idx = min(len(sentences), i + context_sentences + 1)
-            context = '. '.join(sentences[start_idx:end_idx])
-            
-            match_info = {
-                'sentence_index': i,
-                'matched_keywords': sentence_matches,
-                'sentence': sentence,
-                'context': context,
-                'keyword_count': len(sentence_matches),
-                'sentence_length': len(sentence)
-            }
-            matches.append(match_info)
+        matches.append({
+            'sentence_index': i,
+            'matched_keywords': sentence_matches,
+            'sentence': sentence,
+            'context': '. '.join(page.sentence(j) for j in range(start_idx, end_idx)),
+            'context_sentence_count': end_idx - start_idx,
+            'keyword_count': len(sentence_matches),
+            'sentence_length': len(sentence)
+        })
     
     # Sort by keyword count (descending) and sentence length (descending)
     matches.sort(key=lambda x: (x['keyword_count'], x['sentence_length']), reverse=True)
@@ -153,8 +254,7 @@ def prioritize_content(scraped_content: str, signals_keywords: List[str]) -> Tup
         if sentence_idx not in used_sentences:
             priority_parts.append(match['context'])
             # Mark sentences in this context as used
-            context_sentences = re.split(r'[.!?]+', match['context'])
-            for j, _ in enumerate(context_sentences):
+            for j in range(match['context_sentence_count']):
                 used_sentences.add(sentence_idx - SMART_FILTERING_CONFIG['context_sentences_around_match'] + j)
     
     priority_content = '\n\n'.join(priority_parts)
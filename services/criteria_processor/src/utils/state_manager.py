@@ -1,8 +1,13 @@
 """
 State Manager для сохранения прогресса обработки критериев
 Позволяет восстанавливать работу после сбоев или пауз
+
+Прогресс пишется событиями в журнал {session}_progress.jsonl (src/utils/progress_journal.py),
+снапшот {session}_progress.json обновляется при компактификации и в конце сессии.
+Промежуточные результаты дописываются в {session}_partial_results.jsonl.
 """
 
+import copy
 import json
 import os
 import time
@@ -10,7 +15,22 @@ import threading
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+from src.utils.config import PROGRESS_JOURNAL_CONFIG
 from src.utils.logging import log_info, log_error, log_debug
+from src.utils.progress_journal import (
+    get_progress_journal, close_progress_journal, read_progress, has_progress, apply_event
+)
+
+
+# Слушатель изменений прогресса: (session_id, состояние) после каждого события журнала.
+# Воркер движка критериев передает через него прогресс бэкенду (SSE/WebSocket без опроса файлов)
+_progress_listener = None
+
+
+def set_progress_listener(listener):
+    """Установить слушатель прогресса процесса (None - отключить)"""
+    global _progress_listener
+    _progress_listener = listener
 
 
 class ProcessingStateManager:
@@ -43,8 +63,16 @@ class ProcessingStateManager:
         
         # Файлы состояния
         self.progress_file = self.session_dir / f"{session_id}_progress.json"
-        self.results_file = self.session_dir / f"{session_id}_partial_results.json"
+        self.results_file = self.session_dir / f"{session_id}_partial_results.json"  # старый формат (только чтение)
+        self.results_journal_file = self.session_dir / f"{session_id}_partial_results.jsonl"
         self.metadata_file = self.session_dir / f"{session_id}_metadata.json"
+        self._journal = get_progress_journal(
+            self.progress_file,
+            compact_every=PROGRESS_JOURNAL_CONFIG['compact_every_events'],
+            fsync=PROGRESS_JOURNAL_CONFIG['fsync']
+        )
+        self._metadata = None
+        self._journal_started = False
         
         # Состояние
         self._current_state = {
@@ -81,6 +109,8 @@ class ProcessingStateManager:
         
         # Загружаем существующее состояние если есть
         self._load_existing_state()
+        # Базовый снапшот для первого события журнала (состояние до изменений)
+        self._initial_state = copy.deepcopy(self._current_state)
         
         log_info(f"💾 State Manager инициализирован для сессии: {session_id}")
         log_info(f"📁 Папка состояния: {self.session_dir}")
@@ -108,7 +138,7 @@ class ProcessingStateManager:
         """
         try:
             with self._lock:
-                self._current_state.update({
+                self._update_state({
                     "updated_at": datetime.now().isoformat(),
                     "current_product_index": product_index,
                     "current_company_index": company_index,
@@ -119,10 +149,6 @@ class ProcessingStateManager:
                     "status": "processing"
                 })
                 
-                # Сохраняем в файл
-                with open(self.progress_file, 'w', encoding='utf-8') as f:
-                    json.dump(self._current_state, f, ensure_ascii=False, indent=2)
-                
                 log_debug(f"💾 Progress saved: P{product_index} C{company_index} {stage}")
                 return True
                 
@@ -138,10 +164,8 @@ class ProcessingStateManager:
             Словарь с состоянием или None если нет сохраненного состояния
         """
         try:
-            if self.progress_file.exists():
-                with open(self.progress_file, 'r', encoding='utf-8') as f:
-                    progress = json.load(f)
-                
+            progress = read_progress(self.progress_file)
+            if progress is not None:
                 log_info(f"📂 Загружен прогресс: {progress.get('current_stage', 'unknown')}")
                 log_info(f"   Продукт: {progress.get('current_product_index', 0)}/{progress.get('total_products', 0)}")
                 log_info(f"   Компания: {progress.get('current_company_index', 0)}/{progress.get('total_companies', 0)}")
@@ -156,37 +180,30 @@ class ProcessingStateManager:
     
     def save_partial_results(self, results: List[Dict[str, Any]]) -> bool:
         """
-        Сохранить промежуточные результаты
+        Сохранить промежуточные результаты (дописываются к уже сохраненным)
         
         Args:
-            results: Список результатов для сохранения
+            results: Список новых результатов
             
         Returns:
             True если сохранение успешно
         """
         try:
             with self._lock:
-                # Добавляем новые результаты к существующим
+                # Дописываем только новые результаты, ранее сохраненные не перезаписываются
+                with open(self.results_journal_file, 'a', encoding='utf-8') as f:
+                    for result in results:
+                        f.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
                 self._partial_results.extend(results)
                 
-                # Создаем метаданные
-                metadata = {
+                self._write_metadata({
                     "session_id": self.session_id,
                     "saved_at": datetime.now().isoformat(),
                     "total_results": len(self._partial_results),
-                    "batch_size": len(results),
-                    "progress": self._current_state.copy()
-                }
-                
-                # Сохраняем результаты
-                with open(self.results_file, 'w', encoding='utf-8') as f:
-                    json.dump(self._partial_results, f, ensure_ascii=False, indent=2)
-                
-                # Сохраняем метаданные
-                with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                    json.dump(metadata, f, ensure_ascii=False, indent=2)
+                    "batch_size": len(results)
+                })
                 
-                log_info(f"💾 Сохранено {len(results)} новых результатов (всего: {len(self._partial_results)})")
+                log_debug(f"💾 Сохранено {len(results)} новых результатов (всего: {len(self._partial_results)})")
                 return True
                 
         except Exception as e:
@@ -201,14 +218,26 @@ class ProcessingStateManager:
             Список результатов или пустой список
         """
         try:
+            results = []
             if self.results_file.exists():
                 with open(self.results_file, 'r', encoding='utf-8') as f:
                     results = json.load(f)
-                
-                log_info(f"📂 Загружено {len(results)} промежуточных результатов")
-                return results
             
-            return []
+            if self.results_journal_file.exists():
+                with open(self.results_journal_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            results.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            # Оборванная последняя строка после сбоя
+                            log_error(f"⚠️ Пропущена поврежденная строка в {self.results_journal_file.name}")
+            
+            if results:
+                log_info(f"📂 Загружено {len(results)} промежуточных результатов")
+            return results
             
         except Exception as e:
             log_error(f"❌ Ошибка загрузки результатов: {e}")
@@ -230,19 +259,60 @@ class ProcessingStateManager:
                     "details": details or {}
                 }
                 
-                self._current_state["circuit_breaker_events"].append(event)
-                self._current_state["last_circuit_breaker_event"] = event
-                
-                # Ограничиваем историю событий
-                if len(self._current_state["circuit_breaker_events"]) > 50:
-                    self._current_state["circuit_breaker_events"] = \
-                        self._current_state["circuit_breaker_events"][-50:]
+                # Ограничиваем историю событий последними 50
+                self._update_state(
+                    {"last_circuit_breaker_event": event},
+                    push={"circuit_breaker_events": {"item": event, "limit": 50}}
+                )
                 
                 log_debug(f"🛡️ Circuit breaker event recorded: {event_type}")
                 
         except Exception as e:
             log_error(f"❌ Ошибка записи события circuit breaker: {e}")
     
+    def record_session_stats(self, key: str, stats: Dict[str, Any]) -> bool:
+        """
+        Записать блок статистики в состояние и метаданные сессии
+        
+        Args:
+            key: Ключ блока в метаданных (например "llm_cache", "pruning")
+            stats: Словарь со статистикой
+        
+        Returns:
+            True если запись удалась
+        """
+        try:
+            with self._lock:
+                self._update_state({key: stats, "updated_at": datetime.now().isoformat()})
+                self._write_metadata({
+                    "session_id": self.session_id,
+                    key: stats
+                })
+            return True
+                
+        except Exception as e:
+            log_error(f"❌ Ошибка записи статистики {key}: {e}")
+            return False
+    
+    def record_llm_cache_stats(self, stats: Dict[str, Any]):
+        """
+        Записать статистику LLM cache в состояние и метаданные сессии
+        
+        Args:
+            stats: Счетчики кэша (hits, misses, writes, evictions, hit_rate)
+        """
+        if self.record_session_stats("llm_cache", stats):
+            log_info(f"🗄️ LLM cache: hits={stats.get('hits', 0)}, misses={stats.get('misses', 0)}, hit_rate={stats.get('hit_rate', 0)}")
+    
+    def record_pruning_stats(self, stats: Dict[str, Any]):
+        """
+        Записать отчет об отсеченных ветках критериев (сэкономленные LLM/Serper вызовы)
+        
+        Args:
+            stats: PruningStats.summary()
+        """
+        self.record_session_stats("pruning", stats)
+    
     def mark_company_completed(self, company_name: str, product: str, success: bool = True):
         """
         Отметить компанию как обработанную
@@ -254,21 +324,11 @@ class ProcessingStateManager:
         """
         try:
             with self._lock:
-                if success:
-                    self._current_state["processed_companies"] += 1
-                else:
-                    self._current_state["failed_companies"] += 1
-                
-                # Обновляем время и сохраняем состояние в файл
-                self._current_state["updated_at"] = datetime.now().isoformat()
-                self._current_state["current_company"] = company_name
-                
-                # Сохраняем прогресс в файл сразу
-                try:
-                    with open(self.progress_file, 'w', encoding='utf-8') as f:
-                        json.dump(self._current_state, f, ensure_ascii=False, indent=2)
-                except Exception as save_error:
-                    log_error(f"❌ Ошибка сохранения прогресса: {save_error}")
+                counter = "processed_companies" if success else "failed_companies"
+                self._update_state(
+                    {"updated_at": datetime.now().isoformat(), "current_company": company_name},
+                    inc={counter: 1}
+                )
                 
                 log_debug(f"✅ Company marked completed: {company_name} ({product}) - Progress saved")
                 
@@ -277,34 +337,32 @@ class ProcessingStateManager:
     
     def update_totals(self, total_products: int, total_companies: int):
         """Обновляет общее количество продуктов и компаний"""
-        self._current_state["total_products"] = total_products
-        self._current_state["total_companies"] = total_companies
-        self._current_state["updated_at"] = datetime.now().isoformat()
-        
-        # Сохраняем состояние в файл
         try:
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
-                json.dump(self._current_state, f, ensure_ascii=False, indent=2)
+            with self._lock:
+                self._update_state({
+                    "total_products": total_products,
+                    "total_companies": total_companies,
+                    "updated_at": datetime.now().isoformat()
+                })
         except Exception as e:
             log_error(f"❌ Ошибка сохранения состояния: {e}")
     
     def initialize_criteria_totals(self, products_data: dict, companies_count: int, general_criteria: list = None):
         """Простая инициализация - только счетчик компаний"""
         # Убираем сложный подсчет критериев, оставляем только компании
-        self._current_state["total_criteria"] = 0
-        self._current_state["processed_criteria"] = 0
-        self._current_state["criteria_breakdown"] = {
-            "general": {"total": 0, "processed": 0, "passed": 0},
-            "qualification": {"total": 0, "processed": 0, "passed": 0},
-            "mandatory": {"total": 0, "processed": 0, "passed": 0},
-            "nth": {"total": 0, "processed": 0, "passed": 0}
-        }
-        self._current_state["updated_at"] = datetime.now().isoformat()
-        
-        # Сохраняем состояние в файл
         try:
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
-                json.dump(self._current_state, f, ensure_ascii=False, indent=2)
+            with self._lock:
+                self._update_state({
+                    "total_criteria": 0,
+                    "processed_criteria": 0,
+                    "criteria_breakdown": {
+                        "general": {"total": 0, "processed": 0, "passed": 0},
+                        "qualification": {"total": 0, "processed": 0, "passed": 0},
+                        "mandatory": {"total": 0, "processed": 0, "passed": 0},
+                        "nth": {"total": 0, "processed": 0, "passed": 0}
+                    },
+                    "updated_at": datetime.now().isoformat()
+                })
         except Exception as e:
             log_error(f"❌ Ошибка сохранения состояния: {e}")
         
@@ -317,23 +375,27 @@ class ProcessingStateManager:
             criterion_type: 'general', 'qualification', 'mandatory', 'nth'
             result: 'Pass'/'Passed', 'Fail'/'Failed'/'Not Passed', 'ND', 'Error'
         """
-        self._current_state["processed_criteria"] += 1
-        self._current_state["criteria_breakdown"][criterion_type]["processed"] += 1
+        # Счетчики пишутся приращениями: один менеджер сессии вызывается из потоков
+        # всех компаний, и события складываются в журнале без перезаписи
+        increments = {
+            "processed_criteria": 1,
+            f"criteria_breakdown.{criterion_type}.processed": 1
+        }
         
         # Нормализуем результат
         if result in ["Pass", "Passed", "Yes"]:
-            self._current_state["passed_criteria"] += 1
-            self._current_state["criteria_breakdown"][criterion_type]["passed"] += 1
+            increments["passed_criteria"] = 1
+            increments[f"criteria_breakdown.{criterion_type}.passed"] = 1
         elif result in ["ND", "No Data"]:
-            self._current_state["nd_criteria"] += 1
+            increments["nd_criteria"] = 1
         elif result in ["Fail", "Failed", "Not Passed", "No", "Error"]:
-            self._current_state["failed_criteria"] += 1
+            increments["failed_criteria"] = 1
         
-        self._current_state["updated_at"] = datetime.now().isoformat()
-        
-        # Сохраняем прогресс периодически (каждые 10 критериев или в конце)
-        if self._current_state["processed_criteria"] % 10 == 0:
-            self.save_progress()
+        try:
+            with self._lock:
+                self._update_state({"updated_at": datetime.now().isoformat()}, inc=increments)
+        except Exception as e:
+            log_error(f"❌ Ошибка записи результата критерия: {e}")
     
     def get_criteria_progress_percentage(self) -> float:
         """Возвращает процент выполнения по компаниям"""
@@ -353,15 +415,14 @@ class ProcessingStateManager:
         """
         try:
             with self._lock:
-                self._current_state.update({
+                self._update_state({
                     "status": status,
                     "completed_at": datetime.now().isoformat(),
                     "updated_at": datetime.now().isoformat()
                 })
                 
-                # Сохраняем финальное состояние
-                with open(self.progress_file, 'w', encoding='utf-8') as f:
-                    json.dump(self._current_state, f, ensure_ascii=False, indent=2)
+                # Финальное состояние - в снапшот, журнал обрезается
+                self._journal.compact()
                 
                 log_info(f"🏁 Сессия отмечена как завершенная: {status}")
                 
@@ -371,7 +432,12 @@ class ProcessingStateManager:
     def clear_progress(self):
         """Очистить сохраненный прогресс"""
         try:
-            files_to_remove = [self.progress_file, self.results_file, self.metadata_file]
+            close_progress_journal(self.progress_file)
+            self._journal_started = False
+            files_to_remove = [
+                self.progress_file, self._journal.journal_path,
+                self.results_file, self.results_journal_file, self.metadata_file
+            ]
             
             for file_path in files_to_remove:
                 if file_path.exists():
@@ -450,17 +516,45 @@ class ProcessingStateManager:
     def _load_existing_state(self):
         """Загрузить существующее состояние при инициализации"""
         try:
-            # Загружаем прогресс
-            if self.progress_file.exists():
-                with open(self.progress_file, 'r', encoding='utf-8') as f:
-                    saved_state = json.load(f)
-                    self._current_state.update(saved_state)
+            # Загружаем прогресс (снапшот + журнал)
+            saved_state = read_progress(self.progress_file)
+            if saved_state:
+                self._current_state.update(saved_state)
             
             # Загружаем результаты
-            if self.results_file.exists():
+            if self.results_file.exists() or self.results_journal_file.exists():
                 self._partial_results = self.load_partial_results()
             
             log_debug(f"💾 Existing state loaded: {self._current_state.get('status', 'new')}")
             
         except Exception as e:
-            log_error(f"❌ Ошибка загрузки существующего состояния: {e}") 
\ No newline at end of file
+            log_error(f"❌ Ошибка загрузки существующего состояния: {e}") 
+    
+    def _update_state(self, fields: Dict[str, Any], inc: Dict[str, int] = None, push: Dict[str, Any] = None):
+        """Применить изменения к состоянию в памяти и дописать их одним событием в журнал"""
+        if not self._journal_started:
+            if not has_progress(self.progress_file):
+                # Первое событие сессии: снапшот с полным начальным состоянием
+                self._journal.compact(initial_state=self._initial_state)
+            self._journal_started = True
+        
+        event = {"set": fields, "inc": inc or {}, "push": push or {}}
+        apply_event(self._current_state, event)
+        self._journal.append(fields, inc=inc, push=push)
+        
+        if _progress_listener is not None:
+            try:
+                _progress_listener(self.session_id, self._current_state)
+            except Exception as e:
+                log_debug(f"⚠️ Слушатель прогресса не получил событие: {e}")
+    
+    def _write_metadata(self, updates: Dict[str, Any]):
+        """Обновить файл метаданных (читается с диска только один раз)"""
+        if self._metadata is None:
+            self._metadata = {}
+            if self.metadata_file.exists():
+                with open(self.metadata_file, 'r', encoding='utf-8') as f:
+                    self._metadata = json.load(f)
+        self._metadata.update(updates)
+        with open(self.metadata_file, 'w', encoding='utf-8') as f:
+            json.dump(self._metadata, f, ensure_ascii=False, indent=2, default=str)
@@ -0,0 +1,269 @@
+"""
+Бюджет токенов для контекста промптов критериев
+
+Контекст собирается по секциям в порядке важности, пока не исчерпан бюджет модели:
+совпадения Signals → описание → сниппеты поиска → текст страниц (обрезается последним).
+Токены считаются через tiktoken, если он установлен, иначе локальной оценкой
+(слово ≈ ceil(len/4) токенов, знак пунктуации = 1 токен).
+
+Использование токенов по каждому критерию логируется и накапливается в TokenUsageStats.
+"""
+
+import math
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.config import TOKEN_BUDGET_CONFIG, SMART_FILTERING_CONFIG
+from src.utils.logging import log_info, log_debug
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+TRUNCATION_MARKER = "\n[... truncated to fit token budget ...]"
+_APPROX_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+class TokenCounter:
+    """Подсчет и обрезка текста по токенам для конкретной модели"""
+
+    _encodings = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model: str):
+        self.model = model
+        self.encoding = self._get_encoding(model)
+
+    @classmethod
+    def _get_encoding(cls, model: str):
+        if tiktoken is None:
+            return None
+        with cls._lock:
+            if model not in cls._encodings:
+                try:
+                    cls._encodings[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    cls._encodings[model] = tiktoken.get_encoding("cl100k_base")
+            return cls._encodings[model]
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return sum(_approx_tokens(match.group()) for match in _APPROX_TOKEN_RE.finditer(text))
+
+    def truncate(self, text: str, max_tokens: int) -> Tuple[str, int]:
+        """
+        Обрезать текст до max_tokens
+
+        Returns:
+            tuple: (обрезанный текст, число токенов в нем)
+        """
+        if not text or max_tokens <= 0:
+            return "", 0
+
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text, len(tokens)
+            return self.encoding.decode(tokens[:max_tokens]), max_tokens
+
+        used = 0
+        for match in _APPROX_TOKEN_RE.finditer(text):
+            cost = _approx_tokens(match.group())
+            if used + cost > max_tokens:
+                return text[:match.start()].rstrip(), used
+            used += cost
+        return text, used
+
+
+def _approx_tokens(piece: str) -> int:
+    return max(1, math.ceil(len(piece) / 4))
+
+
+def get_token_counter(model: str) -> TokenCounter:
+    return TokenCounter(model)
+
+
+def model_context_budget(model: str) -> int:
+    return TOKEN_BUDGET_CONFIG['model_context_budgets'].get(model, TOKEN_BUDGET_CONFIG['default_context_budget'])
+
+
+class ContextBudget:
+    """
+    Упаковка секций контекста в бюджет токенов
+
+    Секции добавляются в порядке приоритета; каждая получает не больше своего лимита
+    и не больше остатка бюджета. render() выводит секции в порядке добавления.
+    """
+
+    def __init__(self, model: str, budget: Optional[int] = None):
+        self.counter = get_token_counter(model)
+        self.budget = budget if budget is not None else model_context_budget(model)
+        self.used = 0
+        self.sections: List[Tuple[str, str, str]] = []
+        self.usage: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.budget - self.used)
+
+    def add(self, label: str, text: str, header: str = "", max_tokens: Optional[int] = None) -> int:
+        """Добавить секцию (с заголовком header), вернуть число использованных токенов"""
+        if not text:
+            return 0
+
+        full_tokens = self.counter.count(text)
+        limit = self.remaining if max_tokens is None else min(max_tokens, self.remaining)
+        header_tokens = self.counter.count(header)
+        limit -= header_tokens
+
+        if limit <= 0:
+            self.usage[label] = {"tokens": 0, "original_tokens": full_tokens}
+            return 0
+
+        if full_tokens > limit:
+            marker_tokens = self.counter.count(TRUNCATION_MARKER)
+            text, used = self.counter.truncate(text, max(0, limit - marker_tokens))
+            text += TRUNCATION_MARKER
+            used += marker_tokens
+        else:
+            used = full_tokens
+
+        used += header_tokens
+        self.used += used
+        self.sections.append((label, header, text))
+        self.usage[label] = {"tokens": used, "original_tokens": full_tokens + header_tokens}
+        return used
+
+    def render(self, separator: str = "\n", order: Optional[List[str]] = None) -> str:
+        """Секции в порядке добавления или в порядке меток order"""
+        sections = self.sections
+        if order is not None:
+            sections = sorted(sections, key=lambda section: order.index(section[0]) if section[0] in order else len(order))
+        return separator.join(f"{header}{text}" for _, header, text in sections)
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "budget": self.budget,
+            "tokens": self.used,
+            "sections": {label: entry["tokens"] for label, entry in self.usage.items()},
+            "truncated": [label for label, entry in self.usage.items() if entry["tokens"] < entry["original_tokens"]],
+        }
+
+
+def split_priority_content(scraped_text: str) -> Tuple[str, str]:
+    """
+    Разделить вывод scrape_multiple_urls_with_signals на совпадения Signals и остальной текст
+
+    Returns:
+        tuple: (priority_text, page_text)
+    """
+    if not scraped_text:
+        return "", ""
+
+    priority_header = SMART_FILTERING_CONFIG['priority_section_header']
+    full_header = SMART_FILTERING_CONFIG['full_content_header']
+    if priority_header not in scraped_text:
+        return "", scraped_text
+
+    before, after = scraped_text.split(priority_header, 1)
+    if full_header in after:
+        priority, rest = after.split(full_header, 1)
+        return priority.strip(), (before + full_header + rest).strip()
+    return after.strip(), before.strip()
+
+
+def pack_criterion_context(model: str, description: str, snippets: str = "", scraped_text: str = "",
+                           scraped_header: str = "--- Deep Analysis Content ---") -> Tuple[str, Dict[str, object]]:
+    """
+    Контекст критерия в бюджете модели: Signals совпадения, описание, сниппеты, текст страниц.
+    Без совпадений Signals контекст начинается с описания, как и раньше.
+
+    Returns:
+        tuple: (контекст, ContextBudget.summary())
+    """
+    priority_text, page_text = split_priority_content(scraped_text)
+
+    if TOKEN_BUDGET_CONFIG['enable_token_budget']:
+        budget = ContextBudget(model)
+        limits = TOKEN_BUDGET_CONFIG['section_limits']
+    else:
+        # Без ограничений: только подсчет токенов для логов
+        budget = ContextBudget(model, budget=10 ** 9)
+        limits = {"description": None, "signals": None, "snippets": None}
+
+    budget.add("signals", priority_text, header="--- Signal Matches ---\n", max_tokens=limits['signals'])
+    budget.add("description", description, header="\n--- Company Description ---\n" if priority_text else "",
+               max_tokens=limits['description'])
+    budget.add("snippets", snippets, header="\n--- Dynamic Search Results ---\n", max_tokens=limits['snippets'])
+    budget.add("page_text", page_text, header=f"\n{scraped_header}\n")
+
+    return budget.render(separator=""), budget.summary()
+
+
+class TokenUsageStats:
+    """Thread-safe сумма токенов промптов по критериям за сессию"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._by_criterion: Dict[str, Dict[str, int]] = {}
+
+    def record(self, criterion: str, prompt_tokens: int, truncated: bool = False):
+        with self._lock:
+            entry = self._by_criterion.setdefault(criterion, {"calls": 0, "prompt_tokens": 0, "truncated": 0})
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["truncated"] += int(truncated)
+
+    def summary(self, top: int = 20) -> Dict[str, object]:
+        with self._lock:
+            by_criterion = {crit: dict(entry) for crit, entry in self._by_criterion.items()}
+        ranked = sorted(by_criterion.items(), key=lambda item: item[1]["prompt_tokens"], reverse=True)
+        return {
+            "prompt_tokens": sum(entry["prompt_tokens"] for entry in by_criterion.values()),
+            "calls": sum(entry["calls"] for entry in by_criterion.values()),
+            "truncated_calls": sum(entry["truncated"] for entry in by_criterion.values()),
+            "top_criteria": dict(ranked[:top]),
+        }
+
+
+_token_usage = TokenUsageStats()
+
+
+def get_token_usage_stats() -> TokenUsageStats:
+    return _token_usage
+
+
+def reset_token_usage_stats():
+    _token_usage.reset()
+
+
+def log_criterion_tokens(criterion: str, model: str, prompt: str, context_summary: Optional[Dict[str, object]] = None):
+    """Залогировать размер промпта критерия и учесть его в статистике сессии"""
+    prompt_tokens = get_token_counter(model).count(prompt)
+    truncated = bool(context_summary and context_summary["truncated"])
+    _token_usage.record(criterion, prompt_tokens, truncated)
+
+    details = ""
+    if context_summary:
+        details = ", ".join(f"{label}={tokens}" for label, tokens in context_summary["sections"].items())
+        if truncated:
+            details += f", обрезано: {', '.join(context_summary['truncated'])}"
+    log_info(f"🧮 Токены [{criterion}]: {prompt_tokens} ({model}){' - ' + details if details else ''}", console=False)
+    return prompt_tokens
+
+
+def log_token_usage_summary(summary: Dict[str, object]):
+    if not summary["calls"]:
+        return
+    log_info(f"🧮 Токены промптов критериев: {summary['prompt_tokens']} за {summary['calls']} вызовов "
+             f"(обрезано по бюджету: {summary['truncated_calls']})")
+    for criterion, entry in list(summary["top_criteria"].items())[:5]:
+        log_debug(f"   {criterion}: {entry['prompt_tokens']} токенов, {entry['calls']} вызовов")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Каталог критериев: повторный refresh без разбора, пересборка после изменения файла, снапшот
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from src.data.criteria_catalog import CriteriaCatalog
+
+HEADER = "Product,Target Audience,Criteria Type,Criteria,Search Query,Signals\n"
+
+
+def _write(path, rows):
+    path.write_text(HEADER + "".join(row + "\n" for row in rows), encoding="utf-8")
+
+
+def _counting_parser():
+    parsed = []
+
+    def parse_file(path):
+        parsed.append(os.path.basename(path))
+        return pd.read_csv(path)
+
+    return parse_file, parsed
+
+
+def test_unchanged_files_are_not_reparsed(tmp_path):
+    _write(tmp_path / "a.csv", ['Product A,Banks,Mandatory,Is a bank,{company_name} bank,"""core banking""; API"'])
+    _write(tmp_path / "b.csv", ["Product B,Retail,Qualification,Sells online,,"])
+    parse_file, parsed = _counting_parser()
+    catalog = CriteriaCatalog(str(tmp_path), parse_file)
+
+    assert catalog.refresh() is True
+    assert sorted(parsed) == ["a.csv", "b.csv"]
+    assert catalog.products == ["Product A", "Product B"]
+    assert catalog.search_templates == {"{company_name} bank": ("company_name",)}
+    assert catalog.signals['"core banking"; API'] == ("core banking", "API")
+
+    assert catalog.refresh() is False
+    # Перезапись тем же содержимым меняет mtime, но не требует разбора
+    (tmp_path / "b.csv").write_text((tmp_path / "b.csv").read_text(encoding="utf-8"), encoding="utf-8")
+    os.utime(tmp_path / "b.csv", ns=(1, 1))
+    assert catalog.refresh() is False
+    assert len(parsed) == 2
+
+
+def test_changed_file_rebuilds_only_that_file(tmp_path):
+    _write(tmp_path / "a.csv", ["Product A,Banks,Mandatory,Is a bank,,"])
+    _write(tmp_path / "b.csv", ["Product B,Retail,Qualification,Sells online,,"])
+    parse_file, parsed = _counting_parser()
+    catalog = CriteriaCatalog(str(tmp_path), parse_file)
+    catalog.refresh()
+    version = catalog.version
+
+    _write(tmp_path / "b.csv", ["Product C,Retail,Qualification,Sells online,,"])
+    assert catalog.refresh() is True
+    assert parsed == ["a.csv", "b.csv", "b.csv"]
+    assert catalog.products == ["Product A", "Product C"]
+    assert catalog.version != version
+
+    catalog.invalidate("a.csv")
+    catalog.refresh()
+    assert parsed[-1] == "a.csv"
+
+
+def test_snapshot_warms_new_catalog(tmp_path):
+    criteria_dir = tmp_path / "criteria"
+    criteria_dir.mkdir()
+    _write(criteria_dir / "a.csv", ["Product A,Banks,Mandatory,Is a bank,,"])
+    snapshot = str(tmp_path / "catalog.pkl")
+    parse_file, parsed = _counting_parser()
+    CriteriaCatalog(str(criteria_dir), parse_file, snapshot_path=snapshot).refresh()
+
+    warm = CriteriaCatalog(str(criteria_dir), parse_file, snapshot_path=snapshot)
+    assert warm.refresh() is False
+    assert warm.products == ["Product A"]
+    assert parsed == ["a.csv"]
+
+    # Снапшот другого разборщика не используется
+    other = CriteriaCatalog(str(criteria_dir), parse_file, snapshot_path=snapshot, parser_id="other")
+    assert other.refresh() is True
+    assert parsed == ["a.csv", "a.csv"]
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Граф критериев: число вызовов планировщика против последовательного пути
+"""
+
+import asyncio
+import os
+import sys
+
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from src.criteria import mandatory
+from src.criteria.dag import ProductCriteriaDAG, get_pruning_stats, reset_pruning_stats
+from src.utils.config import PROCESSING_CONFIG
+
+ANSWERS = {"C1": "Passed", "C2": "Not Passed", "C3": "Passed", "C4": "Passed"}
+
+
+def _mandatory_df():
+    return pd.DataFrame({
+        "Target Audience": ["Banks"] * 4,
+        "Criteria": list(ANSWERS),
+        "Place": ["gen_descr"] * 4,
+        "Search Query": [None] * 4,
+    })
+
+
+def _patch_calls(monkeypatch):
+    calls = []
+
+    def answer(criterion):
+        calls.append(criterion)
+        return ANSWERS[criterion], None
+
+    async def answer_async(criteria_type, information, criterion, mode):
+        await asyncio.sleep(0)
+        return answer(criterion)
+
+    async def information_async(company_info, place, search_query, **kwargs):
+        return "description", "gen_descr"
+
+    monkeypatch.setattr(mandatory, "get_structured_response", lambda t, information, criterion, mode: answer(criterion))
+    monkeypatch.setattr(mandatory, "get_structured_response_async", answer_async)
+    monkeypatch.setattr(mandatory, "get_information_for_criterion", lambda *a, **k: ("description", "gen_descr"))
+    monkeypatch.setattr(mandatory, "get_information_for_criterion_async", information_async)
+    monkeypatch.setitem(PROCESSING_CONFIG, "use_serper_for_mandatory", False)
+    return calls
+
+
+def _run_async(width, monkeypatch):
+    monkeypatch.setitem(PROCESSING_CONFIG, "mandatory_parallel_width", width)
+    company_info = {"Description": "description"}
+    passed = asyncio.run(mandatory.check_mandatory_criteria_async(company_info, "Banks", _mandatory_df()))
+    return passed, company_info
+
+
+def test_short_circuit_matches_sequential_call_count(monkeypatch):
+    calls = _patch_calls(monkeypatch)
+    reset_pruning_stats()
+    sequential_info = {"Description": "description"}
+    assert mandatory.check_mandatory_criteria(sequential_info, "Banks", _mandatory_df()) is False
+    sequential_calls = len(calls)
+    assert sequential_calls == 2
+
+    calls.clear()
+    reset_pruning_stats()
+    passed, async_info = _run_async(1, monkeypatch)
+    assert passed is False
+    assert async_info == sequential_info
+    assert len(calls) == sequential_calls
+
+    summary = get_pruning_stats().summary()
+    assert summary["llm_calls_skipped"] == 2
+    assert summary["speculative_calls_discarded"] == 0
+    assert summary["llm_calls_saved"] == 0
+
+
+def test_speculative_width_reports_extra_calls(monkeypatch):
+    calls = _patch_calls(monkeypatch)
+    reset_pruning_stats()
+    passed, _ = _run_async(3, monkeypatch)
+    assert passed is False
+
+    summary = get_pruning_stats().summary()
+    # После принятия C1 окно (3 шага) запускает C4: C3 и C4 - вызовы сверх последовательного пути
+    assert summary["speculative_calls_discarded"] == 2
+    assert summary["llm_calls_saved"] == -2
+    assert summary["llm_calls_skipped"] == 0
+    assert len(calls) <= 2 + summary["speculative_calls_discarded"]
+
+
+def test_branch_does_not_mutate_dag():
+    dag = ProductCriteriaDAG("Product", {
+        "qualification_questions": {"Banks": "Is it a bank?"},
+        "mandatory_df": _mandatory_df(),
+        "nth_df": pd.DataFrame(columns=["Target Audience", "Criteria"]),
+    })
+    assert dag.branch("Unknown").mandatory_rows == []
+    assert list(dag.audiences) == ["Banks"]
+    assert len(dag.branch("Banks").mandatory_rows) == 4
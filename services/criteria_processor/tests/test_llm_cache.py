@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Персистентный кэш ответов LLM: попадания, инвалидация по TTL/параметрам, async доступ
+"""
+
+import asyncio
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from src.external import llm_cache as llm_cache_module
+from src.external import openai_client
+from src.external.llm_cache import LLMResponseCache
+
+
+def test_hit_and_key_parameters(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"))
+    assert cache.get("gpt-4o", 0.1, 20, "prompt") is None
+
+    cache.set("gpt-4o", 0.1, 20, "prompt", "Passed")
+    assert cache.get("gpt-4o", 0.1, 20, "prompt") == "Passed"
+    # Другая модель или max_tokens - другой ключ
+    assert cache.get("gpt-4o-mini", 0.1, 20, "prompt") is None
+    assert cache.get("gpt-4o", 0.1, 500, "prompt") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"]) == (1, 3, 1)
+    cache.close()
+
+
+def test_expired_and_evicted_entries(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), ttl_seconds=60, max_entries=2)
+    now = llm_cache_module.time.time()
+    cache.set("gpt-4o", 0.1, 20, "old", "Passed")
+
+    monkeypatch.setattr(llm_cache_module.time, "time", lambda: now + 120)
+    assert cache.get("gpt-4o", 0.1, 20, "old") is None
+
+    for prompt in ("a", "b", "c"):
+        cache.set("gpt-4o", 0.1, 20, prompt, prompt)
+    cache.evict()
+    assert cache.get("gpt-4o", 0.1, 20, "a") is None
+    assert cache.get("gpt-4o", 0.1, 20, "c") == "c"
+    cache.close()
+
+
+def test_async_response_served_from_cache(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"))
+    monkeypatch.setattr(openai_client, "get_llm_cache", lambda: cache)
+
+    def no_client(model):
+        raise AssertionError("OpenAI не должен вызываться при попадании в кэш")
+
+    monkeypatch.setattr(openai_client, "get_async_openai_client", no_client)
+
+    async def run():
+        await cache.set_async("gpt-4o", openai_client.OPENAI_TEMPERATURE, 20, "prompt", "Not Passed")
+        return await openai_client.get_openai_response_async("prompt", max_tokens=20, model="gpt-4o")
+
+    assert asyncio.run(run()) == "Not Passed"
+    cache.close()
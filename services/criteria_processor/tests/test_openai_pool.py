@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Реестр OpenAI клиентов: закрытие замененных sync клиентов и async клиентов event loop
+"""
+
+import asyncio
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from src.external import openai_pool
+from src.external.async_resources import close_async_resources
+from src.external.openai_pool import OpenAIClientRegistry
+
+
+def _registry(monkeypatch):
+    monkeypatch.setattr(openai_pool, "OPENAI_API_KEY", "sk-test")
+    return OpenAIClientRegistry(pool_size=4)
+
+
+def test_retired_client_closes_after_last_lease(monkeypatch):
+    registry = _registry(monkeypatch)
+    with registry.lease_client() as client:
+        registry.configure(max_concurrent_companies=100)
+        assert not client.is_closed()
+        with registry.lease_client() as replacement:
+            assert replacement is not client
+    assert client.is_closed()
+    assert not replacement.is_closed()
+
+    # Без запросов замененный клиент закрывается сразу
+    registry.configure(max_concurrent_companies=200)
+    assert replacement.is_closed()
+    registry.close()
+
+
+def test_async_client_closed_with_loop_resources(monkeypatch):
+    registry = _registry(monkeypatch)
+    monkeypatch.setattr(openai_pool, "_global_registry", registry)
+
+    async def run():
+        client = openai_pool.get_async_openai_client()
+        assert openai_pool.get_async_openai_client() is client
+        await close_async_resources()
+        return client
+
+    client = asyncio.run(run())
+    assert client.is_closed()
+    assert len(registry._async_clients) == 0
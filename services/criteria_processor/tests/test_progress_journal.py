@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Журнал прогресса: счетчики разных писателей складываются, компактификация и сбой при обрезке
+"""
+
+import json
+import os
+import sys
+
+project_root = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from src.utils.progress_journal import ProgressJournal, journal_path_for, read_progress
+
+
+def test_events_replay_and_compaction(tmp_path):
+    snapshot = tmp_path / "s_progress.json"
+    journal = ProgressJournal(snapshot, compact_every=3)
+    journal.append(fields={"status": "processing"})
+    journal.append(inc={"criteria_breakdown.mandatory.processed": 2})
+    assert not snapshot.exists()
+    assert read_progress(snapshot) == {"status": "processing", "criteria_breakdown": {"mandatory": {"processed": 2}}}
+
+    # Третье событие сворачивает журнал в снапшот
+    journal.append(push={"recent": {"item": "Acme", "limit": 2}})
+    assert journal_path_for(snapshot).stat().st_size == 0
+    journal.append(push={"recent": {"item": "Beta", "limit": 2}}, inc={"criteria_breakdown.mandatory.processed": 1})
+    journal.append(push={"recent": {"item": "Gamma", "limit": 2}})
+    journal.close()
+
+    # Второй писатель (новый экземпляр) продолжает seq и складывает счетчики
+    other = ProgressJournal(snapshot, compact_every=0)
+    other.append(inc={"criteria_breakdown.mandatory.processed": 1})
+    other.close()
+
+    state = read_progress(snapshot)
+    assert state["criteria_breakdown"]["mandatory"]["processed"] == 4
+    assert state["recent"] == ["Beta", "Gamma"]
+
+
+def test_crash_between_snapshot_and_truncate_does_not_double_apply(tmp_path):
+    snapshot = tmp_path / "s_progress.json"
+    journal = ProgressJournal(snapshot, compact_every=0)
+    journal.append(inc={"processed": 1})
+    journal.append(inc={"processed": 1})
+    journal.close()
+    lines = journal_path_for(snapshot).read_text(encoding="utf-8")
+
+    ProgressJournal(snapshot, compact_every=0).compact()
+    # Журнал не обрезан (сбой) и дописан оборванной строкой
+    journal_path_for(snapshot).write_text(lines + '{"seq": 3, "inc": {"proc', encoding="utf-8")
+
+    assert json.loads(snapshot.read_text(encoding="utf-8"))["processed"] == 2
+    assert read_progress(snapshot) == {"processed": 2}
+
+    resumed = ProgressJournal(snapshot, compact_every=0)
+    resumed.append(inc={"processed": 1})
+    resumed.close()
+    assert read_progress(snapshot) == {"processed": 3}
@@ -3,11 +3,14 @@ import os
 import csv
 import json
 import logging
+import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, Tuple
+from typing import List, Dict, Any, Optional, Union, Tuple, Iterable, Iterator
 
 # Импортируем функцию нормализации URL
 from src.input_validators import normalize_domain
+from src.session_store import SESSIONS_DB_NAME, SessionMetadataStore, get_session_store
+from src.progress_events import get_progress_bus
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -266,8 +269,9 @@ def save_context_file(context_file_path: str, context_text: str) -> bool:
         return False
 
 # === Session Metadata Handling (Using Project Root Paths) ===
-SESSIONS_METADATA_FILE = PROJECT_ROOT / "sessions_metadata.json" # Use Path object
+SESSIONS_METADATA_FILE = PROJECT_ROOT / "sessions_metadata.json" # Legacy JSON metadata, migrated into SESSIONS_DB_FILE
 SESSIONS_DIR = PROJECT_ROOT / "output" / "sessions" # Use Path object
+SESSIONS_DB_FILE = SESSIONS_DIR / SESSIONS_DB_NAME # Lives in output/ which is persisted between container restarts
 
 def ensure_sessions_dir_exists():
     """Ensures the sessions directory exists."""
@@ -278,70 +282,73 @@ def ensure_sessions_dir_exists():
         except OSError as e:
             logging.error(f"Could not create sessions directory {SESSIONS_DIR}. Error: {e}")
 
-def load_session_metadata() -> list[dict]:
-    """Loads session metadata from the JSON file."""
+def get_metadata_store() -> SessionMetadataStore:
+    """Session metadata store of this process (migrates sessions_metadata.json on first open)."""
     ensure_sessions_dir_exists()
-    if not SESSIONS_METADATA_FILE.exists(): # Use Path.exists()
-        logging.warning(f"\'{SESSIONS_METADATA_FILE}\' not found. Initializing with empty list.")
-        return []
+    return get_session_store(SESSIONS_DB_FILE, legacy_json_path=SESSIONS_METADATA_FILE)
+
+def load_session_metadata() -> list[dict]:
+    """Loads metadata of all sessions (in creation order)."""
     try:
-        # Log file modification time before reading
-        try:
-            mod_time = os.path.getmtime(SESSIONS_METADATA_FILE)
-            logging.info(f"Attempting to load session metadata. File '{SESSIONS_METADATA_FILE}' last modified at: {mod_time}")
-        except OSError:
-            logging.warning(f"Could not get modification time for '{SESSIONS_METADATA_FILE}'.")
-
-        with open(SESSIONS_METADATA_FILE, 'r', encoding='utf-8') as f:
-            content_before_load = f.read() # Read content first for logging
-            f.seek(0) # Reset file pointer to the beginning before json.load
-            metadata = json.loads(content_before_load) # Use json.loads with string content
-            
-            # Log the actual content being loaded for the specific session if possible
-            # This requires knowing the session_id, which this generic function doesn't.
-            # So, we log a snippet or hash if it's too large.
-            # content_snippet = content_before_load[:500] + "..." if len(content_before_load) > 500 else content_before_load
-            # logging.info(f"Successfully loaded session metadata from '{SESSIONS_METADATA_FILE}'. Content snippet: {content_snippet}")
-            
-            if not isinstance(metadata, list):
-                 logging.error(f"Invalid format in \'{SESSIONS_METADATA_FILE}\'. Expected a list. Returning empty list.")
-                 return []
-            return metadata
-    except json.JSONDecodeError:
-        logging.error(f"Error decoding JSON from \'{SESSIONS_METADATA_FILE}\'. Returning empty list.")
-        return []
+        return get_metadata_store().list_all()
     except Exception as e:
         logging.error(f"Error loading session metadata: {e}", exc_info=True)
         return []
 
 def save_session_metadata(metadata: list[dict]):
-    """Saves session metadata list to the JSON file."""
-    ensure_sessions_dir_exists()
-    
-    # Log the metadata that is about to be saved, especially for the relevant session
-    # This requires knowing session_id, so we might log a relevant part or full if small
+    """
+    Replaces metadata of all sessions with the given list.
+    Prefer update_session_metadata() for changes to a single session - it does not overwrite concurrent updates.
+    """
     try:
-        metadata_str_for_log = json.dumps(metadata, indent=2, ensure_ascii=False)
-        # snippet_to_log = metadata_str_for_log[:500] + "..." if len(metadata_str_for_log) > 500 else metadata_str_for_log
-        # logging.info(f"Attempting to save session metadata. Data snippet: {snippet_to_log}")
-    except Exception as log_e:
-        logging.warning(f"Could not serialize metadata for logging before save: {log_e}")
+        get_metadata_store().replace_all(metadata)
+        logging.info(f"Saved metadata of {len(metadata)} sessions to {SESSIONS_DB_FILE}")
+    except Exception as e:
+        logging.error(f"Error saving session metadata: {e}", exc_info=True)
 
+def get_session_metadata(session_id: str) -> Optional[dict]:
+    """Metadata of one session or None (indexed lookup by session_id)."""
     try:
-        with open(SESSIONS_METADATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
-            f.flush()  # Ensure all internal buffers are written to the OS
-            os.fsync(f.fileno())  # Ensure OS writes to disk
-        logging.info(f"Successfully saved session metadata to {SESSIONS_METADATA_FILE} with fsync.")
-        # Log file modification time after writing
-        try:
-            mod_time = os.path.getmtime(SESSIONS_METADATA_FILE)
-            logging.info(f"File '{SESSIONS_METADATA_FILE}' last modified at: {mod_time} (after save)")
-        except OSError:
-            logging.warning(f"Could not get modification time for '{SESSIONS_METADATA_FILE}' after save.")
-            
+        return get_metadata_store().get(session_id)
     except Exception as e:
-        logging.error(f"Error saving session metadata: {e}", exc_info=True)
+        logging.error(f"Error loading metadata for session {session_id}: {e}", exc_info=True)
+        return None
+
+def list_sessions_by_status(*statuses: str) -> list[dict]:
+    """Metadata of sessions with one of the given statuses (indexed by status)."""
+    try:
+        return get_metadata_store().list_by_status(*statuses)
+    except Exception as e:
+        logging.error(f"Error loading metadata of {statuses} sessions: {e}", exc_info=True)
+        return []
+
+def delete_session_metadata(session_id: str) -> bool:
+    """Removes metadata of one session. Raises on storage errors."""
+    return get_metadata_store().delete(session_id)
+
+def add_session_metadata(session_data: dict):
+    """Adds a new session (or replaces all metadata of an existing one). Raises on storage errors."""
+    get_metadata_store().upsert(session_data)
+    get_progress_bus().publish(session_data["session_id"], session_data)
+
+def update_session_metadata(session_id: str, fields=None, **kwargs) -> Optional[dict]:
+    """
+    Atomically updates fields of one session and returns its new metadata (None if the session is unknown).
+
+    fields may be a dict or a function (current metadata) -> dict of changes, or None to leave the session as is;
+    keyword arguments are merged into a dict of changes. Raises on storage errors.
+    """
+    if fields is None:
+        fields = kwargs
+    elif kwargs:
+        if callable(fields):
+            raise TypeError("update_session_metadata() takes either a function or field values, not both")
+        fields = {**fields, **kwargs}
+    session_data = get_metadata_store().update(session_id, fields)
+    if session_data is not None:
+        # Push the new metadata to /events and /ws subscribers (no polling needed)
+        get_progress_bus().publish(session_id, session_data)
+    return session_data
 
 # === Results CSV Handling ===
 def save_results_csv(results: list[dict], output_path: str, expected_fields: list[str] = None, append_mode: bool = False):
@@ -388,90 +395,17 @@ def save_results_csv(results: list[dict], output_path: str, expected_fields: lis
     
     logging.info(f"Saved {len(results)} result(s) to {output_path}")
 
-def save_results_json(results: List[Dict[str, Any]], output_path: str, append_mode: bool = False):
-    """
-    Сохраняет полные результаты обработки компаний в JSON файл.
-    Включает все данные из CSV плюс структурированные данные.
-    
-    Args:
-        results: Список результатов с данными компаний
-        output_path: Путь для сохранения JSON файла
-        append_mode: Режим добавления в существующий файл вместо перезаписи
-    """
-    # Создаем директорию, если она не существует
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    # Подготавливаем полные данные результатов
-    json_data = []
-    
-    for result in results:
-        # Создаем полную структуру данных, включающую все поля
-        json_result = {
-            # Основные поля из CSV
-            "Company_Name": result.get("Company_Name", ""),
-            "Official_Website": result.get("Official_Website", ""),
-            "LinkedIn_URL": result.get("LinkedIn_URL", ""),
-            "Description": result.get("Description", ""),
-            "Timestamp": result.get("Timestamp", ""),
-            "HubSpot_Company_ID": result.get("HubSpot_Company_ID", ""),
-            "Predator_ID": result.get("Predator_ID", ""),
-            "Quality_Status": result.get("Quality_Status", ""),
-            
-            # Структурированные данные (если есть)
-            "structured_data": result.get("structured_data", {}),
-            
-            # Дополнительные поля (валидация, интеграции и т.д.)
-            "validation": result.get("validation", {}),
-            "integrations": result.get("integrations", {}),
-            
-            # Любые другие поля, которые могут быть в результате
-        }
-        
-        # Добавляем все остальные поля, которые не были явно указаны выше
-        for key, value in result.items():
-            if key not in json_result:
-                json_result[key] = value
-        
-        json_data.append(json_result)
-    
-    # Если в режиме добавления и файл существует, загружаем существующие данные
-    existing_data = []
-    if append_mode and os.path.exists(output_path):
-        try:
-            with open(output_path, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-                if not isinstance(existing_data, list):
-                    existing_data = []
-        except Exception as e:
-            logging.error(f"Error loading existing JSON data from {output_path}: {e}")
-            existing_data = []
-    
-    # Объединяем существующие и новые данные
-    final_data = existing_data + json_data
-    
-    # Сохраняем в JSON
-    try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(final_data, f, indent=2, ensure_ascii=False)
-        logging.info(f"Saved {len(json_data)} complete result(s) to {output_path}")
-        return True
-    except Exception as e:
-        logging.error(f"Error saving complete results to {output_path}: {e}")
-        return False
+# === Results JSON Handling ===
+# Результаты пишутся построчно в JSONL (по строке на компанию, O(1) на запись);
+# JSON-массив старого формата собирается из JSONL потоково, когда он нужен для скачивания.
+JSONL_FSYNC_EVERY = 50          # fsync после каждых N записей
+JSONL_FSYNC_INTERVAL = 5.0      # ... или если с последнего fsync прошло больше N секунд
 
-def save_structured_data_incrementally(result: Dict[str, Any], output_path: str):
+
+def build_json_result(result: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Сохраняет полные данные об одной компании в JSON файл инкрементально.
-    Включает все данные из CSV плюс структурированные данные.
-    
-    Args:
-        result: Результат с данными одной компании
-        output_path: Путь для сохранения JSON файла
+    Полная структура результата для JSON: все данные из CSV плюс структурированные данные.
     """
-    # Создаем директорию, если она не существует
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    # Подготавливаем полные данные результата
     json_result = {
         # Основные поля из CSV
         "Company_Name": result.get("Company_Name", ""),
@@ -496,31 +430,194 @@ def save_structured_data_incrementally(result: Dict[str, Any], output_path: str)
         if key not in json_result:
             json_result[key] = value
     
-    # Загружаем существующие данные, если файл существует
-    existing_data = []
-    if os.path.exists(output_path):
+    return json_result
+
+
+def jsonl_path_for(json_path: Union[str, Path]) -> Path:
+    """Путь JSONL журнала для JSON файла результатов: results.json -> results.jsonl"""
+    return Path(json_path).with_suffix(".jsonl")
+
+
+class JsonlResultSink:
+    """
+    Append-only запись результатов в JSONL
+
+    Каждая запись - одна строка, сразу сбрасывается в ОС; fsync выполняется пачками
+    (каждые fsync_every записей или fsync_interval секунд) и при закрытии.
+    Оборванная при сбое последняя строка пропускается при чтении (iter_jsonl_results).
+    """
+    
+    def __init__(self, json_path: Union[str, Path], append: bool = True,
+                 fsync_every: int = JSONL_FSYNC_EVERY, fsync_interval: float = JSONL_FSYNC_INTERVAL):
+        self.json_path = Path(json_path)
+        self.path = jsonl_path_for(json_path)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        
+        if append and not self.path.exists() and self.json_path.exists():
+            # Продолжение сессии, сохраненной в старом формате: переносим массив в JSONL один раз
+            self._migrate_legacy_json()
+        
+        self._file = open(self.path, 'a' if append else 'w', encoding='utf-8')
+        if append and self._file.tell() > 0:
+            self._terminate_torn_line()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.count = 0
+    
+    def _migrate_legacy_json(self):
         try:
-            with open(output_path, 'r', encoding='utf-8') as f:
+            with open(self.json_path, 'r', encoding='utf-8') as f:
                 existing_data = json.load(f)
-                if not isinstance(existing_data, list):
-                    existing_data = []
+            if not isinstance(existing_data, list):
+                existing_data = []
         except Exception as e:
-            logging.error(f"Error loading existing JSON data from {output_path}: {e}")
+            logging.error(f"Error loading existing JSON data from {self.json_path}: {e}")
             existing_data = []
+        with open(self.path, 'w', encoding='utf-8') as f:
+            for item in existing_data:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    
+    def _terminate_torn_line(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+        if torn:
+            self._file.write("\n")
     
-    # Добавляем новые данные
-    existing_data.append(json_result)
+    def write(self, result: Dict[str, Any]):
+        """Дописать один результат (поля как в save_results_json)"""
+        self._file.write(json.dumps(build_json_result(result), ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        self.count += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+    
+    def sync(self):
+        if self._unsynced and not self._file.closed:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+    
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_jsonl_results(jsonl_path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Лениво читать результаты из JSONL, пропуская поврежденные строки"""
+    jsonl_path = Path(jsonl_path)
+    if not jsonl_path.exists():
+        return
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Skipping unreadable line {line_number} in {jsonl_path}")
+
+
+def iter_json_array(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Потоково сериализовать записи в JSON-массив того же вида, что json.dump(records, indent=2).
+    Подходит для StreamingResponse: в памяти только одна запись.
+    """
+    first = True
+    for record in records:
+        item = json.dumps(record, indent=2, ensure_ascii=False, default=str).replace("\n", "\n  ")
+        yield ("[\n  " if first else ",\n  ") + item
+        first = False
+    yield "[]" if first else "\n]"
+
+
+def materialize_json_results(json_path: Union[str, Path]) -> bool:
+    """
+    Собрать JSON-массив старого формата из JSONL журнала рядом с json_path.
+    Запись идет во временный файл с атомарной заменой, поэтому сбой не портит существующий JSON.
+    """
+    json_path = Path(json_path)
+    jsonl_path = jsonl_path_for(json_path)
+    if not jsonl_path.exists():
+        return False
+    
+    tmp_path = json_path.with_name(json_path.name + ".tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for chunk in iter_json_array(iter_jsonl_results(jsonl_path)):
+                f.write(chunk)
+        os.replace(tmp_path, json_path)
+        logging.info(f"Materialized JSON results {json_path} from {jsonl_path.name}")
+        return True
+    except Exception as e:
+        logging.error(f"Error materializing JSON results {json_path}: {e}")
+        return False
+
+
+def save_results_json(results: List[Dict[str, Any]], output_path: str, append_mode: bool = False):
+    """
+    Сохраняет полные результаты обработки компаний в JSON файл.
+    Включает все данные из CSV плюс структурированные данные.
+    
+    Args:
+        results: Список результатов с данными компаний
+        output_path: Путь для сохранения JSON файла
+        append_mode: Дописать результаты в JSONL журнал рядом с файлом (<output>.jsonl)
+                     и пересобрать из него JSON массив (materialize_json_results).
+                     Пересборка читает весь журнал - при записи по одной компании
+                     (пайплайн) используйте JsonlResultSink и materialize_json_results в конце
+    """
+    # Создаем директорию, если она не существует
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    
+    if append_mode:
+        try:
+            with JsonlResultSink(output_path, append=True) as sink:
+                for result in results:
+                    sink.write(result)
+            logging.info(f"Appended {len(results)} complete result(s) to {sink.path}")
+        except Exception as e:
+            logging.error(f"Error appending complete results to {output_path}: {e}")
+            return False
+        # .json остается полным массивом, как до перехода на журнал
+        return materialize_json_results(output_path)
+    
+    # Подготавливаем полные данные результатов
+    json_data = [build_json_result(result) for result in results]
     
     # Сохраняем в JSON
     try:
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, indent=2, ensure_ascii=False)
-        logging.info(f"Added 1 complete result to {output_path}")
+            json.dump(json_data, f, indent=2, ensure_ascii=False)
+        logging.info(f"Saved {len(json_data)} complete result(s) to {output_path}")
         return True
     except Exception as e:
-        logging.error(f"Error saving complete result to {output_path}: {e}")
+        logging.error(f"Error saving complete results to {output_path}: {e}")
         return False
 
+def save_structured_data_incrementally(result: Dict[str, Any], output_path: str):
+    """
+    Дописывает полные данные об одной компании в JSONL журнал рядом с output_path
+    и обновляет JSON файл (см. save_results_json с append_mode=True).
+    Включает все данные из CSV плюс структурированные данные.
+    
+    Args:
+        result: Результат с данными одной компании
+        output_path: Путь JSON файла (журнал - <output>.jsonl)
+    """
+    return save_results_json([result], output_path, append_mode=True)
+
 def merge_original_with_results(original_file_path: str, results_file_path: str, output_file_path: str) -> bool:
     """
     Объединяет исходный файл с результатами обработки.
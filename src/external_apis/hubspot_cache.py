@@ -0,0 +1,267 @@
+"""
+Кэш поиска компаний в HubSpot
+
+HubSpotClient, HubSpotAdapter, HubSpotIntegrationService и интеграция критериев ищут
+одни и те же домены. HubSpotLookupCache хранит результаты поиска (компания или None):
+
+- LRU с ограничением размера; отрицательные результаты живут меньше положительных
+- срок записи не превышает момент, когда ai_description компании перестанет быть
+  свежим (ai_description_updated + max_age_months), - после него нужен новый запрос
+- обратный индекс company_id -> ключи: инвалидация компании после обновления без обхода кэша
+- опционально - SQLite файл: новая сессия начинает с "теплым" кэшем
+
+Модуль не импортирует ничего из пакета src, поэтому criteria_processor загружает его по пути к файлу.
+"""
+
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_CACHE_PATH = os.path.join(PROJECT_ROOT, "cache", "hubspot_lookup_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_NEGATIVE_TTL_SECONDS = 3600
+# Среднее количество дней в месяце (как в HubSpotClient.is_description_fresh)
+DAYS_PER_MONTH = 30.44
+
+
+def _company_id(value: Any) -> Optional[str]:
+    if isinstance(value, dict) and value.get("id") is not None:
+        return str(value["id"])
+    return None
+
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    """ai_description_updated (YYYY-MM-DD, ISO или миллисекунды epoch) -> epoch секунды"""
+    if not value:
+        return None
+    text = str(value).strip()
+    try:
+        if text.isdigit():
+            return int(text) / 1000.0
+        parsed = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+class HubSpotLookupCache:
+    """Thread-safe LRU+TTL кэш результатов поиска компаний с индексом по company_id"""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+        persist_path: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.persist_path = persist_path
+        # key -> (value, company_id, stored_at, expires_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._by_company: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evicted": 0, "invalidated": 0, "loaded": 0}
+
+        if persist_path:
+            self._open(persist_path)
+
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        """(True, значение) если запись есть и не истекла, иначе (False, None); значение может быть None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[3] <= time.time():
+                self._remove(key)
+                self._delete_rows([key])
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, entry[0]
+
+    def set(self, key: str, value: Any, max_age_months: Optional[float] = None):
+        """
+        Сохранить результат поиска
+
+        max_age_months ограничивает срок записи моментом, когда описание компании
+        перестанет быть свежим (если этот момент еще не наступил).
+        """
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if value is not None else self.negative_ttl_seconds)
+        if max_age_months is not None and isinstance(value, dict):
+            updated_at = _parse_timestamp((value.get("properties") or {}).get("ai_description_updated"))
+            if updated_at is not None:
+                stale_at = updated_at + max_age_months * DAYS_PER_MONTH * 86400
+                if stale_at > now:
+                    expires_at = min(expires_at, stale_at)
+
+        company_id = _company_id(value)
+        with self._lock:
+            self._remove(key)
+            self._insert(key, value, company_id, now, expires_at)
+            self._stats["writes"] += 1
+            evicted = self._evict()
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO lookups (key, company_id, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                        (key, company_id, json.dumps(value, ensure_ascii=False, default=str), now, expires_at)
+                    )
+                    self._conn.commit()
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    logger.error(f"HubSpot lookup cache write failed for {key}: {e}")
+            self._delete_rows(evicted)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if self._remove(key):
+                self._stats["invalidated"] += 1
+            self._delete_rows([key])
+
+    def invalidate_company(self, company_id: Any) -> int:
+        """Удалить все записи компании (например после обновления ее свойств); возвращает их количество"""
+        with self._lock:
+            keys = list(self._by_company.get(str(company_id), ()))
+            for key in keys:
+                self._remove(key)
+            self._stats["invalidated"] += len(keys)
+            self._delete_rows(keys)
+        if keys:
+            logger.info(f"HubSpot lookup cache invalidated for company ID {company_id} (keys: {', '.join(keys)})")
+        return len(keys)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Текущие счетчики - база для get_stats(since=...) по одному запуску"""
+        with self._lock:
+            return dict(self._stats)
+
+    def get_stats(self, since: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Счетчики (с момента snapshot since, если передан), hit_rate и размер кэша"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        if since:
+            for name in self._stats:
+                if name != "loaded":
+                    stats[name] -= since.get(name, 0)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- служебное (вызывается под self._lock) ---
+
+    def _insert(self, key: str, value: Any, company_id: Optional[str], stored_at: float, expires_at: float):
+        self._entries[key] = (value, company_id, stored_at, expires_at)
+        if company_id is not None:
+            self._by_company.setdefault(company_id, set()).add(key)
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        company_id = entry[1]
+        if company_id is not None:
+            keys = self._by_company.get(company_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_company[company_id]
+        return True
+
+    def _evict(self):
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+            evicted.append(key)
+        self._stats["evicted"] += len(evicted)
+        return evicted
+
+    def _delete_rows(self, keys):
+        if self._conn is None or not keys:
+            return
+        try:
+            self._conn.executemany("DELETE FROM lookups WHERE key = ?", [(key,) for key in keys])
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"HubSpot lookup cache delete failed: {e}")
+
+    def _open(self, persist_path: str):
+        """Открыть файл кэша: удалить истекшие записи и загрузить последние max_entries"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(persist_path)), exist_ok=True)
+            conn = sqlite3.connect(persist_path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS lookups (
+                    key TEXT PRIMARY KEY,
+                    company_id TEXT,
+                    value TEXT,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_lookups_company ON lookups(company_id);
+            """)
+            conn.execute("DELETE FROM lookups WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+            rows = conn.execute(
+                "SELECT key, company_id, value, stored_at, expires_at FROM lookups ORDER BY stored_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Could not open HubSpot lookup cache {persist_path}, using memory only: {e}")
+            return
+
+        self._conn = conn
+        for key, company_id, value, stored_at, expires_at in reversed(rows):
+            try:
+                self._insert(key, json.loads(value), company_id, stored_at, expires_at)
+            except (TypeError, ValueError):
+                continue
+        self._stats["loaded"] = len(self._entries)
+
+
+_caches: Dict[str, HubSpotLookupCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_hubspot_cache(cache_path: Optional[str] = None, **kwargs) -> HubSpotLookupCache:
+    """
+    Общий кэш на процесс для файла cache_path (по умолчанию HUBSPOT_CACHE_PATH или cache/hubspot_lookup_cache.sqlite);
+    HUBSPOT_CACHE_PATH=memory - кэш только в памяти процесса
+    """
+    cache_path = cache_path or os.getenv("HUBSPOT_CACHE_PATH") or DEFAULT_CACHE_PATH
+    cache = _caches.get(cache_path)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(cache_path)
+            if cache is None:
+                cache = HubSpotLookupCache(persist_path=None if cache_path == "memory" else cache_path, **kwargs)
+                if cache.get_stats()["loaded"]:
+                    logger.info(f"HubSpot lookup cache: restored {cache.get_stats()['loaded']} entries from {cache_path}")
+                _caches[cache_path] = cache
+    return cache
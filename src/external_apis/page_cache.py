@@ -0,0 +1,208 @@
+"""
+Дисковое хранилище страниц ScrapingBee
+
+- ключ - нормализованный URL + вариант (например "text" или "html"), TTL задается на вызов
+- тело страницы хранится сжатым (zstd если установлен zstandard, иначе gzip)
+- одинаковые тела дедуплицируются по sha256 содержимого
+
+Модуль не импортирует ничего из пакета src, поэтому criteria_processor загружает его по пути к файлу.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_CACHE_PATH = os.path.join(PROJECT_ROOT, "cache", "scrapingbee_pages.sqlite")
+DEFAULT_TTL_SECONDS = 14 * 24 * 3600
+
+
+def normalize_url(url: str) -> str:
+    """Схема и хост в нижнем регистре, без фрагмента, порта по умолчанию и завершающего '/', query отсортирован"""
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parts.path.rstrip("/")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def _compress(text: str) -> Tuple[bytes, str]:
+    data = text.encode("utf-8")
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=6).compress(data), "zstd"
+    return gzip.compress(data, compresslevel=6), "gzip"
+
+
+def _decompress(blob: bytes, codec: str) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstandard is not installed, cannot read zstd page")
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    return gzip.decompress(blob).decode("utf-8")
+
+
+class PageCache:
+    """Thread-safe SQLite хранилище страниц с дедупликацией тел"""
+
+    def __init__(self, cache_path: str = DEFAULT_CACHE_PATH, default_ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS):
+        self.cache_path = cache_path
+        self.default_ttl_seconds = default_ttl_seconds
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "deduplicated": 0, "bytes_saved": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                variant TEXT NOT NULL,
+                content_hash TEXT,
+                status_code INTEGER,
+                final_url TEXT,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bodies (
+                content_hash TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_hash ON pages(content_hash);
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(url: str, variant: str) -> str:
+        return f"{variant}|{normalize_url(url)}"
+
+    def get(self, url: str, variant: str = "text", ttl_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Страница из кэша: {"text", "status_code", "final_url", "fetched_at"} или None
+
+        ttl_seconds=None - TTL по умолчанию, 0 - кэш не читается
+        """
+        ttl = self.default_ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl == 0:
+            return None
+
+        try:
+            with self._lock:
+                row = self._conn.execute("""
+                    SELECT p.status_code, p.final_url, p.fetched_at, b.codec, b.data
+                    FROM pages p LEFT JOIN bodies b ON b.content_hash = p.content_hash
+                    WHERE p.key = ?
+                """, (self.make_key(url, variant),)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Page cache read failed for {url}: {e}")
+            row = None
+
+        if row is None or (ttl is not None and time.time() - row[2] > ttl):
+            self._count("misses")
+            return None
+
+        status_code, final_url, fetched_at, codec, blob = row
+        try:
+            text = _decompress(blob, codec) if blob is not None else None
+        except (OSError, ValueError) as e:
+            logger.error(f"Page cache entry for {url} is unreadable: {e}")
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return {"text": text, "status_code": status_code, "final_url": final_url, "fetched_at": fetched_at}
+
+    def set(self, url: str, text: Optional[str], variant: str = "text", status_code: Optional[int] = 200, final_url: Optional[str] = None):
+        """Сохранить страницу; тело с тем же sha256 уже в хранилище не записывается повторно"""
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest() if text is not None else None
+        try:
+            with self._lock:
+                if content_hash is not None:
+                    exists = self._conn.execute(
+                        "SELECT size FROM bodies WHERE content_hash = ?", (content_hash,)
+                    ).fetchone()
+                    if exists:
+                        self._stats["deduplicated"] += 1
+                        self._stats["bytes_saved"] += exists[0]
+                    else:
+                        blob, codec = _compress(text)
+                        self._conn.execute(
+                            "INSERT INTO bodies (content_hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                            (content_hash, codec, len(text.encode("utf-8")), blob)
+                        )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pages (key, url, variant, content_hash, status_code, final_url, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.make_key(url, variant), url, variant, content_hash, status_code, final_url, time.time())
+                )
+                self._conn.commit()
+                self._stats["writes"] += 1
+        except sqlite3.Error as e:
+            logger.error(f"Page cache write failed for {url}: {e}")
+
+    def purge_older_than(self, max_age_seconds: float) -> int:
+        """Удалить устаревшие страницы и тела, на которые больше никто не ссылается"""
+        try:
+            with self._lock:
+                cursor = self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - max_age_seconds,))
+                removed = max(cursor.rowcount, 0)
+                self._conn.execute(
+                    "DELETE FROM bodies WHERE content_hash NOT IN (SELECT content_hash FROM pages WHERE content_hash IS NOT NULL)"
+                )
+                self._conn.commit()
+                return removed
+        except sqlite3.Error as e:
+            logger.error(f"Page cache purge failed: {e}")
+            return 0
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches: Dict[str, PageCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_page_cache(cache_path: Optional[str] = None, default_ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS) -> PageCache:
+    """Общее хранилище на процесс для файла cache_path"""
+    cache_path = cache_path or os.getenv("SCRAPINGBEE_CACHE_PATH") or DEFAULT_CACHE_PATH
+    cache = _caches.get(cache_path)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(cache_path)
+            if cache is None:
+                cache = PageCache(cache_path, default_ttl_seconds=default_ttl_seconds)
+                _caches[cache_path] = cache
+    return cache
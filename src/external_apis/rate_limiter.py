@@ -0,0 +1,406 @@
+"""
+Общий ограничитель скорости запросов к внешним API (token bucket на провайдера)
+
+- запросы в секунду (с запасом burst) и, для OpenAI, токены в минуту
+- ответы 429 (и 503 с Retry-After) ставят провайдера на паузу по Retry-After
+  или по экспоненциальной задержке и снижают скорость вдвое; после серии
+  успешных ответов скорость постепенно возвращается к базовой
+- заголовки OpenAI x-ratelimit-remaining-* / x-ratelimit-reset-* учитываются до 429
+- один ограничитель на провайдера в процессе (get_rate_limiter), общий для всех
+  клиентов: finders, description_generator, HubSpot, normalize_urls
+
+Лимиты по умолчанию - DEFAULT_LIMITS, переопределяются переменными окружения
+RATE_LIMIT_<PROVIDER>_RPS, _BURST, _TPM, _CONCURRENCY (например RATE_LIMIT_OPENAI_TPM=2000000).
+
+Модуль не импортирует ничего из пакета src, поэтому criteria_processor (у которого
+свой пакет src) загружает его по пути к файлу.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS: Dict[str, Dict[str, Any]] = {
+    "openai": {"requests_per_second": 50.0, "burst": 50, "tokens_per_minute": 2_000_000},
+    "serper": {"requests_per_second": 10.0, "burst": 10},
+    "scrapingbee": {"requests_per_second": 5.0, "burst": 5, "max_concurrent": 10},
+    # Search API HubSpot ограничен 5 запросами в секунду на аккаунт
+    "hubspot": {"requests_per_second": 4.0, "burst": 4},
+    # Проверка живости сайтов: запросы идут на разные хосты, ограничиваем общий темп
+    "url_check": {"requests_per_second": 20.0, "burst": 10},
+}
+
+THROTTLE_STATUSES = (429,)
+MAX_BACKOFF_SECONDS = 60.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах: число секунд или HTTP-дата; None если заголовок не разобран"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Длительность OpenAI вида "1s", "6m0s", "20ms" в секундах"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value.strip())
+    if not parts:
+        return parse_retry_after(value)
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket с резервированием
+
+    reserve() сразу списывает токены (баланс может уйти в минус) и возвращает, сколько
+    ждать до их появления, поэтому одновременные вызовы выстраиваются в очередь без циклов.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def drain(self):
+        """Обнулить баланс (сервер сообщил, что лимит исчерпан)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+
+class ProviderLimiter:
+    """
+    Ограничитель одного провайдера
+
+    Использование:
+        limiter = get_rate_limiter("hubspot")
+        await limiter.acquire()                              # или acquire_sync() из потоков
+        ... запрос ...
+        limiter.observe(response.status, response.headers)   # 429 -> пауза и снижение скорости
+
+        async with limiter.limited():                        # + ограничение одновременных запросов
+            ... запрос ...
+    """
+
+    def __init__(self,
+                 name: str,
+                 requests_per_second: float,
+                 burst: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 max_concurrent: Optional[int] = None,
+                 min_rate_fraction: float = 0.1,
+                 recovery_after: int = 20,
+                 base_backoff_seconds: float = 1.0):
+        """
+        Args:
+            name: Имя провайдера (для логов и статистики)
+            requests_per_second: Базовая скорость запросов
+            burst: Емкость корзины запросов (по умолчанию = скорости, но не меньше 1)
+            tokens_per_minute: Лимит токенов в минуту (None - не ограничивать)
+            max_concurrent: Максимум одновременных запросов в limited() (None - без ограничения)
+            min_rate_fraction: Ниже какой доли базовой скорости не снижаться после 429
+            recovery_after: Сколько успешных ответов подряд нужно для шага восстановления скорости
+            base_backoff_seconds: Пауза после 429 без Retry-After (удваивается на каждом 429 подряд)
+        """
+        self.name = name
+        self.base_rate = requests_per_second
+        self.min_rate = requests_per_second * min_rate_fraction
+        self.recovery_after = recovery_after
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_concurrent = max_concurrent
+
+        self.requests = TokenBucket(requests_per_second, burst or max(1.0, requests_per_second))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute else None
+
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._consecutive_throttles = 0
+        self._successes = 0
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._stats = {"requests": 0, "tokens": 0, "waits": 0, "wait_seconds": 0.0, "throttled": 0}
+
+    @property
+    def rate(self) -> float:
+        return self.requests.rate
+
+    def _reserve(self, tokens: float) -> float:
+        delay = self.requests.reserve(1)
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.reserve(min(tokens, self.tokens.capacity)))
+        with self._lock:
+            delay = max(delay, self._paused_until - time.monotonic())
+            self._stats["requests"] += 1
+            self._stats["tokens"] += int(tokens)
+            if delay > 0:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds"] += delay
+        return delay
+
+    async def acquire(self, tokens: float = 0):
+        """Дождаться разрешения на запрос (tokens - оценка токенов запроса для лимита в минуту)"""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, tokens: float = 0):
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _semaphore(self) -> Optional[asyncio.Semaphore]:
+        if not self.max_concurrent:
+            return None
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    @asynccontextmanager
+    async def limited(self, tokens: float = 0):
+        """acquire() + не больше max_concurrent одновременных запросов в текущем event loop"""
+        semaphore = self._semaphore()
+        if semaphore is None:
+            await self.acquire(tokens)
+            yield
+            return
+        async with semaphore:
+            await self.acquire(tokens)
+            yield
+
+    def throttle(self, retry_after: Optional[float] = None) -> float:
+        """
+        Сервер ограничил нас: пауза retry_after секунд (или экспоненциальная) и снижение скорости вдвое
+
+        Returns:
+            float: Длительность паузы в секундах
+        """
+        with self._lock:
+            self._consecutive_throttles += 1
+            self._successes = 0
+            self._stats["throttled"] += 1
+            if retry_after is None:
+                retry_after = self.base_backoff_seconds * (2 ** (self._consecutive_throttles - 1))
+            delay = min(retry_after, MAX_BACKOFF_SECONDS)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            new_rate = max(self.min_rate, self.requests.rate / 2)
+        if new_rate < self.requests.rate:
+            self.requests.set_rate(new_rate)
+        logger.warning(f"Rate limit hit for {self.name}: pausing {delay:.1f}s, rate {new_rate:.2f} req/s")
+        return delay
+
+    def observe(self, status: Optional[int], headers: Optional[Mapping[str, str]] = None) -> Optional[float]:
+        """
+        Учесть ответ сервера
+
+        Returns:
+            float | None: Пауза в секундах, если ответ означает ограничение скорости
+        """
+        headers = headers or {}
+        if status in THROTTLE_STATUSES or (status == 503 and headers.get("Retry-After")):
+            return self.throttle(parse_retry_after(headers.get("Retry-After")))
+
+        self._apply_remaining_headers(headers)
+        if status is not None and 200 <= status < 400:
+            self._record_success()
+        return None
+
+    def _apply_remaining_headers(self, headers: Mapping[str, str]):
+        # OpenAI сообщает остаток лимита: при нуле ждем сброса, не дожидаясь 429
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None or remaining.strip() not in ("0", "0.0"):
+                continue
+            reset = parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            if bucket is not None:
+                bucket.drain()
+            if reset:
+                with self._lock:
+                    self._paused_until = max(self._paused_until, time.monotonic() + min(reset, MAX_BACKOFF_SECONDS))
+
+    def _record_success(self):
+        with self._lock:
+            self._consecutive_throttles = 0
+            if self.requests.rate >= self.base_rate:
+                return
+            self._successes += 1
+            if self._successes < self.recovery_after:
+                return
+            self._successes = 0
+            new_rate = min(self.base_rate, self.requests.rate * 1.25)
+        self.requests.set_rate(new_rate)
+        logger.info(f"Rate limit for {self.name} recovering: {new_rate:.2f} req/s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        stats["rate"] = round(self.requests.rate, 3)
+        stats["base_rate"] = self.base_rate
+        return stats
+
+
+def _limits_from_env(provider: str) -> Dict[str, Any]:
+    limits = dict(DEFAULT_LIMITS.get(provider, {"requests_per_second": 5.0}))
+    prefix = f"RATE_LIMIT_{provider.upper()}_"
+    for suffix, key, cast in (("RPS", "requests_per_second", float), ("BURST", "burst", float),
+                              ("TPM", "tokens_per_minute", float), ("CONCURRENCY", "max_concurrent", int)):
+        value = os.getenv(prefix + suffix)
+        if value:
+            try:
+                limits[key] = cast(value)
+            except ValueError:
+                logger.warning(f"Ignoring invalid {prefix + suffix}={value!r}")
+    return limits
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, **overrides) -> ProviderLimiter:
+    """Общий ограничитель на процесс для провайдера (overrides применяются только при создании)"""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(provider)
+            if limiter is None:
+                limits = _limits_from_env(provider)
+                limits.update(overrides)
+                limiter = ProviderLimiter(provider, **limits)
+                _limiters[provider] = limiter
+    return limiter
+
+
+def get_rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+def reset_rate_limiters():
+    """Забыть все ограничители (для тестов)"""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+# ---------- OpenAI ----------
+
+def estimate_openai_tokens(body: Optional[bytes]) -> int:
+    """Грубая оценка токенов запроса: ~4 символа на токен промпта + запрошенный максимум ответа"""
+    if not body:
+        return 0
+    try:
+        payload = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return len(body) // 4
+    if not isinstance(payload, dict):
+        return len(body) // 4
+    prompt_chars = len(json.dumps(payload.get("messages") or payload.get("input") or "", ensure_ascii=False))
+    completion = payload.get("max_completion_tokens") or payload.get("max_tokens") or payload.get("max_output_tokens") or 0
+    return prompt_chars // 4 + int(completion)
+
+
+def create_async_openai_client(api_key: Optional[str], **kwargs):
+    """
+    AsyncOpenAI, все запросы которого проходят через общий ограничитель "openai"
+
+    Остальные kwargs передаются в AsyncOpenAI. Встроенные повторы SDK на 429 тоже
+    проходят через ограничитель и ждут паузы, выставленной по Retry-After.
+    """
+    import httpx
+    from openai import AsyncOpenAI
+
+    limiter = get_rate_limiter("openai")
+
+    class RateLimitedTransport(httpx.AsyncBaseTransport):
+        def __init__(self, transport: httpx.AsyncBaseTransport):
+            self._transport = transport
+
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            try:
+                body = request.content
+            except httpx.RequestNotRead:
+                body = None
+            await limiter.acquire(estimate_openai_tokens(body))
+            response = await self._transport.handle_async_request(request)
+            limiter.observe(response.status_code, response.headers)
+            return response
+
+        async def aclose(self):
+            await self._transport.aclose()
+
+    # Те же лимиты пула соединений, что у http клиента SDK по умолчанию
+    transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100))
+    http_client = httpx.AsyncClient(
+        transport=RateLimitedTransport(transport),
+        timeout=httpx.Timeout(timeout=600.0, connect=5.0),
+        follow_redirects=True,
+    )
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, **kwargs)
+
+
+# event loop -> {api_key: AsyncOpenAI}: соединения httpx.AsyncClient привязаны к loop
+_async_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Optional[str], Any]]" = weakref.WeakKeyDictionary()
+_async_openai_clients_lock = threading.Lock()
+
+
+def get_async_openai_client(api_key: Optional[str]):
+    """
+    Общий клиент create_async_openai_client(api_key) для текущего event loop
+
+    Для вызовов на каждый запрос (finders): пул соединений переиспользуется,
+    а не создается заново на каждый вызов.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_openai_clients_lock:
+        clients = _async_openai_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            client = create_async_openai_client(api_key)
+            clients[api_key] = client
+    return client
@@ -4,17 +4,35 @@ from typing import Optional, Tuple
 
 import aiohttp
 
+from src.external_apis.page_cache import PageCache, get_page_cache
+from src.external_apis.rate_limiter import ProviderLimiter, get_rate_limiter, parse_retry_after
+
 logger = logging.getLogger(__name__)
 
 class CustomScrapingBeeClient:
     BASE_URL = "https://app.scrapingbee.com/api/v1/"
 
-    def __init__(self, api_key: str, timeout_seconds: int = 60):
+    def __init__(self, api_key: str, timeout_seconds: int = 60,
+                 page_cache: Optional[PageCache] = None, use_page_cache: bool = True,
+                 cache_ttl_seconds: Optional[float] = None,
+                 rate_limiter: Optional[ProviderLimiter] = None):
+        """
+        Args:
+            api_key: ScrapingBee API ключ
+            timeout_seconds: Таймаут одного запроса
+            page_cache: Хранилище страниц (по умолчанию общее, см. page_cache.get_page_cache)
+            use_page_cache: Читать и сохранять успешные ответы в хранилище страниц
+            cache_ttl_seconds: TTL страницы (None - TTL хранилища по умолчанию)
+            rate_limiter: Ограничитель скорости (по умолчанию общий get_rate_limiter("scrapingbee"))
+        """
         if not api_key:
             raise ValueError("ScrapingBee API key is required.")
         self.api_key = api_key
         self._session: Optional[aiohttp.ClientSession] = None
         self.timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+        self.page_cache = (page_cache or get_page_cache()) if use_page_cache else None
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.rate_limiter = rate_limiter or get_rate_limiter("scrapingbee")
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
@@ -47,6 +65,12 @@ class CustomScrapingBeeClient:
             - status_code: HTTP статус код ответа или None при ошибке.
             - final_url_or_error_message: Финальный URL после редиректов, или сообщение об ошибке.
         """
+        if self.page_cache:
+            cached = self.page_cache.get(url, variant="html", ttl_seconds=self.cache_ttl_seconds)
+            if cached is not None:
+                logger.info(f"[ScrapingBee] Страница {url} взята из кэша, статус {cached['status_code']}")
+                return (cached["text"] if return_text else None), cached["status_code"], cached["final_url"] or url
+
         session = await self._get_session()
         
         # Несколько попыток с разными параметрами для обхода блокировок
@@ -94,15 +118,15 @@ class CustomScrapingBeeClient:
 
             try:
                 logger.info(f"[ScrapingBee] Попытка {attempt_num}/3 для {url} с параметрами: {attempt_params}")
-                async with session.get(self.BASE_URL, params=params) as response:
+                async with self.rate_limiter.limited(), session.get(self.BASE_URL, params=params) as response:
                     response_text = await response.text()
 
                     # Проверка на лимит одновременных запросов
                     if response.status == 403 and "Looks like you\'ve hit the concurrency limit" in response_text:
                         logger.warning(f"[ScrapingBee] Достигнут лимит одновременных запросов для URL: {url}")
-                        # Адекватная задержка для лимита одновременных запросов (ScrapingBee требует времени)
+                        # Ограничитель ставит ScrapingBee на паузу и снижает темп для всех клиентов процесса
+                        self.rate_limiter.throttle(parse_retry_after(response.headers.get("Retry-After")))
                         if attempt_num < len(attempts):
-                            await asyncio.sleep(1.5)  # Компромисс: короче чем 2с, но достаточно для ScrapingBee
                             continue
                         return None, response.status, "ScrapingBee concurrency limit reached"
                     
@@ -121,7 +145,10 @@ class CustomScrapingBeeClient:
                     final_url = response.headers.get("X-ScrapingBee-Final-Url", url)
 
                     if response.ok:  # Статусы 2xx
+                        self.rate_limiter.observe(response.status)
                         logger.info(f"[ScrapingBee] Успешный запрос к {url}, статус {response.status}, финальный URL: {final_url}")
+                        if self.page_cache:
+                            self.page_cache.set(url, response_text, variant="html", status_code=response.status, final_url=final_url)
                         html_content = response_text if return_text else None
                         return html_content, response.status, final_url
                     elif response.status in [403, 429]:  # Блокировка ботов
@@ -143,8 +170,7 @@ class CustomScrapingBeeClient:
                 logger.error(f"[ScrapingBee] Ошибка соединения для {url}: {e}")
                 last_error = f"ScrapingBee Connection Error: {str(e)}"
                 if attempt_num < len(attempts):
-                    await asyncio.sleep(0.2)  # Сокращена с 1 до 0.2 секунд
-                    continue
+                    continue  # Темп следующей попытки задает ограничитель
             except asyncio.TimeoutError:
                 logger.error(f"[ScrapingBee] Таймаут запроса к {url}")
                 last_error = f"ScrapingBee Request Timeout"
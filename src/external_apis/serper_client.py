@@ -0,0 +1,378 @@
+"""
+Общий слой Serper.dev для основного пайплайна и criteria_processor
+
+- персистентный кэш запрос → ответ (SQLite), TTL задается на каждый вызов
+- одновременные одинаковые запросы объединяются в один HTTP вызов (sync и async)
+- пул соединений: requests.Session для sync вызовов, общий aiohttp session для async
+- повторы с экспоненциальной задержкой на 429/5xx и сетевых ошибках
+- опциональный общий ограничитель скорости (rate_limiter.ProviderLimiter): темп запросов
+  и пауза по Retry-After после 429
+
+Модуль не импортирует ничего из пакета src, поэтому criteria_processor (у которого
+свой пакет src) загружает его по пути к файлу.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+SERPER_SEARCH_URL = "https://google.serper.dev/search"
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_CACHE_PATH = os.path.join(PROJECT_ROOT, "cache", "serper_cache.sqlite")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class SerperQueryCache:
+    """Thread-safe SQLite кэш ответов Serper, ключ - sha256 от payload запроса"""
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS serper_responses (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, ttl_seconds: Optional[float]) -> Optional[Dict[str, Any]]:
+        """Ответ из кэша или None; ttl_seconds=None - без срока, 0 - кэш не читается"""
+        if ttl_seconds == 0:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM serper_responses WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Serper cache read failed: {e}")
+            return None
+
+        if row is None or (ttl_seconds is not None and time.time() - row[1] > ttl_seconds):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, query: str, response: Dict[str, Any]):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO serper_responses (key, query, response, created_at) VALUES (?, ?, ?, ?)",
+                    (key, query, json.dumps(response, ensure_ascii=False), time.time())
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Serper cache write failed: {e}")
+
+    def purge_older_than(self, max_age_seconds: float) -> int:
+        """Удалить записи старше max_age_seconds, вернуть количество удаленных"""
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "DELETE FROM serper_responses WHERE created_at < ?", (time.time() - max_age_seconds,)
+                )
+                self._conn.commit()
+                return max(cursor.rowcount, 0)
+        except sqlite3.Error as e:
+            logger.error(f"Serper cache purge failed: {e}")
+            return 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SerperClient:
+    """
+    Клиент Serper с кэшем и объединением одинаковых запросов
+
+    search() - из потоков (requests.Session с пулом соединений)
+    search_async() - из корутин (переданный aiohttp session или свой на каждый event loop)
+    Оба метода возвращают dict ответа или None при ошибке.
+    """
+
+    def __init__(self,
+                 api_key: str,
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 default_ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+                 max_retries: int = 3,
+                 backoff_seconds: float = 2.0,
+                 timeout_seconds: float = 20,
+                 pool_size: int = 20,
+                 rate_limiter=None):
+        """
+        Args:
+            api_key: Serper API ключ
+            cache_path: Путь к SQLite кэшу (None - без кэша)
+            default_ttl_seconds: TTL если вызов не передал свой
+            max_retries: Количество попыток на запрос
+            backoff_seconds: Базовая задержка между попытками (удваивается)
+            timeout_seconds: Таймаут одного HTTP запроса
+            pool_size: Размер пула соединений requests.Session
+            rate_limiter: Ограничитель скорости провайдера (rate_limiter.get_rate_limiter("serper")) или None
+        """
+        self.api_key = api_key
+        self.default_ttl_seconds = default_ttl_seconds
+        self.max_retries = max(1, max_retries)
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self.rate_limiter = rate_limiter
+
+        self.cache = SerperQueryCache(cache_path) if cache_path else None
+
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._http.mount("https://", adapter)
+        self._http.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._async_inflight = weakref.WeakKeyDictionary()
+        self._own_sessions = weakref.WeakKeyDictionary()
+        self._stats = {"requests": 0, "cache_hits": 0, "cache_misses": 0, "coalesced": 0, "errors": 0}
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"X-API-KEY": self.api_key, "Content-Type": "application/json"}
+
+    @staticmethod
+    def build_payload(query: str, **params) -> Dict[str, Any]:
+        payload = {"q": query, "gl": "us", "hl": "en", "num": 10}
+        payload.update(params)
+        return payload
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def _cached(self, key: str, ttl_seconds: Optional[float]) -> Optional[Dict[str, Any]]:
+        if not self.cache:
+            return None
+        ttl = self.default_ttl_seconds if ttl_seconds is None else ttl_seconds
+        cached = self.cache.get(key, ttl)
+        self._count("cache_hits" if cached is not None else "cache_misses")
+        return cached
+
+    def _store(self, key: str, query: str, response: Optional[Dict[str, Any]]):
+        if self.cache and response is not None:
+            self.cache.set(key, query, response)
+
+    def _retry_wait(self, attempt: int, max_retries: int, status: Optional[int] = None, headers=None) -> Optional[float]:
+        """Задержка перед следующей попыткой или None, если попытки закончились"""
+        if self.rate_limiter and status is not None:
+            # Пауза после 429 уже выставлена в ограничителе; следующий acquire() ее дождется
+            if self.rate_limiter.observe(status, headers) is not None:
+                return 0.0 if attempt < max_retries - 1 else None
+        if attempt >= max_retries - 1:
+            return None
+        return self.backoff_seconds * (2 ** attempt)
+
+    # ---------- sync ----------
+
+    def search(self, query: str, ttl_seconds: Optional[float] = None, max_retries: Optional[int] = None, **params) -> Optional[Dict[str, Any]]:
+        """Поиск из синхронного кода; одинаковые одновременные запросы ждут первый"""
+        payload = self.build_payload(query, **params)
+        key = SerperQueryCache.make_key(payload)
+
+        cached = self._cached(key, ttl_seconds)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        result = None
+        try:
+            result = self._post_sync(payload, max_retries or self.max_retries)
+            self._store(key, query, result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_result(result)
+
+    def _post_sync(self, payload: Dict[str, Any], max_retries: int) -> Optional[Dict[str, Any]]:
+        for attempt in range(max_retries):
+            self._count("requests")
+            status, headers = None, None
+            if self.rate_limiter:
+                self.rate_limiter.acquire_sync()
+            try:
+                response = self._http.post(SERPER_SEARCH_URL, headers=self.headers, json=payload, timeout=self.timeout_seconds)
+                status, headers = response.status_code, response.headers
+                if status == 200:
+                    if self.rate_limiter:
+                        self.rate_limiter.observe(status, headers)
+                    return response.json()
+                if status not in RETRY_STATUSES:
+                    logger.error(f"Serper API error {status} for '{payload['q']}'")
+                    break
+                error = f"HTTP {status}"
+            except (requests.exceptions.RequestException, ValueError) as e:
+                error = str(e)
+
+            wait = self._retry_wait(attempt, max_retries, status, headers)
+            logger.warning(f"Serper request failed (attempt {attempt + 1}/{max_retries}) for '{payload['q']}': {error}")
+            if wait is None:
+                break
+            if wait:
+                time.sleep(wait)
+
+        self._count("errors")
+        return None
+
+    # ---------- async ----------
+
+    async def search_async(self, query: str, session: Optional[aiohttp.ClientSession] = None,
+                           ttl_seconds: Optional[float] = None, max_retries: Optional[int] = None, **params) -> Optional[Dict[str, Any]]:
+        """Поиск из корутины; одинаковые одновременные запросы в одном event loop делят один HTTP вызов"""
+        payload = self.build_payload(query, **params)
+        key = SerperQueryCache.make_key(payload)
+
+        cached = self._cached(key, ttl_seconds)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        inflight = self._async_inflight.setdefault(loop, {})
+        task = inflight.get(key)
+        if task is not None:
+            self._count("coalesced")
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(self._fetch_async(key, query, payload, session, max_retries or self.max_retries))
+        inflight[key] = task
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_async(self, key, query, payload, session, max_retries) -> Optional[Dict[str, Any]]:
+        session = session or self._own_session()
+        timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
+
+        for attempt in range(max_retries):
+            self._count("requests")
+            status, headers = None, None
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+            try:
+                async with session.post(SERPER_SEARCH_URL, headers=self.headers, json=payload, timeout=timeout) as response:
+                    status, headers = response.status, response.headers
+                    if status == 200:
+                        if self.rate_limiter:
+                            self.rate_limiter.observe(status, headers)
+                        result = await response.json(content_type=None)
+                        self._store(key, query, result)
+                        return result
+                    if status not in RETRY_STATUSES:
+                        logger.error(f"Serper API error {status} for '{query}'")
+                        break
+                    error = f"HTTP {status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error = str(e) or type(e).__name__
+
+            wait = self._retry_wait(attempt, max_retries, status, headers)
+            logger.warning(f"Serper request failed (attempt {attempt + 1}/{max_retries}) for '{query}': {error}")
+            if wait is None:
+                break
+            if wait:
+                await asyncio.sleep(wait)
+
+        self._count("errors")
+        return None
+
+    def _own_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._own_sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession()
+            self._own_sessions[loop] = session
+        return session
+
+    async def aclose(self):
+        """Закрыть собственный aiohttp session текущего event loop"""
+        session = self._own_sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    # ---------- stats ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["cache_hits"] + stats["cache_misses"]
+        stats["cache_hit_rate"] = round(stats["cache_hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def close(self):
+        self._http.close()
+        if self.cache:
+            self.cache.close()
+
+
+_clients: Dict[tuple, SerperClient] = {}
+_clients_lock = threading.Lock()
+
+
+# cache_path не передан: SERPER_CACHE_PATH или DEFAULT_CACHE_PATH (None - кэш выключен)
+_DEFAULT = object()
+
+
+def get_serper_client(api_key: str, cache_path: Optional[str] = _DEFAULT, **kwargs) -> SerperClient:
+    """
+    Общий клиент на процесс для (api_key, cache_path, настройки SerperClient);
+    cache_path=None - без кэша. Вызовы с другими настройками получают свой клиент
+    """
+    if cache_path is _DEFAULT:
+        cache_path = os.getenv("SERPER_CACHE_PATH") or DEFAULT_CACHE_PATH
+    key = (api_key, cache_path, tuple(sorted(kwargs.items())))
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = SerperClient(api_key, cache_path=cache_path, **kwargs)
+                _clients[key] = client
+    return client
+
+
+def reset_serper_clients():
+    """Закрыть и забыть все клиенты (для тестов)"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
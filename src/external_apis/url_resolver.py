@@ -0,0 +1,262 @@
+"""
+Общий кэш проверки доступности URL и разрешения DNS
+
+normalize_urls, DomainCheckFinder и поиск компаний в HubSpot проверяют одни и те же
+домены. UrlResolver хранит результаты проверок (live, final_url, status, error):
+
+- LRU с TTL (отрицательные результаты живут меньше - сбой может быть временным)
+- одновременные проверки одного URL объединяются в одну (in-flight dedup)
+- отдельный кэш DNS (getaddrinfo) с теми же правилами
+- опционально - JSONL журнал в папке сессии: возобновленная сессия не проверяет домены повторно
+
+Резолвер сессии задается start_url_resolution_session() (задачи, созданные после вызова,
+наследуют его через contextvars); вне сессии get_url_resolver() возвращает общий резолвер процесса.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from src.external_apis.page_cache import normalize_url
+
+logger = logging.getLogger(__name__)
+
+URL_CACHE_FILE_NAME = "url_resolution_cache.jsonl"
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_TTL_SECONDS = 6 * 3600
+DEFAULT_NEGATIVE_TTL_SECONDS = 3600
+
+
+def url_record(live: bool, final_url: Optional[str] = None, status: Optional[int] = None,
+               error: Optional[str] = None, **extra: Any) -> Dict[str, Any]:
+    """Результат проверки URL в формате кэша"""
+    record = {"live": bool(live), "final_url": final_url, "status": status, "error": error}
+    record.update(extra)
+    return record
+
+
+class UrlResolver:
+    """LRU+TTL кэш результатов проверки URL и DNS с объединением одновременных проверок"""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+        persist_path: Optional[Union[str, Path]] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.persist_path = str(persist_path) if persist_path else None
+        # key -> (record, checked_at); host -> (error или None, checked_at)
+        self._urls: "OrderedDict[str, tuple]" = OrderedDict()
+        self._hosts: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._journal = None
+        self.stats = {"hits": 0, "misses": 0, "deduplicated": 0, "dns_hits": 0, "dns_misses": 0, "loaded": 0}
+
+        if self.persist_path:
+            self._load_journal()
+
+    # --- URL ---
+
+    @staticmethod
+    def make_key(url: str, variant: str) -> str:
+        return f"{variant}|{normalize_url(url)}"
+
+    def get(self, url: str, variant: str = "liveness") -> Optional[Dict[str, Any]]:
+        """Запись из кэша без проверки или None"""
+        return self._lookup(self._urls, self.make_key(url, variant), lambda entry: entry[0].get("live"))
+
+    async def resolve(
+        self,
+        url: str,
+        probe: Callable[[], Awaitable[Dict[str, Any]]],
+        variant: str = "liveness",
+        accept: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Результат проверки URL: из кэша или от probe() (вызывается один раз на URL,
+        одновременные запросы того же URL ждут ту же проверку)
+
+        variant разделяет проверки с разной семантикой; accept(record) может отвергнуть
+        кэшированную запись (например, отрицательную, полученную без ScrapingBee).
+        """
+        key = self.make_key(url, variant)
+        cached = self._lookup(self._urls, key, lambda entry: entry[0].get("live"))
+        if cached is not None and (accept is None or accept(cached)):
+            self._count("hits")
+            return cached
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop and not inflight.done():
+            self._count("deduplicated")
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # Задача, выполнявшая проверку, отменена - проверяем сами
+
+        self._count("misses")
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            record = await probe()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Исключение уже передано ожидающим (если они есть) - не считаем его необработанным
+            future.exception()
+            raise
+        else:
+            self._store(self._urls, key, record)
+            self._append_journal({"key": key, "record": record})
+            future.set_result(record)
+            return record
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    # --- DNS ---
+
+    async def resolve_host(self, hostname: str):
+        """
+        Разрешить hostname с кэшем: неразрешимый хост дает socket.gaierror
+        (как loop.getaddrinfo), повторный запрос того же хоста не идет в DNS
+        """
+        host = hostname.lower()
+        cached = self._lookup(self._hosts, host, lambda entry: entry[0] is None)
+        if cached is not None:
+            self._count("dns_hits")
+            if cached["error"]:
+                raise socket.gaierror(cached["error"])
+            return
+
+        self._count("dns_misses")
+        try:
+            await asyncio.get_running_loop().getaddrinfo(host, None)
+        except socket.gaierror as e:
+            self._store(self._hosts, host, str(e))
+            self._append_journal({"host": host, "error": str(e)})
+            raise
+        self._store(self._hosts, host, None)
+        self._append_journal({"host": host, "error": None})
+
+    # --- служебное ---
+
+    def _lookup(self, table: "OrderedDict[str, tuple]", key: str, is_positive: Callable[[tuple], bool]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = table.get(key)
+            if entry is None:
+                return None
+            ttl = self.ttl_seconds if is_positive(entry) else self.negative_ttl_seconds
+            if time.time() - entry[1] > ttl:
+                del table[key]
+                return None
+            table.move_to_end(key)
+        if table is self._hosts:
+            return {"error": entry[0]}
+        return dict(entry[0])
+
+    def _store(self, table: "OrderedDict[str, tuple]", key: str, value: Any, checked_at: Optional[float] = None):
+        with self._lock:
+            table[key] = (value, checked_at or time.time())
+            table.move_to_end(key)
+            while len(table) > self.max_entries:
+                table.popitem(last=False)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _load_journal(self):
+        if not os.path.exists(self.persist_path):
+            return
+        loaded = 0
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        continue  # оборванная последняя строка
+                    if "key" in item:
+                        self._store(self._urls, item["key"], item["record"], item.get("checked_at"))
+                    elif "host" in item:
+                        self._store(self._hosts, item["host"], item.get("error"), item.get("checked_at"))
+                    loaded += 1
+        except OSError as e:
+            logger.error(f"Could not read URL resolution cache {self.persist_path}: {e}")
+        self.stats["loaded"] = loaded
+
+    def _append_journal(self, item: Dict[str, Any]):
+        if not self.persist_path:
+            return
+        item["checked_at"] = time.time()
+        try:
+            with self._lock:
+                if self._journal is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.persist_path)), exist_ok=True)
+                    self._journal = open(self.persist_path, "a+b")
+                    # Оборванная при падении последняя строка завершается, чтобы не склеиться с новой записью
+                    if self._journal.tell() > 0:
+                        self._journal.seek(-1, os.SEEK_END)
+                        if self._journal.read(1) != b"\n":
+                            self._journal.write(b"\n")
+                self._journal.write((json.dumps(item, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                self._journal.flush()
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Could not write URL resolution cache {self.persist_path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["urls"] = len(self._urls)
+            stats["hosts"] = len(self._hosts)
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+_session_resolver: contextvars.ContextVar[Optional[UrlResolver]] = contextvars.ContextVar("url_resolver", default=None)
+_process_resolver: Optional[UrlResolver] = None
+_process_lock = threading.Lock()
+
+
+def start_url_resolution_session(persist_path: Optional[Union[str, Path]] = None, **kwargs) -> UrlResolver:
+    """Новый резолвер для текущей сессии (задачи, созданные после вызова, используют его)"""
+    resolver = UrlResolver(persist_path=persist_path, **kwargs)
+    _session_resolver.set(resolver)
+    if resolver.stats["loaded"]:
+        logger.info(f"URL resolution cache: restored {resolver.stats['loaded']} entries from {persist_path}")
+    return resolver
+
+
+def get_url_resolver() -> UrlResolver:
+    """Резолвер текущей сессии или общий резолвер процесса"""
+    global _process_resolver
+    resolver = _session_resolver.get()
+    if resolver is not None:
+        return resolver
+    with _process_lock:
+        if _process_resolver is None:
+            _process_resolver = UrlResolver()
+        return _process_resolver
@@ -19,7 +19,7 @@ import time
 
 from src.pipeline.adapter import PipelineAdapter
 from src.pipeline.core import process_companies
-from src.data_io import load_and_prepare_company_names, save_results_csv, save_results_json, load_session_metadata, save_session_metadata
+from src.data_io import load_and_prepare_company_names, save_results_csv, save_results_json
 from .client import HubSpotClient
 
 logger = logging.getLogger(__name__)
@@ -49,7 +49,8 @@ class HubSpotAdapter:
             load_dotenv() # Убедимся, что .env загружен
             api_key = os.getenv("HUBSPOT_API_KEY")
 
-        self.client = HubSpotClient(api_key=api_key) # Передаем api_key клиенту
+        # Найденные компании хранятся в общем кэше не дольше, чем их описание остается свежим
+        self.client = HubSpotClient(api_key=api_key, max_age_months=max_age_months)
         self.max_age_months = max_age_months
         logger.info(f"HubSpot Adapter initialized with max age: {max_age_months} months. API key {'present' if api_key else 'MISSING'}.")
     
@@ -284,6 +285,10 @@ class HubSpotAdapter:
             predator_id = None
         return description, timestamp, linkedin_url, predator_id
 
+    async def close(self):
+        """Закрыть HTTP-сессию клиента HubSpot"""
+        await self.client.close()
+
 class HubSpotPipelineAdapter(PipelineAdapter):
     """
     Pipeline adapter with HubSpot integration
@@ -331,6 +336,11 @@ class HubSpotPipelineAdapter(PipelineAdapter):
             
         return True # Возвращаем True, если базовая настройка прошла успешно
 
+    async def close(self):
+        """Освобождение ресурсов адаптера (HTTP-сессия клиента HubSpot)"""
+        if self.hubspot_adapter:
+            await self.hubspot_adapter.close()
+
     async def run_pipeline_for_file(self, input_file_path: str | Path, output_csv_path: str | Path, 
                                    pipeline_log_path: Path, # Изменен тип на Path
                                    session_dir_path: Path, llm_config: Dict[str, Any],
@@ -634,7 +644,8 @@ class HubSpotPipelineAdapter(PipelineAdapter):
                 csv_append_mode=should_append_csv, # Используем флаг для CSV
                 json_append_mode=should_append_json, # Используем флаг для JSON
                 already_saved_count=len(all_results),  # Передаем количество уже сохраненных результатов
-                write_to_hubspot=write_to_hubspot # Передаем флаг записи в HubSpot
+                write_to_hubspot=write_to_hubspot, # Передаем флаг записи в HubSpot
+                checkpoint_index=self.checkpoint_index # Завершенные компании восстанавливаются из индекса
             )
             
             # process_companies возвращает только список результатов.
@@ -10,12 +10,20 @@ import re
 import json
 import logging
 import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from urllib.parse import urlparse
 import aiohttp
 import asyncio
 from dotenv import load_dotenv
 
+try:
+    from src.external_apis.rate_limiter import get_rate_limiter
+    from src.external_apis.hubspot_cache import get_hubspot_cache
+except ImportError:
+    # criteria_processor загружает этот файл по пути (у него свой пакет src) и передает ограничитель и кэш сам
+    get_rate_limiter = None
+    get_hubspot_cache = None
+
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
@@ -27,9 +35,21 @@ class HubSpotClient:
     - Поиск компаний по домену
     - Получение свойств компании
     - Обновление свойств компании
+    - Пакетное чтение, обновление и создание компаний (batch endpoints)
+    
+    Все запросы клиента идут через одну aiohttp-сессию (keep-alive соединения с api.hubapi.com);
+    сессия создается при первом запросе и закрывается через close().
     """
     
-    def __init__(self, api_key: Optional[str] = None, base_url: str = "https://api.hubapi.com"):
+    # Сколько раз повторять запрос после 429 (пауза по Retry-After задается ограничителем)
+    MAX_RATE_LIMIT_RETRIES = 3
+    # Лимит HubSpot на количество объектов в одном batch-запросе
+    BATCH_LIMIT = 100
+    # Сколько batch-запросов выполняется одновременно (темп задает ограничитель скорости)
+    MAX_CONCURRENT_BATCHES = 4
+
+    def __init__(self, api_key: Optional[str] = None, base_url: str = "https://api.hubapi.com",
+                 rate_limiter=None, cache=None, max_age_months: Optional[float] = None):
         """
         Инициализация клиента HubSpot API.
         
@@ -37,6 +57,12 @@ class HubSpotClient:
             api_key (str, optional): API ключ для доступа к HubSpot. 
                                      Если не указан, будет взят из переменной окружения HUBSPOT_API_KEY.
             base_url (str): Базовый URL для API HubSpot.
+            rate_limiter (ProviderLimiter, optional): Ограничитель скорости из src/external_apis/rate_limiter.py
+                                     (по умолчанию общий get_rate_limiter("hubspot")).
+            cache (HubSpotLookupCache, optional): Кэш поиска из src/external_apis/hubspot_cache.py
+                                     (по умолчанию общий get_hubspot_cache()).
+            max_age_months (float, optional): Срок свежести описания - найденная компания
+                                     хранится в кэше не дольше, чем ее описание остается свежим.
         """
         # Загружаем переменные окружения, если api_key не передан
         if api_key is None:
@@ -53,8 +79,71 @@ class HubSpotClient:
             "Content-Type": "application/json"
         }
         
-        # Кэш для избежания повторных запросов
-        self._cache = {}
+        # Кэш поиска по домену (общий для всех клиентов процесса)
+        if cache is None and get_hubspot_cache is not None:
+            cache = get_hubspot_cache()
+        self.cache = cache
+        self.max_age_months = max_age_months
+        if rate_limiter is None and get_rate_limiter is not None:
+            rate_limiter = get_rate_limiter("hubspot")
+        self.rate_limiter = rate_limiter
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Общая сессия клиента; сессия привязана к event loop, поэтому в новом цикле создается заново"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            await self._close_session()
+            self._session = aiohttp.ClientSession()
+            self._session_loop = loop
+        return self._session
+
+    async def _close_session(self):
+        """Закрыть сессию, в том числе созданную в другом event loop (иначе ее соединения не закрываются)"""
+        session, session_loop = self._session, self._session_loop
+        self._session = None
+        self._session_loop = None
+        if session is None or session.closed:
+            return
+        if session_loop is not asyncio.get_running_loop() and session_loop is not None and session_loop.is_running():
+            # Цикл сессии еще работает в другом потоке - закрываем в нем
+            asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+            return
+        try:
+            await session.close()
+        except RuntimeError as e:
+            # Цикл сессии уже закрыт: транспорты нельзя закрыть через него
+            logger.debug(f"HubSpot session of a closed event loop could not be closed cleanly: {e}")
+
+    async def close(self):
+        """Закрыть сессию клиента"""
+        await self._close_session()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _request(self, session: aiohttp.ClientSession, method: str, endpoint: str, **kwargs) -> aiohttp.ClientResponse:
+        """
+        Запрос к HubSpot через общий ограничитель скорости; на 429 ждет Retry-After и повторяет.
+
+        Возвращает ответ, который вызывающий код использует как async context manager.
+        """
+        if self.rate_limiter is None:
+            return await session.request(method, endpoint, headers=self.headers, **kwargs)
+
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            await self.rate_limiter.acquire()
+            response = await session.request(method, endpoint, headers=self.headers, **kwargs)
+            pause = self.rate_limiter.observe(response.status, response.headers)
+            if pause is None or attempt == self.MAX_RATE_LIMIT_RETRIES:
+                return response
+            response.release()
+            logger.warning(f"HubSpot rate limit ({response.status}) for {method} {endpoint}, retry {attempt + 1}/{self.MAX_RATE_LIMIT_RETRIES}")
+        return response
     
     async def search_company_by_domain(self, domain: str) -> Optional[Dict[str, Any]]:
         """
@@ -79,113 +168,115 @@ class HubSpotClient:
             
             # Проверяем кэш
             cache_key = f"domain:{normalized_domain}"
-            if cache_key in self._cache:
-                logger.info(f"Using cached result for domain: {normalized_domain}")
-                return self._cache[cache_key]
+            if self.cache is not None:
+                hit, cached = self.cache.lookup(cache_key)
+                if hit:
+                    logger.info(f"Using cached result for domain: {normalized_domain}")
+                    return cached
             
             # Формируем запрос к API
             endpoint = f"{self.base_url}/crm/v3/objects/companies/search"
             
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "filterGroups": [
-                        {
-                            "filters": [{
-                                "propertyName": "domain",
-                                "operator": "CONTAINS_TOKEN",
-                                "value": normalized_domain
-                            }]
-                        },
-                        {
-                            "filters": [{
-                                "propertyName": "domain", 
-                                "operator": "EQ",
-                                "value": normalized_domain
-                            }]
-                        },
-                        {
-                            "filters": [{
-                                "propertyName": "website",
-                                "operator": "EQ", 
-                                "value": normalized_domain
-                            }]
-                        },
-                        {
-                            "filters": [{
-                                "propertyName": "hs_additional_domains",
-                                "operator": "CONTAINS_TOKEN",
-                                "value": normalized_domain
-                            }]
-                        }
-                        # Можно добавить дополнительные поля для веб-сайтов, если они есть в вашем HubSpot
-                        # {
-                        #     "filters": [{
-                        #         "propertyName": "additional_website",
-                        #         "operator": "EQ",
-                        #         "value": normalized_domain
-                        #     }]
-                        # }
-                    ],
-                    "properties": ["name", "domain", "website", "hs_additional_domains", "ai_description", "ai_description_updated", "linkedin_company_page", "gcore_predator_id"],
-                    "limit": 10  # Увеличиваем лимит на случай нескольких совпадений
-                }
+            session = await self._get_session()
+            payload = {
+                "filterGroups": [
+                    {
+                        "filters": [{
+                            "propertyName": "domain",
+                            "operator": "CONTAINS_TOKEN",
+                            "value": normalized_domain
+                        }]
+                    },
+                    {
+                        "filters": [{
+                            "propertyName": "domain", 
+                            "operator": "EQ",
+                            "value": normalized_domain
+                        }]
+                    },
+                    {
+                        "filters": [{
+                            "propertyName": "website",
+                            "operator": "EQ", 
+                            "value": normalized_domain
+                        }]
+                    },
+                    {
+                        "filters": [{
+                            "propertyName": "hs_additional_domains",
+                            "operator": "CONTAINS_TOKEN",
+                            "value": normalized_domain
+                        }]
+                    }
+                    # Можно добавить дополнительные поля для веб-сайтов, если они есть в вашем HubSpot
+                    # {
+                    #     "filters": [{
+                    #         "propertyName": "additional_website",
+                    #         "operator": "EQ",
+                    #         "value": normalized_domain
+                    #     }]
+                    # }
+                ],
+                "properties": ["name", "domain", "website", "hs_additional_domains", "ai_description", "ai_description_updated", "linkedin_company_page", "gcore_predator_id"],
+                "limit": 10  # Увеличиваем лимит на случай нескольких совпадений
+            }
                 
-                async with session.post(endpoint, headers=self.headers, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        results = data.get("results", [])
+            async with await self._request(session, "POST", endpoint, json=payload) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    results = data.get("results", [])
                         
-                        if results:
-                            # Если найдено несколько компаний, выберем лучшее совпадение
-                            # Приоритет: точное совпадение domain > точное совпадение website > первый результат
-                            best_match = None
+                    if results:
+                        # Если найдено несколько компаний, выберем лучшее совпадение
+                        # Приоритет: точное совпадение domain > точное совпадение website > первый результат
+                        best_match = None
                             
-                            for company in results:
-                                properties = company.get("properties", {})
-                                company_domain = properties.get("domain", "")
-                                company_website = properties.get("website", "")
-                                company_additional_domains = properties.get("hs_additional_domains", "")
+                        for company in results:
+                            properties = company.get("properties", {})
+                            company_domain = properties.get("domain", "")
+                            company_website = properties.get("website", "")
+                            company_additional_domains = properties.get("hs_additional_domains", "")
                                 
-                                # Проверяем основной домен
-                                domain_match_found = self._check_domain_match(company_domain, normalized_domain)
-                                # Проверяем поле website
-                                website_match_found = self._check_domain_match(company_website, normalized_domain)
-                                # Проверяем дополнительные домены
-                                additional_domains_match_found = self._check_domain_match(company_additional_domains, normalized_domain)
+                            # Проверяем основной домен
+                            domain_match_found = self._check_domain_match(company_domain, normalized_domain)
+                            # Проверяем поле website
+                            website_match_found = self._check_domain_match(company_website, normalized_domain)
+                            # Проверяем дополнительные домены
+                            additional_domains_match_found = self._check_domain_match(company_additional_domains, normalized_domain)
                                 
-                                # Точное совпадение с полем domain имеет наивысший приоритет
-                                if domain_match_found:
+                            # Точное совпадение с полем domain имеет наивысший приоритет
+                            if domain_match_found:
+                                best_match = company
+                                logger.info(f"Found domain match in HubSpot: {properties.get('name')} (domain field: {company_domain})")
+                                break
+                            # Совпадение с дополнительными доменами имеет второй приоритет
+                            elif additional_domains_match_found:
+                                if not best_match:
                                     best_match = company
-                                    logger.info(f"Found domain match in HubSpot: {properties.get('name')} (domain field: {company_domain})")
-                                    break
-                                # Совпадение с дополнительными доменами имеет второй приоритет
-                                elif additional_domains_match_found:
-                                    if not best_match:
-                                        best_match = company
-                                        logger.info(f"Found additional domains match in HubSpot: {properties.get('name')} (hs_additional_domains field: {company_additional_domains})")
-                                # Совпадение с полем website
-                                elif website_match_found:
-                                    if not best_match:  # Только если еще не найдено совпадение с domain или additional_domains
-                                        best_match = company
-                                        logger.info(f"Found website match in HubSpot: {properties.get('name')} (website field: {company_website})")
-                                # Если не найдено совпадений, используем первый результат как fallback
-                                elif not best_match:
+                                    logger.info(f"Found additional domains match in HubSpot: {properties.get('name')} (hs_additional_domains field: {company_additional_domains})")
+                            # Совпадение с полем website
+                            elif website_match_found:
+                                if not best_match:  # Только если еще не найдено совпадение с domain или additional_domains
                                     best_match = company
-                                    logger.info(f"Using first result in HubSpot: {properties.get('name')} (domain: {company_domain}, website: {company_website}, additional_domains: {company_additional_domains})")
+                                    logger.info(f"Found website match in HubSpot: {properties.get('name')} (website field: {company_website})")
+                            # Если не найдено совпадений, используем первый результат как fallback
+                            elif not best_match:
+                                best_match = company
+                                logger.info(f"Using first result in HubSpot: {properties.get('name')} (domain: {company_domain}, website: {company_website}, additional_domains: {company_additional_domains})")
                             
-                            if best_match:
-                                # Кэшируем результат
-                                self._cache[cache_key] = best_match
-                                return best_match
-                        else:
-                            logger.info(f"No company found for domain: {normalized_domain}")
-                            # Кэшируем отрицательный результат
-                            self._cache[cache_key] = None
-                            return None
+                        if best_match:
+                            # Кэшируем результат
+                            self._cache_set(cache_key, best_match)
+                            return best_match
                     else:
-                        error_text = await response.text()
-                        logger.error(f"HubSpot API error ({response.status}): {error_text}")
+                        logger.info(f"No company found for domain: {normalized_domain}")
+                        # Кэшируем отрицательный результат
+                        self._cache_set(cache_key, None)
                         return None
+                else:
+                    error_text = await response.text()
+                    logger.error(f"HubSpot API error ({response.status}): {error_text}")
+                    return None
         
         except Exception as e:
             logger.error(f"Error searching company by domain: {e}", exc_info=True)
@@ -223,30 +314,29 @@ class HubSpotClient:
             
             endpoint = f"{self.base_url}/crm/v3/objects/companies"
             
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "properties": properties
-                }
+            session = await self._get_session()
+            payload = {
+                "properties": properties
+            }
                 
-                async with session.post(endpoint, headers=self.headers, json=payload) as response:
-                    if response.status == 201:
-                        data = await response.json()
-                        logger.info(f"Successfully created company with domain: {normalized_domain}")
+            async with await self._request(session, "POST", endpoint, json=payload) as response:
+                if response.status == 201:
+                    data = await response.json()
+                    logger.info(f"Successfully created company with domain: {normalized_domain}")
                         
-                        # Добавляем свойства в ответ для соответствия формату ответа search_company_by_domain
-                        if "properties" not in data:
-                            data["properties"] = properties
+                    # Добавляем свойства в ответ для соответствия формату ответа search_company_by_domain
+                    if "properties" not in data:
+                        data["properties"] = properties
                         
-                        # Сбрасываем кэш для этого домена
-                        cache_key = f"domain:{normalized_domain}"
-                        if cache_key in self._cache:
-                            del self._cache[cache_key]
+                    # Сбрасываем кэш для этого домена
+                    if self.cache is not None:
+                        self.cache.invalidate(f"domain:{normalized_domain}")
                         
-                        return data
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Failed to create company. Status: {response.status}, Error: {error_text}")
-                        return None
+                    return data
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Failed to create company. Status: {response.status}, Error: {error_text}")
+                    return None
         
         except Exception as e:
             logger.error(f"Error creating company: {e}", exc_info=True)
@@ -275,21 +365,21 @@ class HubSpotClient:
             
             endpoint = f"{self.base_url}/crm/v3/objects/companies/{company_id}"
             
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "properties": properties
-                }
+            session = await self._get_session()
+            payload = {
+                "properties": properties
+            }
                 
-                async with session.patch(endpoint, headers=self.headers, json=payload) as response:
-                    if response.status == 200:
-                        logger.info(f"Successfully updated properties for company ID: {company_id}")
-                        # Сбрасываем кэш для этой компании
-                        self._invalidate_cache_for_company(company_id)
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Failed to update company properties. Status: {response.status}, Error: {error_text}")
-                        return False
+            async with await self._request(session, "PATCH", endpoint, json=payload) as response:
+                if response.status == 200:
+                    logger.info(f"Successfully updated properties for company ID: {company_id}")
+                    # Сбрасываем кэш для этой компании
+                    self._invalidate_cache_for_company(company_id)
+                    return True
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Failed to update company properties. Status: {response.status}, Error: {error_text}")
+                    return False
         
         except Exception as e:
             logger.error(f"Error updating company properties: {e}", exc_info=True)
@@ -315,21 +405,189 @@ class HubSpotClient:
             properties_param = ",".join(properties)
             endpoint = f"{self.base_url}/crm/v3/objects/companies/{company_id}?properties={properties_param}"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(endpoint, headers=self.headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.info(f"Successfully retrieved properties for company ID: {company_id}")
-                        return data.get("properties", {})
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Failed to get company properties. Status: {response.status}, Error: {error_text}")
-                        return None
+            session = await self._get_session()
+            async with await self._request(session, "GET", endpoint) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    logger.info(f"Successfully retrieved properties for company ID: {company_id}")
+                    return data.get("properties", {})
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Failed to get company properties. Status: {response.status}, Error: {error_text}")
+                    return None
         
         except Exception as e:
             logger.error(f"Error getting company properties: {e}", exc_info=True)
             return None
     
+    async def _post_batch(self, action: str, inputs: List[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None) -> Tuple[Optional[int], Dict[str, Any]]:
+        """
+        Один запрос POST /crm/v3/objects/companies/batch/{action}.
+        
+        Returns:
+            Tuple[Optional[int], Dict[str, Any]]: HTTP статус (None при сетевой ошибке) и тело ответа
+        """
+        endpoint = f"{self.base_url}/crm/v3/objects/companies/batch/{action}"
+        payload = {"inputs": inputs, **(extra or {})}
+        try:
+            async with await self._request(await self._get_session(), "POST", endpoint, json=payload) as response:
+                if response.status in (200, 201, 207):
+                    return response.status, await response.json()
+                error_text = await response.text()
+                logger.error(f"HubSpot batch/{action} error ({response.status}) for {len(inputs)} companies: {error_text}")
+                return response.status, {}
+        except Exception as e:
+            logger.error(f"Error in HubSpot batch/{action} for {len(inputs)} companies: {e}", exc_info=True)
+            return None, {}
+
+    async def _run_batches(self, action: str, inputs: List[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None) -> List[Tuple[List[Dict[str, Any]], Optional[int], Dict[str, Any]]]:
+        """
+        Разбивает inputs на части по BATCH_LIMIT и выполняет batch-запросы
+        (не более MAX_CONCURRENT_BATCHES одновременно).
+        
+        Returns:
+            List[Tuple]: (часть inputs, HTTP статус, тело ответа) для каждой части
+        """
+        chunks = [inputs[i:i + self.BATCH_LIMIT] for i in range(0, len(inputs), self.BATCH_LIMIT)]
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_BATCHES)
+
+        async def run_chunk(chunk):
+            async with semaphore:
+                status, body = await self._post_batch(action, chunk, extra)
+                return chunk, status, body
+
+        return await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+
+    @staticmethod
+    def _log_batch_errors(action: str, body: Dict[str, Any]):
+        for error in body.get("errors", []):
+            ids = error.get("context", {}).get("ids") or error.get("context", {}).get("id")
+            logger.error(f"HubSpot batch/{action} error{f' for {ids}' if ids else ''}: {error.get('message')}")
+
+    async def batch_read_companies(self, company_ids: List[str], properties: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Получение свойств нескольких компаний (batch/read, до BATCH_LIMIT компаний на запрос).
+        
+        Args:
+            company_ids (List[str]): ID компаний в HubSpot
+            properties (List[str]): Список названий свойств для получения
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: ID компании -> словарь свойств (ненайденных компаний в словаре нет)
+        """
+        if not self.api_key:
+            logger.warning("HubSpot API key not set. Batch read operation aborted.")
+            return {}
+
+        unique_ids = list(dict.fromkeys(str(company_id) for company_id in company_ids))
+        if not unique_ids:
+            return {}
+
+        found = {}
+        inputs = [{"id": company_id} for company_id in unique_ids]
+        for _, status, body in await self._run_batches("read", inputs, {"properties": properties}):
+            if status in (200, 207):
+                for company in body.get("results", []):
+                    found[str(company.get("id"))] = company.get("properties", {})
+                self._log_batch_errors("read", body)
+
+        logger.info(f"Batch read: retrieved properties for {len(found)}/{len(unique_ids)} companies")
+        return found
+
+    async def batch_update_companies(self, updates: Dict[str, Dict[str, str]]) -> Dict[str, bool]:
+        """
+        Обновление свойств нескольких компаний (batch/update, до BATCH_LIMIT компаний на запрос).
+        
+        Если HubSpot отклоняет часть целиком (например, из-за одного несуществующего ID),
+        компании этой части обновляются по одной.
+        
+        Args:
+            updates (Dict[str, Dict[str, str]]): ID компании -> словарь свойств для обновления
+            
+        Returns:
+            Dict[str, bool]: ID компании -> True в случае успеха
+        """
+        outcomes = {str(company_id): False for company_id in updates}
+        if not self.api_key:
+            logger.warning("HubSpot API key not set. Batch update operation aborted.")
+            return outcomes
+
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        inputs = []
+        for company_id, properties in updates.items():
+            properties = dict(properties)
+            if "ai_description_updated" in properties:
+                # Всегда используем только формат YYYY-MM-DD без времени
+                properties["ai_description_updated"] = today
+            inputs.append({"id": str(company_id), "properties": properties})
+
+        fallback = []
+        for chunk, status, body in await self._run_batches("update", inputs):
+            if status in (200, 207):
+                for company in body.get("results", []):
+                    company_id = str(company.get("id"))
+                    if company_id in outcomes:
+                        outcomes[company_id] = True
+                        self._invalidate_cache_for_company(company_id)
+                self._log_batch_errors("update", body)
+            elif len(chunk) > 1:
+                fallback.extend(chunk)
+
+        if fallback:
+            logger.warning(f"Batch update rejected for {len(fallback)} companies, updating them one by one")
+            results = await asyncio.gather(*(self.update_company_properties(item["id"], item["properties"]) for item in fallback))
+            for item, success in zip(fallback, results):
+                outcomes[item["id"]] = success
+
+        updated = sum(outcomes.values())
+        logger.info(f"Batch update: updated {updated}/{len(outcomes)} companies")
+        return outcomes
+
+    async def batch_create_companies(self, companies: List[Tuple[str, Dict[str, str]]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Создание нескольких компаний (batch/create, до BATCH_LIMIT компаний на запрос).
+        
+        Args:
+            companies (List[Tuple[str, Dict[str, str]]]): Пары (домен, свойства компании)
+            
+        Returns:
+            List[Optional[Dict[str, Any]]]: Созданная компания или None для каждой входной пары (в том же порядке)
+        """
+        created: List[Optional[Dict[str, Any]]] = [None] * len(companies)
+        if not self.api_key:
+            logger.warning("HubSpot API key not set. Batch create operation aborted.")
+            return created
+
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        inputs = []
+        positions: Dict[str, List[int]] = {}
+        for position, (domain, properties) in enumerate(companies):
+            normalized_domain = self._normalize_domain(domain)
+            if not normalized_domain:
+                logger.warning(f"Invalid domain: {domain}")
+                continue
+            properties = dict(properties)
+            properties["domain"] = normalized_domain
+            if "ai_description_updated" in properties:
+                properties["ai_description_updated"] = today
+            inputs.append({"properties": properties})
+            positions.setdefault(normalized_domain, []).append(position)
+
+        for _, status, body in await self._run_batches("create", inputs):
+            if status in (200, 201, 207):
+                # Порядок results в ответе HubSpot не гарантирован - сопоставляем по домену
+                for company in body.get("results", []):
+                    properties = company.setdefault("properties", {})
+                    domain_positions = positions.get((properties.get("domain") or "").lower())
+                    if domain_positions:
+                        created[domain_positions.pop(0)] = company
+                        if self.cache is not None:
+                            self.cache.invalidate(f"domain:{properties['domain'].lower()}")
+                self._log_batch_errors("create", body)
+
+        logger.info(f"Batch create: created {sum(1 for company in created if company)}/{len(companies)} companies")
+        return created
+
     def is_description_fresh(self, timestamp_str: Optional[str], max_age_months: int = 6) -> bool:
         """
         Проверка свежести описания по временной метке.
@@ -444,30 +702,24 @@ class HubSpotClient:
                 logger.error(f"Error in fallback domain normalization: {inner_e}")
                 return ""
 
+    def _cache_set(self, cache_key: str, value: Optional[Dict[str, Any]]) -> None:
+        """Сохранить результат поиска в кэше (срок ограничен свежестью описания компании)"""
+        if self.cache is not None:
+            self.cache.set(cache_key, value, max_age_months=self.max_age_months)
+
     def _invalidate_cache_for_company(self, company_id: str) -> None:
         """
         Инвалидация кэша для конкретной компании.
         
         Это необходимо, если данные компании были обновлены, и кэш для её домена 
         (если он был основан на поиске по домену) должен быть сброшен.
+        Ключи компании берутся из индекса company_id кэша, без обхода всех записей.
         
         Args:
             company_id (str): ID компании в HubSpot.
         """
-        # Ищем ключ в кэше, который соответствует company_id
-        # Это упрощенная инвалидация, так как мы кэшируем по домену.
-        # Если есть более сложная логика кэширования, её нужно будет учесть.
-        
-        # Собираем ключи, которые нужно удалить
-        keys_to_delete = []
-        for key, cached_item in self._cache.items():
-            if isinstance(cached_item, dict) and cached_item.get("id") == company_id:
-                keys_to_delete.append(key)
-        
-        # Удаляем найденные ключи
-        for key in keys_to_delete:
-            del self._cache[key]
-            logger.info(f"Cache invalidated for company ID {company_id} (key: {key})")
+        if self.cache is not None:
+            self.cache.invalidate_company(company_id)
 
     def _check_domain_match(self, domain_field: str, normalized_target_domain: str) -> bool:
         """
@@ -124,6 +124,11 @@ class HubSpotIntegrationService:
         has_description, company_data = await self.adapter.check_company_description(company_name, domain)
         
         return await self.adapter.save_company_description(company_data, company_name, domain, description)
+    
+    async def close(self):
+        """Закрыть HTTP-сессию клиента HubSpot"""
+        if self.adapter is not None:
+            await self.adapter.close()
 
 
 async def process_companies_with_hubspot(
@@ -205,6 +210,7 @@ async def process_companies_with_hubspot(
                     "Status": "Failed"
                 })
     
+    await hubspot.close()
     return results
 
 
@@ -41,6 +41,7 @@ async def _process_criteria_results_to_hubspot_async(results: List[Dict[str, Any
     try:
         # Инициализация HubSpot клиента
         hubspot_client = HubSpotClient()
+        cache_snapshot = hubspot_client.cache.snapshot() if hubspot_client.cache else None
         
         if not hubspot_client.api_key:
             log_error("❌ Нет API ключа HubSpot")
@@ -58,6 +59,9 @@ async def _process_criteria_results_to_hubspot_async(results: List[Dict[str, Any
             "skipped": 0
         }
         
+        # Собираем обновления всех компаний и отправляем их пакетами (batch/update)
+        updates = {}
+        company_names = {}
         for result in results:
             try:
                 company_name = result.get("Company_Name", "")
@@ -66,47 +70,44 @@ async def _process_criteria_results_to_hubspot_async(results: List[Dict[str, Any
                     stats["skipped"] += 1
                     continue
                 
-                log_info(f"🏢 Обрабатываем: {company_name}")
-                
-                # Ищем компанию в HubSpot
                 hubspot_company_id = result.get("HubSpot_Company_ID")
                 if not hubspot_company_id:
                     log_info(f"⚠️ {company_name}: нет HubSpot_Company_ID - пропускаем")
                     stats["skipped"] += 1
                     continue
                 
-                # Всегда обновляем критерии при включенном чекбоксе HubSpot
-                log_info(f"🔄 {company_name}: обновляем критерии в HubSpot")
-                
                 # Подготавливаем данные для записи
                 criteria_data = result.get("All_Results", {})
                 description = result.get("Description", "")
                 
-                # Формируем данные для обновления
-                update_data = {
+                # Формируем данные для обновления (повторная запись той же компании заменяет предыдущую)
+                company_id = str(hubspot_company_id)
+                updates[company_id] = {
                     "ai_criteria": json.dumps(criteria_data, ensure_ascii=False, separators=(',', ':')),
                     "ai_description": description,
                     "ai_description_updated": datetime.now().isoformat()
                 }
+                company_names[company_id] = company_name
                 
-                # Обновляем компанию в HubSpot
-                success = await hubspot_client.update_company_properties(
-                    hubspot_company_id, 
-                    update_data
-                )
-                
+            except Exception as e:
+                log_error(f"❌ Ошибка обработки компании {result.get('Company_Name', 'Unknown')}: {e}")
+                stats["errors"] += 1
+        
+        if updates:
+            # Всегда обновляем критерии при включенном чекбоксе HubSpot
+            log_info(f"🔄 Обновляем критерии {len(updates)} компаний в HubSpot (пакетами по {HubSpotClient.BATCH_LIMIT})")
+            try:
+                outcomes = await hubspot_client.batch_update_companies(updates)
+            finally:
+                await hubspot_client.close()
+            
+            for company_id, success in outcomes.items():
                 if success:
-                    log_info(f"✅ {company_name}: критерии и описание обновлены в HubSpot")
                     stats["updated"] += 1
                 else:
-                    log_error(f"❌ {company_name}: ошибка обновления в HubSpot")
+                    log_error(f"❌ {company_names[company_id]}: ошибка обновления в HubSpot")
                     stats["errors"] += 1
-                
                 stats["processed"] += 1
-                
-            except Exception as e:
-                log_error(f"❌ Ошибка обработки компании {result.get('Company_Name', 'Unknown')}: {e}")
-                stats["errors"] += 1
         
         log_info(f"""
 🎉 HubSpot интеграция критериев завершена:
@@ -115,6 +116,11 @@ async def _process_criteria_results_to_hubspot_async(results: List[Dict[str, Any
    ❌ Ошибок: {stats['errors']}
    ⏭️ Пропущено: {stats['skipped']}""")
         
+        if hubspot_client.cache:
+            # Обновленные компании удаляются из кэша поиска по индексу company_id
+            stats["hubspot_cache_stats"] = hubspot_client.cache.get_stats(since=cache_snapshot)
+            log_info(f"🗃️ Кэш поиска HubSpot: {stats['hubspot_cache_stats']}")
+        
         return {
             "status": "completed",
             **stats
@@ -0,0 +1,277 @@
+"""
+Локальное определение языка текста перед переводом через LLM
+
+Большинство отчетов уже на английском, и перевод (полный completion gpt-4o-mini
+по всему тексту) для них не нужен. Модуль решает это без сетевых вызовов:
+
+1. Письменность: доля букв не латиницы (кириллица, арабская, CJK и т.д.).
+   Короткие вкрапления (названия компаний) не считаются - порог в буквах и в доле.
+2. Для латиницы - модель символьных триграмм (Cavnar-Trenkle, out-of-place)
+   по профилям английского и распространенных европейских языков плюс доля
+   служебных английских слов.
+
+Проверка идет по блокам текста (абзацы), поэтому английский отчет с одним
+абзацем на другом языке тоже отправляется на перевод.
+
+Статистика пропущенных переводов ведется на сессию (contextvars: задачи сессии
+наследуют ее из run_session_pipeline) и суммарно на процесс.
+"""
+
+import contextvars
+import logging
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Пороги
+MIN_BLOCK_LETTERS = 120          # Короче - блок не анализируется отдельно, а присоединяется к соседнему
+NON_LATIN_MIN_LETTERS = 30       # Сколько букв не латиницы нужно, чтобы считать текст непереведенным...
+NON_LATIN_MIN_SHARE = 0.02       # ...и какая доля от всех букв
+ENGLISH_STOPWORD_MIN_SHARE = 0.06
+PROFILE_SIZE = 300
+
+# Примерно столько токенов уходит на инструкцию переводчика сверх самого текста
+TRANSLATION_PROMPT_OVERHEAD_TOKENS = 80
+
+_SEED_TEXTS = {
+    "en": (
+        "The company is a leading provider of software and services for businesses around the world. "
+        "It was founded in the early years of the industry and is headquartered in the city where its "
+        "main offices are located. Their products include cloud platforms, network infrastructure and "
+        "data solutions that help customers improve the performance of their operations. The firm has "
+        "thousands of employees and works with partners in many countries, which makes it one of the "
+        "largest technology groups in the region. According to recent reports, revenue has grown each "
+        "year and the management expects further growth through new acquisitions and investments."
+    ),
+    "de": (
+        "Das Unternehmen ist ein führender Anbieter von Software und Dienstleistungen für Unternehmen auf "
+        "der ganzen Welt. Es wurde in den frühen Jahren der Branche gegründet und hat seinen Hauptsitz in der "
+        "Stadt, in der sich die wichtigsten Büros befinden. Zu den Produkten gehören Cloud-Plattformen, "
+        "Netzwerkinfrastruktur und Datenlösungen, die den Kunden helfen, die Leistung ihrer Geschäfte zu "
+        "verbessern. Die Firma beschäftigt tausende Mitarbeiter und arbeitet mit Partnern in vielen Ländern "
+        "zusammen. Der Umsatz ist jedes Jahr gewachsen und die Geschäftsführung erwartet weiteres Wachstum."
+    ),
+    "fr": (
+        "L'entreprise est un fournisseur de premier plan de logiciels et de services pour les entreprises du "
+        "monde entier. Elle a été fondée dans les premières années du secteur et son siège social est situé "
+        "dans la ville où se trouvent ses principaux bureaux. Ses produits comprennent des plateformes cloud, "
+        "des infrastructures réseau et des solutions de données qui aident les clients à améliorer la "
+        "performance de leurs activités. La société compte des milliers d'employés et travaille avec des "
+        "partenaires dans de nombreux pays. Le chiffre d'affaires a augmenté chaque année."
+    ),
+    "es": (
+        "La empresa es un proveedor líder de software y servicios para negocios de todo el mundo. Fue fundada "
+        "en los primeros años de la industria y tiene su sede en la ciudad donde se encuentran sus principales "
+        "oficinas. Sus productos incluyen plataformas en la nube, infraestructura de red y soluciones de datos "
+        "que ayudan a los clientes a mejorar el rendimiento de sus operaciones. La compañía tiene miles de "
+        "empleados y trabaja con socios en muchos países. Según los informes, los ingresos han crecido cada año "
+        "y la dirección espera un mayor crecimiento."
+    ),
+    "it": (
+        "L'azienda è un fornitore leader di software e servizi per le imprese di tutto il mondo. È stata "
+        "fondata nei primi anni del settore e ha sede nella città in cui si trovano i suoi uffici principali. "
+        "I suoi prodotti comprendono piattaforme cloud, infrastrutture di rete e soluzioni per i dati che "
+        "aiutano i clienti a migliorare le prestazioni delle loro attività. La società conta migliaia di "
+        "dipendenti e collabora con partner in molti paesi. Secondo i rapporti, il fatturato è cresciuto "
+        "ogni anno e la direzione prevede un'ulteriore crescita."
+    ),
+    "pt": (
+        "A empresa é uma fornecedora líder de software e serviços para negócios em todo o mundo. Foi fundada "
+        "nos primeiros anos do setor e tem sede na cidade onde estão localizados os seus principais "
+        "escritórios. Os seus produtos incluem plataformas de nuvem, infraestrutura de rede e soluções de "
+        "dados que ajudam os clientes a melhorar o desempenho das suas operações. A companhia tem milhares de "
+        "funcionários e trabalha com parceiros em muitos países. A receita cresceu todos os anos e a direção "
+        "espera um crescimento ainda maior."
+    ),
+    "nl": (
+        "Het bedrijf is een toonaangevende leverancier van software en diensten voor ondernemingen over de "
+        "hele wereld. Het werd opgericht in de beginjaren van de sector en heeft zijn hoofdkantoor in de stad "
+        "waar de belangrijkste kantoren zijn gevestigd. De producten omvatten cloudplatforms, "
+        "netwerkinfrastructuur en dataoplossingen die klanten helpen de prestaties van hun activiteiten te "
+        "verbeteren. Het bedrijf heeft duizenden medewerkers en werkt samen met partners in veel landen. "
+        "De omzet is elk jaar gegroeid en het management verwacht verdere groei."
+    ),
+    "pl": (
+        "Firma jest wiodącym dostawcą oprogramowania i usług dla przedsiębiorstw na całym świecie. Została "
+        "założona w pierwszych latach branży, a jej siedziba znajduje się w mieście, w którym mieszczą się "
+        "główne biura. Jej produkty obejmują platformy chmurowe, infrastrukturę sieciową oraz rozwiązania do "
+        "przetwarzania danych, które pomagają klientom poprawić wydajność działalności. Spółka zatrudnia "
+        "tysiące pracowników i współpracuje z partnerami w wielu krajach. Przychody rosły każdego roku."
+    ),
+    "tr": (
+        "Şirket, dünya genelindeki işletmeler için önde gelen bir yazılım ve hizmet sağlayıcısıdır. Sektörün "
+        "ilk yıllarında kurulmuş olup genel merkezi ana ofislerinin bulunduğu şehirdedir. Ürünleri arasında "
+        "bulut platformları, ağ altyapısı ve müşterilerin operasyonlarının performansını artırmalarına "
+        "yardımcı olan veri çözümleri yer almaktadır. Şirketin binlerce çalışanı vardır ve birçok ülkede "
+        "ortaklarla çalışmaktadır. Gelirleri her yıl artmış ve yönetim daha fazla büyüme beklemektedir."
+    ),
+}
+
+_ENGLISH_STOPWORDS = frozenset(
+    "the a an and or of to in on at for with by from as is are was were be been has have had it its "
+    "this that these those which who their they he she we our you not but also into than more most "
+    "about over after such other can will would may".split()
+)
+
+_URL_RE = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"\S+@\S+")
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+_BLOCK_SPLIT_RE = re.compile(r"\n\s*\n")
+
+
+class LanguageGuess(NamedTuple):
+    language: str          # "en", код другого языка или "non_latin"
+    is_english: bool
+    letters: int           # Сколько букв проанализировано
+    non_latin_share: float
+
+
+def _trigrams(words: List[str]) -> Counter:
+    counts = Counter()
+    for word in words:
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            counts[padded[i:i + 3]] += 1
+    return counts
+
+
+def _profile(counts: Counter) -> Dict[str, int]:
+    return {gram: rank for rank, (gram, _) in enumerate(counts.most_common(PROFILE_SIZE))}
+
+
+_PROFILES = {lang: _profile(_trigrams(_WORD_RE.findall(text.lower()))) for lang, text in _SEED_TEXTS.items()}
+
+
+def _is_latin(char: str) -> bool:
+    if char < "\u0080":
+        return True
+    try:
+        return unicodedata.name(char).startswith("LATIN")
+    except ValueError:
+        return False
+
+
+def _clean(text: str) -> str:
+    text = _URL_RE.sub(" ", text)
+    return _EMAIL_RE.sub(" ", text)
+
+
+def _nearest_profile(words: List[str]) -> str:
+    doc_profile = _profile(_trigrams(words))
+    best_language, best_distance = "en", None
+    for language, profile in _PROFILES.items():
+        distance = sum(abs(rank - profile[gram]) if gram in profile else PROFILE_SIZE
+                       for gram, rank in doc_profile.items())
+        if best_distance is None or distance < best_distance:
+            best_language, best_distance = language, distance
+    return best_language
+
+
+def detect_language(text: str) -> LanguageGuess:
+    """Определить язык одного блока текста"""
+    words = _WORD_RE.findall(_clean(text or "").lower())
+    letters = sum(len(word) for word in words)
+    if not letters:
+        return LanguageGuess("en", True, 0, 0.0)
+
+    non_latin = sum(1 for word in words for char in word if not _is_latin(char))
+    non_latin_share = non_latin / letters
+    if non_latin >= NON_LATIN_MIN_LETTERS and non_latin_share >= NON_LATIN_MIN_SHARE:
+        return LanguageGuess("non_latin", False, letters, round(non_latin_share, 3))
+
+    latin_words = [word for word in words if all(_is_latin(char) for char in word)]
+    if not latin_words:
+        return LanguageGuess("en", True, letters, round(non_latin_share, 3))
+
+    language = _nearest_profile(latin_words)
+    stopword_share = sum(1 for word in latin_words if word in _ENGLISH_STOPWORDS) / len(latin_words)
+    # Таблицы и списки ссылок почти без служебных слов: решает триграммная модель
+    is_english = language == "en" and (stopword_share >= ENGLISH_STOPWORD_MIN_SHARE or len(latin_words) < 40)
+    if language == "en" and not is_english:
+        language = "unknown"
+    return LanguageGuess(language, is_english, letters, round(non_latin_share, 3))
+
+
+def _blocks(text: str) -> List[str]:
+    """Абзацы, склеенные до MIN_BLOCK_LETTERS, чтобы короткие строки не анализировались по одной"""
+    blocks, current = [], ""
+    for part in _BLOCK_SPLIT_RE.split(text):
+        current = f"{current}\n\n{part}" if current else part
+        if sum(ch.isalpha() for ch in current) >= MIN_BLOCK_LETTERS:
+            blocks.append(current)
+            current = ""
+    if current:
+        if blocks and sum(ch.isalpha() for ch in current) < MIN_BLOCK_LETTERS:
+            blocks[-1] = f"{blocks[-1]}\n\n{current}"
+        else:
+            blocks.append(current)
+    return blocks
+
+
+def non_english_blocks(text: str) -> List[LanguageGuess]:
+    """Результаты detect_language для блоков текста, которые не на английском"""
+    return [guess for guess in (detect_language(block) for block in _blocks(text or "")) if not guess.is_english]
+
+
+def needs_translation(text: str) -> bool:
+    """True, если в тексте есть блок не на английском (или заметная доля не латиницы)"""
+    if not text or not text.strip():
+        return False
+    return bool(non_english_blocks(text))
+
+
+# ---------- статистика ----------
+
+def _empty_stats() -> Dict[str, Any]:
+    return {"checked": 0, "translated": 0, "skipped": 0, "chars_skipped": 0, "estimated_tokens_saved": 0}
+
+
+_session_stats: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("translation_stats", default=None)
+_total_stats = _empty_stats()
+_stats_lock = threading.Lock()
+
+
+def start_translation_stats() -> Dict[str, Any]:
+    """Начать статистику перевода для текущей сессии (задачи, созданные после вызова, пишут в нее)"""
+    stats = _empty_stats()
+    _session_stats.set(stats)
+    return stats
+
+
+def estimate_translation_tokens(text: str) -> int:
+    """Токены, которые потратил бы перевод: текст на входе + примерно такой же текст на выходе"""
+    return 2 * (len(text) // 4) + TRANSLATION_PROMPT_OVERHEAD_TOKENS
+
+
+def record_translation_decision(text: str, translated: bool, call_site: str = ""):
+    """Учесть решение о переводе в статистике сессии и процесса"""
+    update = _empty_stats()
+    update["checked"] = 1
+    if translated:
+        update["translated"] = 1
+    else:
+        update["skipped"] = 1
+        update["chars_skipped"] = len(text or "")
+        update["estimated_tokens_saved"] = estimate_translation_tokens(text or "")
+        logger.info(f"Translation skipped{f' ({call_site})' if call_site else ''}: text is already English "
+                    f"({len(text or '')} chars, ~{update['estimated_tokens_saved']} tokens saved)")
+
+    with _stats_lock:
+        targets = [_total_stats]
+        session_stats = _session_stats.get()
+        if session_stats is not None:
+            targets.append(session_stats)
+        for stats in targets:
+            for key, value in update.items():
+                stats[key] += value
+
+
+def get_translation_stats(session: bool = True) -> Dict[str, Any]:
+    """Статистика текущей сессии (или процесса при session=False)"""
+    with _stats_lock:
+        stats = _session_stats.get() if session else _total_stats
+        return dict(stats) if stats is not None else _empty_stats()
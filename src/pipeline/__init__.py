@@ -88,6 +88,9 @@ async def run_pipeline(config_path: str = "llm_config.yaml", input_file = None,
         Tuple with success count, failure count, and results
     """
     adapter = get_pipeline_adapter(config_path, input_file, use_hubspot, session_id=session_id)
-    return await adapter.run()
+    try:
+        return await adapter.run()
+    finally:
+        await adapter.close()
 
 __all__ = ['PipelineAdapter', 'HubSpotPipelineAdapter', 'run_pipeline', 'get_pipeline_adapter'] 
\ No newline at end of file
@@ -15,6 +15,7 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple, Callable
 from openai import AsyncOpenAI
 from src.external_apis.scrapingbee_client import CustomScrapingBeeClient
+from src.external_apis.rate_limiter import create_async_openai_client
 
 # Standard pipeline components
 from src.config import load_env_vars, load_llm_config
@@ -25,7 +26,7 @@ from finders.linkedin_finder import LinkedInFinder
 
 from finders.domain_check_finder import DomainCheckFinder
 from finders.login_detection_finder import LoginDetectionFinder
-from src.data_io import load_and_prepare_company_names, save_results_csv, save_results_json, load_session_metadata, save_session_metadata
+from src.data_io import load_and_prepare_company_names, save_results_csv, save_results_json, add_session_metadata, update_session_metadata
 
 # Импортируем функцию нормализации URL в файле
 from normalize_urls import normalize_urls_in_file, remove_duplicates_by_domain, normalize_and_remove_duplicates
@@ -73,6 +74,8 @@ class PipelineAdapter:
         self.openai_client = None
         self.sb_client = None
         self.aiohttp_session = None
+        # Индекс контрольных точек сессии (устанавливается processing_runner для возобновляемых сессий)
+        self.checkpoint_index = None
         
         # Output paths
         self.output_dir = Path("output")
@@ -166,24 +169,16 @@ class PipelineAdapter:
             "success_count": success_count,
             "failure_count": failure_count
         }
-        all_metadata = load_session_metadata()
-        
-        # Проверяем, есть ли уже запись о текущей сессии
-        session_exists = False
-        for i, meta in enumerate(all_metadata):
-            if meta.get("session_id") == session_metadata["session_id"]:
-                all_metadata[i].update(session_metadata)
-                session_exists = True
-                break
-                
-        # Если записи нет, добавляем новую
-        if not session_exists:
-            all_metadata.append(session_metadata)
-            
-        save_session_metadata(all_metadata)
+        # Обновляем запись о текущей сессии; если записи нет, добавляем новую
+        if update_session_metadata(session_metadata["session_id"], session_metadata) is None:
+            add_session_metadata(session_metadata)
         
         logger.info(f"Pipeline finished. Success: {success_count}, Failure: {failure_count}")
         return success_count, failure_count, results
+
+    async def close(self):
+        """Release resources held by the adapter (overridden by adapters with their own clients)"""
+        pass
         
     def _load_config(self):
         """Load configuration from files and environment"""
@@ -219,7 +214,7 @@ class PipelineAdapter:
         
     def _init_clients(self):
         """Initialize API clients"""
-        self.openai_client = AsyncOpenAI(api_key=self.api_keys["openai"])
+        self.openai_client = create_async_openai_client(self.api_keys["openai"])
         self.sb_client = CustomScrapingBeeClient(api_key=self.api_keys["scrapingbee"])
         
     def _setup_directories(self):
@@ -426,7 +421,8 @@ class PipelineAdapter:
             use_raw_llm_data_as_description=self.use_raw_llm_data_as_description,
             csv_append_mode=False,
             json_append_mode=False,
-            write_to_hubspot=write_to_hubspot
+            write_to_hubspot=write_to_hubspot,
+            checkpoint_index=self.checkpoint_index
         )
         
         # 4. Объединение исходного файла с результатами
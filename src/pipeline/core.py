@@ -28,8 +28,9 @@ from finders.login_detection_finder import LoginDetectionFinder
 
 # Pipeline components
 from description_generator import DescriptionGenerator
-from src.data_io import save_results_csv, save_results_json, save_structured_data_incrementally
-from src.pipeline.utils import generate_and_save_raw_markdown_report_async
+from src.data_io import save_results_csv, JsonlResultSink, materialize_json_results
+from src.progress_events import publish_session_progress
+from src.pipeline.utils import generate_and_save_raw_markdown_report_async, StageGraph, CheckpointIndex, company_input_hash
 
 # Импортируем функции валидации
 # from src.input_validators import normalize_domain #, CompanyInfo
@@ -41,6 +42,41 @@ logger = logging.getLogger(__name__)
 # Constants
 DEFAULT_BATCH_SIZE = 5
 
+# Этапы, результаты которых сохраняются в индекс контрольных точек сессии.
+# hubspot_check и этапы после result (валидация, загрузка в HubSpot) изменяют result_data
+# или внешнее состояние, поэтому при возобновлении всегда выполняются заново.
+CHECKPOINT_STAGES = ("domain_check", "linkedin", "deep_search", "description", "markdown_report")
+
+
+def _is_final_stage_output(stage: str, output: Any, run_llm_deep_search_pipeline: bool) -> bool:
+    """Можно ли сохранить результат этапа в контрольную точку (ошибки не сохраняются - этап повторится)"""
+    if stage not in CHECKPOINT_STAGES:
+        return False
+    if stage == "deep_search":
+        return bool(output and (output.get("structured_data") or not run_llm_deep_search_pipeline))
+    if stage == "description":
+        description_text = (output or {}).get("description_text")
+        return bool(description_text and not description_text.startswith("Error"))
+    if stage == "markdown_report":
+        return output is not None
+    return True
+
+
+def _restorable_stages(checkpoint_stages: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Сохраненные этапы, которые можно подставить в StageGraph (markdown отчет - только если файл на месте)"""
+    restored = {stage: output for stage, output in (checkpoint_stages or {}).items() if stage in CHECKPOINT_STAGES}
+    report_path = restored.get("markdown_report")
+    if report_path and not Path(report_path).exists():
+        del restored["markdown_report"]
+    return restored
+
+
+def _is_final_company_result(result: Dict[str, Any]) -> bool:
+    """Результат компании завершен без ошибок - при возобновлении сессии компания пропускается"""
+    description = result.get("Description") or ""
+    return bool(description) and not result.get("error") and not description.startswith("Error")
+
+
 async def _process_single_company_async(
     company_name: str,
     openai_client: AsyncOpenAI,
@@ -66,7 +102,9 @@ async def _process_single_company_async(
     hubspot_client: Optional[Any] = None,
     use_raw_llm_data_as_description: bool = False,
     write_to_hubspot: bool = True,
-    predator_id: Optional[str] = None
+    predator_id: Optional[str] = None,
+    checkpoint_stages: Optional[Dict[str, Any]] = None,
+    on_stage_done: Optional[Callable[[str, Any], None]] = None
 ) -> Dict[str, Any]:
     """
     Process a single company asynchronously
@@ -98,6 +136,8 @@ async def _process_single_company_async(
         second_column_data: Data from the second column
         hubspot_client: HubSpot client
         use_raw_llm_data_as_description: Whether to use raw LLM data as description
+        checkpoint_stages: Stage outputs saved by a previous run (not recomputed)
+        on_stage_done: Callback (stage, output) for stage outputs worth checkpointing
         
     Returns:
         Dict: The result of processing the company
@@ -124,7 +164,6 @@ async def _process_single_company_async(
     
     try:
         found_homepage_url = None
-        linkedin_url = None
         
         # Если URL уже предоставлен в кортеже, используем его
         if homepage_url_from_tuple:
@@ -143,113 +182,131 @@ async def _process_single_company_async(
         if not found_homepage_url:
             logger.warning(f"{run_stage_log} - No homepage URL provided in input data")
         
-        # 2. Проверка доступности URL (если включена и найден URL)
-        if found_homepage_url and run_domain_check_finder:
-            logger.info(f"{run_stage_log} - Running domain check finder for {found_homepage_url}")
+        llm_deep_search_finder = finder_instances.get("llm_deep_search_finder") if run_llm_deep_search_pipeline else None
+        
+        # Этапы обработки компании - граф зависимостей (StageGraph):
+        #   domain_check → hubspot_check → deep_search ┐
+        #   linkedin ──────────────────────────────────┴→ description → markdown_report
+        #                                                             → result → validation, hubspot_upload
+        # LinkedIn finder не зависит от URL и идет параллельно с цепочкой до deep search;
+        # deep search использует только homepage URL.
+        
+        async def domain_check_stage():
+            """2. Проверка доступности URL (если включена и найден URL)"""
+            homepage_url = found_homepage_url
+            if not (homepage_url and run_domain_check_finder):
+                return homepage_url
+            
+            logger.info(f"{run_stage_log} - Running domain check finder for {homepage_url}")
             try:
                 if "domain_check_finder" in finder_instances:
                     domain_check_finder = finder_instances["domain_check_finder"]
-                    domain_check_result = await domain_check_finder.find(found_homepage_url)
+                    domain_check_result = await domain_check_finder.find(homepage_url)
                     
                     if domain_check_result and domain_check_result.get("is_valid"):
                         if domain_check_result.get("redirected_url"):
                             # Если URL перенаправлен, используем новый URL
                             logger.info(f"{run_stage_log} - URL redirected to: {domain_check_result['redirected_url']}")
-                            found_homepage_url = domain_check_result["redirected_url"]
+                            homepage_url = domain_check_result["redirected_url"]
                         
-                        logger.info(f"{run_stage_log} - URL valid: {found_homepage_url}")
+                        logger.info(f"{run_stage_log} - URL valid: {homepage_url}")
                     else:
-                        logger.warning(f"{run_stage_log} - URL invalid: {found_homepage_url}")
+                        logger.warning(f"{run_stage_log} - URL invalid: {homepage_url}")
                         if domain_check_result and "error" in domain_check_result:
                             logger.warning(f"{run_stage_log} - URL error: {domain_check_result['error']}")
                 else:
                     logger.warning(f"{run_stage_log} - Domain check finder not available")
             except Exception as e:
                 logger.error(f"{run_stage_log} - Error running domain check finder: {e}", exc_info=True)
+            return homepage_url
         
-        # 3. Поиск LinkedIn URL
-        logger.info(f"{run_stage_log} - Running LinkedIn finder")
-        try:
-            if "linkedin_finder" in finder_instances:
-                linkedin_finder = finder_instances["linkedin_finder"]
-                # Исправляем передачу session и serper_api_key через context
-                linkedin_result = await linkedin_finder.find(
-                    company_name, 
-                    session=aiohttp_session,
-                    serper_api_key=serper_api_key
-                )
-                if linkedin_result and "result" in linkedin_result and linkedin_result["result"]:
-                    linkedin_url = linkedin_result["result"]
-                    logger.info(f"{run_stage_log} - LinkedIn finder found URL: {linkedin_url}")
-                else:
+        async def linkedin_stage():
+            """3. Поиск LinkedIn URL"""
+            logger.info(f"{run_stage_log} - Running LinkedIn finder")
+            try:
+                if "linkedin_finder" in finder_instances:
+                    linkedin_finder = finder_instances["linkedin_finder"]
+                    # Исправляем передачу session и serper_api_key через context
+                    linkedin_result = await linkedin_finder.find(
+                        company_name, 
+                        session=aiohttp_session,
+                        serper_api_key=serper_api_key
+                    )
+                    if linkedin_result and "result" in linkedin_result and linkedin_result["result"]:
+                        logger.info(f"{run_stage_log} - LinkedIn finder found URL: {linkedin_result['result']}")
+                        return linkedin_result["result"]
                     logger.warning(f"{run_stage_log} - LinkedIn finder did not return a URL")
-            else:
-                logger.warning(f"{run_stage_log} - LinkedIn finder not available")
-        except Exception as e:
-            logger.error(f"{run_stage_log} - Error running LinkedIn finder: {e}", exc_info=True)
-        
-        # 4. Глубокий поиск информации о компании с помощью LLM
-        structured_data = {}
-        llm_deep_search_raw_result = None
+                else:
+                    logger.warning(f"{run_stage_log} - LinkedIn finder not available")
+            except Exception as e:
+                logger.error(f"{run_stage_log} - Error running LinkedIn finder: {e}", exc_info=True)
+            return None
         
-        if run_llm_deep_search_pipeline:
-            logger.info(f"{run_stage_log} - Running LLM deep search finder")
+        async def hubspot_check_stage(domain_check):
+            """Проверяем URL в HubSpot: свежее описание позволяет пропустить deep search"""
+            homepage_url = domain_check
+            if not (llm_deep_search_finder and homepage_url and hubspot_client):
+                return None
+            
             try:
-                if "llm_deep_search_finder" in finder_instances:
-                    llm_deep_search_finder = finder_instances["llm_deep_search_finder"]
-                    
-                    # Переменная для контроля пропуска deep search
-                    skip_deep_search = False
-                    
-                    # Передаем конфигурацию перегрузки, если она есть
-                    if llm_deep_search_config_override:
-                        llm_deep_search_finder.update_config(llm_deep_search_config_override)
-                    
-                    # Проверяем URL в HubSpot, если клиент есть и URL предоставлен
-                    skip_deep_search = False
-                    if found_homepage_url and hubspot_client:
-                        try:
-                            logger.info(f"{run_stage_log} - Checking URL {found_homepage_url} in HubSpot before deep search")
-                            # Используем правильный метод из HubSpotAdapter
-                            description_is_fresh, hubspot_company = await hubspot_client.check_company_description(
-                                company_name, found_homepage_url, aiohttp_session, sb_client
-                            )
-                            
-                            if description_is_fresh and hubspot_company:
-                                logger.info(f"{run_stage_log} - Company with domain {found_homepage_url} found in HubSpot with fresh description")
-                                description_text, timestamp, linkedin_url_from_hubspot, predator_id_from_hubspot = hubspot_client.get_company_details_from_hubspot_data(hubspot_company)
-                                if description_text:
-                                    logger.info(f"{run_stage_log} - Using existing description from HubSpot")
-                                    skip_deep_search = True
-                                    # Добавляем базовую информацию для использования в других местах
-                                    structured_data = {
-                                        "homepage": found_homepage_url,
-                                        "extracted_homepage_url": found_homepage_url,
-                                        "hubspot_id": hubspot_company.get("id"),
-                                        "hubspot_source": True,
-                                        "predator_id": predator_id_from_hubspot
-                                    }
-                                    llm_deep_search_raw_result = description_text
-                                    # Используем LinkedIn из HubSpot если он есть и у нас его нет
-                                    if linkedin_url_from_hubspot and not linkedin_url:
-                                        linkedin_url = linkedin_url_from_hubspot
-                                    # Используем predator_id из HubSpot если он есть и у нас его нет
-                                    if predator_id_from_hubspot and not predator_id:
-                                        predator_id = predator_id_from_hubspot
-                                        result_data["Predator_ID"] = predator_id  # Обновляем result_data
-                                    # Если predator_id из HubSpot есть, всегда обновляем result_data
-                                    elif predator_id_from_hubspot:
-                                        result_data["Predator_ID"] = predator_id_from_hubspot
-                        except Exception as e:
-                            logger.error(f"{run_stage_log} - Error checking HubSpot: {e}", exc_info=True)
-                    
-                    # Шаг 2: Если первый шаг не пропускаем и нужно выполнить полный поиск
-                    if not skip_deep_search:
+                logger.info(f"{run_stage_log} - Checking URL {homepage_url} in HubSpot before deep search")
+                # Используем правильный метод из HubSpotAdapter
+                description_is_fresh, hubspot_company = await hubspot_client.check_company_description(
+                    company_name, homepage_url, aiohttp_session, sb_client
+                )
+                
+                if description_is_fresh and hubspot_company:
+                    logger.info(f"{run_stage_log} - Company with domain {homepage_url} found in HubSpot with fresh description")
+                    description_text, timestamp, linkedin_url_from_hubspot, predator_id_from_hubspot = hubspot_client.get_company_details_from_hubspot_data(hubspot_company)
+                    if description_text:
+                        logger.info(f"{run_stage_log} - Using existing description from HubSpot")
+                        # Если predator_id из HubSpot есть, всегда обновляем result_data
+                        if predator_id_from_hubspot:
+                            result_data["Predator_ID"] = predator_id_from_hubspot
+                        return {
+                            "description": description_text,
+                            "linkedin_url": linkedin_url_from_hubspot,
+                            "predator_id": predator_id_from_hubspot,
+                            # Базовая информация для использования в других местах
+                            "structured_data": {
+                                "homepage": homepage_url,
+                                "extracted_homepage_url": homepage_url,
+                                "hubspot_id": hubspot_company.get("id"),
+                                "hubspot_source": True,
+                                "predator_id": predator_id_from_hubspot
+                            }
+                        }
+            except Exception as e:
+                logger.error(f"{run_stage_log} - Error checking HubSpot: {e}", exc_info=True)
+            return None
+        
+        async def deep_search_stage(domain_check, hubspot_check):
+            """4. Глубокий поиск информации о компании с помощью LLM"""
+            homepage_url = domain_check
+            if hubspot_check:
+                return {
+                    "structured_data": hubspot_check["structured_data"],
+                    "raw_result": hubspot_check["description"],
+                    "homepage_url": homepage_url,
+                    "linkedin_url": hubspot_check["linkedin_url"]
+                }
+            
+            structured_data = {}
+            llm_deep_search_raw_result = None
+            linkedin_url_from_search = None
+            
+            if run_llm_deep_search_pipeline:
+                logger.info(f"{run_stage_log} - Running LLM deep search finder")
+                try:
+                    if llm_deep_search_finder:
+                        # Передаем конфигурацию перегрузки, если она есть
+                        if llm_deep_search_config_override:
+                            llm_deep_search_finder.update_config(llm_deep_search_config_override)
+                        
                         logger.info(f"{run_stage_log} - Running full LLM deep search")
                         llm_search_result = await llm_deep_search_finder.find(
                             company_name, 
-                            company_homepage_url=found_homepage_url,
-                            linkedin_url=linkedin_url,
+                            company_homepage_url=homepage_url,
                             context_text=context_text
                         )
                         
@@ -259,130 +316,129 @@ async def _process_single_company_async(
                             if "result" in llm_search_result:
                                 llm_deep_search_raw_result = llm_search_result["result"]
                             
-                            # Проверяем наличие homepage в структурированных данных
-                            if "homepage" in structured_data and structured_data["homepage"] and not found_homepage_url:
-                                potential_url = structured_data["homepage"]
-                                logger.info(f"{run_stage_log} - Found homepage in LLM deep search, validating: {potential_url}")
-                                
-                                # Проверяем живость URL
-                                is_live, final_url = await _validate_and_get_final_url(
-                                    potential_url, aiohttp_session, sb_client, company_name
-                                )
-                                
-                                if is_live and final_url:
-                                    found_homepage_url = final_url
-                                    logger.info(f"{run_stage_log} - Using validated homepage from LLM deep search: {found_homepage_url}")
-                                    # Обновляем URL в структурированных данных на финальный
-                                    structured_data["homepage"] = final_url
-                                else:
-                                    logger.warning(f"{run_stage_log} - Homepage from LLM deep search is not live: {potential_url}")
-                            
-                            # Проверяем наличие extracted_homepage_url в результате LLMDeepSearchFinder
-                            if "extracted_homepage_url" in structured_data and structured_data["extracted_homepage_url"] and not found_homepage_url:
-                                potential_url = structured_data["extracted_homepage_url"]
-                                logger.info(f"{run_stage_log} - Found extracted homepage URL in LLM deep search, validating: {potential_url}")
-                                
-                                # Проверяем живость URL
-                                is_live, final_url = await _validate_and_get_final_url(
-                                    potential_url, aiohttp_session, sb_client, company_name
-                                )
-                                
-                                if is_live and final_url:
-                                    found_homepage_url = final_url
-                                    logger.info(f"{run_stage_log} - Using validated extracted homepage URL from LLM deep search: {found_homepage_url}")
-                                    # Обновляем URL в структурированных данных на финальный
-                                    structured_data["extracted_homepage_url"] = final_url
-                                else:
-                                    logger.warning(f"{run_stage_log} - Extracted homepage URL from LLM deep search is not live: {potential_url}")
+                            # Проверяем наличие homepage и extracted_homepage_url в структурированных данных
+                            for url_key, url_label in (("homepage", "homepage"), ("extracted_homepage_url", "extracted homepage URL")):
+                                if url_key in structured_data and structured_data[url_key] and not homepage_url:
+                                    potential_url = structured_data[url_key]
+                                    logger.info(f"{run_stage_log} - Found {url_label} in LLM deep search, validating: {potential_url}")
+                                    
+                                    # Проверяем живость URL
+                                    is_live, final_url = await _validate_and_get_final_url(
+                                        potential_url, aiohttp_session, sb_client, company_name
+                                    )
+                                    
+                                    if is_live and final_url:
+                                        homepage_url = final_url
+                                        logger.info(f"{run_stage_log} - Using validated {url_label} from LLM deep search: {homepage_url}")
+                                        # Обновляем URL в структурированных данных на финальный
+                                        structured_data[url_key] = final_url
+                                    else:
+                                        logger.warning(f"{run_stage_log} - {url_label[0].upper() + url_label[1:]} from LLM deep search is not live: {potential_url}")
                             
-                            if "linkedin" in structured_data and structured_data["linkedin"] and not linkedin_url:
-                                linkedin_url = structured_data["linkedin"]
-                                logger.info(f"{run_stage_log} - Using LinkedIn from LLM deep search: {linkedin_url}")
+                            if "linkedin" in structured_data and structured_data["linkedin"]:
+                                linkedin_url_from_search = structured_data["linkedin"]
                         else:
                             logger.warning(f"{run_stage_log} - LLM deep search finder did not return valid data")
-                else:
-                    logger.warning(f"{run_stage_log} - LLM deep search finder not available")
-            except Exception as e:
-                logger.error(f"{run_stage_log} - Error running LLM deep search finder: {e}", exc_info=True)
-        
-        # 5. Генерация описания компании с помощью Description Generator или использование сырых данных
-        description_text = None
+                    else:
+                        logger.warning(f"{run_stage_log} - LLM deep search finder not available")
+                except Exception as e:
+                    logger.error(f"{run_stage_log} - Error running LLM deep search finder: {e}", exc_info=True)
+            
+            return {
+                "structured_data": structured_data,
+                "raw_result": llm_deep_search_raw_result,
+                "homepage_url": homepage_url,
+                "linkedin_url": linkedin_url_from_search
+            }
         
-        # Если указано использовать сырые данные от LLM Deep Search, пропускаем генерацию через DescriptionGenerator
-        if use_raw_llm_data_as_description and llm_deep_search_raw_result:
-            logger.info(f"{run_stage_log} - Using raw LLM data as description")
-            description_text = llm_deep_search_raw_result
-        else:
-            logger.info(f"{run_stage_log} - Running description generator")
-            try:
-                # Собираем найденные данные для передачи в генератор описания
-                company_data = {
-                    "company_name": company_name,
-                    "homepage_url": found_homepage_url,
-                    "linkedin_url": linkedin_url,
-                    "structured_data": structured_data
-                }
-                
-                # Преобразуем найденные данные в формат, ожидаемый генератором
-                findings_list = []
-                
-                # Добавляем homepage_url если есть
-                if found_homepage_url:
-                    findings_list.append({
-                        "source": "homepage_finder",
-                        "result": found_homepage_url
-                    })
+        async def description_stage(linkedin, deep_search):
+            """5. Генерация описания компании с помощью Description Generator или использование сырых данных"""
+            homepage_url = deep_search["homepage_url"]
+            structured_data = deep_search["structured_data"]
+            llm_deep_search_raw_result = deep_search["raw_result"]
+            
+            # LinkedIn: LinkedIn finder, затем HubSpot или LLM deep search
+            linkedin_url = linkedin
+            if not linkedin_url and deep_search["linkedin_url"]:
+                linkedin_url = deep_search["linkedin_url"]
+                logger.info(f"{run_stage_log} - Using LinkedIn from {'HubSpot' if structured_data.get('hubspot_source') else 'LLM deep search'}: {linkedin_url}")
+            
+            description_text = None
+            
+            # Если указано использовать сырые данные от LLM Deep Search, пропускаем генерацию через DescriptionGenerator
+            if use_raw_llm_data_as_description and llm_deep_search_raw_result:
+                logger.info(f"{run_stage_log} - Using raw LLM data as description")
+                description_text = llm_deep_search_raw_result
+            else:
+                logger.info(f"{run_stage_log} - Running description generator")
+                try:
+                    # Преобразуем найденные данные в формат, ожидаемый генератором
+                    findings_list = []
                     
-                # Добавляем LinkedIn URL если есть
-                if linkedin_url:
-                    findings_list.append({
-                        "source": "linkedin_finder",
-                        "result": linkedin_url
-                    })
+                    # Добавляем homepage_url если есть
+                    if homepage_url:
+                        findings_list.append({
+                            "source": "homepage_finder",
+                            "result": homepage_url
+                        })
+                        
+                    # Добавляем LinkedIn URL если есть
+                    if linkedin_url:
+                        findings_list.append({
+                            "source": "linkedin_finder",
+                            "result": linkedin_url
+                        })
+                        
+                    # Добавляем structured_data от LLM Deep Search если есть
+                    if structured_data:
+                        findings_list.append({
+                            "source": "llm_deep_search",
+                            "result": json.dumps(structured_data, ensure_ascii=False)
+                        })
                     
-                # Добавляем structured_data от LLM Deep Search если есть
-                if structured_data:
-                    findings_list.append({
-                        "source": "llm_deep_search",
-                        "result": json.dumps(structured_data, ensure_ascii=False)
-                    })
-                
-                # Вызываем генератор описания с правильными параметрами
-                description_result = await description_generator.generate_description(
-                    company_name, 
-                    findings_list
-                )
-                
-                if isinstance(description_result, dict) and "description" in description_result:
-                    description_text = description_result["description"]
-                    logger.info(f"{run_stage_log} - Description generated successfully ({len(description_text)} chars)")
+                    # Вызываем генератор описания с правильными параметрами
+                    description_result = await description_generator.generate_description(
+                        company_name, 
+                        findings_list
+                    )
                     
-                    # Обновляем structured_data, если он есть в результате
-                    for key, value in description_result.items():
-                        if key != "description" and value:
-                            structured_data[key] = value
-                elif isinstance(description_result, str):
-                    # Если вернулась строка, это, скорее всего, сообщение об ошибке
-                    logger.warning(f"{run_stage_log} - Description generator returned error: {description_result}")
-                    description_text = f"Error generating description for {company_name}: {description_result}"
-                else:
-                    logger.warning(f"{run_stage_log} - Description generator did not return valid data")
-                    description_text = f"Error generating description for {company_name}"
-            except Exception as e:
-                logger.error(f"{run_stage_log} - Error generating description: {e}", exc_info=True)
-                description_text = f"Error generating description for {company_name}: {str(e)}"
+                    if isinstance(description_result, dict) and "description" in description_result:
+                        description_text = description_result["description"]
+                        logger.info(f"{run_stage_log} - Description generated successfully ({len(description_text)} chars)")
+                        
+                        # Обновляем structured_data, если он есть в результате
+                        for key, value in description_result.items():
+                            if key != "description" and value:
+                                structured_data[key] = value
+                    elif isinstance(description_result, str):
+                        # Если вернулась строка, это, скорее всего, сообщение об ошибке
+                        logger.warning(f"{run_stage_log} - Description generator returned error: {description_result}")
+                        description_text = f"Error generating description for {company_name}: {description_result}"
+                    else:
+                        logger.warning(f"{run_stage_log} - Description generator did not return valid data")
+                        description_text = f"Error generating description for {company_name}"
+                except Exception as e:
+                    logger.error(f"{run_stage_log} - Error generating description: {e}", exc_info=True)
+                    description_text = f"Error generating description for {company_name}: {str(e)}"
+            
+            return {
+                "description_text": description_text,
+                "structured_data": structured_data,
+                "homepage_url": homepage_url,
+                "linkedin_url": linkedin_url
+            }
         
-        # 6. Сохранение результатов в Raw Markdown формате
-        if raw_markdown_output_path and structured_data:
+        async def markdown_report_stage(description):
+            """6. Сохранение результатов в Raw Markdown формате"""
+            structured_data = description["structured_data"]
+            if not (raw_markdown_output_path and structured_data):
+                return None
             try:
                 # Преобразуем структурированные данные в формат для markdown
-                findings_for_markdown = []
-                # Добавляем основной результат LLM Deep Search
-                if structured_data:
-                    findings_for_markdown.append({
-                        "source": "llm_deep_search",
-                        "result": structured_data
-                    })
+                findings_for_markdown = [{
+                    "source": "llm_deep_search",
+                    "result": structured_data
+                }]
                 
                 # Генерация и сохранение Raw Markdown отчета с правильными параметрами
                 report_path = await generate_and_save_raw_markdown_report_async(
@@ -393,61 +449,79 @@ async def _process_single_company_async(
                     markdown_output_path=raw_markdown_output_path
                 )
                 logger.info(f"{run_stage_log} - Raw markdown report saved to {report_path}")
+                return report_path
             except Exception as e:
                 logger.error(f"{run_stage_log} - Error saving raw markdown report: {e}", exc_info=True)
+                return None
         
-        # 7. Подготовка итогового результата
-        
-        # Финальная проверка: если URL все еще не найден, используем гарантированный метод
-        if not found_homepage_url:
-            logger.warning(f"{run_stage_log} - URL not found by any standard methods. Using guaranteed URL finder as last resort")
-            try:
-                guaranteed_url = await _guaranteed_url_finder(
-                    company_name=company_name,
-                    openai_client=openai_client,
-                    structured_data=structured_data,
-                    aiohttp_session=aiohttp_session,
-                    sb_client=sb_client
-                )
-                if guaranteed_url:
-                    found_homepage_url = guaranteed_url
-                    logger.info(f"{run_stage_log} - Guaranteed URL finder found URL: {found_homepage_url}")
+        async def result_stage(description):
+            """7. Подготовка итогового результата"""
+            homepage_url = description["homepage_url"]
+            description_text = description["description_text"]
+            # Копия: markdown отчет параллельно сериализует исходные structured_data
+            structured_data = dict(description["structured_data"])
+            
+            # Финальная проверка: если URL все еще не найден, используем гарантированный метод
+            if not homepage_url:
+                logger.warning(f"{run_stage_log} - URL not found by any standard methods. Using guaranteed URL finder as last resort")
+                try:
+                    guaranteed_url = await _guaranteed_url_finder(
+                        company_name=company_name,
+                        openai_client=openai_client,
+                        structured_data=structured_data,
+                        aiohttp_session=aiohttp_session,
+                        sb_client=sb_client
+                    )
+                    if guaranteed_url:
+                        homepage_url = guaranteed_url
+                        logger.info(f"{run_stage_log} - Guaranteed URL finder found URL: {homepage_url}")
+                        
+                        # Добавляем URL в структурированные данные
+                        structured_data["homepage"] = homepage_url
+                        structured_data["extracted_homepage_url"] = homepage_url
+                        structured_data["guaranteed_url_source"] = True
+                except Exception as e:
+                    logger.error(f"{run_stage_log} - Error in guaranteed URL finder: {e}", exc_info=True)
+                    
+                # Если даже гарантированный метод не нашел URL, создаем синтетический URL
+                if not homepage_url:
+                    # Создаем синтетический URL на основе имени компании
+                    homepage_url = _create_synthetic_url(company_name)
+                    logger.warning(f"{run_stage_log} - Using synthetic URL as last resort: {homepage_url}")
                     
                     # Добавляем URL в структурированные данные
-                    structured_data["homepage"] = found_homepage_url
-                    structured_data["extracted_homepage_url"] = found_homepage_url
-                    structured_data["guaranteed_url_source"] = True
-            except Exception as e:
-                logger.error(f"{run_stage_log} - Error in guaranteed URL finder: {e}", exc_info=True)
-                
-            # Если даже гарантированный метод не нашел URL, создаем синтетический URL
-            if not found_homepage_url:
-                # Создаем синтетический URL на основе имени компании
-                synthetic_url = _create_synthetic_url(company_name)
-                found_homepage_url = synthetic_url
-                logger.warning(f"{run_stage_log} - Using synthetic URL as last resort: {found_homepage_url}")
-                
-                # Добавляем URL в структурированные данные
-                structured_data["homepage"] = found_homepage_url
-                structured_data["extracted_homepage_url"] = found_homepage_url
-                structured_data["synthetic_url"] = True
-        
-        result_data["Official_Website"] = found_homepage_url or ""
-        result_data["LinkedIn_URL"] = linkedin_url or ""
-        result_data["Description"] = description_text or f"Error generating description for {company_name}"
-        result_data["structured_data"] = structured_data
+                    structured_data["homepage"] = homepage_url
+                    structured_data["extracted_homepage_url"] = homepage_url
+                    structured_data["synthetic_url"] = True
+            
+            result_data["Official_Website"] = homepage_url or ""
+            result_data["LinkedIn_URL"] = description["linkedin_url"] or ""
+            result_data["Description"] = description_text or f"Error generating description for {company_name}"
+            result_data["structured_data"] = structured_data
+            
+            return {
+                "homepage_url": homepage_url,
+                "linkedin_url": description["linkedin_url"],
+                "description_text": description_text,
+                "structured_data": structured_data
+            }
         
-        # 8. Валидация результатов
-        if description_text and not description_text.startswith("Error"):
+        async def validation_stage(result):
+            """8. Валидация результатов"""
+            description_text = result["description_text"]
+            if not (description_text and not description_text.startswith("Error")):
+                logger.info(f"{run_stage_log} - Skipping validation due to empty or error description")
+                return None
+            
             try:
                 logger.info(f"{run_stage_log} - Validating company result")
                 
                 # Подготавливаем данные для валидации
                 company_data_for_validation = {
-                    "company_name": structured_data.get("company_name", "") or company_name,
+                    "company_name": result["structured_data"].get("company_name", "") or company_name,
                     "description": description_text,
-                    "official_website": found_homepage_url or "",
-                    "linkedin_url": linkedin_url or ""
+                    "official_website": result["homepage_url"] or "",
+                    "linkedin_url": result["linkedin_url"] or ""
                 }
                 
                 # Выполняем валидацию
@@ -463,8 +537,6 @@ async def _process_single_company_async(
                 # Если валидация не прошла, отмечаем результат как неудачный
                 if not validated_result.get("validation", {}).get("is_valid", True):
                     validation_reason = validated_result.get("validation", {}).get("validation_reason", "Unknown validation error")
-                    logger.warning(f"{run_stage_log} - Validation failed: {validation_reason}")
-                    
                     # Validation failed but we don't add it to output
                     logger.warning(f"{run_stage_log} - Validation failed: {validation_reason}")
                 else:
@@ -476,8 +548,140 @@ async def _process_single_company_async(
                     "validation_performed": False,
                     "validation_error": str(e)
                 }
-        else:
-            logger.info(f"{run_stage_log} - Skipping validation due to empty or error description")
+            return result_data.get("validation")
+        
+        async def hubspot_upload_stage(hubspot_check, result):
+            """9. Сохранение в HubSpot, если клиент доступен и запись разрешена"""
+            homepage_url = result["homepage_url"]
+            description_text = result["description_text"]
+            linkedin_url = result["linkedin_url"]
+            # predator_id из входных данных приоритетнее найденного в HubSpot
+            upload_predator_id = predator_id or (hubspot_check or {}).get("predator_id")
+            
+            if hubspot_client and homepage_url and description_text and write_to_hubspot:
+                try:
+                    # Проверяем качество описания перед записью в HubSpот
+                    from src.integrations.hubspot.quality_checker import should_write_to_hubspot_async
+                
+                    # Получаем настройки проверки качества из конфигурации
+                    quality_config = llm_config.get("hubspot_quality_check", {})
+                    quality_enabled = quality_config.get("enabled", True)
+                    use_llm_validation = quality_config.get("use_llm_validation", False)
+                
+                    if quality_enabled:
+                        min_length = quality_config.get("min_description_length", 500)
+                        quality_ok, quality_reason, quality_details = await should_write_to_hubspot_async(
+                            description=description_text,
+                            company_name=company_name,
+                            openai_client=openai_client,
+                            use_llm_validation=use_llm_validation,
+                            min_description_length=min_length
+                        )
+                    else:
+                        # Если проверка качества отключена, считаем все описания хорошими
+                        quality_ok = True
+                        quality_reason = "Quality check disabled"
+                        quality_details = {"quality_check_enabled": False}
+                
+                    logger.info(f"{run_stage_log} - Quality check result: {quality_ok}, reason: {quality_reason}")
+                
+                    if quality_ok:
+                        logger.info(f"{run_stage_log} - Attempting to upload data to HubSpot")
+                        # Используем правильный метод save_company_description который возвращает (success, company_id)
+                        hubspot_success, hubspot_company_id = await hubspot_client.save_company_description(
+                            company_data=None,  # Пусть метод сам найдет компанию по URL
+                            company_name=company_name,
+                            url=homepage_url,
+                            description=description_text,
+                            linkedin_url=linkedin_url,
+                            predator_id=upload_predator_id,  # Добавляем predator ID
+                            aiohttp_session=aiohttp_session,  # Добавляем HTTP сессию
+                            sb_client=sb_client  # Добавляем ScrapingBee клиент
+                        )
+                    
+                        if hubspot_success:
+                            logger.info(f"{run_stage_log} - Data uploaded to HubSpot successfully")
+                            # Добавляем информацию о загрузке в HubSpot в результаты
+                            result_data.setdefault("integrations", {})["hubspot"] = {
+                                "success": True, 
+                                "company_id": hubspot_company_id,
+                                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                                "quality_check": quality_details
+                            }
+                            # Добавляем HubSpot Company ID в основные результаты
+                            from src.integrations.hubspot.adapter import format_hubspot_company_id
+                            result_data["HubSpot_Company_ID"] = format_hubspot_company_id(hubspot_company_id)
+                            result_data["Quality_Status"] = "PASSED - Uploaded to HubSpot"
+                        else:
+                            logger.warning(f"{run_stage_log} - Failed to upload data to HubSpot")
+                            result_data.setdefault("integrations", {})["hubspot"] = {
+                                "success": False,
+                                "error": "Failed to upload data to HubSpot",
+                                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                                "quality_check": quality_details
+                            }
+                            result_data["HubSpot_Company_ID"] = ""
+                            result_data["Quality_Status"] = f"PASSED - Upload failed: {result_data.get('error', 'Unknown error')}"
+                    else:
+                        logger.warning(f"{run_stage_log} - Description quality check failed, skipping HubSpot upload: {quality_reason}")
+                        result_data.setdefault("integrations", {})["hubspot"] = {
+                            "success": False,
+                            "error": f"Quality check failed: {quality_reason}",
+                            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                            "quality_check": quality_details
+                        }
+                        result_data["HubSpot_Company_ID"] = ""
+                        result_data["Quality_Status"] = f"FAILED - {quality_reason}"
+                except Exception as e:
+                    logger.error(f"{run_stage_log} - Error uploading to HubSpot: {e}", exc_info=True)
+                    result_data.setdefault("integrations", {})["hubspot"] = {
+                        "success": False,
+                        "error": str(e),
+                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+                    }
+                    result_data["HubSpot_Company_ID"] = ""
+                    result_data["Quality_Status"] = f"ERROR - {str(e)[:50]}..."
+            else:
+                # Если HubSpot клиент недоступен или запись отключена, добавляем пустое поле
+                if hubspot_client and not write_to_hubspot:
+                    logger.info(f"{run_stage_log} - HubSpot write is disabled, skipping upload")
+                    result_data["Quality_Status"] = "NOT_CHECKED - HubSpot write disabled"
+                elif not hubspot_client:
+                    result_data["Quality_Status"] = "NOT_CHECKED - HubSpot not configured"
+                elif not homepage_url:
+                    result_data["Quality_Status"] = "NOT_CHECKED - No homepage URL found"
+                elif not description_text:
+                    result_data["Quality_Status"] = "NOT_CHECKED - No description generated"
+                else:
+                    result_data["Quality_Status"] = "NOT_CHECKED - Unknown reason"
+                result_data["HubSpot_Company_ID"] = ""
+            return result_data.get("integrations", {}).get("hubspot")
+        
+        graph = StageGraph(company_name)
+        graph.add("domain_check", domain_check_stage)
+        graph.add("linkedin", linkedin_stage)
+        graph.add("hubspot_check", hubspot_check_stage, deps=["domain_check"])
+        graph.add("deep_search", deep_search_stage, deps=["domain_check", "hubspot_check"])
+        graph.add("description", description_stage, deps=["linkedin", "deep_search"])
+        graph.add("markdown_report", markdown_report_stage, deps=["description"])
+        graph.add("result", result_stage, deps=["description"])
+        graph.add("validation", validation_stage, deps=["result"])
+        graph.add("hubspot_upload", hubspot_upload_stage, deps=["hubspot_check", "result"])
+        
+        def save_stage_checkpoint(stage, output):
+            if on_stage_done and _is_final_stage_output(stage, output, run_llm_deep_search_pipeline):
+                on_stage_done(stage, output)
+        
+        restored_stages = _restorable_stages(checkpoint_stages)
+        if restored_stages:
+            logger.info(f"{run_stage_log} - Restoring stages from checkpoint: {list(restored_stages)}")
+        
+        try:
+            await graph.run(restored=restored_stages, on_stage_done=save_stage_checkpoint)
+        finally:
+            result_data["stage_timings"] = dict(graph.timings)
+        logger.info(f"{run_stage_log} - Stage timings: total {graph.timings['total']}s "
+                    f"(sequential {graph.sequential_seconds()}s): {graph.timings}")
         
         # Если задан output_csv_path, сохраняем результат текущей компании в CSV
         # ---- НАЧАЛО БЛОКА ДЛЯ КОММЕНТИРОВАНИЯ ----
@@ -574,105 +778,6 @@ async def _process_single_company_async(
         #     except Exception as e:
         #         logger.error(f"{run_stage_log} - Error saving structured data: {e}", exc_info=True)
         
-        # 8. Сохранение в HubSpot, если клиент доступен и запись разрешена
-        if hubspot_client and found_homepage_url and description_text and write_to_hubspot:
-            try:
-                # Проверяем качество описания перед записью в HubSpот
-                from src.integrations.hubspot.quality_checker import should_write_to_hubspot_async
-                
-                # Получаем настройки проверки качества из конфигурации
-                quality_config = llm_config.get("hubspot_quality_check", {})
-                quality_enabled = quality_config.get("enabled", True)
-                use_llm_validation = quality_config.get("use_llm_validation", False)
-                
-                if quality_enabled:
-                    min_length = quality_config.get("min_description_length", 500)
-                    quality_ok, quality_reason, quality_details = await should_write_to_hubspot_async(
-                        description=description_text,
-                        company_name=company_name,
-                        openai_client=openai_client,
-                        use_llm_validation=use_llm_validation,
-                        min_description_length=min_length
-                    )
-                else:
-                    # Если проверка качества отключена, считаем все описания хорошими
-                    quality_ok = True
-                    quality_reason = "Quality check disabled"
-                    quality_details = {"quality_check_enabled": False}
-                
-                logger.info(f"{run_stage_log} - Quality check result: {quality_ok}, reason: {quality_reason}")
-                
-                if quality_ok:
-                    logger.info(f"{run_stage_log} - Attempting to upload data to HubSpot")
-                    # Используем правильный метод save_company_description который возвращает (success, company_id)
-                    hubspot_success, hubspot_company_id = await hubspot_client.save_company_description(
-                        company_data=None,  # Пусть метод сам найдет компанию по URL
-                        company_name=company_name,
-                        url=found_homepage_url,
-                        description=description_text,
-                        linkedin_url=linkedin_url,
-                        predator_id=predator_id,  # Добавляем predator ID
-                        aiohttp_session=aiohttp_session,  # Добавляем HTTP сессию
-                        sb_client=sb_client  # Добавляем ScrapingBee клиент
-                    )
-                    
-                    if hubspot_success:
-                        logger.info(f"{run_stage_log} - Data uploaded to HubSpot successfully")
-                        # Добавляем информацию о загрузке в HubSpot в результаты
-                        result_data.setdefault("integrations", {})["hubspot"] = {
-                            "success": True, 
-                            "company_id": hubspot_company_id,
-                            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                            "quality_check": quality_details
-                        }
-                        # Добавляем HubSpot Company ID в основные результаты
-                        from src.integrations.hubspot.adapter import format_hubspot_company_id
-                        result_data["HubSpot_Company_ID"] = format_hubspot_company_id(hubspot_company_id)
-                        result_data["Quality_Status"] = "PASSED - Uploaded to HubSpot"
-                    else:
-                        logger.warning(f"{run_stage_log} - Failed to upload data to HubSpot")
-                        result_data.setdefault("integrations", {})["hubspot"] = {
-                            "success": False,
-                            "error": "Failed to upload data to HubSpot",
-                            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                            "quality_check": quality_details
-                        }
-                        result_data["HubSpot_Company_ID"] = ""
-                        result_data["Quality_Status"] = f"PASSED - Upload failed: {result_data.get('error', 'Unknown error')}"
-                else:
-                    logger.warning(f"{run_stage_log} - Description quality check failed, skipping HubSpot upload: {quality_reason}")
-                    result_data.setdefault("integrations", {})["hubspot"] = {
-                        "success": False,
-                        "error": f"Quality check failed: {quality_reason}",
-                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                        "quality_check": quality_details
-                    }
-                    result_data["HubSpot_Company_ID"] = ""
-                    result_data["Quality_Status"] = f"FAILED - {quality_reason}"
-            except Exception as e:
-                logger.error(f"{run_stage_log} - Error uploading to HubSpot: {e}", exc_info=True)
-                result_data.setdefault("integrations", {})["hubspot"] = {
-                    "success": False,
-                    "error": str(e),
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                }
-                result_data["HubSpot_Company_ID"] = ""
-                result_data["Quality_Status"] = f"ERROR - {str(e)[:50]}..."
-        else:
-            # Если HubSpot клиент недоступен или запись отключена, добавляем пустое поле
-            if hubspot_client and not write_to_hubspot:
-                logger.info(f"{run_stage_log} - HubSpot write is disabled, skipping upload")
-                result_data["Quality_Status"] = "NOT_CHECKED - HubSpot write disabled"
-            elif not hubspot_client:
-                result_data["Quality_Status"] = "NOT_CHECKED - HubSpot not configured"
-            elif not found_homepage_url:
-                result_data["Quality_Status"] = "NOT_CHECKED - No homepage URL found"
-            elif not description_text:
-                result_data["Quality_Status"] = "NOT_CHECKED - No description generated"
-            else:
-                result_data["Quality_Status"] = "NOT_CHECKED - Unknown reason"
-            result_data["HubSpot_Company_ID"] = ""
-        
         # logger.info(f"{run_stage_log} - Processing completed successfully") # Закомментировано
         return result_data
     
@@ -710,7 +815,8 @@ async def process_companies(
     csv_append_mode: bool = False,
     json_append_mode: bool = False,
     already_saved_count: int = 0,  # Количество уже сохраненных результатов
-    write_to_hubspot: bool = True  # Флаг записи в HubSpot
+    write_to_hubspot: bool = True,  # Флаг записи в HubSpot
+    checkpoint_index: Optional[CheckpointIndex] = None  # Индекс контрольных точек сессии (возобновление)
 ) -> List[Dict[str, Any]]:
     """
     Process multiple companies in parallel batches
@@ -740,6 +846,8 @@ async def process_companies(
         json_append_mode: Whether to append to JSON file instead of overwriting
         already_saved_count: Number of already saved results
         write_to_hubspot: Whether to write results to HubSpot (default: True)
+        checkpoint_index: Session checkpoint index. Companies completed in a previous run
+                          are restored from it, unfinished ones resume from their last completed stage
         
     Returns:
         List[Dict[str, Any]]: List of results
@@ -775,7 +883,7 @@ async def process_companies(
         finder_instances["domain_check_finder"] = DomainCheckFinder()
         
     # LoginDetectionFinder для определения наличия форм логина
-    finder_instances["login_detection_finder"] = LoginDetectionFinder(sb_client)
+    finder_instances["login_detection_finder"] = LoginDetectionFinder()
     
     # LLMDeepSearchFinder для глубокого поиска информации
     if run_llm_deep_search_pipeline_cfg:
@@ -797,7 +905,12 @@ async def process_companies(
             finder_instances["llm_deep_search_finder"] = llm_deep_search_finder
     
     # Создаем экземпляр DescriptionGenerator для генерации описаний
-    description_generator = DescriptionGenerator(openai_client)
+    # (секция description_batching в llm_config включает упаковку извлечения нескольких компаний в один запрос)
+    description_generator = DescriptionGenerator(
+        getattr(openai_client, "api_key", None),
+        openai_client=openai_client,
+        batch_config=(llm_config or {}).get("description_batching")
+    )
     
     # Процессинг компаний динамической очередью с семафором
     results = []
@@ -812,6 +925,14 @@ async def process_companies(
     
     async def process_company_with_semaphore(company_input_item, company_index):
         """Обрабатывает одну компанию с использованием семафора"""
+        input_hash = company_input_hash(company_input_item) if checkpoint_index else None
+        checkpoint = checkpoint_index.get(input_hash) if checkpoint_index else None
+        if checkpoint and checkpoint["status"] == "completed" and checkpoint["result"]:
+            # Компания завершена в предыдущем запуске - результат берется из индекса без обработки
+            logger.info(f"[{company_index+1}/{total_companies}] Restored from checkpoint: {checkpoint['company_name']}")
+            await result_queue.put((company_index, checkpoint["result"], None))
+            return
+        
         async with semaphore:  # Семафор ограничивает количество одновременных задач
             # Получаем имя компании и второй столбец, если они предоставлены как кортеж или словарь
             local_second_column_data = second_column_data.copy() if second_column_data else {}
@@ -836,6 +957,8 @@ async def process_companies(
             
             try:
                 logger.info(f"[{company_index+1}/{total_companies}] Starting processing company: {company_name}")
+                if checkpoint_index:
+                    checkpoint_index.start(input_hash, company_index, company_name)
                 
                 # Обрабатываем компанию
                 result = await _process_single_company_async(
@@ -863,9 +986,17 @@ async def process_companies(
                     hubspot_client=hubspot_client,
                     use_raw_llm_data_as_description=use_raw_llm_data_as_description,
                     write_to_hubspot=write_to_hubspot,
-                    predator_id=company_predator  # Передаем predator ID
+                    predator_id=company_predator,  # Передаем predator ID
+                    checkpoint_stages=checkpoint["stages"] if checkpoint else None,
+                    on_stage_done=(lambda stage, output: checkpoint_index.save_stage(input_hash, stage, output)) if checkpoint_index else None
                 )
                 
+                if checkpoint_index:
+                    if _is_final_company_result(result):
+                        checkpoint_index.complete(input_hash, result)
+                    else:
+                        checkpoint_index.fail(input_hash, result.get("error") or result.get("Description") or "No description", result)
+                
                 logger.info(f"[{company_index+1}/{total_companies}] Successfully processed company: {company_name}")
                 
                 # Помещаем результат в очередь для сохранения
@@ -873,6 +1004,8 @@ async def process_companies(
                 
             except Exception as e:
                 logger.error(f"[{company_index+1}/{total_companies}] Error processing company {company_name}: {e}", exc_info=True)
+                if checkpoint_index:
+                    checkpoint_index.fail(input_hash, str(e))
                 error_result = {
                     "Company_Name": company_name,
                     "Official_Website": None,
@@ -891,53 +1024,67 @@ async def process_companies(
         saved_count = already_saved_count  # Начинаем с уже сохраненных результатов
         logger.info(f"Result saver started, waiting for {total_companies} companies, already saved: {already_saved_count}")
         
-        while saved_count < total_companies + already_saved_count:
+        # JSON результаты дописываются в JSONL журнал (O(1) на компанию), массив собирается в конце
+        json_sink = None
+        if output_json_path:
             try:
-                company_index, result, error = await result_queue.get()
-                logger.info(f"Received result for company index {company_index}, saved_count: {saved_count}")
+                json_sink = JsonlResultSink(output_json_path, append=json_append_mode or already_saved_count > 0)
+            except Exception as sink_error:
+                logger.error(f"Error opening JSON results journal for {output_json_path}: {sink_error}", exc_info=True)
+        
+        try:
+            while saved_count < total_companies + already_saved_count:
+                try:
+                    company_index, result, error = await result_queue.get()
+                    logger.info(f"Received result for company index {company_index}, saved_count: {saved_count}")
                 
-                # Проверяем, что URL официального сайта нормализован
-                if not error and result.get("Official_Website"):
-                    normalized_url = normalize_domain(result["Official_Website"])
-                    if normalized_url != result["Official_Website"]:
-                        logger.info(f"Normalized URL in result: '{result['Official_Website']}' -> '{normalized_url}'")
-                        result["Official_Website"] = normalized_url
+                    # Проверяем, что URL официального сайта нормализован
+                    if not error and result.get("Official_Website"):
+                        normalized_url = normalize_domain(result["Official_Website"])
+                        if normalized_url != result["Official_Website"]:
+                            logger.info(f"Normalized URL in result: '{result['Official_Website']}' -> '{normalized_url}'")
+                            result["Official_Website"] = normalized_url
                 
-                results.append(result)
+                    results.append(result)
                 
-                # Определяем режим сохранения: если уже есть сохраненные результаты, всегда используем append
-                current_csv_append_mode = csv_append_mode or (saved_count > 0)
-                current_json_append_mode = json_append_mode or (saved_count > 0)
+                    # Определяем режим сохранения: если уже есть сохраненные результаты, всегда используем append
+                    current_csv_append_mode = csv_append_mode or (saved_count > 0)
                 
-                # Сохраняем результат сразу же
-                try:
-                    if output_csv_path:
-                        save_results_csv(
-                            results=[result], 
-                            output_path=output_csv_path, 
-                            expected_fields=expected_csv_fieldnames,
-                            append_mode=current_csv_append_mode
-                        )
-                        logger.info(f"Saved result to CSV for company: {result.get('Company_Name', 'Unknown')}")
+                    # Сохраняем результат сразу же
+                    try:
+                        if output_csv_path:
+                            save_results_csv(
+                                results=[result], 
+                                output_path=output_csv_path, 
+                                expected_fields=expected_csv_fieldnames,
+                                append_mode=current_csv_append_mode
+                            )
+                            logger.info(f"Saved result to CSV for company: {result.get('Company_Name', 'Unknown')}")
                     
-                    if output_json_path:
-                        save_results_json(
-                            results=[result], 
-                            output_path=output_json_path,
-                            append_mode=current_json_append_mode
-                        )
-                        logger.info(f"Saved result to JSON for company: {result.get('Company_Name', 'Unknown')}")
+                        if json_sink:
+                            json_sink.write(result)
+                            logger.info(f"Saved result to JSON for company: {result.get('Company_Name', 'Unknown')}")
                         
-                except Exception as save_error:
-                    logger.error(f"Error saving result for company {result.get('Company_Name', 'Unknown')}: {save_error}", exc_info=True)
+                    except Exception as save_error:
+                        logger.error(f"Error saving result for company {result.get('Company_Name', 'Unknown')}: {save_error}", exc_info=True)
                 
-                saved_count += 1
-                company_counter["value"] = saved_count - already_saved_count  # Показываем прогресс только для текущей обработки
-                logger.info(f"Progress: {saved_count - already_saved_count}/{total_companies} companies processed, total saved: {saved_count}")
+                    saved_count += 1
+                    company_counter["value"] = saved_count - already_saved_count  # Показываем прогресс только для текущей обработки
+                    logger.info(f"Progress: {saved_count - already_saved_count}/{total_companies} companies processed, total saved: {saved_count}")
+                    # Подписчики прогресса сессии (SSE/WebSocket) получают событие вместо опроса результатов
+                    publish_session_progress(
+                        progress_processed=saved_count,
+                        progress_total=total_companies + already_saved_count,
+                        last_company=result.get("Company_Name")
+                    )
                 
-            except Exception as queue_error:
-                logger.error(f"Error in result_saver while processing queue: {queue_error}", exc_info=True)
-                break
+                except Exception as queue_error:
+                    logger.error(f"Error in result_saver while processing queue: {queue_error}", exc_info=True)
+                    break
+        finally:
+            if json_sink:
+                json_sink.close()
+                materialize_json_results(output_json_path)
                 
         logger.info(f"Result saver finished, saved {saved_count - already_saved_count} new companies, total: {saved_count}")
     
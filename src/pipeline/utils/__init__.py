@@ -6,8 +6,13 @@ This package contains utility functions for the pipeline.
 
 from src.pipeline.utils.logging import setup_session_logging
 from src.pipeline.utils.markdown import generate_and_save_raw_markdown_report_async
+from src.pipeline.utils.stage_graph import StageGraph
+from src.pipeline.utils.checkpoints import CheckpointIndex, company_input_hash
 
 __all__ = [
     'setup_session_logging',
-    'generate_and_save_raw_markdown_report_async'
+    'generate_and_save_raw_markdown_report_async',
+    'StageGraph',
+    'CheckpointIndex',
+    'company_input_hash'
 ] 
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Checkpoint Index Module
+
+Индекс контрольных точек сессии основного пайплайна (SQLite в папке сессии).
+
+Для каждой компании хранится:
+- хэш входной строки (имя, URL, predator) - ключ записи; измененная строка
+  считается новой компанией и обрабатывается заново
+- статус: running, completed или failed
+- результаты завершенных этапов StageGraph (homepage, LinkedIn, deep search,
+  описание, markdown отчет) - при возобновлении они не выполняются повторно
+- итоговый результат компании - завершенные компании при возобновлении
+  не обрабатываются, их результат сохраняется в выходные файлы как есть
+
+Каждое изменение фиксируется сразу (WAL), поэтому индекс переживает
+отмену сессии, падение процесса и перезапуск контейнера.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DB_NAME = "checkpoints.sqlite"
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+def company_input_hash(company_input_item: Any) -> str:
+    """sha256 входной строки компании (строка, кортеж (name, url) или словарь name/url/predator)"""
+    if isinstance(company_input_item, dict):
+        key_data = {field: company_input_item.get(field) for field in ("name", "url", "predator")}
+    elif isinstance(company_input_item, (tuple, list)):
+        key_data = {"name": company_input_item[0], "url": company_input_item[1] if len(company_input_item) > 1 else None, "predator": None}
+    else:
+        key_data = {"name": company_input_item, "url": None, "predator": None}
+    payload = json.dumps(key_data, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class CheckpointIndex:
+    """Thread-safe SQLite индекс статусов и результатов этапов компаний одной сессии"""
+
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS companies (
+                input_hash TEXT PRIMARY KEY,
+                company_index INTEGER,
+                company_name TEXT,
+                status TEXT NOT NULL,
+                stages TEXT NOT NULL DEFAULT '{}',
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_companies_status ON companies(status);
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def for_session(cls, session_dir: Union[str, Path]) -> "CheckpointIndex":
+        return cls(Path(session_dir) / CHECKPOINT_DB_NAME)
+
+    def get(self, input_hash: str) -> Optional[Dict[str, Any]]:
+        """Запись компании: {"status", "stages", "result", "error", "attempts", ...} или None"""
+        try:
+            with self._lock:
+                row = self._conn.execute("""
+                    SELECT company_index, company_name, status, stages, result, error, attempts, updated_at
+                    FROM companies WHERE input_hash = ?
+                """, (input_hash,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Checkpoint index read failed for {input_hash[:12]}: {e}")
+            return None
+
+        if row is None:
+            return None
+        company_index, company_name, status, stages, result, error, attempts, updated_at = row
+        try:
+            stages = json.loads(stages) if stages else {}
+            result = json.loads(result) if result else None
+        except ValueError as e:
+            logger.error(f"Checkpoint entry for {company_name} is unreadable: {e}")
+            return None
+        return {
+            "company_index": company_index,
+            "company_name": company_name,
+            "status": status,
+            "stages": stages,
+            "result": result,
+            "error": error,
+            "attempts": attempts,
+            "updated_at": updated_at,
+        }
+
+    def start(self, input_hash: str, company_index: int, company_name: str):
+        """Отметить начало обработки; сохраненные этапы предыдущих попыток не удаляются"""
+        self._execute("""
+            INSERT INTO companies (input_hash, company_index, company_name, status, attempts, updated_at)
+            VALUES (?, ?, ?, ?, 1, ?)
+            ON CONFLICT(input_hash) DO UPDATE SET
+                company_index = excluded.company_index,
+                company_name = excluded.company_name,
+                status = excluded.status,
+                attempts = companies.attempts + 1,
+                updated_at = excluded.updated_at
+        """, (input_hash, company_index, company_name, STATUS_RUNNING, time.time()))
+
+    def save_stage(self, input_hash: str, stage: str, output: Any):
+        """Сохранить результат завершенного этапа"""
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT stages FROM companies WHERE input_hash = ?", (input_hash,)).fetchone()
+                stages = json.loads(row[0]) if row and row[0] else {}
+                stages[stage] = output
+                self._conn.execute(
+                    "UPDATE companies SET stages = ?, updated_at = ? WHERE input_hash = ?",
+                    (_dumps(stages), time.time(), input_hash)
+                )
+                self._conn.commit()
+        except (sqlite3.Error, ValueError, TypeError) as e:
+            logger.error(f"Checkpoint index failed to save stage '{stage}' for {input_hash[:12]}: {e}")
+
+    def complete(self, input_hash: str, result: Dict[str, Any]):
+        self._finish(input_hash, STATUS_COMPLETED, result, None)
+
+    def fail(self, input_hash: str, error: str, result: Optional[Dict[str, Any]] = None):
+        """Компания завершилась с ошибкой - при возобновлении она обрабатывается снова с последнего этапа"""
+        self._finish(input_hash, STATUS_FAILED, result, error)
+
+    def _finish(self, input_hash: str, status: str, result: Optional[Dict[str, Any]], error: Optional[str]):
+        self._execute(
+            "UPDATE companies SET status = ?, result = ?, error = ?, updated_at = ? WHERE input_hash = ?",
+            (status, _dumps(result) if result is not None else None, error, time.time(), input_hash)
+        )
+
+    def reset(self):
+        """Удалить все записи (новый запуск сессии с нуля)"""
+        self._execute("DELETE FROM companies")
+
+    def summary(self) -> Dict[str, int]:
+        """Количество компаний по статусам"""
+        counts = {STATUS_COMPLETED: 0, STATUS_FAILED: 0, STATUS_RUNNING: 0}
+        try:
+            with self._lock:
+                rows = self._conn.execute("SELECT status, COUNT(*) FROM companies GROUP BY status").fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Checkpoint index summary failed: {e}")
+            return counts
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params: tuple = ()):
+        try:
+            with self._lock:
+                self._conn.execute(sql, params)
+                self._conn.commit()
+        except (sqlite3.Error, TypeError) as e:
+            logger.error(f"Checkpoint index write failed: {e}")
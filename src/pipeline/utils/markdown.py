@@ -11,11 +11,16 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional
 from openai import AsyncOpenAI
 
+from src.language_detection import needs_translation, record_translation_decision
+
 logger = logging.getLogger(__name__)
 
 async def translate_to_english_if_needed(text: str, openai_client: AsyncOpenAI) -> str:
     """
-    Принудительно переводит весь текст на английский язык.
+    Переводит на английский язык части текста, которые не на английском.
+    
+    Язык определяется локально (src.language_detection): если весь текст уже
+    на английском, LLM не вызывается; иначе переводятся только чанки не на английском.
     
     Args:
         text: Исходный текст
@@ -24,8 +29,13 @@ async def translate_to_english_if_needed(text: str, openai_client: AsyncOpenAI)
     Returns:
         str: Переведенный текст
     """
+    if not needs_translation(text):
+        record_translation_decision(text, translated=False, call_site="raw_markdown")
+        logger.info(f"Текст уже на английском (длина: {len(text)}), перевод пропущен")
+        return text
+
     try:
-        logger.info(f"Выполняется принудительный перевод на английский (длина текста: {len(text)})")
+        logger.info(f"Выполняется перевод на английский (длина текста: {len(text)})")
         
         # Разбиваем текст на части, если он слишком большой
         chunk_size = 8000  # Максимальный размер чанка для перевода
@@ -56,8 +66,13 @@ async def translate_to_english_if_needed(text: str, openai_client: AsyncOpenAI)
         translated_chunks = []
         logger.info(f"Текст разбит на {len(chunks)} частей для перевода")
         
-        # Переводим каждую часть отдельно
+        # Переводим каждую часть отдельно; части уже на английском оставляем как есть
         for i, chunk in enumerate(chunks):
+            if len(chunks) > 1 and not needs_translation(chunk):
+                record_translation_decision(chunk, translated=False, call_site="raw_markdown_chunk")
+                translated_chunks.append(chunk)
+                continue
+            record_translation_decision(chunk, translated=True, call_site="raw_markdown_chunk")
             logger.info(f"Переводится часть {i+1} из {len(chunks)} (размер: {len(chunk)})")
             response = await openai_client.chat.completions.create(
                 model="gpt-4o-mini",
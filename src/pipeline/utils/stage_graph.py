@@ -0,0 +1,99 @@
+"""
+Stage Graph Module
+
+Небольшой граф зависимостей этапов обработки одной компании.
+Этап запускается, как только готовы все его зависимости; независимые этапы
+выполняются конкурентно. Время каждого этапа записывается в timings.
+Результаты этапов из контрольной точки (restored) не пересчитываются.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageGraph:
+    """
+    DAG асинхронных этапов
+
+    Пример:
+        graph = StageGraph()
+        graph.add("domain_check", check_domain)
+        graph.add("linkedin", find_linkedin)
+        graph.add("deep_search", deep_search, deps=["domain_check"])
+        results = await graph.run()
+
+    Функция этапа получает результаты зависимостей именованными аргументами
+    (имя зависимости -> ее результат) и должна сама обрабатывать свои ошибки:
+    исключение этапа отменяет остальные этапы и пробрасывается из run().
+
+    run(restored=...) подставляет сохраненные результаты этапов вместо их выполнения
+    (зависимости восстановленного этапа при этом не ждутся); on_stage_done(name, result)
+    вызывается после каждого выполненного (не восстановленного) этапа.
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._stages: Dict[str, tuple] = {}
+        self.timings: Dict[str, float] = {}
+        self.restored: List[str] = []
+
+    def add(self, name: str, func: Callable[..., Awaitable[Any]], deps: Iterable[str] = ()) -> "StageGraph":
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' is already defined")
+        deps = tuple(deps)
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = (func, deps)
+        return self
+
+    async def run(
+        self,
+        restored: Optional[Dict[str, Any]] = None,
+        on_stage_done: Optional[Callable[[str, Any], None]] = None
+    ) -> Dict[str, Any]:
+        """Выполнить все этапы; вернуть словарь имя этапа -> результат"""
+        tasks: Dict[str, asyncio.Task] = {}
+        restored = {name: value for name, value in (restored or {}).items() if name in self._stages}
+        self.restored = list(restored)
+
+        async def run_stage(name: str, func: Callable[..., Awaitable[Any]], deps: tuple):
+            if name in restored:
+                self.timings[name] = 0.0
+                return restored[name]
+            inputs = {dep: await tasks[dep] for dep in deps}
+            started = time.perf_counter()
+            try:
+                result = await func(**inputs)
+            finally:
+                self.timings[name] = round(time.perf_counter() - started, 3)
+            if on_stage_done:
+                on_stage_done(name, result)
+            return result
+
+        # Этапы добавляются только после своих зависимостей, поэтому порядок вставки - топологический
+        for name, (func, deps) in self._stages.items():
+            tasks[name] = asyncio.create_task(run_stage(name, func, deps))
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self.timings["total"] = round(time.perf_counter() - started, 3)
+
+        return {name: task.result() for name, task in tasks.items()}
+
+    def sequential_seconds(self) -> Optional[float]:
+        """Сумма времени этапов - сколько заняла бы последовательная обработка (для сравнения с total)"""
+        stage_times = [seconds for name, seconds in self.timings.items() if name != "total"]
+        return round(sum(stage_times), 3) if stage_times else None
@@ -0,0 +1,175 @@
+"""
+Progress Events Module
+
+Шина событий прогресса сессий: фронтенд получает изменения через SSE/WebSocket
+вместо опроса эндпоинтов статуса и прогресса.
+
+- тема - session_id; publish() сливает поля события в текущее состояние темы,
+  подписчики получают полное состояние (номер seq растет с каждым событием)
+- publish() можно вызывать из event loop и из других потоков (потоки пайплайна,
+  поток чтения прогресса воркеров движка критериев); без подписчиков состояние
+  только запоминается
+- при подписке сначала отдается текущее состояние темы (replay)
+- у подписчика ограниченная очередь: события - снимки состояния, поэтому при
+  медленном клиенте старые снимки вытесняются новыми и память не растет
+- пайплайн публикует прогресс текущей сессии через publish_session_progress()
+  (session_id берется из contextvars, как статистика перевода)
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Статусы, после которых поток событий сессии закрывается
+TERMINAL_STATUSES = {"completed", "error", "failed", "cancelled"}
+
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_MAX_TOPICS = 1000
+
+
+class Subscription:
+    """Очередь снимков состояния одного подписчика (только в потоке event loop)"""
+
+    def __init__(self, topic: Optional[str], max_queue: int):
+        self.topic = topic
+        self.dropped = 0
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_queue)
+        self._ready = asyncio.Event()
+
+    def push(self, state: Dict[str, Any]):
+        if len(self._events) == self._events.maxlen:
+            # Клиент не успевает - самый старый снимок заменяется новым
+            self.dropped += 1
+        self._events.append(state)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Следующий снимок или None, если за timeout секунд событий не было"""
+        if not self._events:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._events.popleft()
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        return await self.get()
+
+
+class ProgressEventBus:
+    """Состояние прогресса по темам и рассылка снимков подписчикам"""
+
+    def __init__(self, max_queue: int = DEFAULT_QUEUE_SIZE, max_topics: int = DEFAULT_MAX_TOPICS):
+        self.max_queue = max_queue
+        self.max_topics = max_topics
+        self._states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # topic (None - все темы) -> подписчики; изменяется только в потоке event loop
+        self._subscribers: Dict[Optional[str], Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def publish(self, topic: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Слить поля в состояние темы и разослать новый снимок; возвращает снимок"""
+        with self._lock:
+            state = self._states.pop(topic, None) or {"session_id": topic, "seq": 0}
+            state = {**state, **fields, "seq": state["seq"] + 1}
+            self._states[topic] = state
+            while len(self._states) > self.max_topics:
+                self._states.popitem(last=False)
+            loop = self._loop
+
+        if loop is None or loop.is_closed():
+            return state
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(topic, state)
+        else:
+            try:
+                loop.call_soon_threadsafe(self._dispatch, topic, state)
+            except RuntimeError:
+                # event loop уже остановлен (завершение процесса)
+                pass
+        return state
+
+    def get_state(self, topic: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._states.get(topic)
+            return dict(state) if state is not None else None
+
+    def discard(self, topic: str):
+        """Забыть состояние темы (например после удаления сессии)"""
+        with self._lock:
+            self._states.pop(topic, None)
+
+    @asynccontextmanager
+    async def subscribe(self, topic: Optional[str] = None, replay: bool = True) -> AsyncIterator[Subscription]:
+        """Подписка на тему (None - на все темы); с replay первым приходит текущее состояние"""
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+        subscription = Subscription(topic, self.max_queue)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        if replay and topic is not None:
+            state = self.get_state(topic)
+            if state is not None:
+                subscription.push(state)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+            if subscription.dropped:
+                logger.info(f"Progress subscriber of {topic or 'all sessions'} skipped {subscription.dropped} intermediate updates")
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        return len(self._subscribers.get(topic, ()))
+
+    def _dispatch(self, topic: str, state: Dict[str, Any]):
+        for key in (topic, None):
+            for subscription in list(self._subscribers.get(key, ())):
+                subscription.push(state)
+
+
+_bus: Optional[ProgressEventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_progress_bus() -> ProgressEventBus:
+    """Общая шина событий прогресса процесса"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = ProgressEventBus()
+    return _bus
+
+
+_current_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("progress_session_id", default=None)
+
+
+def start_session_events(session_id: str):
+    """Публиковать прогресс текущей задачи (и созданных после вызова задач) в тему session_id"""
+    _current_session.set(session_id)
+
+
+def publish_session_progress(**fields) -> Optional[Dict[str, Any]]:
+    """Опубликовать поля прогресса текущей сессии (ничего не делает вне сессии)"""
+    session_id = _current_session.get()
+    if session_id is None:
+        return None
+    return get_progress_bus().publish(session_id, fields)
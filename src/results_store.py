@@ -0,0 +1,311 @@
+"""
+Results Store Module
+
+Индекс результатов сессии (SQLite) рядом с CSV: эндпоинты результатов отдают страницу
+строк вместо чтения и очистки всего CSV на каждый запрос.
+
+- индекс - файл <csv>.index.sqlite: таблица results (строки CSV в исходном порядке)
+  и meta (mtime/размер исходного CSV, колонки); строится один раз на версию CSV
+- refresh() сравнивает (mtime, размер) CSV с индексом и перестраивает его только
+  после изменения файла; индекс записывается во временный файл и заменяется атомарно
+- query() - offset/limit, выбор колонок, фильтры (column:op:value) и сортировка
+  выполняются в SQLite, поэтому время ответа зависит от размера страницы
+- NaN/inf в индекс не попадают (NULL), значения возвращаются готовыми для JSON
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 2
+INDEX_SUFFIX = ".index.sqlite"
+MAX_OPEN_STORES = 32
+
+# op фильтра -> SQL условие (column подставляется как идентификатор в кавычках)
+FILTER_OPERATORS = {
+    "eq": "{column} = ?",
+    "ne": "({column} IS NULL OR {column} != ?)",
+    "gt": "{column} > ?",
+    "gte": "{column} >= ?",
+    "lt": "{column} < ?",
+    "lte": "{column} <= ?",
+    "contains": "instr(lower(CAST({column} AS TEXT)), lower(?)) > 0",
+    "not_contains": "({column} IS NULL OR instr(lower(CAST({column} AS TEXT)), lower(?)) = 0)",
+    "empty": "({column} IS NULL OR CAST({column} AS TEXT) = '')",
+    "not_empty": "({column} IS NOT NULL AND CAST({column} AS TEXT) != '')",
+}
+VALUELESS_OPERATORS = {"empty", "not_empty"}
+
+ResultFilter = Tuple[str, str, Optional[str]]
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def parse_filters(expressions: Optional[Iterable[str]]) -> List[ResultFilter]:
+    """Фильтры вида "column:op:value" (для empty/not_empty - "column:op"); ValueError при ошибке"""
+    filters = []
+    for expression in expressions or ():
+        parts = expression.split(":", 2)
+        if len(parts) < 2 or not parts[0]:
+            raise ValueError(f"Invalid filter '{expression}', expected column:op:value")
+        column, op = parts[0], parts[1]
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unknown filter operator '{op}', expected one of: {', '.join(FILTER_OPERATORS)}")
+        if op in VALUELESS_OPERATORS:
+            filters.append((column, op, None))
+        elif len(parts) == 3:
+            filters.append((column, op, parts[2]))
+        else:
+            raise ValueError(f"Filter '{expression}' needs a value")
+    return filters
+
+
+def parse_columns(columns: Optional[str]) -> Optional[List[str]]:
+    """"a,b,c" -> список колонок (None - все колонки)"""
+    if not columns:
+        return None
+    return [column.strip() for column in columns.split(",") if column.strip()] or None
+
+
+def parse_sort(sort: Optional[str]) -> List[Tuple[str, bool]]:
+    """"col1,-col2" -> [(col1, по возрастанию), (col2, по убыванию)]"""
+    order = []
+    for item in (sort or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        descending = item.startswith("-")
+        order.append((item.lstrip("+-"), descending))
+    return order
+
+
+def _is_bool_column(series: pd.Series) -> bool:
+    """bool колонка CSV: dtype bool или (с пустыми ячейками) object только из True/False/NaN"""
+    if pd.api.types.is_bool_dtype(series):
+        return True
+    if series.dtype != object:
+        return False
+    values = series.dropna()
+    return not values.empty and all(isinstance(value, (bool, np.bool_)) for value in values)
+
+
+def index_path_for(source_path: Union[str, Path]) -> str:
+    return f"{source_path}{INDEX_SUFFIX}"
+
+
+class ResultsStore:
+    """Thread-safe индекс результатов одного CSV файла"""
+
+    def __init__(self, source_path: Union[str, Path], index_path: Optional[Union[str, Path]] = None):
+        self.source_path = str(source_path)
+        self.index_path = str(index_path) if index_path else index_path_for(self.source_path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        self.columns: List[str] = []
+        self._bool_columns: set = set()
+        self.row_count = 0
+
+    def refresh(self) -> bool:
+        """Перестроить индекс, если CSV изменился; True, если индекс перестроен. FileNotFoundError - CSV нет"""
+        stat = os.stat(self.source_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._stamp == stamp:
+                return False
+            if self._open_index(stamp):
+                return False
+            self._build(stamp)
+            return True
+
+    def query(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        filters: Sequence[ResultFilter] = (),
+        sort: Sequence[Tuple[str, bool]] = (),
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """(число строк после фильтров, строки страницы); ValueError - неизвестная колонка"""
+        self.refresh()
+        with self._lock:
+            selected = list(columns) if columns else list(self.columns)
+            self._check_columns(selected + [column for column, _, _ in filters] + [column for column, _ in sort])
+            if not self.columns or not selected:
+                return (self.row_count if not filters else 0), []
+
+            where, params = self._where(filters)
+            if where:
+                total = self._conn.execute(f"SELECT COUNT(*) FROM results {where}", params).fetchone()[0]
+            else:
+                total = self.row_count
+
+            for column, _ in sort:
+                self._ensure_index(column)
+            order_by = ", ".join(f"{_quote(column)} {'DESC' if descending else 'ASC'}" for column, descending in sort)
+            order_by = f"{order_by}, rowid" if order_by else "rowid"
+            sql = (f"SELECT {', '.join(_quote(column) for column in selected)} FROM results {where} "
+                   f"ORDER BY {order_by} LIMIT ? OFFSET ?")
+            rows = self._conn.execute(sql, [*params, -1 if limit is None else limit, offset]).fetchall()
+
+        bool_columns = [i for i, column in enumerate(selected) if column in self._bool_columns]
+        records = []
+        for row in rows:
+            record = dict(zip(selected, row))
+            for i in bool_columns:
+                value = row[i]
+                record[selected[i]] = None if value is None else bool(value)
+            records.append(record)
+        return total, records
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    # --- служебное (вызывается под self._lock) ---
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._stamp = None
+
+    def _connect(self, path: str) -> sqlite3.Connection:
+        return sqlite3.connect(path, check_same_thread=False, timeout=30)
+
+    def _open_index(self, stamp: Tuple[int, int]) -> bool:
+        """Открыть индекс с диска, если он построен для этой версии CSV (например другим процессом)"""
+        if not os.path.exists(self.index_path):
+            return False
+        conn = None
+        try:
+            conn = self._connect(self.index_path)
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        except sqlite3.Error as e:
+            if conn is not None:
+                conn.close()
+            logger.warning(f"Results index {self.index_path} is unreadable, rebuilding: {e}")
+            return False
+        if (meta.get("format"), meta.get("source_stamp")) != (str(INDEX_FORMAT), json.dumps(list(stamp))):
+            conn.close()
+            return False
+        self._close()
+        self._conn = conn
+        self._stamp = stamp
+        self.columns = json.loads(meta["columns"])
+        self._bool_columns = set(json.loads(meta["bool_columns"]))
+        self.row_count = int(meta["row_count"])
+        return True
+
+    def _read_source(self) -> pd.DataFrame:
+        try:
+            df = pd.read_csv(self.source_path, sep=',', encoding='utf-8-sig')
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame()
+        # inf не сериализуется в JSON - как и NaN, хранится как NULL
+        return df.replace([np.inf, -np.inf], np.nan)
+
+    def _build(self, stamp: Tuple[int, int]):
+        df = self._read_source()
+        columns = [str(column) for column in df.columns]
+        df.columns = columns
+        bool_columns = [column for column in columns if _is_bool_column(df[column])]
+        for column in bool_columns:
+            # 1.0/0.0/NULL: колонка с числовым типом, фильтр eq:true сравнивает с 1
+            df[column] = df[column].astype(float)
+
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        conn = self._connect(tmp_path)
+        try:
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            if columns:
+                df.to_sql("results", conn, index=False)
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+                ("format", str(INDEX_FORMAT)),
+                ("source_stamp", json.dumps(list(stamp))),
+                ("columns", json.dumps(columns, ensure_ascii=False)),
+                ("bool_columns", json.dumps(bool_columns, ensure_ascii=False)),
+                ("row_count", str(len(df))),
+            ])
+            conn.commit()
+            conn.close()
+            os.replace(tmp_path, self.index_path)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            conn.close()
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise RuntimeError(f"Could not build results index {self.index_path}: {e}") from e
+
+        self._close()
+        self._conn = self._connect(self.index_path)
+        self._stamp = stamp
+        self.columns = columns
+        self._bool_columns = set(bool_columns)
+        self.row_count = len(df)
+        logger.info(f"Results index built: {self.index_path} ({self.row_count} rows, {len(columns)} columns)")
+
+    def _check_columns(self, columns: Iterable[str]):
+        unknown = [column for column in dict.fromkeys(columns) if column not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown result columns: {', '.join(unknown)}")
+
+    def _where(self, filters: Sequence[ResultFilter]) -> Tuple[str, List[Any]]:
+        conditions, params = [], []
+        for column, op, value in filters:
+            conditions.append(FILTER_OPERATORS[op].format(column=_quote(column)))
+            if op in VALUELESS_OPERATORS:
+                continue
+            if column in self._bool_columns and op not in ("contains", "not_contains"):
+                # bool хранится как 0/1
+                value = 1 if str(value).strip().lower() in ("1", "true", "yes") else 0
+            params.append(value)
+        return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def _ensure_index(self, column: str):
+        name = _quote(f"idx_{column}")
+        try:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON results ({_quote(column)})")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            # Индекс только ускоряет сортировку - без него запрос все равно выполнится
+            logger.debug(f"Could not index results column {column}: {e}")
+
+
+_stores: "OrderedDict[str, ResultsStore]" = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def get_results_store(source_path: Union[str, Path]) -> ResultsStore:
+    """Общий индекс процесса для CSV файла результатов (открыто не больше MAX_OPEN_STORES)"""
+    key = os.path.abspath(str(source_path))
+    with _stores_lock:
+        store = _stores.pop(key, None)
+        if store is None:
+            store = ResultsStore(key)
+        _stores[key] = store
+        while len(_stores) > MAX_OPEN_STORES:
+            _, evicted = _stores.popitem(last=False)
+            evicted.close()
+    return store
+
+
+def forget_results_store(source_path: Union[str, Path]):
+    """Закрыть индекс файла (например перед удалением папки сессии)"""
+    with _stores_lock:
+        store = _stores.pop(os.path.abspath(str(source_path)), None)
+    if store is not None:
+        store.close()
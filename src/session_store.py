@@ -0,0 +1,224 @@
+"""
+Session Metadata Store Module
+
+Хранилище метаданных сессий (SQLite) вместо одного файла sessions_metadata.json.
+
+- одна строка на сессию: session_id (первичный ключ), status (индекс), позиция в списке
+  сессий и словарь метаданных в JSON - запрос статуса одной сессии не читает остальные
+- update() изменяет одну сессию атомарно (BEGIN IMMEDIATE): параллельные обновления
+  разных полей из обработчиков API, фоновой задачи и ее callback не затирают друг друга
+- при первом открытии пустого хранилища сессии переносятся из sessions_metadata.json
+  (файл не удаляется и больше не изменяется)
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_DB_NAME = "sessions_metadata.sqlite"
+
+Fields = Union[Dict[str, Any], Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]]
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class SessionMetadataStore:
+    """Thread-safe SQLite хранилище метаданных сессий с индексами по session_id и status"""
+
+    def __init__(self, db_path: Union[str, Path], legacy_json_path: Optional[Union[str, Path]] = None):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        # isolation_level=None - транзакции открываются явно (BEGIN IMMEDIATE в update/replace_all)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                status TEXT,
+                position INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_status ON sessions(status);
+            CREATE INDEX IF NOT EXISTS idx_sessions_position ON sessions(position);
+        """)
+
+        if legacy_json_path is not None:
+            self._migrate_json(Path(legacy_json_path))
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Метаданные сессии или None"""
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Session store read failed for {session_id}: {e}")
+            return None
+        return self._loads(row[0], session_id) if row else None
+
+    def list_all(self) -> List[Dict[str, Any]]:
+        """Все сессии в порядке создания"""
+        return self._select("SELECT session_id, data FROM sessions ORDER BY position")
+
+    def list_by_status(self, *statuses: str) -> List[Dict[str, Any]]:
+        """Сессии с одним из статусов (по индексу status)"""
+        if not statuses:
+            return []
+        placeholders = ", ".join("?" for _ in statuses)
+        return self._select(f"SELECT session_id, data FROM sessions WHERE status IN ({placeholders}) ORDER BY position", statuses)
+
+    def upsert(self, session_data: Dict[str, Any]):
+        """Добавить сессию в конец списка или полностью заменить ее метаданные (позиция сохраняется)"""
+        session_id = session_data["session_id"]
+        try:
+            with self._lock:
+                self._conn.execute("""
+                    INSERT INTO sessions (session_id, status, position, data, updated_at)
+                    VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM sessions), ?, ?)
+                    ON CONFLICT(session_id) DO UPDATE SET
+                        status = excluded.status,
+                        data = excluded.data,
+                        updated_at = excluded.updated_at
+                """, (session_id, session_data.get("status"), _dumps(session_data), time.time()))
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Session store write failed for {session_id}: {e}")
+            raise
+
+    def update(self, session_id: str, fields: Fields) -> Optional[Dict[str, Any]]:
+        """
+        Атомарно обновить поля одной сессии; возвращает новые метаданные или None, если сессии нет.
+
+        fields - словарь новых значений или функция (текущие метаданные) -> словарь;
+        функция, вернувшая None, оставляет сессию без изменений (условное обновление).
+        """
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+                    if row is None:
+                        self._conn.execute("ROLLBACK")
+                        return None
+                    session_data = json.loads(row[0])
+                    changes = fields(session_data) if callable(fields) else fields
+                    if changes is None:
+                        self._conn.execute("ROLLBACK")
+                        return session_data
+                    session_data.update(changes)
+                    self._conn.execute(
+                        "UPDATE sessions SET status = ?, data = ?, updated_at = ? WHERE session_id = ?",
+                        (session_data.get("status"), _dumps(session_data), time.time(), session_id)
+                    )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Session store update failed for {session_id}: {e}")
+            raise
+        return session_data
+
+    def delete(self, session_id: str) -> bool:
+        try:
+            with self._lock:
+                cursor = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Session store delete failed for {session_id}: {e}")
+            raise
+        return cursor.rowcount > 0
+
+    def replace_all(self, sessions: Iterable[Dict[str, Any]]):
+        """Заменить весь список сессий (совместимость с save_session_metadata)"""
+        now = time.time()
+        rows = [
+            (s["session_id"], s.get("status"), position, _dumps(s), now)
+            for position, s in enumerate(sessions) if s.get("session_id")
+        ]
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute("DELETE FROM sessions")
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO sessions (session_id, status, position, data, updated_at) VALUES (?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Session store replace failed: {e}")
+            raise
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _select(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        try:
+            with self._lock:
+                rows = self._conn.execute(sql, tuple(params)).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Session store read failed: {e}")
+            return []
+        sessions = (self._loads(data, session_id) for session_id, data in rows)
+        return [s for s in sessions if s is not None]
+
+    @staticmethod
+    def _loads(data: str, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(data)
+        except ValueError as e:
+            logger.error(f"Session store entry {session_id} is unreadable: {e}")
+            return None
+
+    def _migrate_json(self, json_path: Path):
+        """Перенести сессии из sessions_metadata.json, если хранилище еще пустое"""
+        if self.count() or not json_path.exists():
+            return
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                sessions = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not migrate session metadata from {json_path}: {e}")
+            return
+        if not isinstance(sessions, list):
+            logger.error(f"Invalid format in {json_path}: expected a list, nothing migrated")
+            return
+        sessions = [s for s in sessions if isinstance(s, dict) and s.get("session_id")]
+        self.replace_all(sessions)
+        logger.info(f"Migrated {len(sessions)} sessions from {json_path} to {self.db_path}")
+
+
+_stores: Dict[str, SessionMetadataStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_session_store(db_path: Union[str, Path], legacy_json_path: Optional[Union[str, Path]] = None) -> SessionMetadataStore:
+    """Общее хранилище на процесс для файла db_path"""
+    key = str(db_path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = SessionMetadataStore(db_path, legacy_json_path=legacy_json_path)
+                _stores[key] = store
+    return store
@@ -0,0 +1,200 @@
+"""
+Local stand-in for the OpenAI endpoints used by the description generator.
+
+Serves chat completions, file upload/download and the Batch API with
+deterministic answers, so batched generation can be tested without network
+access or API spend:
+
+    async with StubOpenAIServer() as server:
+        client = AsyncOpenAI(api_key="test", base_url=server.base_url)
+        generator = DescriptionGenerator(None, openai_client=client, batch_config={"enabled": True})
+
+Chat completions with a json_schema response_format get a minimal document that
+satisfies the schema (company_key items are echoed from the prompt for packed
+requests); other completions get a three-paragraph text. Batches complete as
+soon as they are created. server.requests records every chat completion body.
+"""
+
+import itertools
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from description_generator.batch import COMPANY_KEY_MARKER
+
+_COMPANY_KEY_RE = re.compile(re.escape(COMPANY_KEY_MARKER) + r"\s*(\S+)")
+_COMPANY_NAME_RE = re.compile(r"(?:Company Name|Company): ([^\n]+)")
+
+
+def fake_document(schema: Dict[str, Any], company_name: str = "") -> Any:
+    """Smallest value that satisfies a (strict) JSON schema."""
+    schema_type = schema.get("type")
+    types = schema_type if isinstance(schema_type, list) else [schema_type]
+    if "object" in types:
+        return {name: fake_document(prop, company_name) for name, prop in schema.get("properties", {}).items()}
+    if "null" in types:
+        return None
+    if "array" in types:
+        return []
+    if "string" in types:
+        return company_name if company_name else "n/a"
+    if "integer" in types or "number" in types:
+        return 0
+    if "boolean" in types:
+        return False
+    if "anyOf" in schema:
+        return fake_document(schema["anyOf"][0], company_name)
+    return None
+
+
+class StubOpenAIServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.requests: List[Dict[str, Any]] = []
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_post("/v1/chat/completions", self._chat_completions)
+        self.app.router.add_post("/v1/files", self._upload_file)
+        self.app.router.add_get("/v1/files/{file_id}/content", self._file_content)
+        self.app.router.add_post("/v1/batches", self._create_batch)
+        self.app.router.add_get("/v1/batches/{batch_id}", self._get_batch)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def _next_id(self, prefix: str) -> str:
+        return f"{prefix}-{next(self._ids)}"
+
+    # --- chat completions ---
+
+    def complete(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Deterministic chat completion response for a request body."""
+        self.requests.append(body)
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []) if m.get("role") == "user")
+        response_format = body.get("response_format") or {}
+
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            keys = _COMPANY_KEY_RE.findall(prompt)
+            if keys and "companies" in schema.get("properties", {}):
+                item_schema = schema["properties"]["companies"]["items"]["properties"]["data"]
+                sections = prompt.split(COMPANY_KEY_MARKER)[1:]
+                names = [(_COMPANY_NAME_RE.search(section) or [None, ""])[1] for section in sections]
+                content = {"companies": [{"company_key": key, "data": fake_document(item_schema, name)}
+                                         for key, name in zip(keys, names)]}
+            else:
+                match = re.search(r"about the company '([^']+)'", prompt)
+                content = fake_document(schema, match.group(1) if match else "")
+            content = json.dumps(content, ensure_ascii=False)
+        else:
+            match = _COMPANY_NAME_RE.search(prompt)
+            name = match.group(1) if match else "The company"
+            content = "\n\n".join(f"{name} paragraph {i}." for i in (1, 2, 3))
+
+        return {
+            "id": self._next_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+    async def _chat_completions(self, request: web.Request) -> web.Response:
+        return web.json_response(self.complete(await request.json()))
+
+    # --- files ---
+
+    def _file_object(self, file_id: str) -> Dict[str, Any]:
+        stored = self.files[file_id]
+        return {"id": file_id, "object": "file", "bytes": len(stored["content"]), "created_at": stored["created_at"],
+                "filename": stored["filename"], "purpose": stored["purpose"], "status": "processed"}
+
+    def _store_file(self, content: bytes, filename: str, purpose: str) -> str:
+        file_id = self._next_id("file")
+        self.files[file_id] = {"content": content, "filename": filename, "purpose": purpose, "created_at": int(time.time())}
+        return file_id
+
+    async def _upload_file(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        upload = form["file"]
+        file_id = self._store_file(upload.file.read(), upload.filename, form.get("purpose", "batch"))
+        return web.json_response(self._file_object(file_id))
+
+    async def _file_content(self, request: web.Request) -> web.Response:
+        stored = self.files.get(request.match_info["file_id"])
+        if stored is None:
+            return web.json_response({"error": {"message": "file not found"}}, status=404)
+        return web.Response(body=stored["content"], content_type="application/octet-stream")
+
+    # --- batches ---
+
+    async def _create_batch(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        input_file = self.files.get(body["input_file_id"])
+        if input_file is None:
+            return web.json_response({"error": {"message": "input file not found"}}, status=404)
+
+        output_lines = []
+        for line in input_file["content"].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            batch_request = json.loads(line)
+            output_lines.append(json.dumps({
+                "id": self._next_id("batch_req"),
+                "custom_id": batch_request["custom_id"],
+                "response": {"status_code": 200, "request_id": self._next_id("req"),
+                             "body": self.complete(batch_request["body"])},
+                "error": None,
+            }, ensure_ascii=False))
+        # Like the real Batch API, output order is not guaranteed
+        output_lines.reverse()
+        output_file_id = self._store_file(("\n".join(output_lines) + "\n").encode("utf-8"), "batch_output.jsonl", "batch_output")
+
+        batch_id = self._next_id("batch")
+        now = int(time.time())
+        self.batches[batch_id] = {
+            "id": batch_id, "object": "batch", "endpoint": body["endpoint"], "errors": None,
+            "input_file_id": body["input_file_id"], "completion_window": body.get("completion_window", "24h"),
+            "status": "completed", "output_file_id": output_file_id, "error_file_id": None,
+            "created_at": now, "in_progress_at": now, "completed_at": now,
+            "request_counts": {"total": len(output_lines), "completed": len(output_lines), "failed": 0},
+            "metadata": body.get("metadata"),
+        }
+        return web.json_response(self.batches[batch_id])
+
+    async def _get_batch(self, request: web.Request) -> web.Response:
+        batch = self.batches.get(request.match_info["batch_id"])
+        if batch is None:
+            return web.json_response({"error": {"message": "batch not found"}}, status=404)
+        return web.json_response(batch)
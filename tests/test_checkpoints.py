@@ -0,0 +1,46 @@
+from src.pipeline.utils.checkpoints import CheckpointIndex, company_input_hash
+
+
+def test_index_survives_reopen_with_stages_and_result(tmp_path):
+    """После перезапуска завершенная компания берется из индекса, прерванная - с сохраненными этапами."""
+    done = company_input_hash({"name": "Acme", "url": "https://acme.com"})
+    interrupted = company_input_hash({"name": "Beta", "url": "https://beta.com"})
+
+    index = CheckpointIndex.for_session(tmp_path)
+    index.start(done, 0, "Acme")
+    index.save_stage(done, "homepage", {"text": "home"})
+    index.complete(done, {"name": "Acme", "Description": "Acme makes things"})
+    index.start(interrupted, 1, "Beta")
+    index.save_stage(interrupted, "homepage", {"text": "beta home"})
+    index.save_stage(interrupted, "linkedin", {"url": "https://linkedin.com/company/beta"})
+    index.close()
+
+    resumed = CheckpointIndex.for_session(tmp_path)
+    entry = resumed.get(done)
+    assert entry["status"] == "completed"
+    assert entry["result"] == {"name": "Acme", "Description": "Acme makes things"}
+
+    entry = resumed.get(interrupted)
+    assert entry["status"] == "running"
+    assert set(entry["stages"]) == {"homepage", "linkedin"}
+
+    # Повторная попытка сохраняет этапы и увеличивает счетчик попыток
+    resumed.start(interrupted, 1, "Beta")
+    resumed.fail(interrupted, "timeout")
+    entry = resumed.get(interrupted)
+    assert (entry["status"], entry["attempts"], entry["error"]) == ("failed", 2, "timeout")
+    assert set(entry["stages"]) == {"homepage", "linkedin"}
+    assert resumed.summary() == {"completed": 1, "failed": 1, "running": 0}
+
+    resumed.reset()
+    assert resumed.get(done) is None
+    resumed.close()
+
+
+def test_changed_input_row_is_a_new_company():
+    """Измененный URL или predator дает другой ключ; форма входной строки не важна."""
+    base = company_input_hash({"name": "Acme", "url": "https://acme.com", "predator": None})
+    assert company_input_hash(("Acme", "https://acme.com")) == base
+    assert company_input_hash({"name": "Acme", "url": "https://acme.io"}) != base
+    assert company_input_hash({"name": "Acme", "url": "https://acme.com", "predator": "1"}) != base
+    assert company_input_hash("Acme") == company_input_hash(("Acme",))
@@ -0,0 +1,59 @@
+import asyncio
+
+from openai import AsyncOpenAI
+
+from description_generator import DescriptionGenerator
+from stub_openai_server import StubOpenAIServer
+
+
+def _findings(company_name):
+    return [{"source": "llm_deep_search", "result": f"{company_name} is a cloud provider headquartered in Berlin."}]
+
+
+def test_packed_extraction_is_reconciled_by_company():
+    """Извлечение нескольких компаний упаковывается в один запрос, результаты не перепутаны."""
+
+    async def run():
+        async with StubOpenAIServer() as server:
+            client = AsyncOpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+            generator = DescriptionGenerator(
+                None, openai_client=client,
+                batch_config={"enabled": True, "max_companies_per_request": 3, "max_wait_seconds": 0.2}
+            )
+            companies = ["Alpha GmbH", "Beta AG", "Gamma SE"]
+            results = await asyncio.gather(*(generator.generate_description(name, _findings(name)) for name in companies))
+            await client.close()
+            return companies, results, server.requests, generator.batcher.stats
+
+    companies, results, requests, stats = asyncio.run(run())
+
+    extraction_requests = [r for r in requests if r.get("response_format")]
+    packed = [r for r in extraction_requests if r["response_format"]["json_schema"]["name"].endswith("_BATCH")]
+    # 16000 // 6500 = 2 компании в пачке: третья компания извлекается отдельным запросом
+    assert len(extraction_requests) == 2 and len(packed) == 1
+    assert packed[0]["max_tokens"] == 2 * 6500
+    assert stats["packed_requests"] == 1 and stats["single_requests"] == 1 and stats["fallbacks"] == 0
+    for name, result in zip(companies, results):
+        assert result["company_name"] == name
+        assert result["description"].startswith(f"{name} paragraph 1.")
+
+
+def test_batch_api_round_trip(tmp_path):
+    """Batch API: JSONL выгружается, ответы (в другом порядке) сопоставляются с компаниями по custom_id."""
+
+    async def run():
+        async with StubOpenAIServer() as server:
+            client = AsyncOpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+            generator = DescriptionGenerator(None, openai_client=client)
+            companies = [("Alpha GmbH", _findings("Alpha GmbH")), ("Empty Ltd", []), ("Beta AG", _findings("Beta AG"))]
+            outcomes = await generator.generate_descriptions_via_batch_api(companies, tmp_path, poll_seconds=0)
+            await client.close()
+            return outcomes
+
+    outcomes = asyncio.run(run())
+
+    assert outcomes[0]["company_name"] == "Alpha GmbH"
+    assert outcomes[0]["description"].startswith("Alpha GmbH paragraph 1.")
+    assert isinstance(outcomes[1], str)
+    assert outcomes[2]["company_name"] == "Beta AG"
+    assert (tmp_path / "extraction.jsonl").exists() and (tmp_path / "summary.manifest.json").exists()
@@ -0,0 +1,97 @@
+import json
+
+from src.external_apis import hubspot_cache
+from src.external_apis.hubspot_cache import HubSpotLookupCache
+from src.session_store import SessionMetadataStore
+
+
+def _company(company_id, updated=None):
+    return {"id": company_id, "properties": {"ai_description_updated": updated}}
+
+
+def test_hit_and_expiry(monkeypatch):
+    """Попадание в кэш; отрицательный результат истекает раньше положительного."""
+    cache = HubSpotLookupCache(ttl_seconds=100, negative_ttl_seconds=10)
+    now = hubspot_cache.time.time()
+    cache.set("domain:acme.com", _company("1"))
+    cache.set("domain:missing.com", None)
+
+    assert cache.lookup("domain:acme.com") == (True, _company("1"))
+    assert cache.lookup("domain:missing.com") == (True, None)
+    assert cache.lookup("domain:other.com") == (False, None)
+
+    monkeypatch.setattr(hubspot_cache.time, "time", lambda: now + 50)
+    assert cache.lookup("domain:missing.com") == (False, None)
+    assert cache.lookup("domain:acme.com")[0] is True
+
+    monkeypatch.setattr(hubspot_cache.time, "time", lambda: now + 150)
+    assert cache.lookup("domain:acme.com") == (False, None)
+    assert cache.get_stats()["expired"] == 2
+
+
+def test_entry_does_not_outlive_description_freshness(monkeypatch):
+    """Запись истекает, когда ai_description перестает быть свежим."""
+    cache = HubSpotLookupCache(ttl_seconds=365 * 86400)
+    now = hubspot_cache.time.time()
+    # Описание обновлено 30 дней назад, max_age_months=1 - свежее еще ~0.44 дня
+    updated_ms = str(int((now - 30 * 86400) * 1000))
+    cache.set("domain:acme.com", _company("1", updated_ms), max_age_months=1)
+
+    monkeypatch.setattr(hubspot_cache.time, "time", lambda: now + 86400)
+    assert cache.lookup("domain:acme.com") == (False, None)
+
+
+def test_invalidate_company_and_lru_eviction():
+    """Инвалидация удаляет все ключи компании; сверх max_entries вытесняется самая старая запись."""
+    cache = HubSpotLookupCache(max_entries=3)
+    cache.set("domain:acme.com", _company("1"))
+    cache.set("name:acme", _company("1"))
+    cache.set("domain:beta.com", _company("2"))
+
+    assert cache.invalidate_company("1") == 2
+    assert cache.lookup("name:acme") == (False, None)
+    assert cache.invalidate_company("1") == 0
+
+    cache.set("domain:c.com", _company("3"))
+    cache.set("domain:d.com", _company("4"))
+    cache.lookup("domain:beta.com")
+    cache.set("domain:e.com", _company("5"))
+    assert cache.lookup("domain:c.com") == (False, None)
+    assert cache.lookup("domain:beta.com")[0] is True
+    assert cache.get_stats()["evicted"] == 1
+
+
+def test_persisted_entries_survive_reopen(tmp_path):
+    """Новый экземпляр с тем же файлом начинает с сохраненными записями, без инвалидированных."""
+    path = str(tmp_path / "hubspot.sqlite")
+    cache = HubSpotLookupCache(persist_path=path)
+    cache.set("domain:acme.com", _company("1"))
+    cache.set("domain:beta.com", _company("2"))
+    cache.invalidate_company("2")
+    cache.close()
+
+    reopened = HubSpotLookupCache(persist_path=path)
+    assert reopened.get_stats()["loaded"] == 1
+    assert reopened.lookup("domain:acme.com") == (True, _company("1"))
+    assert reopened.lookup("domain:beta.com") == (False, None)
+    reopened.close()
+
+
+def test_session_store_migrates_json_and_updates_one_session(tmp_path):
+    """Сессии переносятся из JSON; update меняет поля одной сессии, функция может отменить обновление."""
+    legacy = tmp_path / "sessions_metadata.json"
+    legacy.write_text(json.dumps([
+        {"session_id": "a", "status": "running"},
+        {"session_id": "b", "status": "completed"},
+    ]), encoding="utf-8")
+    store = SessionMetadataStore(tmp_path / "sessions.sqlite", legacy_json_path=legacy)
+
+    assert [s["session_id"] for s in store.list_all()] == ["a", "b"]
+    store.update("a", {"status": "completed", "total": 3})
+    assert store.get("a") == {"session_id": "a", "status": "completed", "total": 3}
+    assert [s["session_id"] for s in store.list_by_status("completed")] == ["a", "b"]
+
+    unchanged = store.update("b", lambda current: None)
+    assert unchanged == {"session_id": "b", "status": "completed"}
+    assert store.update("missing", {"status": "x"}) is None
+    store.close()
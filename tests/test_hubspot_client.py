@@ -0,0 +1,67 @@
+import asyncio
+
+from src.external_apis.hubspot_cache import HubSpotLookupCache
+from src.integrations.hubspot.client import HubSpotClient
+
+
+def _client(cache=None):
+    return HubSpotClient(api_key="test-key", cache=cache or HubSpotLookupCache())
+
+
+def test_batch_update_chunks_and_falls_back_to_patch():
+    """Части по BATCH_LIMIT; отклоненная целиком часть обновляется по одной компании через PATCH."""
+    client = _client()
+    batches = []
+    patched = []
+
+    async def post_batch(action, inputs, extra=None):
+        batches.append([item["id"] for item in inputs])
+        if "bad" in [item["id"] for item in inputs]:
+            return 400, {}
+        return 200, {"results": [{"id": item["id"]} for item in inputs]}
+
+    async def update_company_properties(company_id, properties):
+        patched.append(company_id)
+        return company_id != "bad"
+
+    client._post_batch = post_batch
+    client.update_company_properties = update_company_properties
+
+    updates = {str(i): {"ai_description": f"d{i}"} for i in range(150)}
+    updates["bad"] = {"ai_description": "x"}
+    outcomes = asyncio.run(client.batch_update_companies(updates))
+
+    assert [len(batch) for batch in batches] == [100, 51]
+    # Вторая часть (50 компаний + "bad") отклонена целиком - PATCH по одной
+    assert patched == batches[1]
+    assert outcomes["bad"] is False
+    assert sum(outcomes.values()) == 150
+
+
+def test_batch_update_invalidates_cached_lookups():
+    """Обновленная компания удаляется из кэша поиска по домену."""
+    cache = HubSpotLookupCache()
+    cache.set("domain:example.com", {"id": "42", "properties": {}})
+    client = _client(cache)
+
+    async def post_batch(action, inputs, extra=None):
+        return 200, {"results": [{"id": item["id"]} for item in inputs]}
+
+    client._post_batch = post_batch
+    asyncio.run(client.batch_update_companies({"42": {"ai_description": "new"}}))
+    assert cache.lookup("domain:example.com") == (False, None)
+
+
+def test_session_of_previous_loop_is_closed():
+    """Сессия, созданная в другом event loop, закрывается при замене."""
+    client = _client()
+
+    async def get_session():
+        return await client._get_session()
+
+    first = asyncio.run(get_session())
+    second = asyncio.run(get_session())
+    assert second is not first
+    assert first.closed
+
+    asyncio.run(client.close())
@@ -0,0 +1,19 @@
+import asyncio
+
+from src.external_apis.rate_limiter import get_async_openai_client
+
+
+def test_async_openai_client_is_shared_per_loop_and_key():
+    """Один клиент на event loop и API ключ; новый loop получает свой клиент."""
+
+    async def clients():
+        first = get_async_openai_client("sk-a")
+        assert get_async_openai_client("sk-a") is first
+        other_key = get_async_openai_client("sk-b")
+        assert other_key is not first
+        for client in (first, other_key):
+            await client.close()
+        return first
+
+    first_loop_client = asyncio.run(clients())
+    assert asyncio.run(clients()) is not first_loop_client
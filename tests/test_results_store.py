@@ -0,0 +1,36 @@
+from src.results_store import ResultsStore, parse_filters
+
+
+def test_bool_column_with_blanks_keeps_bool_values(tmp_path):
+    """True/False колонка с пустыми ячейками (object в pandas) отдается и фильтруется как bool."""
+    csv_path = tmp_path / "results.csv"
+    csv_path.write_text("Company_Name,Flag\nAlpha,True\nBeta,\nGamma,False\nDelta,True\n", encoding="utf-8")
+    store = ResultsStore(csv_path)
+
+    total, rows = store.query()
+    assert total == 4
+    assert [row["Flag"] for row in rows] == [True, None, False, True]
+
+    total, rows = store.query(columns=["Company_Name"], filters=parse_filters(["Flag:eq:True"]))
+    assert total == 2
+    assert [row["Company_Name"] for row in rows] == ["Alpha", "Delta"]
+
+    total, _ = store.query(filters=parse_filters(["Flag:eq:false"]))
+    assert total == 1
+    store.close()
+
+
+def test_page_and_sort(tmp_path):
+    """offset/limit и сортировка выполняются по индексу; индекс перестраивается после изменения CSV."""
+    csv_path = tmp_path / "results.csv"
+    csv_path.write_text("Company_Name,Score\n" + "".join(f"C{i},{i % 5}\n" for i in range(20)), encoding="utf-8")
+    store = ResultsStore(csv_path)
+
+    total, rows = store.query(sort=[("Score", True)], offset=2, limit=3)
+    assert total == 20
+    assert [row["Score"] for row in rows] == [4, 4, 3]
+    assert [row["Company_Name"] for row in rows] == ["C14", "C19", "C3"]
+
+    csv_path.write_text("Company_Name,Score\nOnly,1\n", encoding="utf-8")
+    assert store.query()[0] == 1
+    store.close()
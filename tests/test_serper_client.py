@@ -0,0 +1,55 @@
+from src.external_apis import serper_client
+from src.external_apis.serper_client import SerperClient, get_serper_client, reset_serper_clients
+
+
+def _counting_client(tmp_path):
+    client = SerperClient("key", cache_path=str(tmp_path / "serper.sqlite"))
+    calls = []
+
+    def post(payload, max_retries):
+        calls.append(payload["q"])
+        return {"organic": [{"link": f"https://example.com/{len(calls)}"}]}
+
+    client._post_sync = post
+    return client, calls
+
+
+def test_repeated_query_is_served_from_cache(tmp_path):
+    """Повторный запрос не идет в Serper; ttl_seconds=0 читает мимо кэша и обновляет запись."""
+    client, calls = _counting_client(tmp_path)
+
+    first = client.search("acme corp")
+    assert client.search("acme corp") == first
+    assert calls == ["acme corp"]
+
+    refreshed = client.search("acme corp", ttl_seconds=0)
+    assert refreshed != first
+    assert client.search("acme corp") == refreshed
+    assert calls == ["acme corp", "acme corp"]
+    client.close()
+
+
+def test_expired_entry_is_refetched(tmp_path, monkeypatch):
+    """Запись старше TTL не используется."""
+    client, calls = _counting_client(tmp_path)
+    now = serper_client.time.time()
+    client.search("acme corp", ttl_seconds=60)
+
+    monkeypatch.setattr(serper_client.time, "time", lambda: now + 120)
+    client.search("acme corp", ttl_seconds=60)
+    assert len(calls) == 2
+    client.close()
+
+
+def test_shared_client_key_includes_settings(tmp_path):
+    """get_serper_client не отдает клиент с чужими настройками."""
+    cache_path = str(tmp_path / "serper.sqlite")
+    try:
+        client = get_serper_client("key", cache_path=cache_path, max_retries=2)
+        assert get_serper_client("key", cache_path=cache_path, max_retries=2) is client
+
+        other = get_serper_client("key", cache_path=cache_path, max_retries=5)
+        assert other is not client
+        assert other.max_retries == 5
+    finally:
+        reset_serper_clients()
@@ -0,0 +1,80 @@
+import asyncio
+import socket
+
+from src.external_apis import url_resolver
+from src.external_apis.url_resolver import UrlResolver, url_record
+
+
+def test_concurrent_checks_of_one_url_share_one_probe():
+    """Одновременные проверки одного URL объединяются; повторная проверка берется из кэша."""
+    resolver = UrlResolver()
+    probes = []
+
+    async def probe():
+        probes.append(1)
+        await asyncio.sleep(0.01)
+        return url_record(True, final_url="https://acme.com/")
+
+    async def run():
+        results = await asyncio.gather(*(resolver.resolve("https://acme.com", probe) for _ in range(5)))
+        cached = await resolver.resolve("acme.com", probe)
+        return results, cached
+
+    results, cached = asyncio.run(run())
+    assert len(probes) == 1
+    assert all(result["live"] for result in results)
+    assert cached["final_url"] == "https://acme.com/"
+    stats = resolver.get_stats()
+    assert (stats["misses"], stats["deduplicated"], stats["hits"]) == (1, 4, 1)
+
+
+def test_negative_results_expire_sooner(monkeypatch):
+    """Отрицательный результат живет negative_ttl_seconds, положительный - ttl_seconds."""
+    resolver = UrlResolver(ttl_seconds=100, negative_ttl_seconds=10)
+    now = url_resolver.time.time()
+
+    async def check(url, live):
+        async def probe():
+            return url_record(live)
+        return await resolver.resolve(url, probe)
+
+    asyncio.run(check("https://up.com", True))
+    asyncio.run(check("https://down.com", False))
+
+    monkeypatch.setattr(url_resolver.time, "time", lambda: now + 50)
+    assert resolver.get("https://up.com")["live"] is True
+    assert resolver.get("https://down.com") is None
+
+    monkeypatch.setattr(url_resolver.time, "time", lambda: now + 150)
+    assert resolver.get("https://up.com") is None
+
+
+def test_journal_restores_urls_and_hosts(tmp_path, monkeypatch):
+    """Возобновленная сессия читает проверки из журнала и не повторяет их."""
+    path = tmp_path / "url_resolution_cache.jsonl"
+    resolver = UrlResolver(persist_path=path)
+
+    async def failing_getaddrinfo(self, host, port):
+        raise socket.gaierror("Name or service not known")
+
+    monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", failing_getaddrinfo)
+
+    async def run(resolver):
+        async def probe():
+            return url_record(True, status=200)
+        await resolver.resolve("https://acme.com", probe)
+        try:
+            await resolver.resolve_host("missing.example")
+        except socket.gaierror as e:
+            return str(e)
+
+    asyncio.run(run(resolver))
+    resolver.close()
+
+    restored = UrlResolver(persist_path=path)
+    assert restored.get_stats()["loaded"] == 2
+    assert restored.get("https://acme.com")["status"] == 200
+    assert asyncio.run(run(restored)) == "Name or service not known"
+    stats = restored.get_stats()
+    assert (stats["misses"], stats["hits"], stats["dns_misses"], stats["dns_hits"]) == (0, 1, 0, 1)
+    restored.close()